@@ -9,11 +9,85 @@ from requests.auth import AuthBase, HTTPBasicAuth
 from requests.cookies import extract_cookies_to_jar
 from requests.utils import parse_dict_header
 from urllib.parse import urlparse
+import hashlib
 import requests
 import re
+import threading
+import time
 
 from atomic_reactor.utils.retries import get_retrying_requests_session
 
+# lifetime of a token when the realm does not specify expires_in (as per the
+# docker token authentication specification)
+DEFAULT_TOKEN_EXPIRES_IN = 60
+# tokens are considered expired this many seconds before they actually expire
+TOKEN_EXPIRY_MARGIN = 10
+
+
+class BearerTokenStore(object):
+    """Process-wide store of registry Bearer tokens.
+
+    Tokens are keyed by realm, token request parameters (service, scope) and
+    credentials, and are dropped once they expire. The Bearer challenges
+    (www-authenticate header) of registries are stored too, so that a token
+    can be attached to the first request sent to a repository, without
+    waiting for the registry to respond with 401.
+
+    Counts the 401 round trips and token fetches avoided thanks to the store,
+    compared to a per-session token cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._challenges = {}
+        self.round_trips_avoided = 0
+        self.fetches_avoided = 0
+
+    def get_challenge(self, registry):
+        with self._lock:
+            return self._challenges.get(registry)
+
+    def set_challenge(self, registry, challenge):
+        with self._lock:
+            self._challenges[registry] = challenge
+
+    def get_token(self, key):
+        """Return the token stored for key, None if there is no valid token"""
+        with self._lock:
+            token, expires_at = self._tokens.get(key, (None, 0))
+            if token is not None and expires_at <= time.monotonic():
+                del self._tokens[key]
+                return None
+            return token
+
+    def set_token(self, key, token, expires_in=None):
+        expires_in = expires_in or DEFAULT_TOKEN_EXPIRES_IN
+        expires_at = time.monotonic() + expires_in - min(TOKEN_EXPIRY_MARGIN, expires_in / 2)
+        with self._lock:
+            self._tokens[key] = (token, expires_at)
+
+    def invalidate(self, key, token):
+        """Drop the token stored for key, unless it was already replaced by another one"""
+        with self._lock:
+            if self._tokens.get(key, (None,))[0] == token:
+                del self._tokens[key]
+
+    def count_avoided(self, round_trip, fetch):
+        with self._lock:
+            self.round_trips_avoided += int(round_trip)
+            self.fetches_avoided += int(fetch)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._challenges.clear()
+            self.round_trips_avoided = 0
+            self.fetches_avoided = 0
+
+
+token_store = BearerTokenStore()
+
 
 class HTTPBearerAuth(AuthBase):
     """Performs Bearer authentication for the given Request object.
@@ -25,9 +99,12 @@ class HTTPBearerAuth(AuthBase):
     auth_b64 may be provided for authentication (instead of username and
     password).
 
-    Once Bearer token is retrieved, it will be cached and used in subsequent
-    requests. Since tokens are specific to repositories, the token cache may
-    store multiple tokens.
+    Once Bearer token is retrieved, it will be stored in the process-wide
+    token_store and used in subsequent requests, by all instances using the
+    same credentials, until the token expires. Since tokens are specific to
+    repositories, the store may hold multiple tokens. Once the Bearer challenge
+    of a registry is known, tokens are requested before the first request to a
+    repository is sent. A token rejected by the registry is fetched again once.
 
     Supports registry v2 API only.
     """
@@ -52,15 +129,25 @@ class HTTPBearerAuth(AuthBase):
         self.verify = verify
         self.access = access or ('pull',)
 
-        self._token_cache = {}
+        # repositories this instance already sent a token to
+        self._authorized_repos = set()
         self._retry_session = get_retrying_requests_session()   # Used when querying for token
 
     def __call__(self, response):
         repo = self._get_repo_from_url(response.url)
-
-        if repo in self._token_cache:
-            self._set_header(response, repo)
-            return response
+        challenge = token_store.get_challenge(self._get_registry_from_url(response.url))
+
+        if challenge is not None:
+            key = self._get_token_key(challenge, repo)
+            token = token_store.get_token(key)
+            fetch_avoided = token is not None
+            if token is None:
+                token = self._fetch_token(key)
+            if repo not in self._authorized_repos:
+                # without the store, this request would be answered with 401
+                token_store.count_avoided(round_trip=True, fetch=fetch_avoided)
+                self._authorized_repos.add(repo)
+            self._set_header(response, token)
 
         def handle_401_with_repo(response, **kwargs):
             return self.handle_401(response, repo, **kwargs)
@@ -78,7 +165,20 @@ class HTTPBearerAuth(AuthBase):
         if 'bearer' not in auth_info.lower():
             return response
 
-        self._token_cache[repo] = self._get_token(auth_info, repo)
+        challenge = parse_dict_header(self.BEARER_PATTERN.sub('', auth_info, count=1))
+        token_store.set_challenge(self._get_registry_from_url(response.url), challenge)
+        key = self._get_token_key(challenge, repo)
+
+        sent_header = response.request.headers.get('Authorization', '')
+        sent_token = sent_header[len('Bearer '):] if self.BEARER_PATTERN.match(sent_header) \
+            else None
+        if sent_token is not None:
+            # the token expired or was revoked
+            token_store.invalidate(key, sent_token)
+        token = token_store.get_token(key)
+        if token is None or token == sent_token:
+            token = self._fetch_token(key)
+        self._authorized_repos.add(repo)
 
         # Consume content and release the original connection
         # to allow our new request to reuse the same one.
@@ -89,7 +189,7 @@ class HTTPBearerAuth(AuthBase):
         extract_cookies_to_jar(retry_request._cookies, response.request, response.raw)
         retry_request.prepare_cookies(retry_request._cookies)
 
-        self._set_header(retry_request, repo)
+        self._set_header(retry_request, token)
         retry_response = response.connection.send(retry_request, **kwargs)
         retry_response.history.append(response)
         retry_response.request = retry_request
@@ -100,26 +200,46 @@ class HTTPBearerAuth(AuthBase):
 
         return retry_response
 
-    def _get_token(self, auth_info, repo):
-        bearer_info = parse_dict_header(self.BEARER_PATTERN.sub('', auth_info, count=1))
+    def _get_token_key(self, challenge, repo):
+        """Get the key of the token for repo in token_store
+
+        :param challenge: dict, parameters of the Bearer challenge (realm, service, ...)
+        :param repo: str, repository, None for global access
+        :return: tuple, realm, token request parameters and a digest of credentials
+        """
+        bearer_info = dict(challenge)
         # If repo could not be determined, do not set scope - implies global access
         if repo:
             bearer_info['scope'] = 'repository:{}:{}'.format(repo, ','.join(self.access))
         realm = bearer_info.pop('realm')
 
+        credentials = self.auth_b64 or '{}:{}'.format(self.username, self.password)
+        if not self.auth_b64 and not (self.username and self.password):
+            credentials = ''
+        credentials_digest = hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+
+        return realm, tuple(sorted(bearer_info.items())), credentials_digest
+
+    def _fetch_token(self, key):
+        realm, params, _ = key
+
         realm_auth = None
         if self.auth_b64:
             realm_auth = HTTPBasicAuthWithB64(self.auth_b64)
         elif self.username and self.password:
             realm_auth = HTTPBasicAuth(self.username, self.password)
 
-        realm_response = self._retry_session.get(realm, params=bearer_info, verify=self.verify,
+        realm_response = self._retry_session.get(realm, params=dict(params), verify=self.verify,
                                                  auth=realm_auth)
         realm_response.raise_for_status()
-        return realm_response.json()['token']
+        token_info = realm_response.json()
+        token = token_info['token']
+        token_store.set_token(key, token, token_info.get('expires_in'))
+        return token
 
-    def _set_header(self, response, repo):
-        response.headers['Authorization'] = 'Bearer {}'.format(self._token_cache[repo])
+    @staticmethod
+    def _set_header(response, token):
+        response.headers['Authorization'] = 'Bearer {}'.format(token)
 
     def _get_repo_from_url(self, url):
         url_parts = urlparse(url)
@@ -129,6 +249,11 @@ class HTTPBearerAuth(AuthBase):
             repo = v2_match.group(1)
         return repo
 
+    @staticmethod
+    def _get_registry_from_url(url):
+        url_parts = urlparse(url)
+        return '{}://{}'.format(url_parts.scheme, url_parts.netloc)
+
 
 class HTTPBasicAuthWithB64(AuthBase):
     """Performs Basic authentication for the given Request object.
@@ -161,6 +161,7 @@ class ReactorConfigKeys(object):
     CACHITO_KEY = 'cachito'
     ALLOW_MULTIPLE_REMOTE_SOURCES_KEY = 'allow_multiple_remote_sources'
     ARTIFACTS_ALLOWED_DOMAINS_KEY = 'artifacts_allowed_domains'
+    ARTIFACTS_CACHE_KEY = 'artifacts_cache'
     YUM_REPO_ALLOWED_DOMAINS_KEY = 'yum_repo_allowed_domains'
     IMAGE_LABELS_KEY = 'image_labels'
     IMAGE_LABEL_INFO_URL_FORMAT_KEY = 'image_label_info_url_format'
@@ -183,6 +184,8 @@ class ReactorConfigKeys(object):
     SKIP_KOJI_CHECK_FOR_BASE_IMAGE_KEY = 'skip_koji_check_for_base_image'
     DEEP_MANIFEST_LIST_INSPECTION_KEY = 'deep_manifest_list_inspection'
     FAIL_ON_DIGEST_MISMATCH_KEY = 'fail_on_digest_mismatch'
+    LAYER_SIZES_FROM_REGISTRY_KEY = 'layer_sizes_from_registry'
+    GIT_MIRROR_CACHE_KEY = 'git_mirror_cache'
     SOURCE_CONTAINER_KEY = 'source_container'
     OPERATOR_MANIFESTS_KEY = 'operator_manifests'
     IMAGE_SIZE_LIMIT_KEY = 'image_size_limit'
@@ -366,6 +369,16 @@ class Configuration(object):
     def artifacts_allowed_domains(self):
         return self._get_value(ReactorConfigKeys.ARTIFACTS_ALLOWED_DOMAINS_KEY, fallback=[])
 
+    @property
+    def artifacts_cache(self):
+        config = self._get_value(ReactorConfigKeys.ARTIFACTS_CACHE_KEY, fallback=None)
+        if not config:
+            return None
+        return {
+            'path': config['path'],
+            'max_size': config.get('max_size', 0),
+        }
+
     @property
     def yum_repo_allowed_domains(self):
         return self._get_value(ReactorConfigKeys.YUM_REPO_ALLOWED_DOMAINS_KEY, fallback=[])
@@ -495,6 +508,20 @@ class Configuration(object):
     def fail_on_digest_mismatch(self):
         return self._get_value(ReactorConfigKeys.FAIL_ON_DIGEST_MISMATCH_KEY, fallback=True)
 
+    @property
+    def layer_sizes_from_registry(self):
+        return self._get_value(ReactorConfigKeys.LAYER_SIZES_FROM_REGISTRY_KEY, fallback=False)
+
+    @property
+    def git_mirror_cache(self):
+        config = self._get_value(ReactorConfigKeys.GIT_MIRROR_CACHE_KEY, fallback=None)
+        if not config:
+            return None
+        return {
+            'path': config['path'],
+            'max_size': config.get('max_size', 0),
+        }
+
     @property
     def source_container(self):
         return self._get_value(ReactorConfigKeys.SOURCE_CONTAINER_KEY, fallback={})
@@ -72,6 +72,7 @@ TOOLS_USED = (
 )
 
 DEFAULT_DOWNLOAD_BLOCK_SIZE = 10 * 1024 * 1024  # 10Mb
+DEFAULT_UPLOAD_BLOCK_SIZE = 1024 * 1024  # 1Mb, same as koji fast upload
 
 IMAGE_TYPE_DOCKER_ARCHIVE = 'docker-archive'
 IMAGE_TYPE_OCI = 'oci'
@@ -132,10 +133,10 @@ DOCKER_MAX_RETRIES = 3
 DOCKER_BACKOFF_FACTOR = 5
 # docker retries statuses
 DOCKER_CLIENT_STATUS_RETRY = (408, 500, 502, 503, 504)
-# max retries for docker push
-DOCKER_PUSH_MAX_RETRIES = 6
-# how many seconds should wait before another try of docker push
-DOCKER_PUSH_BACKOFF_FACTOR = 5
+# max retries of looking up a pushed manifest, which is not visible in the registry yet
+PUSHED_MANIFEST_MAX_RETRIES = 6
+# how many seconds should wait (with jitter) before another lookup of a pushed manifest
+PUSHED_MANIFEST_BACKOFF_FACTOR = 1
 # max retries for http requests
 HTTP_MAX_RETRIES = 10
 # how many seconds should wait before another try of http request
@@ -157,6 +158,8 @@ KOJI_RESERVE_RETRY_DELAY = 2
 KOJI_MAX_RETRIES = 120
 KOJI_RETRY_INTERVAL = 60
 KOJI_OFFLINE_RETRY_INTERVAL = 120
+# max number of files uploaded to koji at the same time
+KOJI_MAX_CONCURRENT_UPLOADS = 4
 # max retries for locking remote host slots
 REMOTE_HOST_MAX_RETRIES = 10
 REMOTE_HOST_RETRY_INTERVAL = 5
@@ -6,14 +6,18 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 import logging
+import os
+import time
 import reflink
 
+from dataclasses import dataclass
 from pathlib import Path
 import shutil
 from shutil import copytree
-from typing import Dict, List, Callable, Iterable, Optional, TypeVar
+from typing import Any, Dict, List, Callable, Iterable, Optional, Tuple, TypeVar
 
 from dockerfile_parse import DockerfileParser
+from dockerfile_parse.util import b2u
 
 from atomic_reactor.constants import (
     DOCKERFILE_FILENAME,
@@ -38,6 +42,115 @@ class DockerfileNotExist(Exception):
     """Dockerfile does not exist."""
 
 
+# Changes made within this time after the last modification may not be
+# visible in the mtime (coarse filesystem timestamps)
+MTIME_GRANULARITY_NS = 1_000_000_000
+
+
+@dataclass
+class DockerfileCacheStats:
+    """Number of Dockerfile parses and of parses served from the cache"""
+
+    parses: int = 0
+    hits: int = 0
+
+
+class CachedDockerfileParser(DockerfileParser):
+    """DockerfileParser keeping the content and the parsed structure in memory.
+
+    The content is re-read only when the mtime, size or inode of the file
+    changes, or, when the file was modified too recently for the mtime to
+    tell, when the file content differs. The structure is re-parsed only when
+    the content changes. Writes through the parser go to the file as usual.
+    """
+
+    def __init__(self, path: str, parent_env: Optional[Dict[str, str]] = None,
+                 stats: Optional[DockerfileCacheStats] = None) -> None:
+        self.stats = stats or DockerfileCacheStats()
+        # stat of the file when the cached content was read or written
+        self._file_state: Optional[Tuple[int, int, int]] = None
+        self._checked_at = 0
+        self._parsed: Optional[Tuple[str, List[Dict[str, Any]]]] = None
+        # the content is read lazily, on the first access
+        super().__init__(path, cache_content=False, parent_env=parent_env)
+        self.cache_content = True
+
+    @staticmethod
+    def _state(st: os.stat_result) -> Tuple[int, int, int]:
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _read(self) -> str:
+        try:
+            with open(self.dockerfile_path, 'rb') as dockerfile:
+                return b2u(dockerfile.read())
+        except (IOError, OSError) as ex:
+            logger.error("Couldn't retrieve content of dockerfile: %r", ex)
+            raise
+
+    def _is_current(self) -> bool:
+        if self._file_state is None:
+            return False
+        try:
+            st = os.stat(self.dockerfile_path)
+        except FileNotFoundError:
+            return False
+        if self._state(st) != self._file_state:
+            return False
+        if st.st_mtime_ns + MTIME_GRANULARITY_NS > self._checked_at:
+            checked_at = time.time_ns()
+            if self._read() != self.cached_content:
+                return False
+            self._checked_at = checked_at
+        return True
+
+    def _reload(self) -> None:
+        self._checked_at = time.time_ns()
+        # stat before reading, a concurrent change makes the next check fail
+        try:
+            file_state: Optional[Tuple[int, int, int]] = self._state(
+                os.stat(self.dockerfile_path)
+            )
+        except FileNotFoundError:
+            file_state = None
+        self.cached_content = self._read()
+        self._file_state = file_state
+
+    def _written(self) -> None:
+        self._checked_at = time.time_ns()
+        self._file_state = self._state(os.stat(self.dockerfile_path))
+
+    @property
+    def content(self) -> str:
+        if not self._is_current():
+            self._reload()
+        return self.cached_content
+
+    @content.setter
+    def content(self, content: str) -> None:
+        DockerfileParser.content.fset(self, content)  # type: ignore[attr-defined]
+        self._written()
+
+    @property
+    def lines(self) -> List[str]:
+        return self.content.splitlines(True)
+
+    @lines.setter
+    def lines(self, lines: List[str]) -> None:
+        DockerfileParser.lines.fset(self, lines)  # type: ignore[attr-defined]
+        self._written()
+
+    @property
+    def structure(self) -> List[Dict[str, Any]]:
+        content = self.content
+        if self._parsed is not None and self._parsed[0] == content:
+            self.stats.hits += 1
+        else:
+            self._parsed = (content, super().structure)
+            self.stats.parses += 1
+        # callers may modify the instructions
+        return [dict(instruction) for instruction in self._parsed[1]]
+
+
 class BuildDirIsNotInitialized(Exception):
     """Build directories are not initialized."""
 
@@ -48,12 +161,18 @@ class BuildDirIsNotInitialized(Exception):
 class BuildDir(object):
     """Representing a directory which is specific to a platform."""
 
-    def __init__(self, path: Path, platform: str) -> None:
+    def __init__(
+        self, path: Path, platform: str, dockerfile_stats: Optional[DockerfileCacheStats] = None
+    ) -> None:
         if not path.exists():
             raise FileNotFoundError(f"Build directory {path} does not exist.")
         self.path = path
         self.platform = platform
         self.exported_squashed_image: Path = self.path / EXPORTED_SQUASHED_IMAGE_NAME
+        self.dockerfile_stats = dockerfile_stats or DockerfileCacheStats()
+        # parsers by the parent environment they were created with
+        self._dockerfiles: Dict[Optional[Tuple[Tuple[str, str], ...]],
+                                CachedDockerfileParser] = {}
 
     def exported_compressed_image(self, ext: str) -> Path:
         """Return the filename of an exported compressed image.
@@ -79,10 +198,23 @@ class BuildDir(object):
     def dockerfile(self) -> DockerfileParser:
         """Return the parsed Dockerfile.
 
+        The parser is reused between calls, it is re-parsed only when the
+        Dockerfile changes.
+
         :return: the parsed Dockerfile.
         :rtype: DockerfileParser
         """
-        return DockerfileParser(str(self.dockerfile_path))
+        return self._cached_dockerfile(None)
+
+    def _cached_dockerfile(self, parent_env: Optional[Dict[str, str]]) -> DockerfileParser:
+        key = None if parent_env is None else tuple(sorted(parent_env.items()))
+        path = str(self.dockerfile_path)
+        parser = self._dockerfiles.get(key)
+        if parser is None or parser.dockerfile_path != path:
+            parser = CachedDockerfileParser(path, parent_env=parent_env,
+                                            stats=self.dockerfile_stats)
+            self._dockerfiles[key] = parser
+        return parser
 
     @staticmethod
     def _get_env_from_inspection(data: ImageInspectionData) -> Optional[Dict[str, str]]:
@@ -117,7 +249,7 @@ class BuildDir(object):
         envs = self._get_env_from_inspection(parent_inspect)
         if envs is None:
             logger.debug("Parent Environment not found, not applied to Dockerfile")
-        return DockerfileParser(str(self.dockerfile_path), parent_env=envs)
+        return self._cached_dockerfile(envs)
 
 
 FileCreationFunc = Callable[[BuildDir], Iterable[Path]]
@@ -142,6 +274,8 @@ class RootBuildDir(object):
             raise FileNotFoundError(f"Path {path} does not exist.")
         self.path = path
         self.platforms: List[str] = []
+        self.dockerfile_stats = DockerfileCacheStats()
+        self._platform_dirs: Dict[str, BuildDir] = {}
 
     @property
     def source_container_sources_dir(self) -> Path:
@@ -215,8 +349,16 @@ class RootBuildDir(object):
         return self.platform_dir(self.platforms[0])
 
     def platform_dir(self, platform: str) -> BuildDir:
-        """Get the build directory for the specified platform."""
-        return BuildDir(self.path / platform, platform)
+        """Get the build directory for the specified platform.
+
+        The same BuildDir is returned between calls, so that parsed
+        Dockerfiles are cached for the whole task.
+        """
+        build_dir = self._platform_dirs.get(platform)
+        if build_dir is None:
+            build_dir = BuildDir(self.path / platform, platform, self.dockerfile_stats)
+            self._platform_dirs[platform] = build_dir
+        return build_dir
 
     def for_each_platform(self, action: Callable[[BuildDir], T]) -> Dict[str, T]:
         """Apply an action on every platform-specific directory.
@@ -318,6 +460,7 @@ class ContextDir:
             path.mkdir(parents=True)
         self._path = path
         self.workflow_json = path / "workflow.json"
+        self.digest_cache = path / "digest_cache.jsonl"
 
     def get_platform_dir(self, platform: str) -> Path:
         """Get the directory specific to the specified platform.
@@ -13,7 +13,7 @@ import time
 import requests
 from urllib.parse import urlparse
 
-from atomic_reactor.util import get_retrying_requests_session
+from atomic_reactor.util import digest_cache, get_retrying_requests_session
 from atomic_reactor.constants import (
     DEFAULT_DOWNLOAD_BLOCK_SIZE,
     HTTP_BACKOFF_FACTOR,
@@ -91,6 +91,11 @@ def download_url(url, dest_dir, insecure=False, session=None, dest_filename=None
                     else:
                         logger.info('digest for cachito archive is correct')
 
+            computed = {f'{algo}sum': checksum.hexdigest()
+                        for algo, checksum in checksums.items()}
+            if verify_cachito_digest:
+                computed[f'{CACHITO_HASH_ALG}sum'] = cachito_hasher.hexdigest()
+            digest_cache.update_file(dest_path, computed)
             break
         except requests.exceptions.RequestException:
             if attempt < HTTP_MAX_RETRIES:
@@ -13,8 +13,6 @@ import functools
 import json
 import logging
 import threading
-import os
-import time
 import re
 from dataclasses import dataclass, field, fields
 from textwrap import dedent
@@ -22,6 +20,7 @@ from typing import Any, Callable, Dict, Final, List, Optional, Union, Tuple
 
 from dockerfile_parse import DockerfileParser
 
+from atomic_reactor.auth import token_store
 from atomic_reactor.dirs import ContextDir, RootBuildDir
 from atomic_reactor.plugin import PluginsRunner
 from atomic_reactor.constants import (
@@ -34,7 +33,7 @@ from atomic_reactor.util import (DockerfileImages,
                                  base_image_is_custom, print_version_of_tools, validate_with_schema)
 from atomic_reactor.config import Configuration, get_openshift_session
 from atomic_reactor.source import Source, DummySource
-from atomic_reactor.utils import imageutil
+from atomic_reactor.utils import imageutil, resource_monitor
 # from atomic_reactor import get_logging_encoding
 from osbs.api import OSBS
 from osbs.utils import ImageName
@@ -42,6 +41,9 @@ from osbs.utils import ImageName
 
 logger = logging.getLogger(__name__)
 
+# seconds to wait for FSWatcher to take the last sample
+FS_WATCHER_JOIN_TIMEOUT = 5
+
 
 class BuildResults(object):
     build_logs = None
@@ -212,24 +214,42 @@ class TagConf(ISerializer):
 
 class FSWatcher(threading.Thread):
     """
-    Poll the filesystem every second in the background and keep a record of highest usage.
+    Sample the resources used by the build in the background.
+
+    Keeps a record of the highest usage of the root filesystem and, through a
+    ResourceMonitor, a time series of the disk usage of the filesystems the build
+    writes to and of the memory, CPU and block I/O of the process tree, tagged
+    with the running plugin. Samples are taken every second while the usage
+    changes and less often while it is steady.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, paths: Optional[List[str]] = None, **kwargs):
+        """
+        :param paths: paths in the filesystems to sample, see resource_monitor.default_paths
+        """
         super(FSWatcher, self).__init__(*args, **kwargs)
         self.daemon = True  # exits whenever the process exits
         self._lock = threading.Lock()
+        self._wakeup = threading.Event()
         self._done = False
         self._data = {}
+        self._paths = paths or resource_monitor.default_paths()
+        self._plugin: Optional[str] = None
+        self._monitor: Optional[resource_monitor.ResourceMonitor] = None
 
     def run(self):
         """ Overrides parent method to implement thread's functionality. """
+        monitor = resource_monitor.ResourceMonitor(self._paths)
+        with self._lock:
+            self._monitor = monitor
         while True:  # make sure to run at least once before exiting
             with self._lock:
                 self._update(self._data)
+                interval = monitor.sample(self._plugin)
             if self._done:
                 break
-            time.sleep(1)
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
 
     def get_usage_data(self):
         """ Safely retrieve the most up to date results. """
@@ -237,27 +257,29 @@ class FSWatcher(threading.Thread):
             data_copy = self._data.copy()
         return data_copy
 
+    def get_resource_data(self) -> Optional[Dict[str, Any]]:
+        """Safely retrieve the sampled time series and peaks, None if the watcher did not run"""
+        with self._lock:
+            return self._monitor.as_dict() if self._monitor else None
+
+    def set_plugin(self, plugin: Optional[str]) -> None:
+        """Tag the following samples with the running plugin, and take one at once."""
+        self._plugin = plugin
+        self._wakeup.set()
+
     def finish(self):
-        """ Signal background thread to exit next time it wakes up. """
+        """ Signal background thread to take the last sample and exit. """
         with self._lock:  # just to be tidy; lock not really needed to set a boolean
             self._done = True
+        self._wakeup.set()
 
     @staticmethod
     def _update(data):
         try:
-            st = os.statvfs("/")
+            new_data = resource_monitor.disk_usage("/")
         except Exception as e:
             return e  # just for tests; we don't really need return value
 
-        mb = 1000 ** 2  # sadly storage is generally expressed in decimal units
-        new_data = dict(
-            mb_free=st.f_bfree * st.f_frsize // mb,
-            mb_total=st.f_blocks * st.f_frsize // mb,
-            mb_used=(st.f_blocks - st.f_bfree) * st.f_frsize // mb,
-            inodes_free=st.f_ffree,
-            inodes_total=st.f_files,
-            inodes_used=st.f_files - st.f_ffree,
-        )
         for key in ["mb_total", "mb_used", "inodes_total", "inodes_used"]:
             data[key] = max(new_data[key], data.get(key, 0))
         for key in ["mb_free", "inodes_free"]:
@@ -315,13 +337,32 @@ class ImageBuildWorkflowData(ISerializer):
 
     parent_images_digests: Dict[str, Dict[str, str]] = field(default_factory=dict)
 
+    # PNC artifact records (id, publicUrl, purl and checksums) by artifact id, fetched
+    # by fetch_maven_artifacts and reused by the plugins of later tasks
+    pnc_artifacts: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    # Manifest digests pushed or looked up by plugins, by pullspec and media type, see
+    # atomic_reactor.utils.digest_ledger
+    digest_ledger: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    # Plugin name -> number of registry lookups served from digest_ledger
+    digest_ledger_hits: Dict[str, int] = field(default_factory=dict)
+
+    # Resources sampled by FSWatcher, one entry per workflow run (task), see
+    # atomic_reactor.utils.resource_monitor.ResourceMonitor.as_dict
+    resource_usage: List[Dict[str, Any]] = field(default_factory=list)
+
     # List of output files that are uploaded to Brew/Koji
-    # Each element is a two-strings list, local_filename and dest_filename. E.g.
+    # Each element is a dict with the local_filename and dest_filename strings and
+    # an optional metadata dict, the Koji output metadata of the file. The checksum
+    # is added to the metadata while uploading the file. E.g.
     # [
     #     {"local_filename": "/path/to/data.json", "dest_filename": "metadata.json"},
-    #     {"local_filename": "/path/to/build.log", "dest_filename": "x86_64-build.log"},
+    #     {"local_filename": "/path/to/remote-source.tar.gz",
+    #      "dest_filename": "remote-source.tar.gz",
+    #      "metadata": {"filename": "remote-source.tar.gz", "filesize": 1024,
+    #                   "arch": "noarch", "type": "remote-sources", ...}},
     # ]
-    koji_upload_files: List[Dict[str, str]] = field(default_factory=list)
+    koji_upload_files: List[Dict[str, Any]] = field(default_factory=list)
 
     @classmethod
     def load(cls, data: Dict[str, Any]):
@@ -501,7 +542,7 @@ class DockerBuildWorkflow(object):
         self.keep_plugins_running = keep_plugins_running
         self.plugin_files = plugin_files
         self.plugins_conf = plugins_conf or []
-        self.fs_watcher = FSWatcher()
+        self.fs_watcher = FSWatcher(paths=resource_monitor.default_paths(build_dir.path))
 
         self.storage_transport = DOCKER_STORAGE_TRANSPORT_NAME
 
@@ -639,6 +680,17 @@ class DockerBuildWorkflow(object):
         )
         return failed, cancelled
 
+    def _save_resource_usage(self) -> None:
+        if self.fs_watcher.is_alive():
+            # let the watcher take the last sample
+            self.fs_watcher.join(FS_WATCHER_JOIN_TIMEOUT)
+        usage = self.fs_watcher.get_resource_data()
+        if not usage:
+            return
+        self.data.resource_usage.append(usage)
+        logger.debug("Resource monitor took %d samples using %.3fs of CPU, peaks: %s",
+                     usage['sample_count'], usage['overhead_cpu_seconds'], usage['peaks'])
+
     def build_container_image(self) -> None:
         """Start the container build.
 
@@ -659,3 +711,9 @@ class DockerBuildWorkflow(object):
             runner.run()
         finally:
             self.fs_watcher.finish()
+            self._save_resource_usage()
+            dockerfile_stats = self.build_dir.dockerfile_stats
+            logger.debug("Dockerfile parsed %d times, %d parses served from the cache",
+                         dockerfile_stats.parses, dockerfile_stats.hits)
+            logger.debug("Registry token store avoided %d 401 round trips and %d token fetches",
+                         token_store.round_trips_avoided, token_store.fetches_avoided)
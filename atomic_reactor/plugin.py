@@ -319,9 +319,11 @@ class PluginsRunner(object):
         start_time = datetime.now()
         plugin_key = exec_info.plugin_class.key
         self.save_plugin_timestamp(plugin_key, start_time)
+        self.workflow.fs_watcher.set_plugin(plugin_key)
         try:
             yield
         finally:
+            self.workflow.fs_watcher.set_plugin(None)
             try:
                 finish_time = datetime.now()
                 duration = finish_time - start_time
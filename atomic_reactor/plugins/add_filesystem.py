@@ -20,7 +20,7 @@ from atomic_reactor.constants import (DEFAULT_DOWNLOAD_BLOCK_SIZE, PLUGIN_ADD_FI
                                       PLUGIN_RESOLVE_COMPOSES_KEY)
 from atomic_reactor.config import get_koji_session
 from atomic_reactor.plugin import Plugin, TaskCanceledException
-from atomic_reactor.utils.koji import TaskWatcher, stream_task_output
+from atomic_reactor.utils.koji import TaskWatcher, download_task_output
 from atomic_reactor.utils.yum import YumRepo
 from atomic_reactor.util import get_platforms, base_image_is_custom, map_to_user_params
 from atomic_reactor import util
@@ -77,12 +77,12 @@ class AddFilesystemPlugin(Plugin):
         "koji_target",
     )
 
-    def __init__(self, workflow, poll_interval=5, blocksize=DEFAULT_DOWNLOAD_BLOCK_SIZE,
+    def __init__(self, workflow, poll_interval=None, blocksize=DEFAULT_DOWNLOAD_BLOCK_SIZE,
                  repos=None, koji_target=None):
         """
         :param workflow: DockerBuildWorkflow instance
         :param poll_interval: int, seconds between polling Koji while waiting
-                              for task completion
+                              for task completion, None to poll on a backoff
         :param blocksize: int, chunk size for downloading files from koji
         :param repos: list<str>: list of yum repo URLs to be used during
                       base filesystem creation. First value will also
@@ -274,9 +274,11 @@ class AddFilesystemPlugin(Plugin):
         if file_path.exists():
             raise RuntimeError(f'Filesystem {file_name} already exists at {file_path}')
 
-        with open(file_path, 'wb') as f:
-            for chunk in stream_task_output(self.session, task_id, file_name, self.blocksize):
-                f.write(chunk)
+        koji_config = self.workflow.conf.koji
+        pathinfo = self.workflow.conf.koji_path_info if koji_config.get('root_url') else None
+        download_task_output(self.session, task_id, file_name, file_path, pathinfo=pathinfo,
+                             insecure=koji_config.get('insecure_download', False),
+                             blocksize=self.blocksize)
 
         return file_name
 
@@ -295,6 +297,10 @@ class AddFilesystemPlugin(Plugin):
                 self.log.info("Exception while canceling a task (ignored): %s",
                               util.exception_message(exc))
 
+        if task.detect_delay is not None:
+            self.log.info("image task %s is %s, detected %.1fs after completion",
+                          task_id, task.state, task.detect_delay)
+
         if task.failed():
             try:
                 # Koji may re-raise the error that caused task to fail
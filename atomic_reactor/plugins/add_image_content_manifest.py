@@ -155,7 +155,8 @@ class AddImageContentManifestPlugin(Plugin):
             icm = self._get_hermeto_icm()
 
         if self.pnc_artifact_ids:
-            purl_specs = self.pnc_util.get_artifact_purl_specs(self.pnc_artifact_ids)
+            purl_specs = self.pnc_util.get_artifact_purl_specs(self.pnc_artifact_ids,
+                                                               self.workflow.data.pnc_artifacts)
             for purl_spec in purl_specs:
                 icm['image_contents'].append({'purl': purl_spec})
 
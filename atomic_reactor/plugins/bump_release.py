@@ -6,8 +6,9 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
+import itertools
 import time
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 
 from atomic_reactor.dirs import BuildDir
 from atomic_reactor.plugin import Plugin
@@ -17,9 +18,15 @@ from atomic_reactor.constants import (PLUGIN_BUMP_RELEASE_KEY, PROG, KOJI_RESERV
                                       KOJI_RESERVE_RETRY_DELAY)
 from atomic_reactor.config import get_koji_session
 from atomic_reactor.util import is_scratch_build
+from atomic_reactor.utils.koji import koji_multicall
 from koji import GenericError
 import koji
 
+# number of candidate releases looked up in the first multicall,
+# doubled (up to the max) while all of them are taken
+RELEASE_PROBE_WINDOW = 4
+RELEASE_PROBE_MAX_WINDOW = 64
+
 
 class BumpReleasePlugin(Plugin):
     """
@@ -99,17 +106,12 @@ class BumpReleasePlugin(Plugin):
         # but next_release might be a failed build. Koji's CGImport doesn't
         # allow reuploading builds, so instead we should increment next_release
         # and make sure the build doesn't exist
-        while True:
-            build_info = {'name': component, 'version': version, 'release': next_release}
-            self.log.debug('checking that the build does not exist: %s', build_info)
-            build = self.xmlrpc.getBuild(build_info)
-            if not build:
-                return next_release
-            elif self.reserve_build:
-                if build['state'] in (koji.BUILD_STATES['FAILED'], koji.BUILD_STATES['CANCELED']):
-                    return next_release
+        def incremented_releases(release: str) -> Iterator[str]:
+            while True:
+                yield release
+                release = self.get_patched_release(release, increment=True)
 
-            next_release = self.get_patched_release(next_release, increment=True)
+        return self.find_free_release(component, version, incremented_releases(next_release))
 
     def get_next_release_append(
         self, component: str, version: str, base_release: Optional[str], base_suffix: int = 1
@@ -118,18 +120,40 @@ class BumpReleasePlugin(Plugin):
         # magic depending on the exact details of how koji increments the release,
         # and we expect that the number of builds for any one base_release will be small.
         release = base_release or '1'
-        suffix = base_suffix
+        releases = ('%s.%s' % (release, suffix) for suffix in itertools.count(base_suffix))
+        return self.find_free_release(component, version, releases)
+
+    def is_release_free(self, build: Optional[dict]) -> bool:
+        """Check whether a new build can use the release of an existing build (or None)"""
+        if not build:
+            return True
+        if self.reserve_build:
+            return build['state'] in (koji.BUILD_STATES['FAILED'], koji.BUILD_STATES['CANCELED'])
+        return False
+
+    def find_free_release(self, component: str, version: str, releases: Iterator[str]) -> str:
+        """Return the first of the candidate releases which can be used for a new build
+
+        The builds of the candidates are looked up in windows of releases, with
+        one multicall for each window, the window is widened while all the
+        candidates in it are taken.
+
+        :param releases: infinite iterator of candidate releases, in order of preference
+        """
+        window = RELEASE_PROBE_WINDOW
         while True:
-            next_release = '%s.%s' % (release, suffix)
-            build_info = {'name': component, 'version': version, 'release': next_release}
-            self.log.debug('checking that the build does not exist: %s', build_info)
-            build = self.xmlrpc.getBuild(build_info)
-            if not build:
-                return next_release
-            elif self.reserve_build:
-                if build['state'] in (koji.BUILD_STATES['FAILED'], koji.BUILD_STATES['CANCELED']):
-                    return next_release
-            suffix += 1
+            candidates = list(itertools.islice(releases, window))
+            self.log.debug('checking that the builds do not exist: %s-%s-%s',
+                           component, version, candidates)
+            builds = koji_multicall(
+                self.xmlrpc, 'getBuild',
+                [({'name': component, 'version': version, 'release': release},)
+                 for release in candidates],
+            )
+            for release, build in zip(candidates, builds):
+                if self.is_release_free(build):
+                    return release
+            window = min(window * 2, RELEASE_PROBE_MAX_WINDOW)
 
     def get_next_release(self, build_info):
         queryopts = {'order': '-build.id', 'limit': 1}
@@ -212,12 +236,7 @@ class BumpReleasePlugin(Plugin):
         build_info = {'name': component, 'version': version, 'release': release}
         self.log.debug('checking that the build does not exist: %s', build_info)
         build = self.xmlrpc.getBuild(build_info)
-        if build:
-            if self.reserve_build:
-                if build['state'] in (koji.BUILD_STATES['FAILED'],
-                                      koji.BUILD_STATES['CANCELED']):
-                    return
-
+        if not self.is_release_free(build):
             raise RuntimeError('build already exists in Koji: {}-{}-{} ({})'
                                .format(component, version, release, build.get('id')))
 
@@ -8,7 +8,7 @@ of the BSD license. See the LICENSE file for details.
 from atomic_reactor.constants import IMAGE_TYPE_DOCKER_ARCHIVE
 from atomic_reactor.dirs import BuildDir
 from atomic_reactor.plugin import Plugin
-from atomic_reactor.util import get_exported_image_metadata
+from atomic_reactor.util import get_exported_image_metadata, is_flatpak_build
 
 
 class FetchDockerArchivePlugin(Plugin):
@@ -36,4 +36,9 @@ class FetchDockerArchivePlugin(Plugin):
         return metadata
 
     def run(self):
+        if self.workflow.conf.layer_sizes_from_registry and not is_flatpak_build(self.workflow):
+            # only the layer sizes are needed from the archive, they are
+            # streamed from the registry instead
+            self.log.info('layer sizes are taken from the registry, not fetching images')
+            return None
         return self.workflow.build_dir.for_each_platform(self.download_image)
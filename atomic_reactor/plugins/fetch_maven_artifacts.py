@@ -9,6 +9,7 @@ import dataclasses
 import functools
 import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Iterator, List, Sequence, Dict
 
@@ -22,7 +23,8 @@ from atomic_reactor.config import get_koji_session
 from atomic_reactor.dirs import BuildDir
 from atomic_reactor.download import download_url
 from atomic_reactor.plugin import Plugin
-from atomic_reactor.utils.koji import NvrRequest
+from atomic_reactor.utils.artifact_cache import ArtifactCache
+from atomic_reactor.utils.koji import NvrRequest, koji_multicall
 from atomic_reactor.utils.pnc import PNCUtil
 
 try:
@@ -30,6 +32,8 @@ try:
 except ImportError:
     from urllib.parse import urlparse
 
+MAX_DOWNLOAD_WORKERS = 4
+
 
 @dataclasses.dataclass(frozen=True)
 class DownloadRequest:
@@ -75,16 +79,24 @@ class FetchMavenArtifactsPlugin(Plugin):
         download_queue = []
         errors = []
 
+        # look up all builds, then the archives of all found builds, in one multicall each
+        nvrs = list(dict.fromkeys(nvr_request.nvr for nvr_request in nvr_requests))
+        builds = dict(zip(nvrs, koji_multicall(self.session, 'getBuild',
+                                               [(nvr,) for nvr in nvrs])))
+        build_ids = list(dict.fromkeys(build_info['id'] for build_info in builds.values()
+                                       if build_info))
+        archives = dict(zip(build_ids, koji_multicall(self.session, 'listArchives',
+                                                      [(build_id,) for build_id in build_ids],
+                                                      kwargs={'type': 'maven'})))
+
         for nvr_request in nvr_requests:
-            build_info = self.session.getBuild(nvr_request.nvr)
+            build_info = builds[nvr_request.nvr]
             if not build_info:
                 errors.append('Build {} not found.'.format(nvr_request.nvr))
                 continue
 
             maven_build_path = self.path_info.mavenbuild(build_info)
-            build_archives = self.session.listArchives(buildID=build_info['id'],
-                                                       type='maven')
-            build_archives = nvr_request.match_all(build_archives)
+            build_archives = nvr_request.match_all(archives[build_info['id']])
 
             for build_archive in build_archives:
                 maven_file_path = self.path_info.mavenfile(build_archive)
@@ -194,9 +206,18 @@ class FetchMavenArtifactsPlugin(Plugin):
 
         for build in builds:
             pnc_build_metadata['builds'].append({'id': build['build_id']})
+            artifact_ids.extend(artifact['id'] for artifact in build['artifacts'])
+
+        pnc_artifacts = {}
+        if artifact_ids:
+            pnc_artifacts = self.pnc_util.get_artifacts(artifact_ids,
+                                                        self.workflow.data.pnc_artifacts)
+            self.workflow.data.pnc_artifacts.update(pnc_artifacts)
+
+        for build in builds:
             for artifact in build['artifacts']:
-                artifact_ids.append(artifact['id'])
-                url, checksums = self.pnc_util.get_artifact(artifact['id'])
+                url, checksums = self.pnc_util.artifact_url_and_checksums(
+                    pnc_artifacts[str(artifact['id'])])
                 download_queue.append(DownloadRequest(url, artifact['target'], checksums))
 
         return artifact_ids, download_queue, pnc_build_metadata
@@ -204,31 +225,54 @@ class FetchMavenArtifactsPlugin(Plugin):
     def download_files(
         self, downloads: Sequence[DownloadRequest], build_dir: BuildDir
     ) -> Iterator[Path]:
-        """Download maven artifacts to a build dir."""
+        """Download maven artifacts to a build dir.
+
+        Files are downloaded concurrently, checksums are verified while the
+        files are streamed. Files found in the artifact cache are copied from
+        there, downloaded files are added to the cache.
+        """
         artifacts_path = build_dir.path / self.DOWNLOAD_DIR
         koji_config = self.workflow.conf.koji
         insecure = koji_config.get('insecure_download', False)
+        artifact_cache = ArtifactCache.from_config(self.workflow.conf)
 
         self.log.debug('%d files to download', len(downloads))
         session = util.get_retrying_requests_session()
 
-        for index, download in enumerate(downloads):
+        def fetch(index: int, download: DownloadRequest) -> bool:
             dest_path = artifacts_path / download.dest
-            dest_dir = dest_path.parent
-            dest_filename = dest_path.name
 
-            if not dest_dir.exists():
-                dest_dir.mkdir(parents=True)
+            if artifact_cache and artifact_cache.fetch(download.checksums, dest_path):
+                return True
 
             self.log.debug('%d/%d downloading %s', index + 1, len(downloads),
                            download.url)
 
-            download_url(url=download.url, dest_dir=dest_dir, insecure=insecure, session=session,
-                         dest_filename=dest_filename, expected_checksums=download.checksums)
-            yield dest_path
+            download_url(url=download.url, dest_dir=dest_path.parent, insecure=insecure,
+                         session=session, dest_filename=dest_path.name,
+                         expected_checksums=download.checksums)
+            if artifact_cache:
+                artifact_cache.store(dest_path, download.checksums)
+            return False
+
+        # when a destination is requested more than once, the last request wins
+        by_dest = {download.dest: (index, download) for index, download in enumerate(downloads)}
+        for dest in by_dest:
+            (artifacts_path / dest).parent.mkdir(parents=True, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+            cached = list(executor.map(lambda item: fetch(*item), by_dest.values()))
+
+        if artifact_cache:
+            self.log.info('%d of %d files copied from artifact cache', sum(cached),
+                          len(cached))
+
+        for download in downloads:
+            yield artifacts_path / download.dest
 
     def generate_sbom_components_for_pnc(self, pnc_artifact_ids: List[int]):
-        purl_specs = self.pnc_util.get_artifact_purl_specs(pnc_artifact_ids)
+        purl_specs = self.pnc_util.get_artifact_purl_specs(pnc_artifact_ids,
+                                                           self.workflow.data.pnc_artifacts)
 
         for purl in purl_specs:
             comp_name, version_part = purl.split('/', 1)[1].split('@', 1)
@@ -114,7 +114,7 @@ class GatherBuildsMetadataPlugin(Plugin):
         build_host = json.loads(self._get_hostname_for_platform(platform))
         output_files, _ = get_output(workflow=self.workflow, buildroot_id=build_host,
                                      pullspec=pullspec_image, platform=platform,
-                                     source_build=False)
+                                     source_build=False, consumer=self.key)
         if build_log_output := self._generate_build_log_output(platform, build_host):
             output_files.append(build_log_output)
 
@@ -9,6 +9,8 @@ import json
 import os
 import subprocess
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from typing import Any, Dict, List, Optional
 
@@ -28,11 +30,15 @@ from atomic_reactor.utils.cachito import CachitoAPI
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.util import (read_fetch_artifacts_url, read_fetch_artifacts_koji,
                                  base_image_is_custom, get_retrying_requests_session,
-                                 validate_with_schema, get_platforms)
+                                 validate_with_schema, get_platforms, sha256sum,
+                                 RegistryClient, RegistrySession)
 
-from osbs.utils import Labels
+from osbs.utils import ImageName, Labels
 import koji
 
+# Maximum number of cosign processes attaching SBOMs at once
+MAX_SBOM_PUSH_WORKERS = 4
+
 
 class GenerateSbomPlugin(Plugin):
     """
@@ -299,37 +305,112 @@ class GenerateSbomPlugin(Plugin):
 
         return unique_components
 
-    def push_sboms_to_registry(self):
+    def _sbom_already_attached(self, client: RegistryClient, image: ImageName,
+                               sbom_digest: str) -> bool:
+        """Check if the SBOM with sbom_digest is already attached to the image
+
+        cosign stores the SBOM as the only layer of the image tagged
+        '<algorithm>-<hex>.sbom' after the digest of the image manifest.
+        """
+        manifest_digests = client.get_manifest_digests(image, versions=('v2', 'oci'))
+        manifest_digest = manifest_digests.v2 or manifest_digests.oci
+        if not isinstance(manifest_digest, str):
+            return False
+
+        sbom_image = image.copy()
+        sbom_image.tag = f"{manifest_digest.replace(':', '-')}.sbom"
+        for version in ('oci', 'v2'):
+            response, _ = client.get_manifest(sbom_image, version)
+            if response:
+                layers = response.json().get('layers', [])
+                return any(layer['digest'] == sbom_digest for layer in layers)
+        return False
+
+    def push_sbom_to_registry(self, platform: str, tmpdir: str,
+                              client: Optional[RegistryClient]) -> float:
+        """Attach the SBOM for platform to the image built for it
+
+        :return: float, seconds spent checking and attaching the SBOM
+        """
+        start = time.monotonic()
+        image = self.workflow.data.tag_conf.get_unique_images_with_platform(platform)[0]
+        sbom_file_path = os.path.join(tmpdir, f"icm-{platform}.json")
+        sbom_param = f"--sbom={sbom_file_path}"
+        cmd = ["cosign", "attach", "sbom", image.to_str(), '--type=cyclonedx', sbom_param]
+
+        sbom_json = json.dumps(self.sbom[platform], indent=4, sort_keys=True)
+        with open(sbom_file_path, 'w') as outfile:
+            outfile.write(sbom_json)
+        self.log.debug('SBOM JSON saved to: %s', sbom_file_path)
+
+        if client is not None:
+            sbom_digest = sha256sum(sbom_json, prefix=True)
+            try:
+                attached = self._sbom_already_attached(client, image, sbom_digest)
+            except Exception as exc:
+                self.log.warning('Unable to check SBOM attached to %s: %s', image, exc)
+                attached = False
+            if attached:
+                self.log.info('SBOM %s for platform %s is already attached to %s, skipping',
+                              sbom_digest, platform, image)
+                return time.monotonic() - start
+
+        self.log.info('pushing SBOM for platform %s to registry', platform)
+        retries.run_cmd(cmd)
+        return time.monotonic() - start
+
+    def push_sboms_to_registry(self) -> Dict[str, float]:
+        """Attach SBOMs for all platforms, in parallel
+
+        :return: dict, platforms mapped to seconds spent pushing their SBOMs
+        """
         docker_config = os.path.join(self.workflow.conf.registries_cfg_path, '.dockerconfigjson')
 
         if not os.path.exists(docker_config):
             self.log.warning("Dockerconfig json doesn't exist in : '%s'",  docker_config)
-            return
+            return {}
 
         tmpdir = tempfile.mkdtemp()
         os.environ["DOCKER_CONFIG"] = tmpdir
-        sbom_type = '--type=cyclonedx'
         dest_config = os.path.join(tmpdir, 'config.json')
         # cosign requires docker config named exactly 'config.json'
         os.symlink(docker_config, dest_config)
 
-        for platform in self.all_platforms:
-            image = self.workflow.data.tag_conf.get_unique_images_with_platform(platform)[0]
-            sbom_file_path = os.path.join(tmpdir, f"icm-{platform}.json")
-            sbom_param = f"--sbom={sbom_file_path}"
-            cmd = ["cosign", "attach", "sbom", image.to_str(), sbom_type,  sbom_param]
-
-            with open(sbom_file_path, 'w') as outfile:
-                json.dump(self.sbom[platform], outfile, indent=4, sort_keys=True)
-            self.log.debug('SBOM JSON saved to: %s', sbom_file_path)
-
-            try:
-                self.log.info('pushing SBOM for platform %s to registry', platform)
-                retries.run_cmd(cmd)
-            except subprocess.CalledProcessError as e:
-                self.log.error("SBOM push for platform %s failed with output:\n%s",
-                               platform, e.output)
-                raise
+        try:
+            registry = self.workflow.conf.registry
+            session = RegistrySession(registry['uri'], insecure=registry['insecure'],
+                                      dockercfg_path=registry.get('secret'))
+            client: Optional[RegistryClient] = RegistryClient(session)
+        except (KeyError, RuntimeError):
+            self.log.info('No output registry configured, not checking for attached SBOMs')
+            client = None
+
+        timings = {}
+        failed = {}
+        with ThreadPoolExecutor(max_workers=MAX_SBOM_PUSH_WORKERS) as executor:
+            futures = {
+                executor.submit(self.push_sbom_to_registry, platform, tmpdir, client): platform
+                for platform in self.all_platforms
+            }
+            for future, platform in futures.items():
+                try:
+                    timings[platform] = future.result()
+                except subprocess.CalledProcessError as e:
+                    self.log.error("SBOM push for platform %s failed with output:\n%s",
+                                   platform, e.output)
+                    failed[platform] = e
+                except Exception as e:  # pylint: disable=broad-except
+                    self.log.error("SBOM push for platform %s failed: %s", platform, e)
+                    failed[platform] = e
+
+        if failed:
+            raise RuntimeError(
+                f"SBOM push failed for platforms: {', '.join(sorted(failed))}"
+            ) from next(iter(failed.values()))
+
+        for platform, seconds in timings.items():
+            self.log.debug('SBOM for platform %s pushed in %.2f seconds', platform, seconds)
+        return timings
 
     def run(self) -> Dict[str, Any]:
         """Run the plugin."""
@@ -399,6 +480,6 @@ class GenerateSbomPlugin(Plugin):
         for platform in self.all_platforms:
             self.sbom[platform]['incompleteness_reasons'] = incompleteness_reasons_full
 
-        self.push_sboms_to_registry()
+        push_timings = self.push_sboms_to_registry()
 
-        return self.sbom
+        return {'sboms': self.sbom, 'push_timings': push_timings}
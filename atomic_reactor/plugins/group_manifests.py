@@ -9,6 +9,7 @@ get the image manifest lists from the worker builders. If possible, group them t
 and return them. if not, return empty dict after re-uploading it for all existing image
 tags.
 """
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, NamedTuple, Union
 
 from osbs.utils import ImageName
@@ -23,6 +24,7 @@ from atomic_reactor.util import (
     get_unique_images,
     get_platforms,
 )
+from atomic_reactor.utils import digest_ledger
 from atomic_reactor.utils.manifest import ManifestUtil
 from atomic_reactor.constants import PLUGIN_GROUP_MANIFESTS_KEY, MEDIA_TYPE_OCI_V1_INDEX
 
@@ -33,6 +35,8 @@ from atomic_reactor.constants import PLUGIN_GROUP_MANIFESTS_KEY, MEDIA_TYPE_OCI_
 # code to copy registries is possible, but would be more involved because of the
 # size of layers and the complications of the protocol for copying them.
 
+MAX_DIGEST_LOOKUP_WORKERS = 4
+
 
 class BuiltImage(NamedTuple):
     """Represents a per-arch image which was built and pushed to a registry by the build task.
@@ -76,16 +80,37 @@ class GroupManifestsPlugin(Plugin):
 
     def get_built_images(self, session: RegistrySession) -> List[BuiltImage]:
         """Get information about all the per-arch images that were built by the build tasks."""
-        tag_conf = self.workflow.data.tag_conf
+        wf_data = self.workflow.data
         client = RegistryClient(session)
+        versions = ("v2", "oci")
+
+        # At this point, only the unique image has been built and pushed. Primary tags will
+        #   be pushed by this plugin, floating tags by the push_floating_tags plugin.
+        images = {platform: wf_data.tag_conf.get_unique_images_with_platform(platform)[0]
+                  for platform in get_platforms(wf_data)}
+
+        # images pushed by tag_and_push are in the digest ledger, with the single
+        # manifest type they were pushed with
+        all_digests = {
+            platform: digest_ledger.get_recorded_digests(wf_data, image, versions)
+            for platform, image in images.items()
+        }
+        missing = [platform for platform, digests in all_digests.items() if not digests]
+        digest_ledger.record_hits(wf_data, self.key, len(images) - len(missing))
+
+        with ThreadPoolExecutor(max_workers=MAX_DIGEST_LOOKUP_WORKERS) as executor:
+            queried = executor.map(
+                lambda platform: client.get_manifest_digests(images[platform], versions=versions),
+                missing
+            )
+            for platform, manifest_digests in zip(missing, queried):
+                digest_ledger.record_digests(wf_data, images[platform], manifest_digests)
+                all_digests[platform] = manifest_digests
 
         built_images = []
 
-        for platform in get_platforms(self.workflow.data):
-            # At this point, only the unique image has been built and pushed. Primary tags will
-            #   be pushed by this plugin, floating tags by the push_floating_tags plugin.
-            image = tag_conf.get_unique_images_with_platform(platform)[0]
-            manifest_digests = client.get_manifest_digests(image, versions=("v2", "oci"))
+        for platform, image in images.items():
+            manifest_digests = all_digests[platform]
 
             if len(manifest_digests) != 1:
                 raise RuntimeError(
@@ -138,6 +163,7 @@ class GroupManifestsPlugin(Plugin):
         # Now push the manifest list to the registry once per each tag
         self.log.info("%s: Tagging manifest list", session.registry)
 
+        stored_digests = {}
         for image in self.non_floating_images:
             target_repo = image.to_str(registry=False, tag=False)
             # We have to call store_manifest_in_repository directly for each
@@ -149,14 +175,20 @@ class GroupManifestsPlugin(Plugin):
                                                                 manifest['repository'],
                                                                 target_repo,
                                                                 ref=manifest['digest'])
-            self.manifest_util.store_manifest_in_repository(session, list_json, list_type,
-                                                            target_repo, target_repo, ref=image.tag)
-        # Get the digest of the manifest list using one of the tags
+            stored_digest = self.manifest_util.store_manifest_in_repository(
+                session, list_json, list_type, target_repo, target_repo, ref=image.tag
+            )
+            digest_ledger.record_digest(self.workflow.data, image, list_type, stored_digest)
+            stored_digests[image.to_str()] = stored_digest
+
+        # Get the digest of the manifest list using one of the tags, unless the
+        # registry sent it when the manifest list was stored
         registry_image = get_unique_images(self.workflow)[0]
-        _, digest_str, _, _ = self.manifest_util.get_manifest(session,
-                                                              registry_image.to_str(registry=False,
-                                                                                    tag=False),
-                                                              registry_image.tag)
+        digest_str = stored_digests.get(registry_image.to_str())
+        if not digest_str:
+            _, digest_str, _, _ = self.manifest_util.get_manifest(
+                session, registry_image.to_str(registry=False, tag=False), registry_image.tag
+            )
 
         if list_type == MEDIA_TYPE_OCI_V1_INDEX:
             digest = ManifestDigest(oci_index=digest_str)
@@ -177,6 +209,8 @@ class GroupManifestsPlugin(Plugin):
                                                                                 source_digest,
                                                                                 source_repo,
                                                                                 images)
+        for image in images:
+            digest_ledger.record_digest(self.workflow.data, image, media, source_digest)
         return {
             'manifest': manifest.decode('utf-8'),
             'media_type': media,
@@ -27,6 +27,7 @@ from atomic_reactor.constants import (
 )
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.util import map_to_user_params
+from atomic_reactor.utils.git_mirror import GitMirrorCache
 from atomic_reactor.utils.hermeto import (
     remote_source_to_hermeto, clone_only, validate_paths,
     normalize_gomod_pkg_manager, enforce_sandbox,
@@ -193,6 +194,10 @@ class HermetoInitPlugin(Plugin):
 
     def clone_remote_source(self, repo: str, target_dir: Path, commit: str):
         self.log.debug("Cloning %s at %s into %s", repo, commit, target_dir)
+        mirror_cache = GitMirrorCache.from_config(self.workflow.conf)
+        if mirror_cache:
+            mirror_cache.clone(repo, target_dir, commit)
+            return
         clone_git_repo(
             repo,
             target_dir,
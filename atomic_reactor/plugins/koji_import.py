@@ -5,8 +5,10 @@ All rights reserved.
 This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
 import json
+import queue
 import tempfile
 from itertools import chain
 
@@ -23,7 +25,8 @@ from atomic_reactor.plugin import Plugin
 from atomic_reactor.plugins.add_help import AddHelpPlugin
 from atomic_reactor.source import GitSource
 from atomic_reactor.plugins.add_filesystem import AddFilesystemPlugin
-from atomic_reactor.util import (OSBSLogs, get_parent_image_koji_data, get_pipeline_run_start_time,
+from atomic_reactor.util import (OSBSLogs, get_checksums, get_parent_image_koji_data,
+                                 get_pipeline_run_start_time,
                                  get_manifest_media_version, get_platforms, is_flatpak_build,
                                  is_manifest_list, map_to_user_params)
 from atomic_reactor.utils.flatpak_util import FlatpakUtil
@@ -32,6 +35,7 @@ from atomic_reactor.utils.koji import (
     get_buildroot as koji_get_buildroot,
     get_output as koji_get_output,
     get_output_metadata,
+    upload_file_with_checksums,
 )
 from atomic_reactor.plugins.fetch_sources import PLUGIN_FETCH_SOURCES_KEY
 
@@ -62,6 +66,7 @@ from atomic_reactor.constants import (
     KOJI_SUBTYPE_OP_BUNDLE,
     KOJI_SOURCE_ENGINE,
     KOJI_METADATA_FILENAME,
+    KOJI_MAX_CONCURRENT_UPLOADS,
 )
 from atomic_reactor.util import (get_primary_images,
                                  get_floating_images, get_unique_images,
@@ -573,12 +578,86 @@ class KojiImportBase(Plugin):
     def get_server_dir(self):
         return koji_cli.lib.unique_path('koji-upload')
 
-    def _upload_output_files(self, server_dir: str) -> None:
-        """Helper method to upload collected output files."""
+    def _upload_output_file(self, upload_info: Dict[str, Any], server_dir: str,
+                            session) -> None:
+        """Upload an output file, computing its checksum on the way if it is still missing.
+
+        :param upload_info: dict, item of workflow.data.koji_upload_files
+        :param server_dir: str, upload directory on the hub
+        :param session: koji.ClientSession instance used for the upload
+        """
+        local_filename = upload_info["local_filename"]
+        dest_filename = upload_info["dest_filename"]
+        self.log.debug("uploading %r to %r as %r", local_filename, server_dir, dest_filename)
+
+        result = upload_file_with_checksums(session, local_filename, server_dir,
+                                            os.path.basename(dest_filename),
+                                            blocksize=self.blocksize,
+                                            callback=KojiUploadLogger(self.log).callback)
+
+        metadata = upload_info.get("metadata")
+        if metadata is not None:
+            metadata['checksum'] = result['checksums']['md5sum']
+            metadata['checksum_type'] = 'md5'
+
+        size_mib = result['size'] / 1024 / 1024
+        self.log.info("uploaded %r: %.1f MiB in %.1f s (%.1f MiB/s)",
+                      dest_filename, size_mib, result['seconds'],
+                      size_mib / result['seconds'] if result['seconds'] else 0)
+
+    def _add_missing_checksums(self) -> None:
+        """Compute checksums of output files which were not computed while uploading."""
         for upload_info in self.workflow.data.koji_upload_files:
-            self.upload_file(upload_info["local_filename"],
-                             upload_info["dest_filename"],
-                             server_dir)
+            metadata = upload_info.get("metadata")
+            if metadata is not None and 'checksum' not in metadata:
+                checksums = get_checksums(upload_info["local_filename"], ['md5'])
+                metadata['checksum'] = checksums['md5sum']
+                metadata['checksum_type'] = 'md5'
+
+    def _upload_output_files(self, server_dir: str) -> None:
+        """Helper method to upload collected output files.
+
+        With koji fast upload, files are uploaded concurrently, each one by its own
+        koji subsession, and checksums missing in output metadata are computed from
+        the uploaded chunks. Otherwise, files are uploaded one by one.
+        """
+        upload_files = self.workflow.data.koji_upload_files
+
+        if not self.workflow.conf.koji.get('use_fast_upload', True):
+            for upload_info in upload_files:
+                self.upload_file(upload_info["local_filename"],
+                                 upload_info["dest_filename"],
+                                 server_dir)
+            self._add_missing_checksums()
+            return
+
+        if not upload_files:
+            return
+
+        # koji sessions must not be used by several threads at the same time
+        sessions: queue.Queue = queue.Queue()
+        workers = min(len(upload_files), KOJI_MAX_CONCURRENT_UPLOADS)
+        subsessions = [self.session.subsession() for _ in range(workers)]
+        for subsession in subsessions:
+            sessions.put(subsession)
+
+        def upload(upload_info: Dict[str, Any]) -> None:
+            session = sessions.get()
+            try:
+                self._upload_output_file(upload_info, server_dir, session)
+            finally:
+                sessions.put(session)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # list() to raise the first upload error, if any
+                list(executor.map(upload, upload_files))
+        finally:
+            for subsession in subsessions:
+                try:
+                    subsession.logout()
+                except Exception:
+                    self.log.warning("Failed to log out koji subsession", exc_info=True)
 
     def run(self):
         """
@@ -592,6 +671,7 @@ class KojiImportBase(Plugin):
         koji_metadata = self.combine_metadata_fragments()
 
         if is_scratch_build(self.workflow):
+            self._add_missing_checksums()
             self.upload_metadata(koji_metadata, server_dir, scratch=True)
             return
 
@@ -703,14 +783,14 @@ class KojiImportPlugin(KojiImportBase):
 
     def _collect_sbom_metadata(self) -> Iterable[ArtifactOutputInfo]:
         wf_data = self.workflow.data
-        sbom_results = wf_data.plugins_results[PLUGIN_GENERATE_SBOM]
+        sboms = wf_data.plugins_results[PLUGIN_GENERATE_SBOM]['sboms']
 
         tmpdir = tempfile.mkdtemp()
         for platform in self.all_platforms:
             file_path = os.path.join(tmpdir, ICM_JSON_FILENAME.format(platform))
 
             with open(file_path, 'w') as f:
-                json.dump(sbom_results[platform], f, indent=4, sort_keys=True)
+                json.dump(sboms[platform], f, indent=4, sort_keys=True)
             yield (file_path, ICM_JSON_FILENAME.format(platform), KOJI_BTYPE_ICM, None)
 
     def get_output(self, buildroot_id: str) -> List[Dict[str, Any]]:
@@ -746,18 +826,19 @@ class KojiImportPlugin(KojiImportBase):
             self._collect_maven_metadata(),
             self._collect_sbom_metadata(),
         ):
+            upload_info = {
+                'local_filename': local_filename,
+                'dest_filename': dest_filename,
+            }
             # Maven metadata has been generated already, use it directly.
             if metadata is None:
-                metadata = get_output_metadata(local_filename, dest_filename)
+                # The checksum is computed while uploading the file, to read it only once
+                metadata = get_output_metadata(local_filename, dest_filename, checksum=False)
                 add_type_info(metadata, type_info)
+                upload_info['metadata'] = metadata
             metadata['buildroot_id'] = buildroot_id
             outputs.append(metadata)
-            wf_data.koji_upload_files.append(
-                {
-                    'local_filename': local_filename,
-                    'dest_filename': dest_filename,
-                }
-            )
+            wf_data.koji_upload_files.append(upload_info)
 
         outputs.extend(super().get_output(buildroot_id))
 
@@ -865,6 +946,7 @@ class KojiImportSourceContainerPlugin(KojiImportBase):
             pullspec=pullspec,
             platform=os.uname()[4],
             source_build=True,
+            consumer=self.key,
         )
         self.workflow.data.koji_upload_files.append({
             "local_filename": output_file.filename,
@@ -5,7 +5,8 @@ All rights reserved.
 This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
-from typing import Any, Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.constants import (
     INSPECT_CONFIG, PLUGIN_KOJI_PARENT_KEY, BASE_IMAGE_KOJI_BUILD, PARENT_IMAGES_KOJI_BUILDS,
@@ -16,15 +17,19 @@ from atomic_reactor.util import (
     base_image_is_custom, get_manifest_media_type, is_scratch_build,
     get_platforms, RegistrySession, RegistryClient
 )
+from atomic_reactor.utils.koji import koji_multicall
 from osbs.utils import ImageName, Labels
 
 import json
 import koji
+import threading
 import time
 
 
 DEFAULT_POLL_TIMEOUT = 60 * 3  # 3 minutes
 DEFAULT_POLL_INTERVAL = 10  # 10 seconds
+# max number of manifest digest checks running at the same time
+MAX_DIGEST_CHECK_WORKERS = 4
 
 
 class KojiParentBuildMissing(ValueError):
@@ -71,6 +76,10 @@ class KojiParentPlugin(Plugin):
         self.platforms = get_platforms(self.workflow.data)
         # RegistryClient instances cached by registry name
         self.registry_clients = {}
+        # koji sessions and the registry clients cache are shared by
+        # the manifest digest checks running in worker threads
+        self._koji_lock = threading.Lock()
+        self._registry_clients_lock = threading.Lock()
         self._deep_manifest_list_inspection = self.workflow.conf.deep_manifest_list_inspection
 
     def run(self):
@@ -86,14 +95,34 @@ class KojiParentPlugin(Plugin):
                 inspect_data=self.workflow.imageutil.base_image_inspect(),
             )
 
-        manifest_mismatches = []
+        parents = []
         for img, local_tag in df_images.items():
             img_str = img.to_str()
             if base_image_is_custom(img_str):
                 continue
 
             nvr = self.detect_parent_image_nvr(local_tag) if local_tag else None
-            parent_build_info = self.wait_for_parent_image_build(nvr) if nvr else None
+            parents.append((img_str, local_tag, nvr))
+
+        # Wait for all parent builds together and check manifest digests of each
+        # parent as soon as its build is found complete
+        digest_checks: Dict[str, Future] = {}
+        with ThreadPoolExecutor(max_workers=MAX_DIGEST_CHECK_WORKERS) as executor:
+            def check_completed_build(nvr: str, build_info: Dict[str, Any]) -> None:
+                for img_str, local_tag, parent_nvr in parents:
+                    if parent_nvr == nvr and img_str not in digest_checks:
+                        digest_checks[img_str] = executor.submit(
+                            self.check_manifest_digest, local_tag, build_info
+                        )
+
+            nvrs = [nvr for _, _, nvr in parents if nvr]
+            parent_builds = self.wait_for_parent_image_builds(
+                nvrs, on_complete=check_completed_build
+            )
+
+        manifest_mismatches = []
+        for img_str, _, nvr in parents:
+            parent_build_info = parent_builds.get(nvr) if nvr else None
             self._parent_builds[img_str] = parent_build_info
 
             if nvr == self._base_image_nvr:
@@ -101,7 +130,7 @@ class KojiParentPlugin(Plugin):
 
             if parent_build_info:
                 try:
-                    self.check_manifest_digest(local_tag, parent_build_info)
+                    digest_checks[img_str].result()
                 except ValueError as exc:
                     manifest_mismatches.append(exc)
             else:
@@ -209,7 +238,8 @@ class KojiParentPlugin(Plugin):
             v2_digest = manifest['digest']
             manifest_list_data[arch] = v2_digest
 
-        archives = self.koji_session.listArchives(build_id)
+        with self._koji_lock:
+            archives = self.koji_session.listArchives(build_id)
         koji_archives_data = {}
         for archive in (a for a in archives if a['btype'] == KOJI_BTYPE_IMAGE):
             arch = archive['extra']['docker']['config']['architecture']
@@ -281,26 +311,68 @@ class KojiParentPlugin(Plugin):
         :return: build info mapping that is the return value from Koji getBuild API.
         :rtype: dict[str, any]
         """
+        return self.wait_for_parent_image_builds([nvr])[nvr]
+
+    def wait_for_parent_image_builds(
+        self,
+        nvrs: List[str],
+        on_complete: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Given image NVRs, wait for the builds that produced them to show up in koji.
+        All builds still pending are queried in one koji multicall per poll interval.
+        If some of them don't show up within the timeout, raise an error.
+
+        :param nvrs: list of str, NVRs of the parent images
+        :param on_complete: callable, called with NVR and build info as soon as
+            a build is found complete
+        :return: build info mappings (return values from Koji getBuild API), by NVR
+        :rtype: dict[str, dict[str, any]]
+        """
+        builds: Dict[str, Optional[Dict[str, Any]]] = {}
+        # keep the order, but query each NVR only once
+        pending = list(dict.fromkeys(nvrs))
+        for nvr in pending:
+            self.log.info('Waiting for Koji build for parent image %s', nvr)
 
-        self.log.info('Waiting for Koji build for parent image %s', nvr)
         poll_start = time.time()
-        while time.time() - poll_start < self.poll_timeout:
-            build = self.koji_session.getBuild(nvr)
-            if build:
+        while pending and time.time() - poll_start < self.poll_timeout:
+            with self._koji_lock:
+                results = koji_multicall(self.koji_session, 'getBuild',
+                                         [(nvr,) for nvr in pending])
+
+            still_pending = []
+            for nvr, build in zip(pending, results):
+                if not build:
+                    still_pending.append(nvr)
+                    continue
+
                 build_state = koji.BUILD_STATES[build['state']]
                 self.log.info('Parent image Koji build found with id %s', build.get('id'))
                 if build_state == 'COMPLETE':
-                    return build
-                elif build_state != 'BUILDING':
+                    builds[nvr] = build
+                    if on_complete:
+                        on_complete(nvr, build)
+                elif build_state == 'BUILDING':
+                    still_pending.append(nvr)
+                else:
                     exc_msg = ('Parent image Koji build {} state is {}, not COMPLETE.')
                     raise KojiParentBuildMissing(exc_msg.format(nvr, build_state))
-            time.sleep(self.poll_interval)
 
-        if not self.workflow.conf.skip_koji_check_for_base_image:
-            raise KojiParentBuildMissing('Parent image Koji build NOT found for {}!'.format(nvr))
+            pending = still_pending
+            if pending:
+                time.sleep(self.poll_interval)
+
+        for nvr in pending:
+            if not self.workflow.conf.skip_koji_check_for_base_image:
+                raise KojiParentBuildMissing(
+                    'Parent image Koji build NOT found for {}!'.format(nvr)
+                )
+
+            self.log.warning("Parent image Koji build NOT found for %s!", nvr)
+            builds[nvr] = None
 
-        self.log.warning("Parent image Koji build NOT found for %s!", nvr)
-        return None
+        return builds
 
     def make_result(self) -> Optional[Dict[str, Any]]:
         """Construct the result dict to be preserved in the build metadata."""
@@ -315,9 +387,11 @@ class KojiParentPlugin(Plugin):
         """
         Get registry client for specified registry, cached by registry name
         """
-        client = self.registry_clients.get(registry)
-        if client is None:
-            session = RegistrySession.create_from_config(self.workflow.conf, registry=registry)
-            client = RegistryClient(session)
-            self.registry_clients[registry] = client
-        return client
+        with self._registry_clients_lock:
+            client = self.registry_clients.get(registry)
+            if client is None:
+                session = RegistrySession.create_from_config(self.workflow.conf,
+                                                             registry=registry)
+                client = RegistryClient(session)
+                self.registry_clients[registry] = client
+            return client
@@ -35,13 +35,14 @@ class KojiTagBuildPlugin(Plugin):
 
     args_from_user_params = map_to_user_params("target:koji_target")
 
-    def __init__(self, workflow, target=None, poll_interval=5):
+    def __init__(self, workflow, target=None, poll_interval=None):
         """
         constructor
 
         :param workflow: DockerBuildWorkflow instance
         :param target: str, koji target
-        :param poll_interval: int, seconds between Koji task status requests
+        :param poll_interval: int, seconds between Koji task status requests,
+                              None to poll on a backoff
         """
         super(KojiTagBuildPlugin, self).__init__(workflow)
 
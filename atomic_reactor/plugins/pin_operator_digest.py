@@ -22,6 +22,7 @@ from atomic_reactor.util import (RegistrySession,
                                  RegistryClient,
                                  has_operator_bundle_manifest,
                                  read_yaml_from_url,
+                                 sha256sum,
                                  terminal_key_paths,
                                  map_to_user_params)
 from osbs.utils.yaml import (
@@ -260,7 +261,7 @@ class PinOperatorDigestsPlugin(Plugin):
                 operator_csv.modifications_update(
                     operator_csv_modifications.get('update', {}))
 
-            self.workflow.build_dir.for_each_platform(operator_csv.dump)
+            self._write_operator_csv(operator_csv)
         else:
             self.log.warning("%s has a relatedImages section, skipping", operator_csv.path)
 
@@ -306,6 +307,35 @@ class PinOperatorDigestsPlugin(Plugin):
             raise RuntimeError("Koji package: {} isn't allowed to use skip_all for operator "
                                "bundles".format(component))
 
+    def _write_operator_csv(self, operator_csv):
+        """Write the updated CSV file into all platform-specific build dirs
+
+        The CSV is serialized only once, into the first build dir, and copied
+        (reflinked, if supported) to the other build dirs. If the CSV file is a
+        symlink, its target is written and copied, the symlinks are kept.
+
+        :param OperatorCSV operator_csv: the updated cluster service version (CSV) file
+        """
+        build_dir = self.workflow.build_dir
+        first_dir = build_dir.any_platform.path
+        csv_relpath = Path(operator_csv.path).resolve().relative_to(first_dir.resolve())
+
+        # Drop the original files first, a reflink does not truncate them
+        for platform in build_dir.platforms[1:]:
+            build_dir.path.joinpath(platform, csv_relpath).unlink(missing_ok=True)
+
+        csv_file = build_dir.for_all_platforms_copy(
+            lambda platform_dir: [operator_csv.dump(platform_dir)]
+        )[0]
+
+        checksum = sha256sum(csv_file.read_bytes())
+        for platform in build_dir.platforms[1:]:
+            copied_file = build_dir.path.joinpath(platform, csv_relpath)
+            if sha256sum(copied_file.read_bytes()) != checksum:
+                raise RuntimeError(f"{copied_file} differs from the updated CSV file {csv_file}")
+        self.log.debug("Updated CSV file %s written for platforms: %s",
+                       csv_relpath, ", ".join(build_dir.platforms))
+
     def _get_operator_manifest(self):
         if self.workflow.source.config.operator_manifests is None:
             raise RuntimeError("operator_manifests configuration missing in container.yaml")
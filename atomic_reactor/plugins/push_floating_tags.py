@@ -7,6 +7,7 @@ of the BSD license. See the LICENSE file for details.
 """
 
 from atomic_reactor.constants import PLUGIN_PUSH_FLOATING_TAGS_KEY, PLUGIN_GROUP_MANIFESTS_KEY
+from atomic_reactor.utils import digest_ledger
 from atomic_reactor.utils.manifest import ManifestUtil
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.util import get_floating_images, get_unique_images
@@ -40,8 +41,10 @@ class PushFloatingTagsPlugin(Plugin):
             # referenced manifest, since each one should be a new tag that requires uploading
             # the manifest again
             self.log.debug("storing %s as %s", target_repo, image.tag)
-            self.manifest_util.store_manifest_in_repository(session, manifest, list_type,
-                                                            target_repo, target_repo, ref=image.tag)
+            stored_digest = self.manifest_util.store_manifest_in_repository(
+                session, manifest, list_type, target_repo, target_repo, ref=image.tag
+            )
+            digest_ledger.record_digest(self.workflow.data, image, list_type, stored_digest)
 
         registry_image = get_unique_images(self.workflow)[0]
 
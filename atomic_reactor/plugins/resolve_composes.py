@@ -6,6 +6,7 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from datetime import datetime, timedelta
 from typing import TypedDict, List, Dict, Any, Optional
@@ -27,6 +28,8 @@ MINIMUM_TIME_TO_EXPIRE = timedelta(hours=2).total_seconds()
 UNPUBLISHED_REPOS = 'include_unpublished_pulp_repos'
 # flag to let ODCS ignore missing content sets
 IGNORE_ABSENT_REPOS = 'ignore_absent_pulp_repos'
+# max number of compose renewals requested at the same time
+MAX_RENEW_WORKERS = 4
 
 
 class ResolveComposesResult(TypedDict):
@@ -267,32 +270,39 @@ class ResolveComposesPlugin(Plugin):
 
     def wait_for_composes(self):
         self.log.debug('Waiting for ODCS composes to be available: %s', self.all_compose_ids)
-        self.composes_info = []
-        for compose_id in self.all_compose_ids:
-            compose_info = self.odcs_client.wait_for_compose(compose_id)
-
-            if self._needs_renewal(compose_info):
-                sigkeys = compose_info.get('sigkeys', '').split()
-                updated_signing_intent = self.odcs_config.get_signing_intent_by_keys(sigkeys)
-                if set(sigkeys) != set(updated_signing_intent['keys']):
-                    self.log.info('Updating signing keys in "%s" from "%s", to "%s" in compose '
-                                  '"%s" due to sigkeys deprecation',
-                                  updated_signing_intent['name'],
-                                  sigkeys,
-                                  updated_signing_intent['keys'],
-                                  compose_info['id']
-                                  )
-                    sigkeys = updated_signing_intent['keys']
-
-                compose_info = self.odcs_client.renew_compose(compose_id, sigkeys)
-                compose_id = compose_info['id']
-                self.new_compose_ids.append(compose_id)
-                compose_info = self.odcs_client.wait_for_compose(compose_id)
-
-            self.composes_info.append(compose_info)
+        composes_info = self.odcs_client.wait_for_composes(self.all_compose_ids)
+        self.composes_info = [composes_info[compose_id] for compose_id in self.all_compose_ids]
+
+        to_renew = [index for index, compose_info in enumerate(self.composes_info)
+                    if self._needs_renewal(compose_info)]
+        if to_renew:
+            with ThreadPoolExecutor(max_workers=MAX_RENEW_WORKERS) as executor:
+                renewed = list(executor.map(self._renew_compose,
+                                            [self.composes_info[index] for index in to_renew]))
+
+            renewed_ids = [compose_info['id'] for compose_info in renewed]
+            self.new_compose_ids.extend(renewed_ids)
+            renewed_info = self.odcs_client.wait_for_composes(renewed_ids)
+            for index, compose_id in zip(to_renew, renewed_ids):
+                self.composes_info[index] = renewed_info[compose_id]
 
         self.all_compose_ids = [item['id'] for item in self.composes_info]
 
+    def _renew_compose(self, compose_info):
+        sigkeys = compose_info.get('sigkeys', '').split()
+        updated_signing_intent = self.odcs_config.get_signing_intent_by_keys(sigkeys)
+        if set(sigkeys) != set(updated_signing_intent['keys']):
+            self.log.info('Updating signing keys in "%s" from "%s", to "%s" in compose '
+                          '"%s" due to sigkeys deprecation',
+                          updated_signing_intent['name'],
+                          sigkeys,
+                          updated_signing_intent['keys'],
+                          compose_info['id']
+                          )
+            sigkeys = updated_signing_intent['keys']
+
+        return self.odcs_client.renew_compose(compose_info['id'], sigkeys)
+
     def _needs_renewal(self, compose_info):
         if compose_info['state_name'] == 'removed':
             return True
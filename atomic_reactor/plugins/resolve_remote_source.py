@@ -9,9 +9,10 @@ import base64
 import functools
 import os.path
 import shlex
-import tarfile
+import time
 from collections import Counter
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Optional, List, Dict
 
@@ -30,10 +31,13 @@ from atomic_reactor.dirs import BuildDir
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.util import (is_scratch_build,
                                  map_to_user_params,
-                                 safe_extractall
                                  )
 from atomic_reactor.utils.cachito import CFG_TYPE_B64
 from atomic_reactor.utils.koji import get_koji_task_owner
+from atomic_reactor.utils.unpack import unpack_tarball
+
+# max number of Cachito requests waited for and downloaded at the same time
+MAX_CONCURRENT_REQUESTS = 4
 
 
 @dataclass(frozen=True)
@@ -45,6 +49,7 @@ class RemoteSource:
     json_data: subset of the JSON representation of the Cachito request (source_request_to_json)
     build_args: environment variables for this remote source
     tarball_path: the path of the tarball downloaded from Cachito
+    timings: seconds spent waiting for the request and downloading its tarball
     """
 
     id: int
@@ -53,6 +58,7 @@ class RemoteSource:
     json_env_data: Dict[str, Dict[str, str]]
     json_config_data: List[Dict[str, str]]
     tarball_path: Path
+    timings: Dict[str, float] = field(default_factory=dict)
 
     @classmethod
     def tarball_filename(cls, name: Optional[str]):
@@ -184,8 +190,6 @@ class ResolveRemoteSourcePlugin(Plugin):
         user = self.get_koji_user()
         self.log.info('Using user "%s" for cachito request', user)
 
-        processed_remote_sources = []
-
         if self.multiple_remote_sources_params:
             self.verify_multiple_remote_sources_names_are_unique()
 
@@ -198,21 +202,28 @@ class ResolveRemoteSourcePlugin(Plugin):
                 for remote_source in self.multiple_remote_sources_params
             }
 
-            completed_requests = {
-                name: self.cachito_session.wait_for_request(request)
-                for name, request in open_requests.items()
-            }
-            for name, request in completed_requests.items():
-                processed_remote_sources.append(self.process_request(request, name))
-
         else:
-            open_request = self.cachito_session.request_sources(
+            open_requests = {
+                None: self.cachito_session.request_sources(
                     user=user,
                     dependency_replacements=self._dependency_replacements,
                     **self.single_remote_source_params
-            )
-            completed_request = self.cachito_session.wait_for_request(open_request)
-            processed_remote_sources.append(self.process_request(completed_request, None))
+                )
+            }
+
+        # Wait for all requests at the same time, each one is downloaded as soon
+        # as it completes. Env vars and config files are fetched by a separate
+        # pool, in parallel with the downloads.
+        max_workers = min(len(open_requests), MAX_CONCURRENT_REQUESTS)
+        with ThreadPoolExecutor(max_workers=max_workers) as requests_executor, \
+                ThreadPoolExecutor(max_workers=max_workers * 2) as metadata_executor:
+            futures = {
+                name: requests_executor.submit(
+                    self.wait_and_process_request, request, name, metadata_executor
+                )
+                for name, request in open_requests.items()
+            }
+            processed_remote_sources = [future.result() for future in futures.values()]
 
         return processed_remote_sources
 
@@ -251,8 +262,7 @@ class ResolveRemoteSourcePlugin(Plugin):
             dest_dir.mkdir(parents=True)
             created_dirs.append(dest_dir)
 
-            with tarfile.open(remote_source.tarball_path) as tar:
-                safe_extractall(tar, str(dest_dir))
+            unpack_tarball(remote_source.tarball_path, dest_dir, log=self.log)
 
             self.generate_cachito_config_files(dest_dir, remote_source.json_config_data)
 
@@ -304,26 +314,62 @@ class ResolveRemoteSourcePlugin(Plugin):
             raise ValueError(f'Provided remote sources parameters contain '
                              f'non unique names: {duplicate_names}')
 
-    def process_request(self, source_request: dict, name: Optional[str]) -> RemoteSource:
-        """Download the tarball for a request and return info about the processed remote source."""
+    def wait_and_process_request(
+        self, open_request: dict, name: Optional[str], metadata_executor: ThreadPoolExecutor,
+    ) -> RemoteSource:
+        """Wait for a request to complete and return info about the processed remote source.
+
+        :param open_request: dict, the Cachito request as returned when it was created
+        :param name: str, name of the remote source
+        :param metadata_executor: ThreadPoolExecutor, used to fetch env vars and config files
+        """
+        wait_start = time.monotonic()
+        source_request = self.cachito_session.wait_for_request(open_request)
+        wait_time = time.monotonic() - wait_start
+        self.log.debug('Cachito request %s completed after %.2f seconds',
+                       source_request["id"], wait_time)
+
+        return self.process_request(source_request, name, metadata_executor,
+                                    timings={'wait': wait_time})
+
+    def process_request(
+        self, source_request: dict, name: Optional[str], metadata_executor: ThreadPoolExecutor,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> RemoteSource:
+        """Download the tarball for a request and return info about the processed remote source.
+
+        Env vars and config files of the request are fetched by metadata_executor
+        while the tarball is downloaded.
+        """
         tarball_filename = RemoteSource.tarball_filename(name)
         dest_dir = str(self.workflow.build_dir.any_platform.path)
+        request_id = source_request["id"]
 
+        env_vars = metadata_executor.submit(
+            self.cachito_session.get_request_env_vars, request_id
+        )
+        config_files = metadata_executor.submit(
+            self.cachito_session.get_request_config_files, request_id
+        )
+
+        download_start = time.monotonic()
         tarball_dest_path = self.cachito_session.download_sources(
             source_request,
             dest_dir=dest_dir,
             dest_filename=tarball_filename,
         )
-
-        env_vars = self.cachito_session.get_request_env_vars(source_request["id"])
+        timings = dict(timings or {}, download=time.monotonic() - download_start)
+        self.log.debug('Sources of Cachito request %s downloaded in %.2f seconds',
+                       request_id, timings['download'])
 
         remote_source = RemoteSource(
-            id=source_request["id"],
+            id=request_id,
             name=name,
             json_data=self.source_request_to_json(source_request),
-            json_env_data=env_vars,
-            json_config_data=self.cachito_session.get_request_config_files(source_request["id"]),
+            json_env_data=env_vars.result(),
+            json_config_data=config_files.result(),
             tarball_path=Path(tarball_dest_path),
+            timings=timings,
         )
         return remote_source
 
@@ -351,6 +397,7 @@ class ResolveRemoteSourcePlugin(Plugin):
                 "filename": remote_source.tarball_path.name,
                 "path": str(remote_source.tarball_path),
             },
+            "timings": remote_source.timings,
         }
 
     def generate_cachito_config_files(self, dest_dir: Path, config_files: List[dict]) -> None:
@@ -11,7 +11,7 @@ from atomic_reactor.plugins.fetch_sources import PLUGIN_FETCH_SOURCES_KEY
 from atomic_reactor.constants import (PLUGIN_VERIFY_MEDIA_KEY, SCRATCH_FROM,
                                       PLUGIN_CHECK_USER_SETTINGS)
 from atomic_reactor.plugin import Plugin
-from atomic_reactor.util import get_manifest_digests
+from atomic_reactor.utils import digest_ledger
 
 
 class StoreMetadataPlugin(Plugin):
@@ -33,16 +33,15 @@ class StoreMetadataPlugin(Plugin):
         Returns a map of repositories to digests
         """
 
-        digests = {}  # repository -> digest
         registry = self.workflow.conf.registry
 
-        for image in self.workflow.data.tag_conf.images:
-            image_digests = get_manifest_digests(image, registry['uri'], registry['insecure'],
-                                                 registry.get('secret', None))
-            if image_digests:
-                digests[image.to_str()] = image_digests
-
-        return digests
+        image_digests = digest_ledger.lookup_digests(self.workflow.data,
+                                                     self.workflow.data.tag_conf.images,
+                                                     registry['uri'], registry['insecure'],
+                                                     registry.get('secret', None),
+                                                     consumer=self.key)
+        # repository -> digest
+        return {image: digests for image, digests in image_digests.items() if digests}
 
     def get_pullspecs(self, digests):
         # v2 registry digests
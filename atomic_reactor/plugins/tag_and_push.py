@@ -6,34 +6,46 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
+import os
 import subprocess
+import tempfile
 import time
 import platform
 import random
-from typing import Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import requests
+from requests.exceptions import HTTPError, RetryError
 
 from atomic_reactor.constants import (
-    DOCKER_PUSH_BACKOFF_FACTOR,
-    DOCKER_PUSH_MAX_RETRIES,
     IMAGE_TYPE_DOCKER_ARCHIVE,
     IMAGE_TYPE_OCI,
     PLUGIN_FLATPAK_CREATE_OCI,
     PLUGIN_SOURCE_CONTAINER_KEY,
+    PUSHED_MANIFEST_BACKOFF_FACTOR,
+    PUSHED_MANIFEST_MAX_RETRIES,
 )
 from atomic_reactor.config import get_koji_session
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.plugins.fetch_sources import PLUGIN_FETCH_SOURCES_KEY
 from atomic_reactor.metadata import annotation_map
-from atomic_reactor.util import (Dockercfg, get_all_manifests,
-                                 get_manifest_digests,
+from atomic_reactor.util import (Dockercfg,
+                                 RegistrySession,
+                                 get_manifest_media_type,
                                  get_platforms,
                                  is_flatpak_build,
-                                 map_to_user_params)
-from atomic_reactor.utils import retries
+                                 manifest_is_media_type,
+                                 map_to_user_params,
+                                 query_registry)
+from atomic_reactor.utils import digest_ledger, retries
 from osbs.utils import ImageName
 import osbs.utils
 from osbs.constants import RAND_DIGITS
 
+# max number of images pushed at the same time
+MAX_PUSH_WORKERS = 4
+
 
 __all__ = ('TagAndPushPlugin', )
 
@@ -63,7 +75,11 @@ class TagAndPushPlugin(Plugin):
         self.koji_target = koji_target
 
     def push_with_skopeo(self, image: Dict[str, str], registry_image: ImageName, insecure: bool,
-                         docker_push_secret: str) -> None:
+                         docker_push_secret: str) -> Optional[str]:
+        """Push the image, return the digest of the pushed manifest
+
+        :return: str, manifest digest written by skopeo, None if it was not written
+        """
         cmd = ['skopeo', 'copy']
         if docker_push_secret is not None:
             dockercfg = Dockercfg(docker_push_secret)
@@ -86,13 +102,83 @@ class TagAndPushPlugin(Plugin):
 
         dest_img = 'docker://' + registry_image.to_str()
 
-        cmd += [source_img, dest_img]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            digest_file = os.path.join(tmpdir, 'digest')
+            cmd += ['--digestfile=' + digest_file, source_img, dest_img]
+
+            try:
+                retries.run_cmd(cmd)
+            except subprocess.CalledProcessError as e:
+                self.log.error("push failed with output:\n%s", e.output)
+                raise
+
+            try:
+                with open(digest_file) as f:
+                    return f.read().strip() or None
+            except FileNotFoundError:
+                return None
+
+    def get_pushed_manifest(self, registry_image: ImageName, digest: Optional[str],
+                            insecure: bool, docker_push_secret: str
+                            ) -> Optional[requests.Response]:
+        """Get the V2 schema 2 manifest of a pushed image
+
+        The manifest may not be visible in the registry right after the push,
+        look it up again with a short jittered backoff, without pushing the
+        image again.
+
+        :param digest: str, digest of the pushed manifest, look the manifest up
+                       by the tag of registry_image if None
+        :return: response with the manifest, None if it was not found
+        """
+        session = RegistrySession(self.registry['uri'], insecure=insecure,
+                                  dockercfg_path=docker_push_secret)
+        reference = digest or registry_image.tag
+
+        for retry in range(PUSHED_MANIFEST_MAX_RETRIES + 1):
+            try:
+                response = query_registry(session, registry_image, digest=digest, version='v2')
+            except (HTTPError, RetryError) as ex:
+                if ex.response is None or ex.response.status_code not in (
+                        requests.codes.not_found, requests.codes.not_acceptable):
+                    raise
+            else:
+                if manifest_is_media_type(response, get_manifest_media_type('v2')):
+                    return response
+                # the registry has a manifest of another type, it will not change
+                if digest:
+                    return None
+
+            if retry < PUSHED_MANIFEST_MAX_RETRIES:
+                delay = PUSHED_MANIFEST_BACKOFF_FACTOR * (2 ** retry)
+                sleep_time = random.uniform(delay / 2, delay)
+                self.log.info("V2 schema 2 manifest %s of %s not found, looking it up "
+                              "again in %.1fs", reference, registry_image.to_str(), sleep_time)
+                time.sleep(sleep_time)
+
+        return None
+
+    def push_image(self, image: Dict[str, str], registry_image: ImageName, insecure: bool,
+                   docker_push_secret: str, need_manifest: bool = False
+                   ) -> Tuple[ImageName, Optional[str], Optional[requests.Response]]:
+        """Push the image, return the digest of its manifest
+
+        The registry is queried for the pushed manifest only if skopeo did not
+        write its digest or if the manifest itself is needed.
+
+        :param need_manifest: bool, whether to wait for the manifest in the registry
+        :return: tuple, the image, the digest of its manifest and the response with
+                 the manifest, the digest or the response are None if not known
+        """
+        digest = self.push_with_skopeo(image, registry_image, insecure, docker_push_secret)
+        self.log.info("Pushed %s, digest %s", registry_image.to_str(), digest)
+        if digest and not need_manifest:
+            return registry_image, digest, None
 
-        try:
-            retries.run_cmd(cmd)
-        except subprocess.CalledProcessError as e:
-            self.log.error("push failed with output:\n%s", e.output)
-            raise
+        manifest = self.get_pushed_manifest(registry_image, digest, insecure, docker_push_secret)
+        if manifest is not None and not digest:
+            digest = manifest.headers.get('Docker-Content-Digest')
+        return registry_image, digest, manifest
 
     def source_get_unique_image(self) -> ImageName:
         source_result = self.workflow.data.plugins_results[PLUGIN_FETCH_SOURCES_KEY]
@@ -181,36 +267,26 @@ class TagAndPushPlugin(Plugin):
         docker_push_secret = self.registry.get('secret', None)
         self.log.info("Registry %s secret %s", self.registry['uri'], docker_push_secret)
 
-        for image, registry_image in images:
-            max_retries = DOCKER_PUSH_MAX_RETRIES
-
-            for retry in range(max_retries + 1):
-                self.push_with_skopeo(image, registry_image, insecure, docker_push_secret)
-
-                if is_source_build:
-                    manifests_dict = get_all_manifests(registry_image, self.registry['uri'],
-                                                       insecure,
-                                                       docker_push_secret, versions=('v2',))
-                    try:
-                        koji_source_manifest_response = manifests_dict['v2']
-                    except KeyError as exc:
-                        raise RuntimeError(
-                            f'Unable to fetch v2 schema 2 digest for {registry_image.to_str()}'
-                        ) from exc
-
-                    wf_data.koji_source_manifest = koji_source_manifest_response.json()
-
-                digests = get_manifest_digests(registry_image, self.registry['uri'],
-                                               insecure, docker_push_secret)
-
-                if not (digests.v2 or digests.oci) and (retry < max_retries):
-                    sleep_time = DOCKER_PUSH_BACKOFF_FACTOR * (2 ** retry)
-                    self.log.info("Retrying push because V2 schema 2 or "
-                                  "OCI manifest not found in %is", sleep_time)
-
-                    time.sleep(sleep_time)
-                else:
-                    break
+        with ThreadPoolExecutor(max_workers=MAX_PUSH_WORKERS) as executor:
+            futures = [
+                executor.submit(self.push_image, image, registry_image, insecure,
+                                docker_push_secret, need_manifest=is_source_build)
+                for image, registry_image in images
+            ]
+            results = [future.result() for future in futures]
+
+        for registry_image, digest, manifest in results:
+            if is_source_build:
+                if manifest is None:
+                    raise RuntimeError(
+                        f'Unable to fetch v2 schema 2 digest for {registry_image.to_str()}'
+                    )
+                wf_data.koji_source_manifest = manifest.json()
+            elif digest is None:
+                self.log.warning("V2 schema 2 manifest of %s not found in the registry",
+                                 registry_image.to_str())
+            digest_ledger.record_digest(wf_data, registry_image,
+                                        get_manifest_media_type('v2'), digest)
 
             pushed_images.append(registry_image)
 
@@ -16,8 +16,8 @@ from atomic_reactor.constants import (PLUGIN_GROUP_MANIFESTS_KEY, PLUGIN_VERIFY_
                                       MEDIA_TYPE_OCI_V1_INDEX)
 
 from atomic_reactor.plugin import Plugin
-from atomic_reactor.util import (get_manifest_digests, get_platforms,
-                                 is_manifest_list, ManifestDigest)
+from atomic_reactor.util import get_platforms, is_manifest_list, ManifestDigest
+from atomic_reactor.utils import digest_ledger
 
 
 class VerifyMediaTypesPlugin(Plugin):
@@ -63,8 +63,9 @@ class VerifyMediaTypesPlugin(Plugin):
                 if expected_media_types:
                     expected_media_types.intersection_update(set(limit_media_types))
 
-        digests = get_manifest_digests(pullspec, registry['uri'], insecure,
-                                       secret, require_digest=False, **kwargs)
+        digests = digest_ledger.lookup_digests(self.workflow.data, [pullspec], registry['uri'],
+                                               insecure, secret, require_digest=False,
+                                               consumer=self.key, **kwargs)[pullspec.to_str()]
         if digests:
             if digests.v2_list:
                 media_types.add(MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST)
@@ -15,7 +15,7 @@ import os
 import shutil
 import tempfile
 from textwrap import dedent
-from typing import Any, List, Callable, TypeVar
+from typing import Any, List, Callable, Optional, TypeVar
 import collections
 try:
     from urlparse import urlparse
@@ -27,6 +27,7 @@ from osbs.utils import clone_git_repo, get_commit_id
 from atomic_reactor import util
 from atomic_reactor.constants import REPO_CONTAINER_CONFIG
 from atomic_reactor.util import read_yaml_from_file_path
+from atomic_reactor.utils.git_mirror import GitMirrorCache
 
 logger = logging.getLogger(__name__)
 
@@ -162,6 +163,9 @@ class Source(object):
 
 
 class GitSource(Source):
+    # when set, the repository is cloned through a local mirror
+    mirror_cache: Optional[GitMirrorCache] = None
+
     @property  # type: ignore
     @path_must_exist
     def commit_id(self):
@@ -172,7 +176,8 @@ class GitSource(Source):
             commit = self.provider_params.get('git_commit', None)
             branch = self.provider_params.get('git_branch', None)
             depth = self.provider_params.get('git_commit_depth', None)
-            clone_git_repo(
+            clone = self.mirror_cache.clone if self.mirror_cache else clone_git_repo
+            clone(
                 self.uri, target_dir=self.path, commit=commit, branch=branch, depth=depth
             )
         return self.path
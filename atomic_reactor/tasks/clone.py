@@ -6,7 +6,9 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
+from atomic_reactor.source import GitSource
 from atomic_reactor.tasks import common
+from atomic_reactor.utils.git_mirror import GitMirrorCache
 
 
 class CloneTask(common.Task[common.TaskParams]):
@@ -15,4 +17,7 @@ class CloneTask(common.Task[common.TaskParams]):
     task_name = 'clone'
 
     def execute(self):
-        self._params.source.get()
+        source = self._params.source
+        if isinstance(source, GitSource):
+            source.mirror_cache = GitMirrorCache.from_config(self.load_config())
+        source.get()
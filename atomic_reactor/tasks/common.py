@@ -126,6 +126,9 @@ class Task(abc.ABC, Generic[ParamsT]):
 
     def run(self, *args, **kwargs):
         try:
+            # share checksums of files with the other tasks of the build
+            util.digest_cache.set_path(self.get_context_dir().digest_cache)
+
             if self.ignore_sigterm:
                 signal.signal(signal.SIGTERM, signal.SIG_IGN)
             else:
@@ -26,6 +26,7 @@ import yaml
 import string
 import signal
 import tarfile
+import threading
 from collections import namedtuple
 from copy import deepcopy
 from base64 import b64decode
@@ -61,6 +62,7 @@ from requests.utils import guess_json_utf
 
 from osbs.api import OSBS
 from osbs.exceptions import OsbsException
+from osbs.tekton import TaskRun
 from osbs.utils import Labels, ImageName
 from osbs.utils import yaml as osbs_yaml
 
@@ -305,8 +307,81 @@ def _process_plugin_substitution(mapping, key_parts, value):
                            (plugin_name, plugins_num))
 
 
+# Block size used to read files when computing their checksums
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+
+class DigestCache(object):
+    """
+    Cache of file checksums, keyed by the identity of the file contents
+
+    A file is identified by its device, inode, size and modification time, so a
+    cached checksum is not used for a file which was modified or replaced since.
+    Checksums are kept in memory and, if a path is set, appended as JSON lines to
+    that file, to be shared by all the processes working on the same files.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._lock = threading.Lock()
+        self._checksums: Dict[str, Dict[str, str]] = {}
+        self._path = None
+        if path is not None:
+            self.set_path(path)
+
+    @staticmethod
+    def _key(stat: os.stat_result) -> str:
+        return f'{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}'
+
+    def set_path(self, path: Path) -> None:
+        """Persist checksums in path, loading the ones already stored there"""
+        with self._lock:
+            self._path = path
+            if not path.exists():
+                return
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # last line may have been cut off by a killed process
+                        continue
+                    self._checksums.setdefault(entry['key'], {}).update(entry['checksums'])
+
+    def get(self, stat: os.stat_result) -> Dict[str, str]:
+        """Get cached checksums ({'md5sum': ...}) of the file with given stat result"""
+        with self._lock:
+            return dict(self._checksums.get(self._key(stat), {}))
+
+    def update(self, stat: os.stat_result, checksums: Dict[str, str]) -> None:
+        """Cache checksums of the file with given stat result"""
+        if not checksums:
+            return
+        key = self._key(stat)
+        with self._lock:
+            self._checksums.setdefault(key, {}).update(checksums)
+            if self._path is not None:
+                # a single small append, not interleaved with writes of other processes
+                try:
+                    with open(self._path, 'a') as f:
+                        f.write(json.dumps({'key': key, 'checksums': checksums}) + '\n')
+                except OSError as exc:
+                    logger.warning('Unable to store checksums in %s: %s', self._path, exc)
+
+    def update_file(self, path: Union[str, Path], checksums: Dict[str, str]) -> None:
+        """Cache checksums computed for the file at path while writing or reading it"""
+        self.update(os.stat(path), checksums)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._checksums.clear()
+            self._path = None
+
+
+digest_cache = DigestCache()
+
+
 def _compute_checksums(
-    fd: BinaryIO, hash_objs: List[_hashlib.HASH], blocksize: int = 65536
+    fd: BinaryIO, hash_objs: List[_hashlib.HASH], blocksize: int = CHECKSUM_BLOCK_SIZE
 ) -> None:
     """
     Compute file checksums in given hash objects.
@@ -326,6 +401,10 @@ def get_checksums(filename: Union[str, BinaryIO], algorithms: List[str]) -> Dict
     """
     Compute a checksum(s) of given file using specified algorithms.
 
+    All the checksums are computed in a single pass over the file. Checksums of
+    files (not file-like objects) are cached in digest_cache, only the ones
+    missing from the cache are computed.
+
     :param filename: path to file or file-like object
     :param algorithms: list of cryptographic hash functions, currently supported: md5, sha256
     :return: dictionary
@@ -337,15 +416,30 @@ def get_checksums(filename: Union[str, BinaryIO], algorithms: List[str]) -> Dict
     if not all(elem in allowed_algorithms for elem in algorithms):
         raise ValueError('Algorithms supported {}. Found {}'.format(allowed_algorithms, algorithms))
 
-    hash_objs = [getattr(hashlib, algorithm)() for algorithm in algorithms]
-
+    checksums = {}
     if isinstance(filename, str):
         with open(filename, mode='rb') as f:
-            _compute_checksums(f, hash_objs)
-    else:
-        _compute_checksums(filename, hash_objs)
+            stat = os.fstat(f.fileno())
+            cached = digest_cache.get(stat)
+            hash_objs = [getattr(hashlib, algorithm)() for algorithm in algorithms
+                         if '{}sum'.format(algorithm) not in cached]
+            if hash_objs:
+                _compute_checksums(f, hash_objs)
+        computed = {'{}sum'.format(hash_obj.name): hash_obj.hexdigest() for hash_obj in hash_objs}
+        # do not cache checksums of a file modified while being read
+        if computed and DigestCache._key(os.stat(filename)) == DigestCache._key(stat):
+            digest_cache.update(stat, computed)
+        cached.update(computed)
+        for algorithm in algorithms:
+            sum_name = '{}sum'.format(algorithm)
+            checksums[sum_name] = cached[sum_name]
+            logger.debug('%s: %s%s', sum_name, checksums[sum_name],
+                         '' if sum_name in computed else ' (cached)')
+        return checksums
+
+    hash_objs = [getattr(hashlib, algorithm)() for algorithm in algorithms]
+    _compute_checksums(filename, hash_objs)
 
-    checksums = {}
     for hash_obj in hash_objs:
         sum_name = '{}sum'.format(hash_obj.name)
         checksums[sum_name] = hash_obj.hexdigest()
@@ -886,6 +980,23 @@ class RegistryClient(object):
 
         return image_inspect
 
+    def get_blob(self, image: ImageName, digest: str, stream: bool = False) -> requests.Response:
+        """Return blob by digest
+
+        :param image: ImageName, the remote image the blob belongs to
+        :param digest: str, digest of the blob
+        :param stream: bool, if True, the content is downloaded only when accessed
+
+        :return: requests.Response object
+        """
+        context = '/'.join([x for x in [image.namespace, image.repo] if x])
+        url = '/v2/{}/blobs/{}'.format(context, digest)
+        logger.debug("get_blob: querying %s", url)
+
+        response = self._session.get(url, stream=stream)
+        response.raise_for_status()
+        return response
+
     def _blob_config_by_digest(self, image: ImageName, config_digest: str) -> dict:
         config_response = query_registry(self._session, image, digest=config_digest, is_blob=True)
         blob_config = config_response.json()
@@ -1378,52 +1489,113 @@ def get_parent_image_koji_data(workflow: "DockerBuildWorkflow"):
     return image_metadata
 
 
+class _HashedLogFile(object):
+    """Temporary log file computing its md5 checksum while being written"""
+
+    def __init__(self, prefix: str):
+        self._file = NamedTemporaryFile(prefix=prefix, suffix='.log', mode='wb', delete=False)
+        self.name = self._file.name
+        self.md5 = hashlib.md5()
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.md5.update(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+        digest_cache.update_file(self.name, {'md5sum': self.md5.hexdigest()})
+
+
 class OSBSLogs(object):
+    # max number of characters of a log encoded and written at once
+    LOG_CHUNK_SIZE = 1024 * 1024
+
     def __init__(self, log, platforms: list):
         self.log = log
         self.platforms = platforms
 
-    def get_log_metadata(self, path, filename):
+    def get_log_metadata(self, path, filename, checksum=None):
         """
         Describe a file by its metadata.
 
+        :param checksum: str, md5 checksum of the file, computed from the file if not provided
         :return: dict
         """
 
-        checksums = get_checksums(path, ['md5'])
+        if checksum is None:
+            checksum = get_checksums(path, ['md5'])['md5sum']
         metadata = {'filename': filename,
                     'filesize': os.path.getsize(path),
-                    'checksum': checksums['md5sum'],
+                    'checksum': checksum,
                     'checksum_type': 'md5',
                     'type': 'log',
                     'arch': 'noarch'}
 
         return metadata
 
+    def _write_log(self, log_files: List[_HashedLogFile], log: str) -> None:
+        """
+        Write a container log into the log files chunk by chunk, so that the
+        log is not held in memory twice, as str and encoded.
+
+        :param log_files: list, log files to write the log into
+        :param log: str, the container log
+        """
+        for offset in range(0, len(log), self.LOG_CHUNK_SIZE):
+            data = log[offset:offset + self.LOG_CHUNK_SIZE].encode('utf-8')
+            for log_file in log_files:
+                log_file.write(data)
+        for log_file in log_files:
+            log_file.write(b'\n')
+
+    def _iter_task_run_logs(self, osbs: OSBS, pipeline_run: Dict[str, Any]
+                            ) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """
+        Fetch the logs of the task runs of a pipeline run, one task run at a time
+
+        The logs of a task run which cannot be fetched are skipped.
+
+        :param pipeline_run: dict, the pipeline run as returned by osbs.get_build
+        :return: iterator of (pipeline task name, dict of logs by container) tuples
+        """
+        for child in pipeline_run['status'].get('childReferences', []):
+            if child.get('kind', 'TaskRun') != 'TaskRun':
+                continue
+            try:
+                logs = TaskRun(os=osbs.os, task_run_name=child['name']).get_logs()
+            except OsbsException as ex:
+                self.log.error("unable to get logs of task run %s: %s", child['name'], ex)
+                continue
+            yield child['pipelineTaskName'], logs
+
     def get_log_files(self, osbs: OSBS, pipeline_run_name) -> List[Output]:
         """
         Build list of log files
 
+        The logs are fetched and written one task run at a time, like
+        osbs.get_build_logs fetches them but without collecting the logs of
+        all task runs first, so only the logs of one task run are held in
+        memory. Checksums are computed while writing.
+
         :return: list, of log files
         """
 
-        logs = None
         outputs: List[Output] = []
 
-        # Collect logs from server
         try:
-            logs = osbs.get_build_logs(pipeline_run_name)
+            pipeline_run = osbs.get_build(pipeline_run_name)
         except OsbsException as ex:
             self.log.error("unable to get build logs: %s", ex)
             return outputs
 
         filename = 'osbs-build'
-        logfiles = {'noarch': NamedTemporaryFile(prefix=f'{pipeline_run_name}-{filename}-noarch-',
-                                                 suffix='.log', mode='wb', delete=False)}
+        logfiles = {'noarch': _HashedLogFile(prefix=f'{pipeline_run_name}-{filename}-noarch-')}
 
-        # Correct log order depends on dict iteration order
-        # and on osbs.get_build_logs returning correctly ordered dict
-        for task_run_name, containers in logs.items():
+        # logs are written in the order of the task runs in the pipeline run
+        for task_run_name, containers in self._iter_task_run_logs(osbs, pipeline_run):
             task_platform = next(
                 (platform for platform in self.platforms if
                  platform.replace('_', '-') in task_run_name),
@@ -1432,34 +1604,23 @@ class OSBSLogs(object):
             if task_platform in logfiles:
                 log_file = logfiles[task_platform]
             else:
-                log_file = NamedTemporaryFile(
-                    prefix=f'{pipeline_run_name}-{filename}-{task_platform}-',
-                    suffix='.log',
-                    mode='wb',
-                    delete=False,
+                log_file = _HashedLogFile(
+                    prefix=f'{pipeline_run_name}-{filename}-{task_platform}-'
                 )
                 logfiles[task_platform] = log_file
 
-            remote_sources_log = None
+            task_log_files = [log_file]
             if task_run_name == REMOTE_SOURCES_TASKNAME:
-                if REMOTE_SOURCES_LOGNAME in logfiles:
-                    remote_sources_log = logfiles[REMOTE_SOURCES_LOGNAME]
-                else:
-                    remote_sources_log = NamedTemporaryFile(
-                        prefix=REMOTE_SOURCES_LOGNAME,
-                        suffix='.log',
-                        mode='wb',
-                        delete=False,
+                if REMOTE_SOURCES_LOGNAME not in logfiles:
+                    logfiles[REMOTE_SOURCES_LOGNAME] = _HashedLogFile(
+                        prefix=REMOTE_SOURCES_LOGNAME
                     )
-                    logfiles[REMOTE_SOURCES_LOGNAME] = remote_sources_log
+                task_log_files.append(logfiles[REMOTE_SOURCES_LOGNAME])
 
             for log_message in containers.values():
-                log_file.write((log_message + '\n').encode('utf-8'))
-                if remote_sources_log:
-                    remote_sources_log.write((log_message + '\n').encode('utf-8'))
-            log_file.flush()
-            if remote_sources_log:
-                remote_sources_log.flush()
+                self._write_log(task_log_files, log_message)
+            for task_log_file in task_log_files:
+                task_log_file.flush()
 
         for platform, logfile in logfiles.items():
             if platform == 'noarch':
@@ -1468,9 +1629,10 @@ class OSBSLogs(object):
                 log_filename = REMOTE_SOURCES_LOGNAME
             else:
                 log_filename = platform
-            metadata = self.get_log_metadata(logfile.name, f'{log_filename}.log')
             # No need to keep file open. After close, this temp log file still exists.
             logfile.close()
+            metadata = self.get_log_metadata(logfile.name, f'{log_filename}.log',
+                                             checksum=logfile.md5.hexdigest())
             outputs.append(Output(filename=logfile.name, metadata=metadata))
 
         return outputs
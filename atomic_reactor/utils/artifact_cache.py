@@ -0,0 +1,137 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Persistent cache of downloaded artifacts, shared by the builds running on one worker.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from atomic_reactor.config import Configuration
+from atomic_reactor.util import digest_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactCache:
+    """Cache of artifacts, keyed by their checksums
+
+    An artifact is stored once its checksums were verified by the download, as
+    <path>/<algorithm>/<checksum>, hardlinked for each of the verified
+    checksums. It is served from the cache only if all the expected checksums
+    are found and refer to the same file, so an artifact is never trusted for
+    an algorithm it was not verified with. Files are replaced atomically, builds
+    running concurrently on the same cache need no locking. When the cache
+    grows over max_size bytes, the least recently used artifacts are removed.
+    """
+
+    def __init__(self, path: Union[str, Path], max_size: int = 0):
+        """
+        :param path: directory of the cache, created if it does not exist
+        :param max_size: maximum size of the cache in bytes, 0 for unlimited
+        """
+        self.path = Path(path)
+        self.max_size = max_size
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, conf: Configuration) -> Optional['ArtifactCache']:
+        """Create the cache from reactor config, return None if it is not configured"""
+        cache_config = conf.artifacts_cache
+        if not cache_config:
+            return None
+        return cls(cache_config['path'], cache_config['max_size'])
+
+    def _entry_path(self, algorithm: str, checksum: str) -> Path:
+        return self.path / algorithm / checksum.lower()
+
+    def fetch(self, checksums: Dict[str, str], dest: Union[str, Path]) -> bool:
+        """Copy the artifact with the expected checksums to dest
+
+        :param checksums: expected checksums, by algorithm
+        :param dest: path of the file to create
+        :return: True if the artifact was found in the cache, False otherwise
+        """
+        if not checksums:
+            return False
+
+        entries = [self._entry_path(algorithm, checksum)
+                   for algorithm, checksum in checksums.items()]
+        try:
+            inodes = {entry.stat().st_ino for entry in entries}
+            if len(inodes) != 1:
+                return False
+            shutil.copyfile(entries[0], dest)
+            # mark the artifact as recently used
+            os.utime(entries[0])
+        except FileNotFoundError:
+            # not cached, or removed by another build
+            return False
+
+        digest_cache.update_file(dest, {f'{algorithm}sum': checksum
+                                        for algorithm, checksum in checksums.items()})
+        logger.debug('%s copied from artifact cache', dest)
+        return True
+
+    def store(self, path: Union[str, Path], checksums: Dict[str, str]) -> None:
+        """Add the artifact at path, whose checksums were verified
+
+        :param path: path of the artifact
+        :param checksums: verified checksums of the artifact, by algorithm
+        """
+        if not checksums:
+            return
+
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, prefix='.artifact-')
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp_name)
+            for algorithm, checksum in checksums.items():
+                entry = self._entry_path(algorithm, checksum)
+                entry.parent.mkdir(exist_ok=True)
+                # link to another name first, then replace the entry atomically
+                tmp_link = f'{tmp_name}.{algorithm}'
+                os.link(tmp_name, tmp_link)
+                os.replace(tmp_link, entry)
+        finally:
+            os.unlink(tmp_name)
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used artifacts, until the cache fits into max_size"""
+        if not self.max_size:
+            return
+
+        # all the entries of an artifact are links to the same file
+        artifacts: Dict[int, List[Path]] = defaultdict(list)
+        stats: Dict[int, Tuple[float, int]] = {}
+        for entry in self.path.glob('*/*'):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            artifacts[st.st_ino].append(entry)
+            stats[st.st_ino] = (st.st_mtime, st.st_size)
+
+        total_size = sum(size for _, size in stats.values())
+        for inode in sorted(stats, key=lambda inode: stats[inode][0]):
+            if total_size <= self.max_size:
+                break
+            logger.info('Removing %s (%d bytes) from artifact cache',
+                        artifacts[inode][0].name, stats[inode][1])
+            for entry in artifacts[inode]:
+                try:
+                    entry.unlink()
+                except FileNotFoundError:
+                    pass
+            total_size -= stats[inode][1]
@@ -0,0 +1,136 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Ledger of the manifest digests known to the build, kept in workflow data.
+
+Plugins which push or PUT a manifest record its digest, plugins (and later
+tasks) which need the digests of the built images read them from the ledger
+and query the registry only for the media types which are not recorded.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Sequence
+
+import requests
+from osbs.utils import ImageName
+
+from atomic_reactor.inner import ImageBuildWorkflowData
+from atomic_reactor.util import ManifestDigest, get_manifest_digests, get_manifest_media_type
+
+logger = logging.getLogger(__name__)
+
+MAX_DIGEST_LOOKUP_WORKERS = 4
+
+ALL_VERSIONS = ('v1', 'v2', 'v2_list', 'oci', 'oci_index')
+
+
+def record_digest(wf_data: ImageBuildWorkflowData, image: ImageName, media_type: str,
+                  digest: Optional[str]) -> None:
+    """Record the digest of the manifest of image
+
+    :param wf_data: workflow data holding the ledger
+    :param image: ImageName, pullspec of the image, by tag
+    :param media_type: str, media type of the manifest
+    :param digest: str, manifest digest, ignored if None
+    """
+    if not digest:
+        return
+    wf_data.digest_ledger.setdefault(image.to_str(), {})[media_type] = digest
+
+
+def record_digests(wf_data: ImageBuildWorkflowData, image: ImageName,
+                   digests: ManifestDigest) -> None:
+    """Record the digests of image, for each manifest schema version"""
+    for version, digest in digests.items():
+        # True if the registry did not send the digest
+        if isinstance(digest, str):
+            record_digest(wf_data, image, get_manifest_media_type(version), digest)
+
+
+def get_recorded_digests(wf_data: ImageBuildWorkflowData, image: ImageName,
+                         versions: Iterable[str] = ALL_VERSIONS) -> ManifestDigest:
+    """Return the recorded digests of image, for the requested schema versions"""
+    entry = wf_data.digest_ledger.get(image.to_str(), {})
+    return ManifestDigest({version: entry[get_manifest_media_type(version)]
+                           for version in versions
+                           if get_manifest_media_type(version) in entry})
+
+
+def record_hits(wf_data: ImageBuildWorkflowData, consumer: str, count: int) -> None:
+    """Count registry lookups of consumer which were served from the ledger"""
+    hits = wf_data.digest_ledger_hits
+    hits[consumer] = hits.get(consumer, 0) + count
+
+
+def _query_missing_digests(image, registry, insecure, dockercfg_path, versions, require_digest,
+                           known: ManifestDigest) -> Optional[ManifestDigest]:
+    if not known:
+        return get_manifest_digests(image, registry, insecure, dockercfg_path,
+                                    versions=versions, require_digest=require_digest)
+
+    missing = tuple(version for version in versions if version not in known)
+    try:
+        queried = get_manifest_digests(image, registry, insecure, dockercfg_path,
+                                       versions=missing, require_digest=False)
+    except requests.exceptions.HTTPError as ex:
+        # none of the missing versions is available, the recorded ones are
+        if ex.response is None or ex.response.status_code != requests.codes.not_found:
+            raise
+        queried = ManifestDigest()
+
+    digests = {**(queried or {}), **known}
+    return ManifestDigest({version: digests[version] for version in versions
+                           if version in digests})
+
+
+def lookup_digests(wf_data: ImageBuildWorkflowData, images: Sequence[ImageName], registry: str,
+                   insecure: bool = False, dockercfg_path: Optional[str] = None,
+                   versions: Sequence[str] = ALL_VERSIONS, require_digest: bool = True,
+                   consumer: Optional[str] = None) -> Dict[str, Optional[ManifestDigest]]:
+    """Return the manifest digests of images, from the ledger or from the registry
+
+    Digests which are not recorded are looked up in the registry, concurrently
+    for all the images, as by get_manifest_digests, and recorded. The number
+    of registry lookups the ledger avoided is counted for the consumer.
+
+    :param wf_data: workflow data holding the ledger
+    :param images: list of ImageName, the images to get the digests of
+    :param registry: str, URI of the registry
+    :param insecure: bool, when True registry's cert is not verified
+    :param dockercfg_path: str, dirname of .dockercfg location
+    :param versions: tuple, which manifest schema versions to get the digests of
+    :param require_digest: bool, when True an exception is raised if no digest is
+                           found for an image
+    :param consumer: str, name of the plugin the lookups are counted for
+    :return: dict, image pullspec -> ManifestDigest
+    """
+    versions = tuple(versions)
+    known = {image.to_str(): get_recorded_digests(wf_data, image, versions) for image in images}
+    to_query = [image for image in images if len(known[image.to_str()]) < len(versions)]
+    avoided = sum(len(digests) for digests in known.values())
+
+    with ThreadPoolExecutor(max_workers=MAX_DIGEST_LOOKUP_WORKERS) as executor:
+        futures = {
+            image.to_str(): executor.submit(_query_missing_digests, image, registry, insecure,
+                                            dockercfg_path, versions, require_digest,
+                                            known[image.to_str()])
+            for image in to_query
+        }
+        results = {image: future.result() for image, future in futures.items()}
+
+    for image in to_query:
+        if results[image.to_str()]:
+            record_digests(wf_data, image, results[image.to_str()])
+
+    if consumer:
+        record_hits(wf_data, consumer, avoided)
+    logger.debug('%d of %d manifest digest lookups served from the ledger',
+                 avoided, len(images) * len(versions))
+
+    return {image.to_str(): results.get(image.to_str(), known[image.to_str()])
+            for image in images}
@@ -0,0 +1,214 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Persistent cache of bare git mirrors, shared by the builds running on one worker.
+"""
+
+import fcntl
+import logging
+import os
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from osbs.utils import clone_git_repo
+
+from atomic_reactor.config import Configuration
+from atomic_reactor.util import sha256sum
+from atomic_reactor.utils import retries
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_git_url(url: str) -> str:
+    """Normalize a git URL, so that different spellings of one repository match
+
+    The scheme and host are lowercased, credentials, trailing slashes and the .git
+    suffix are removed. scp-like URLs (git@host:path) and paths are only stripped.
+    """
+    url = url.strip()
+    parsed = urlsplit(url)
+    path = parsed.path if parsed.scheme else url
+    path = path.rstrip('/')
+    if path.endswith('.git'):
+        path = path[:-len('.git')]
+    if not parsed.scheme:
+        return path
+
+    netloc = (parsed.hostname or '').lower()
+    if parsed.port:
+        netloc = f'{netloc}:{parsed.port}'
+    return urlunsplit((parsed.scheme.lower(), netloc, path, '', ''))
+
+
+def _dir_size(path: Path) -> int:
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, filename)).st_size
+            except FileNotFoundError:
+                pass
+    return size
+
+
+class GitMirrorCache:
+    """Cache of bare mirrors of git repositories, keyed by the normalized repository URL
+
+    Repositories are cloned from the local mirror, which is created or updated
+    from the remote first, so only new objects are fetched over the network.
+    Builds running concurrently on the same cache are serialized per mirror with
+    file locks. When the cache grows over max_size bytes, the least recently used
+    mirrors are removed.
+    """
+
+    def __init__(self, path: Union[str, Path], max_size: int = 0):
+        """
+        :param path: directory of the cache, created if it does not exist
+        :param max_size: maximum size of the cache in bytes, 0 for unlimited
+        """
+        self.path = Path(path)
+        self.max_size = max_size
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, conf: Configuration) -> Optional['GitMirrorCache']:
+        """Create the cache from reactor config, return None if it is not configured"""
+        cache_config = conf.git_mirror_cache
+        if not cache_config:
+            return None
+        return cls(cache_config['path'], cache_config['max_size'])
+
+    def _mirror_path(self, url: str) -> Path:
+        return self.path / f'{sha256sum(normalize_git_url(url))}.git'
+
+    @staticmethod
+    def _lock_path(mirror: Path) -> Path:
+        return mirror.with_suffix('.lock')
+
+    @contextmanager
+    def _locked(self, mirror: Path, operation: int) -> Iterator[None]:
+        lock_path = self._lock_path(mirror)
+        while True:
+            lock_file = open(lock_path, 'a')
+            try:
+                fcntl.flock(lock_file, operation)
+                # the lock file may have been removed with an evicted mirror meanwhile
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                lock_file.close()
+                raise
+            lock_file.close()
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _update_mirror(self, url: str, mirror: Path) -> None:
+        # The URL may contain credentials of the build: it is never stored in the
+        # mirror, which has no remote, every build fetches from its own URL.
+        fetch_cmd = ['fetch', '--prune', '--quiet', url, '+refs/*:refs/*']
+        start = time.monotonic()
+        if mirror.exists():
+            size_before = _dir_size(mirror)
+            retries.run_cmd(['git', '-C', str(mirror), *fetch_cmd])
+        else:
+            size_before = 0
+            tmp_mirror = mirror.with_suffix('.tmp')
+            shutil.rmtree(tmp_mirror, ignore_errors=True)
+            # a partial mirror is removed by the next attempt
+            retries.run_cmd(['git', 'init', '--quiet', '--bare', str(tmp_mirror)])
+            retries.run_cmd(['git', '-C', str(tmp_mirror), *fetch_cmd])
+            # point HEAD to the default branch of the repository, like clone --mirror
+            head = retries.run_cmd(['git', 'ls-remote', '--symref', url, 'HEAD'])
+            for line in head.decode().splitlines():
+                if line.startswith('ref: '):
+                    ref = line[len('ref: '):].split('\t')[0]
+                    retries.run_cmd(['git', '-C', str(tmp_mirror), 'symbolic-ref', 'HEAD', ref])
+            tmp_mirror.rename(mirror)
+        logger.info('Mirror of %s updated in %.2f seconds, %d bytes fetched',
+                    normalize_git_url(url), time.monotonic() - start,
+                    _dir_size(mirror) - size_before)
+
+    def clone(self, url: str, target_dir: Union[str, Path], commit: Optional[str] = None,
+              branch: Optional[str] = None, depth: Optional[int] = None) -> None:
+        """Clone repository at url into target_dir, through its mirror
+
+        Accepts the same arguments as osbs.utils.clone_git_repo. If the mirror
+        cannot be updated, the repository is cloned from url directly. Builds
+        cloning the same repository wait for each other, cloning from the local
+        mirror takes little time.
+        """
+        mirror = self._mirror_path(url)
+        with self._locked(mirror, fcntl.LOCK_EX):
+            try:
+                self._update_mirror(url, mirror)
+            except subprocess.CalledProcessError as exc:
+                logger.warning('Unable to update mirror of %s, cloning without it: %s',
+                               normalize_git_url(url), exc.output)
+                clone_git_repo(url, target_dir=target_dir, commit=commit, branch=branch,
+                               depth=depth)
+                return
+            os.utime(mirror)
+
+            start = time.monotonic()
+            # git ignores depth when cloning from a local path, but not from a file:// URL
+            source = mirror.as_uri() if depth else str(mirror)
+            clone_git_repo(source, target_dir=target_dir, commit=commit, branch=branch,
+                           depth=depth)
+            retries.run_cmd(['git', '-C', str(target_dir), 'remote', 'set-url', 'origin', url])
+            logger.info('Cloned %s from mirror in %.2f seconds',
+                        normalize_git_url(url), time.monotonic() - start)
+
+        self.evict(keep=mirror)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """Remove least recently used mirrors, until the cache fits into max_size
+
+        Mirrors which are in use by other builds are skipped.
+
+        :param keep: mirror which must not be removed
+        """
+        if not self.max_size:
+            return
+
+        mtimes = {}
+        for mirror in self.path.glob('*.git'):
+            try:
+                mtimes[mirror] = mirror.stat().st_mtime
+            except FileNotFoundError:
+                # removed by another build meanwhile
+                continue
+        mirrors = sorted(mtimes, key=mtimes.get)
+        sizes = {mirror: _dir_size(mirror) for mirror in mirrors}
+        total_size = sum(sizes.values())
+
+        for mirror in mirrors:
+            if total_size <= self.max_size:
+                break
+            if mirror == keep:
+                continue
+            try:
+                with self._locked(mirror, fcntl.LOCK_EX | fcntl.LOCK_NB):
+                    if mirror.exists():
+                        logger.info('Removing mirror %s (%d bytes) from git cache',
+                                    mirror, sizes[mirror])
+                        shutil.rmtree(mirror)
+                    # builds waiting for the lock notice it was removed and lock a new file
+                    self._lock_path(mirror).unlink()
+            except BlockingIOError:
+                logger.debug('Mirror %s is in use, not removing it', mirror)
+                continue
+            total_size -= sizes[mirror]
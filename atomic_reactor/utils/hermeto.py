@@ -8,9 +8,10 @@
 Utils to help to integrate with Hermeto CLI tool
 """
 
+import errno
 import logging
 
-from typing import Any, Callable, Dict, Optional, Tuple, List
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, List
 from pathlib import Path
 import os.path
 import urllib
@@ -28,49 +29,76 @@ class SymlinkSandboxError(Exception):
     """Found symlink(s) pointing outside the sandbox."""
 
 
-def enforce_sandbox(repo_root: Path, remove_unsafe_symlinks: bool = False) -> None:
+def _is_within(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(os.path.join(directory, ''))
+
+
+def _find_unsafe_symlinks(root: str) -> Iterator[str]:
     """
-    Check that there are no symlinks that try to leave the cloned repository.
+    Find symlinks under root which resolve to a path outside of root.
 
-    :param (str | Path) repo_root: absolute path to root of cloned repository
-    :param bool remove_unsafe_symlinks: remove unsafe symlinks if any are found
-    :raises OsbsValidationException: if any symlink points outside of cloned repository
+    Only symlinks are resolved: root is a real path and directories which are
+    not symlinks are the only ones descended into, so the real path of any other
+    entry is its directory's real path joined with its name. The directories are
+    listed with os.scandir, which tells symlinks apart without a stat call.
+
+    :param str root: real path of the directory to scan
+    :return: iterator of the paths of the unsafe symlinks, in the order of os.walk
     """
-    for path_to_dir, subdirs, files in os.walk(repo_root):
-        dirpath = Path(path_to_dir)
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            # os.walk skips directories it cannot list, too
+            continue
 
-        for entry in subdirs + files:
+        subdirs = []
+        for entry in entries:
             # the logic in here actually *requires* f-strings with `!r`. using
             # `%r` DOES NOT WORK (tested)
             # pylint: disable=logging-fstring-interpolation
+            if entry.is_symlink():
+                real_path = os.path.realpath(entry.path)
+                try:
+                    os.stat(real_path)
+                except OSError as e:
+                    # a dangling symlink is checked by where it points to, like Path.resolve
+                    if e.errno == errno.ELOOP:
+                        logger.info(f"Symlink loop from {entry.path!r}")
+                        continue
+                if not _is_within(real_path, root):
+                    yield entry.path
+            elif entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+        pending.extend(reversed(subdirs))
 
-            # apparently pylint doesn't understand Path
-            full_path = dirpath / entry  # pylint: disable=old-division
-
-            try:
-                real_path = full_path.resolve()
-            except RuntimeError as e:
-                if "Symlink loop from " in str(e):
-                    logger.info(f"Symlink loop from {full_path!r}")
-                    continue
-                logger.exception("RuntimeError encountered")
-                raise
-
-            try:
-                real_path.relative_to(repo_root)
-            except ValueError as exc:
-                # Unlike the real path, the full path is always relative to the root
-                relative_path = str(full_path.relative_to(repo_root))
-                if remove_unsafe_symlinks:
-                    full_path.unlink()
-                    logger.warning(
-                        f"The destination of {relative_path!r} is outside of cloned repository. "
-                        "Removing...",
-                    )
-                else:
-                    raise SymlinkSandboxError(
-                        f"The destination of {relative_path!r} is outside of cloned repository",
-                    ) from exc
+
+def enforce_sandbox(repo_root: Path, remove_unsafe_symlinks: bool = False) -> None:
+    """
+    Check that there are no symlinks that try to leave the cloned repository.
+
+    :param (str | Path) repo_root: absolute path to root of cloned repository
+    :param bool remove_unsafe_symlinks: remove unsafe symlinks if any are found
+    :raises OsbsValidationException: if any symlink points outside of cloned repository
+    """
+    root = os.path.realpath(repo_root)
+    for path in _find_unsafe_symlinks(root):
+        # pylint: disable=logging-fstring-interpolation
+        # Unlike the real path, the path of the symlink is always relative to the root
+        relative_path = os.path.relpath(path, root)
+        if remove_unsafe_symlinks:
+            os.unlink(path)
+            logger.warning(
+                f"The destination of {relative_path!r} is outside of cloned repository. "
+                "Removing...",
+            )
+        else:
+            raise SymlinkSandboxError(
+                f"The destination of {relative_path!r} is outside of cloned repository",
+            )
 
 
 def validate_paths(repo_path: Path, remote_sources_packages: dict) -> None:
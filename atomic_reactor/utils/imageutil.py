@@ -7,12 +7,17 @@ of the BSD license. See the LICENSE file for details.
 """
 
 import functools
+import hashlib
 import subprocess
 import logging
 import tarfile
+import threading
 import json
+import zlib
 
-from typing import Optional, Union, Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Optional, Union, Dict, Iterable, Iterator, List, Any, Tuple
 from pathlib import Path
 
 from osbs.utils import ImageName
@@ -24,6 +29,12 @@ from atomic_reactor.utils import retries
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of layer blobs streamed from the registry at once
+MAX_LAYER_DOWNLOAD_WORKERS = 4
+LAYER_CHUNK_SIZE = 1024 * 1024
+# Layers which can be decompressed when streamed from the registry
+SUPPORTED_LAYER_MEDIA_TYPE_SUFFIXES = ('.tar', '.gzip', '+gzip')
+
 
 class ExtractionError(Exception):
     """The image extraction failed."""
@@ -37,6 +48,38 @@ class NonEmptyDestinationError(ExtractionError):
     """Error of extracting into non-empty destination"""
 
 
+class UnsupportedLayerError(ValueError):
+    """Layer blobs of the image cannot be decompressed on the fly"""
+
+
+def _decompress_layer(
+    media_type: str, chunks: Iterable[bytes], blob_checksum: Any
+) -> Iterator[bytes]:
+    """Decompress the chunks of a layer blob, updating the checksum of the blob
+
+    Pieces of at most LAYER_CHUNK_SIZE bytes are yielded, so a highly
+    compressed chunk is not inflated into memory at once.
+    """
+    gzipped = media_type.endswith(('.gzip', '+gzip'))
+    # Layer may consist of multiple gzip members
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        blob_checksum.update(chunk)
+        if not gzipped:
+            yield chunk
+            continue
+        while True:
+            data = decompressor.decompress(chunk, LAYER_CHUNK_SIZE)
+            chunk = decompressor.unconsumed_tail
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            yield data
+            # with a full piece, more output may be pending in the decompressor
+            if not chunk and len(data) < LAYER_CHUNK_SIZE:
+                break
+
+
 def image_is_inspectable(image: Union[str, ImageName]) -> bool:
     """Check if we should expect the image to be inspectable."""
     im = str(image)
@@ -57,6 +100,9 @@ class ImageUtil:
         """
         self._dockerfile_images = dockerfile_images
         self._conf = conf
+        # compressed layer digest -> (diff_id, uncompressed size)
+        self._layer_sizes: Dict[str, Tuple[str, int]] = {}
+        self._layer_sizes_lock = threading.Lock()
 
     def set_dockerfile_images(self, dockerfile_images: util.DockerfileImages) -> None:
         """Set a new dockerfile_images instance."""
@@ -193,6 +239,90 @@ class ImageUtil:
                 for (diff_id, layer) in zip(diff_ids, layers)
             ]
 
+    def get_uncompressed_image_layer_sizes_from_registry(
+        self, image: Union[str, ImageName]
+    ) -> List[Dict[str, Any]]:
+        """Returns data about the uncompressed image layer sizes, without downloading the image
+
+        The layer blobs are streamed from the output registry and decompressed
+        on the fly to count their size and verify their diff_id, nothing is
+        written to disk. Layers are processed in parallel and the results are
+        cached by the compressed layer digest.
+
+        :param image: Union[str, ImageName], platform-specific image pushed to
+            the output registry
+        :raises UnsupportedLayerError: if the layers are neither gzip compressed
+            nor uncompressed, the sizes are to be taken from the image archive
+        :return: List[Dict[str, Any]], List of dicts, where each dict
+                 contains layer digest and the size of the layer in bytes
+        """
+        image = ImageName.parse(str(image))
+        registry = self._conf.registry
+        session = util.RegistrySession(registry['uri'], insecure=registry['insecure'],
+                                       dockercfg_path=registry.get('secret'))
+        client = util.RegistryClient(session)
+
+        for version in ('v2', 'oci'):
+            response, _ = client.get_manifest(image, version)
+            if response:
+                break
+        else:
+            raise RuntimeError(f"Image {image}: No v2 schema 2 or oci manifest found")
+
+        manifest = response.json()
+        config = client.get_blob(image, manifest['config']['digest']).json()
+        diff_ids = config['rootfs']['diff_ids']
+        layers = manifest['layers']
+        unsupported = {layer['mediaType'] for layer in layers
+                       if not layer['mediaType'].endswith(SUPPORTED_LAYER_MEDIA_TYPE_SUFFIXES)}
+        if unsupported:
+            raise UnsupportedLayerError(f'Image {image}: unsupported layer media types '
+                                        f'{", ".join(sorted(unsupported))}')
+        if len(layers) != len(diff_ids):
+            raise ValueError(f'Image {image}: {len(layers)} layers in manifest, '
+                             f'but {len(diff_ids)} diff_ids in config')
+
+        with ThreadPoolExecutor(max_workers=MAX_LAYER_DOWNLOAD_WORKERS) as executor:
+            layer_sizes = list(executor.map(
+                lambda layer: self._get_uncompressed_layer_size(client, image, layer), layers
+            ))
+
+        for diff_id, (computed_diff_id, _) in zip(diff_ids, layer_sizes):
+            if diff_id != computed_diff_id:
+                raise ValueError(f'Image {image}: diff_id of layer {computed_diff_id} '
+                                 f'does not match {diff_id} from config')
+        return [
+            {"diff_id": diff_id, "size": size} for (diff_id, size) in layer_sizes
+        ]
+
+    def _get_uncompressed_layer_size(
+        self, client: util.RegistryClient, image: ImageName, layer: Dict[str, Any]
+    ) -> Tuple[str, int]:
+        """Stream a layer blob from the registry, return its diff_id and uncompressed size"""
+        digest = layer['digest']
+        with self._layer_sizes_lock:
+            if digest in self._layer_sizes:
+                logger.debug("Using cached size of layer %s", digest)
+                return self._layer_sizes[digest]
+
+        blob_checksum = hashlib.sha256()
+        checksum = hashlib.sha256()
+        size = 0
+        with closing(client.get_blob(image, digest, stream=True)) as response:
+            chunks = response.iter_content(chunk_size=LAYER_CHUNK_SIZE)
+            for data in _decompress_layer(layer['mediaType'], chunks, blob_checksum):
+                checksum.update(data)
+                size += len(data)
+
+        if f'sha256:{blob_checksum.hexdigest()}' != digest:
+            raise ValueError(f'Layer {digest}: checksum of downloaded blob does not match')
+
+        result = f'sha256:{checksum.hexdigest()}', size
+        logger.debug("Layer %s has diff_id %s and uncompressed size %d", digest, *result)
+        with self._layer_sizes_lock:
+            self._layer_sizes[digest] = result
+        return result
+
     def extract_filesystem_layer(self, src_path: str, dst_path: str) -> str:
         """Extract filesystem layer from image archive tarball and
         saves it at dst_path. This is meant for flatpaks and will work
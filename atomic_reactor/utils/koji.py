@@ -7,29 +7,39 @@ of the BSD license. See the LICENSE file for details.
 """
 
 import fnmatch
+import hashlib
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Sequence
 
 import time
 import platform
 from atomic_reactor.inner import DockerBuildWorkflow, ImageBuildWorkflowData
 
 import koji
+import requests
+from koji.util import adler32_constructor
 
 from atomic_reactor import __version__ as atomic_reactor_version
 from atomic_reactor.constants import (DEFAULT_DOWNLOAD_BLOCK_SIZE,
+                                      DEFAULT_UPLOAD_BLOCK_SIZE,
+                                      HTTP_BACKOFF_FACTOR,
                                       IMAGE_TYPE_DOCKER_ARCHIVE,
                                       PROG,
                                       KOJI_MAX_RETRIES,
                                       KOJI_RETRY_INTERVAL,
                                       KOJI_OFFLINE_RETRY_INTERVAL)
 from atomic_reactor.types import RpmComponent
+from atomic_reactor.utils import digest_ledger
+from atomic_reactor.utils.imageutil import UnsupportedLayerError
 from atomic_reactor.util import (Output, get_image_upload_filename,
                                  get_checksums, get_manifest_media_type,
                                  create_tar_gz_archive, get_config_from_registry,
-                                 get_manifest_digests, get_version_of_tools)
+                                 get_version_of_tools,
+                                 is_flatpak_build, digest_cache,
+                                 get_retrying_requests_session)
 from osbs.utils import ImageName
 
 logger = logging.getLogger(__name__)
@@ -171,26 +181,218 @@ def create_koji_session(hub_url, auth_info=None, use_fast_upload=True):
     return session
 
 
+def upload_file_with_checksums(session, local_filename: str, serverdir: str, name: str,
+                               algorithms: Sequence[str] = ('md5',),
+                               blocksize: Optional[int] = None,
+                               callback=None) -> Dict[str, Any]:
+    """
+    Upload a file to koji with the fast upload API, computing checksums of the
+    file from the uploaded chunks, so that the file is read only once.
+
+    Each chunk and the whole upload are verified against the adler32 checksums
+    reported by the hub, like koji.ClientSession.fastUpload does.
+
+    :param session: koji.ClientSession instance
+    :param local_filename: str, path to the file to upload
+    :param serverdir: str, upload directory on the hub
+    :param name: str, file name on the hub
+    :param algorithms: list of str, hashlib algorithms of the checksums to compute
+    :param blocksize: int, size of the uploaded chunks
+    :param callback: callable, called with the same arguments as koji upload callbacks
+    :return: dict, with 'checksums' (e.g. {'md5sum': ...}), 'size' and 'seconds' keys
+    """
+    blocksize = blocksize or DEFAULT_UPLOAD_BLOCK_SIZE
+    hash_objs = [hashlib.new(algorithm) for algorithm in algorithms]
+    full_chksum = adler32_constructor()
+    size = os.path.getsize(local_filename)
+
+    start = time.time()
+    if callback:
+        callback(0, size, 0, 0, 0)
+
+    offset = 0
+    with open(local_filename, 'rb') as f:
+        # upload at least one (empty) chunk, so that empty files are created too
+        first_chunk = True
+        while True:
+            lap = time.time()
+            chunk = f.read(blocksize)
+            if not chunk and not first_chunk:
+                break
+            first_chunk = False
+
+            result = session.rawUpload(chunk, offset, serverdir, name, overwrite=True)
+            if result['size'] != len(chunk):
+                raise koji.GenericError('server returned wrong chunk size for {}: {} != {}'
+                                        .format(name, result['size'], len(chunk)))
+            if result['hexdigest'] != adler32_constructor(chunk).hexdigest():
+                raise koji.GenericError('upload checksum failed for {} at offset {}'
+                                        .format(name, offset))
+
+            full_chksum.update(chunk)
+            for hash_obj in hash_objs:
+                hash_obj.update(chunk)
+            offset += len(chunk)
+
+            if callback:
+                now = time.time()
+                callback(offset, size, len(chunk), now - lap, now - start)
+
+    if offset != size:
+        raise koji.GenericError('file {} changed while uploading: {} != {}'
+                                .format(local_filename, offset, size))
+
+    result = session.checkUpload(serverdir, name, verify='adler32')
+    if int(result['size']) != offset or result['hexdigest'] != full_chksum.hexdigest():
+        raise koji.GenericError('upload verification failed for {}: {}'.format(name, result))
+
+    checksums = {'{}sum'.format(hash_obj.name): hash_obj.hexdigest() for hash_obj in hash_objs}
+    digest_cache.update_file(local_filename, checksums)
+    return {
+        'checksums': checksums,
+        'size': offset,
+        'seconds': time.time() - start,
+    }
+
+
+def koji_multicall(session, method: str, args_list: List[tuple],
+                   batch: Optional[int] = None,
+                   kwargs: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """
+    Call a Koji API method once for each set of arguments, using a single
+    multicall instead of one hub round trip per call.
+
+    :param session: koji.ClientSession instance
+    :param method: str, name of the Koji API method
+    :param args_list: list of tuples, positional arguments of each call
+    :param batch: int, max number of calls sent to the hub in one request
+    :param kwargs: dict, keyword arguments passed to every call
+    :return: list, results in the same order as args_list
+    """
+    if not args_list:
+        return []
+
+    kwargs = kwargs or {}
+    with session.multicall(strict=True, batch=batch) as m:
+        calls = [getattr(m, method)(*args, **kwargs) for args in args_list]
+
+    return [call.result for call in calls]
+
+
+# states of finished Koji tasks
+TASK_FINISHED_STATES = ('CLOSED', 'CANCELED', 'FAILED')
+# first and max seconds between polls of Koji tasks, by task method;
+# tags are applied in seconds, image builds take many minutes
+TASK_POLL_INTERVALS = {
+    'tagBuild': (1, 5),
+    'image': (15, 60),
+}
+DEFAULT_TASK_POLL_INTERVALS = (2, 30)
+TASK_POLL_BACKOFF_FACTOR = 1.5
+
+
 class TaskWatcher(object):
-    def __init__(self, session, task_id, poll_interval=5):
+    """Wait for a Koji task to finish
+
+    Unless poll_interval is set, the task is polled on a backoff tuned to the
+    task method (see TASK_POLL_INTERVALS). Use watch_tasks to wait for
+    several tasks at once.
+    """
+
+    def __init__(self, session, task_id, poll_interval=None):
+        """
+        :param session: koji.ClientSession instance
+        :param task_id: int, Koji task ID
+        :param poll_interval: int, fixed seconds between polls, None for the backoff
+        """
         self.session = session
         self.task_id = task_id
         self.poll_interval = poll_interval
         self.state = 'CANCELED'
+        # task info of the last poll, with the request of the task
+        self.task_info = None
+        # seconds between the completion of the task and its detection
+        self.detect_delay = None
+        self._interval = None
 
     def wait(self):
-        logger.debug("waiting for koji task %r to finish", self.task_id)
-        while not self.session.taskFinished(self.task_id):
-            time.sleep(self.poll_interval)
-
-        logger.debug("koji task is finished, getting info")
-        task_info = self.session.getTaskInfo(self.task_id, request=True)
-        self.state = koji.TASK_STATES[task_info['state']]
+        """Wait for the task to finish, return its state"""
+        watch_tasks(self.session, [self])
         return self.state
 
     def failed(self):
         return self.state in ['CANCELED', 'FAILED']
 
+    def next_interval(self):
+        """Return seconds until the next poll of the unfinished task"""
+        if self.poll_interval is not None:
+            return self.poll_interval
+
+        first, maximum = TASK_POLL_INTERVALS.get((self.task_info or {}).get('method'),
+                                                 DEFAULT_TASK_POLL_INTERVALS)
+        if self._interval is None:
+            self._interval = first
+        else:
+            self._interval = min(self._interval * TASK_POLL_BACKOFF_FACTOR, maximum)
+        return self._interval
+
+    def update(self, task_info):
+        """Update the watcher with the polled task info, return True if the task is finished"""
+        if task_info is None:
+            raise RuntimeError('Koji task {} not found'.format(self.task_id))
+
+        self.task_info = task_info
+        state = koji.TASK_STATES[task_info['state']]
+        if state not in TASK_FINISHED_STATES:
+            return False
+
+        self.state = state
+        completion_ts = task_info.get('completion_ts')
+        if completion_ts:
+            self.detect_delay = max(0.0, time.time() - completion_ts)
+            logger.debug("koji task %r is %s, detected %.1fs after completion",
+                         self.task_id, state, self.detect_delay)
+        else:
+            logger.debug("koji task %r is %s", self.task_id, state)
+        return True
+
+
+def watch_tasks(session, watchers: Sequence[TaskWatcher]) -> None:
+    """
+    Wait for several Koji tasks to finish
+
+    The info of all the tasks due for a poll is requested in one multicall.
+    The state and task info of the finished tasks are set in their watchers.
+
+    :param session: koji.ClientSession instance
+    :param watchers: list of TaskWatcher, one for each task
+    """
+    logger.debug("waiting for koji tasks %s to finish",
+                 ', '.join(repr(watcher.task_id) for watcher in watchers))
+    # time of the next poll, for watchers of unfinished tasks
+    next_poll = {watcher: time.monotonic() for watcher in watchers}
+
+    while next_poll:
+        now = time.monotonic()
+        due = [watcher for watcher, poll_time in next_poll.items() if poll_time <= now]
+        if not due:
+            time.sleep(min(next_poll.values()) - now)
+            continue
+
+        if len(due) == 1:
+            task_infos = [session.getTaskInfo(due[0].task_id, request=True)]
+        else:
+            task_infos = koji_multicall(session, 'getTaskInfo',
+                                        [(watcher.task_id,) for watcher in due],
+                                        kwargs={'request': True})
+
+        now = time.monotonic()
+        for watcher, task_info in zip(due, task_infos):
+            if watcher.update(task_info):
+                del next_poll[watcher]
+            else:
+                next_poll[watcher] = now + watcher.next_interval()
+
 
 def stream_task_output(session, task_id, file_name,
                        blocksize=DEFAULT_DOWNLOAD_BLOCK_SIZE):
@@ -211,7 +413,129 @@ def stream_task_output(session, task_id, file_name,
     logger.debug('Finished streaming %s from task %s', file_name, task_id)
 
 
-def tag_koji_build(session, build_id, target, poll_interval=5):
+# size of the byte ranges of a task output downloaded in parallel
+TASK_OUTPUT_RANGE_SIZE = 64 * 1024 * 1024
+MAX_TASK_OUTPUT_DOWNLOAD_WORKERS = 4
+# times a range interrupted by a connection error is resumed
+TASK_OUTPUT_MAX_RESUMES = 3
+
+
+def _download_range(http_session, url, fd, start, end, ranged, insecure, blocksize):
+    """Download bytes start to end (inclusive) of url into fd
+
+    A range request interrupted by a connection error is resumed from its
+    last received byte. Without range requests, the download cannot be
+    resumed and the error is raised.
+
+    :return: int, number of bytes received
+    """
+    offset = start
+    for attempt in range(TASK_OUTPUT_MAX_RESUMES + 1):
+        headers = {'Range': f'bytes={offset}-{end}'} if ranged else {}
+        try:
+            response = http_session.get(url, headers=headers, stream=True, verify=not insecure)
+            response.raise_for_status()
+            if ranged and response.status_code != requests.codes.partial_content:
+                raise ValueError(f'{url} does not support range requests')
+            for chunk in response.iter_content(chunk_size=blocksize):
+                if offset + len(chunk) > end + 1:
+                    raise ValueError(f'{url}: range {start}-{end} received more bytes')
+                offset += os.pwrite(fd, chunk, offset)
+            if offset > end:
+                return offset - start
+            logger.debug('%s: range %d-%d ended at %d', url, start, end, offset)
+        except (requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ConnectionError) as exc:
+            if not ranged or attempt == TASK_OUTPUT_MAX_RESUMES:
+                raise
+            logger.debug('%s: range %d-%d interrupted at %d: %s', url, start, end, offset, exc)
+        if not ranged:
+            break
+        time.sleep(HTTP_BACKOFF_FACTOR * (2 ** attempt))
+    raise ValueError(f'{url}: incomplete range {start}-{end}, received {offset - start} bytes')
+
+
+def _download_task_output_http(url, dest_path, size, insecure, blocksize):
+    http_session = get_retrying_requests_session()
+    response = http_session.head(url, verify=not insecure)
+    response.raise_for_status()
+    content_length = int(response.headers.get('Content-Length', -1))
+    if content_length != size:
+        raise ValueError(f'{url}: {content_length} bytes, task output is {size} bytes')
+    ranged = response.headers.get('Accept-Ranges') == 'bytes'
+    if ranged:
+        ranges = [(start, min(start + TASK_OUTPUT_RANGE_SIZE, size) - 1)
+                  for start in range(0, size, TASK_OUTPUT_RANGE_SIZE)]
+    else:
+        ranges = [(0, size - 1)]
+
+    fd = os.open(dest_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        with ThreadPoolExecutor(max_workers=MAX_TASK_OUTPUT_DOWNLOAD_WORKERS) as executor:
+            futures = [
+                executor.submit(_download_range, http_session, url, fd, start, end,
+                                ranged, insecure, blocksize)
+                for start, end in ranges if start <= end
+            ]
+            received = sum(future.result() for future in futures)
+    finally:
+        os.close(fd)
+    # the file was truncated to the expected size, only the received bytes tell
+    if received != size:
+        raise ValueError(f'{url}: received {received} bytes, task output is {size} bytes')
+    logger.debug('Downloaded %s in %d ranges', url, len(ranges))
+
+
+def download_task_output(session, task_id, file_name, dest_path, pathinfo=None,
+                         insecure=False, blocksize=DEFAULT_DOWNLOAD_BLOCK_SIZE):
+    """
+    Download an output file of a Koji task
+
+    When pathinfo is given, the file is downloaded over HTTP from the work
+    directory of the task, in ranges fetched in parallel; a range interrupted
+    by a connection error is resumed from its last received byte. If the
+    HTTP download fails or does not match the size of the task output, the
+    file is streamed through the hub instead (see stream_task_output).
+
+    :param session: koji.ClientSession instance
+    :param task_id: int, ID of the task
+    :param file_name: str, name of the output file
+    :param dest_path: path of the file to create
+    :param pathinfo: koji.PathInfo for the Koji root url, None to stream through the hub
+    :param insecure: bool, whether to skip TLS checks of the HTTP download
+    :param blocksize: int, chunk size to download
+    :raise RuntimeError: if the file streamed through the hub does not match the size of
+        the task output
+    :return: int, size of the file
+    """
+    outputs = session.listTaskOutput(task_id, stat=True)
+    if file_name not in outputs:
+        raise RuntimeError(f'{file_name} not found in the output of task {task_id}')
+    # sizes are strings, XML-RPC integers are 32 bit
+    size = int(outputs[file_name]['st_size'])
+
+    downloaded = False
+    if pathinfo is not None:
+        url = f'{pathinfo.task(task_id)}/{file_name}'
+        try:
+            _download_task_output_http(url, dest_path, size, insecure, blocksize)
+            downloaded = True
+        except (requests.exceptions.RequestException, ValueError) as exc:
+            logger.warning('Failed to download %s, streaming it from the hub: %s', url, exc)
+
+    if not downloaded:
+        received = 0
+        with open(dest_path, 'wb') as f:
+            for chunk in stream_task_output(session, task_id, file_name, blocksize):
+                received += f.write(chunk)
+        if received != size:
+            raise RuntimeError(f'{file_name} from task {task_id} has {received} bytes, '
+                               f'expected {size} bytes')
+    return size
+
+
+def tag_koji_build(session, build_id, target, poll_interval=None):
     logger.debug('Finding destination tag for target %s', target)
     target_info = session.getBuildTarget(target)
     dest_tag = target_info['dest_tag_name']
@@ -382,13 +706,15 @@ def get_output(workflow: DockerBuildWorkflow,
                buildroot_id: str,
                pullspec: ImageName,
                platform: str,
-               source_build: bool = False):
+               source_build: bool = False,
+               consumer: Optional[str] = None):
     """
     Build the 'output' section of the metadata.
     :param buildroot_id: str, buildroot_id
     :param pullspec: ImageName
     :param platform: str, output platform
     :param source_build: bool, is source_build ?
+    :param consumer: str, name of the plugin to count digest ledger hits for
     :param logs: list, of Output logs
     :return: tuple, list of Output instances, and extra Output file
     """
@@ -417,11 +743,22 @@ def get_output(workflow: DockerBuildWorkflow,
         parent_id = inspect['Id'] if inspect else None
 
         image_archive = str(workflow.build_dir.platform_dir(platform).exported_squashed_image)
-        layer_sizes = imageutil.get_uncompressed_image_layer_sizes(image_archive)
-
-    digests = get_manifest_digests(pullspec, workflow.conf.registry['uri'],
-                                   workflow.conf.registry['insecure'],
-                                   workflow.conf.registry.get('secret', None))
+        layer_sizes = None
+        if workflow.conf.layer_sizes_from_registry and not is_flatpak_build(workflow):
+            try:
+                layer_sizes = imageutil.get_uncompressed_image_layer_sizes_from_registry(pullspec)
+            except UnsupportedLayerError as exc:
+                # fetch_docker_archive skipped the image, fetch it now
+                logger.warning('%s, fetching the image archive instead', exc)
+                imageutil.download_image_archive_tarball(pullspec, image_archive)
+        if layer_sizes is None:
+            layer_sizes = imageutil.get_uncompressed_image_layer_sizes(image_archive)
+
+    digests = digest_ledger.lookup_digests(workflow.data, [pullspec],
+                                           workflow.conf.registry['uri'],
+                                           workflow.conf.registry['insecure'],
+                                           workflow.conf.registry.get('secret', None),
+                                           consumer=consumer)[pullspec.to_str()]
 
     if digests.v2:
         config_manifest_digest = digests.v2
@@ -497,17 +834,20 @@ def get_output(workflow: DockerBuildWorkflow,
     return output_files, extra_output_file
 
 
-def get_output_metadata(path, filename):
+def get_output_metadata(path, filename, checksum=True):
     """
     Describe a file by its metadata.
 
+    :param checksum: bool, compute the checksum of the file. If False, the
+        checksum is left to be added later, e.g. while uploading the file
     :return: dict
     """
-    checksums = get_checksums(path, ['md5'])
     metadata = {'filename': filename,
-                'filesize': os.path.getsize(path),
-                'checksum': checksums['md5sum'],
-                'checksum_type': 'md5'}
+                'filesize': os.path.getsize(path)}
+    if checksum:
+        checksums = get_checksums(path, ['md5'])
+        metadata.update({'checksum': checksums['md5sum'],
+                         'checksum_type': 'md5'})
 
     return metadata
 
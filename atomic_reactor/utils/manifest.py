@@ -107,6 +107,8 @@ class ManifestUtil(object):
         """
         Stores the manifest into target_repo, possibly tagging it. This may involve
         copying referenced blobs from source_repo.
+
+        :return: str, digest of the stored manifest sent by the registry, or None
         """
 
         if not ref:
@@ -119,6 +121,7 @@ class ManifestUtil(object):
         headers = {'Content-Type': media_type}
         response = session.put(url, data=manifest, headers=headers)
         response.raise_for_status()
+        return response.headers.get('Docker-Content-Digest')
 
     def get_registry_session(self):
         insecure = self.registry.get('insecure', False)
@@ -163,6 +163,55 @@ class ODCSClient(object):
         logger.info("Renewed compose is %d", compose_id)
         return response_json
 
+    def _get_composes(self, compose_ids):
+        """Retrieve compose status of several composes
+
+        Composes are queried with a single list request filtered by compose IDs,
+        any compose missing in the response is queried on its own.
+
+        :param compose_ids: list<int>, compose IDs to query
+        :return: dict, status of each compose, by compose ID
+        """
+        composes = {}
+        if len(compose_ids) > 1:
+            params = [('id', compose_id) for compose_id in compose_ids]
+            params.append(('per_page', len(compose_ids)))
+            response = self.session.get('{}/composes/'.format(self.url.rstrip('/')),
+                                        params=params)
+            response.raise_for_status()
+            for item in response.json().get('items', []):
+                if item['id'] in compose_ids:
+                    composes[item['id']] = item
+
+        for compose_id in compose_ids:
+            if compose_id not in composes:
+                response = self.session.get(self._get_compose_url(compose_id))
+                response.raise_for_status()
+                composes[compose_id] = response.json()
+
+        return composes
+
+    def _compose_finished(self, compose_id, response_json):
+        """Check if the compose is not in progress anymore
+
+        :raise RuntimeError: if state_name is 'failed'
+        """
+        if response_json['state_name'] == 'failed':
+            state_reason = response_json.get('state_reason', 'Unknown')
+            logger.error(dedent("""\
+               Compose %s failed: %s
+               Details: %s
+               """), compose_id, state_reason, json.dumps(response_json, indent=4))
+            raise RuntimeError('Failed request for compose_id={}: {}'
+                               .format(compose_id, state_reason))
+
+        if response_json['state_name'] not in ['wait', 'generating']:
+            logger.debug("Retrieved compose information for compose_id=%s: %s",
+                         compose_id, json.dumps(response_json, indent=4))
+            return True
+
+        return False
+
     def wait_for_compose(self, compose_id,
                          burst_retry=1,
                          burst_length=30,
@@ -187,18 +236,7 @@ class ODCSClient(object):
             response.raise_for_status()
             response_json = response.json()
 
-            if response_json['state_name'] == 'failed':
-                state_reason = response_json.get('state_reason', 'Unknown')
-                logger.error(dedent("""\
-                   Compose %s failed: %s
-                   Details: %s
-                   """), compose_id, state_reason, json.dumps(response_json, indent=4))
-                raise RuntimeError('Failed request for compose_id={}: {}'
-                                   .format(compose_id, state_reason))
-
-            if response_json['state_name'] not in ['wait', 'generating']:
-                logger.debug("Retrieved compose information for compose_id=%s: %s",
-                             compose_id, json.dumps(response_json, indent=4))
+            if self._compose_finished(compose_id, response_json):
                 return response_json
 
             elapsed = time.time() - start_time
@@ -213,6 +251,53 @@ class ODCSClient(object):
                 else:
                     time.sleep(burst_retry)
 
+    def wait_for_composes(self, compose_ids,
+                          burst_retry=1,
+                          burst_length=30,
+                          slow_retry=10):
+        """Wait for several compose requests to finalize
+
+        All composes still in progress are polled together on each retry,
+        so the total wait is that of the slowest compose.
+
+        :param compose_ids: list<int>, compose IDs to wait for
+        :param burst_retry: int, seconds to wait between retries prior to exceeding
+                            the burst length
+        :param burst_length: int, seconds to switch to slower retry period
+        :param slow_retry: int, seconds to wait between retries after exceeding
+                           the burst length
+
+        :return: dict, updated status of each compose, by compose ID
+        :raise RuntimeError: if state_name of any compose becomes 'failed'
+        """
+        pending = list(dict.fromkeys(compose_ids))
+        logger.debug("Getting compose information for compose_ids=%s", pending)
+        finished = {}
+        start_time = time.time()
+        while pending:
+            composes = self._get_composes(pending)
+            for compose_id in list(pending):
+                if self._compose_finished(compose_id, composes[compose_id]):
+                    finished[compose_id] = composes[compose_id]
+                    pending.remove(compose_id)
+
+            if not pending:
+                break
+
+            elapsed = time.time() - start_time
+            if elapsed > self.timeout:
+                raise WaitComposeToFinishTimeout(pending[0], self.timeout)
+            else:
+                logger.debug("Retrying request compose_ids=%s, elapsed_time=%s",
+                             pending, elapsed)
+
+                if elapsed > burst_length:
+                    time.sleep(slow_retry)
+                else:
+                    time.sleep(burst_retry)
+
+        return finished
+
     def cancel_compose(self, compose_id):
         """Cancel a compose by sending a DELETE request with compose id"""
         try:
@@ -14,6 +14,15 @@ from pathlib import Path
 from atomic_reactor.dirs import BuildDir
 from ruamel.yaml import YAML
 from ruamel.yaml.comments import CommentedMap, CommentedSeq
+from ruamel.yaml.error import YAMLError
+from ruamel.yaml.events import (
+    AliasEvent,
+    CollectionEndEvent,
+    CollectionStartEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+)
 
 from atomic_reactor.util import chain_get, sha256sum
 from osbs.utils import ImageName
@@ -43,6 +52,12 @@ def get_yaml_parser():
 
 yaml = get_yaml_parser()
 
+# Only used to scan YAML documents, uses the C-based parser if available
+_scan_yaml_parser = YAML(typ='safe')
+
+# The kind of a YAML document could not be determined by scanning it
+UNKNOWN_KIND = object()
+
 
 OPERATOR_CSV_KIND = "ClusterServiceVersion"
 
@@ -224,6 +239,60 @@ def check_csv(data, schema):
     validate_with_schema(data, schema)
 
 
+def scan_kind(path):
+    """
+    Find the top-level kind of a YAML document without loading the document.
+
+    Parsing events are read only until the kind is found, no objects are constructed.
+
+    :param path: Path to file
+    :return: str, kind of the document; None if the document is not a mapping
+        or does not have a string kind; UNKNOWN_KIND if it could not be determined
+    """
+    with open(path) as f:
+        events = _scan_yaml_parser.parse(f)
+        try:
+            for event in events:
+                if isinstance(event, CollectionStartEvent):
+                    break
+                if isinstance(event, (ScalarEvent, AliasEvent)):
+                    return None
+            else:
+                # Empty document
+                return None
+
+            if not isinstance(event, MappingStartEvent):
+                return None
+
+            depth = 1
+            is_key = True
+            is_kind_key = False
+            for event in events:
+                if depth == 1:
+                    if isinstance(event, MappingEndEvent):
+                        break
+                    if is_key:
+                        is_kind_key = isinstance(event, ScalarEvent) and event.value == "kind"
+                    elif is_kind_key:
+                        if isinstance(event, AliasEvent):
+                            return UNKNOWN_KIND
+                        return event.value if isinstance(event, ScalarEvent) else None
+                    is_key = not is_key
+
+                if isinstance(event, CollectionStartEvent):
+                    depth += 1
+                elif isinstance(event, CollectionEndEvent):
+                    depth -= 1
+        except YAMLError as exc:
+            # Let the full parse decide (and report the error)
+            log.debug("%s - Unable to scan YAML document for kind: %s", path, exc)
+            return UNKNOWN_KIND
+        finally:
+            events.close()
+
+    return None
+
+
 def modify_dict_recursively(target, mods, append=False):
     """Apply 'mods' dictionary to 'target' dictionary for map entry values,
 
@@ -516,6 +585,9 @@ class Annotation(NamedPullspec):
         self._image_key = NotImplemented
         self._start_i = NotImplemented
         self._end_i = NotImplemented
+        # Other pullspecs found in the same annotation text, their indices
+        # are shifted when this pullspec is replaced
+        self._siblings = []
 
     @property
     def image(self):
@@ -532,6 +604,13 @@ class Annotation(NamedPullspec):
         text = self.data[self._image_key]
         self.data[self._image_key] = text[:i] + value + text[j:]
 
+        delta = len(value) - (j - i)
+        self._end_i = j + delta
+        for sibling in self._siblings:
+            if sibling is not self and sibling._start_i >= j:
+                sibling._start_i += delta
+                sibling._end_i += delta
+
     @property
     def name(self):
         # Construct name by taking repo and tag from image and adding suffix
@@ -561,6 +640,100 @@ class Annotation(NamedPullspec):
         return self
 
 
+class PullspecIndex(object):
+    """
+    Locations of all pullspecs in ClusterServiceVersion data, found in a single
+    walk through the data.
+
+    Named pullspecs (and annotations) only point into the data, replacing them
+    updates the data in place and the index stays valid. The index has to be
+    rebuilt only when the structure of the data changes.
+    """
+
+    def __init__(self, data, known_annotation_keys, pullspec_heuristic):
+        """
+        Build the index
+
+        :param data: ClusterServiceVersion yaml data
+        :param known_annotation_keys: Annotation keys that are expected to contain pullspecs
+        :param pullspec_heuristic: Function that takes a string and returns
+            a list of (start, end) pullspec indices
+        """
+        self._known_annotation_keys = known_annotation_keys
+        self._pullspec_heuristic = pullspec_heuristic
+
+        # Known sources of pullspecs in annotations
+        self.annotations = []
+        # Pullspecs guessed by the heuristic in other annotations
+        self.guessed_annotations = []
+        # (obj, key or index) of all strings outside of metadata.annotations
+        self.strings = []
+
+        self._walk(data, None, find_annotations=True)
+        # Pullspecs are found left-to-right, they *must* be replaced right-to-left
+        self.guessed_annotations.reverse()
+
+        related_images_path = ("spec", "relatedImages")
+        self.related_images = [
+            RelatedImage(r) for r in chain_get(data, related_images_path, default=[])
+        ]
+
+        deployments_path = ("spec", "install", "spec", "deployments")
+        deployments = chain_get(data, deployments_path, default=[])
+        containers_path = ("spec", "template", "spec", "containers")
+        self.containers = [
+            Container(c)
+            for d in deployments for c in chain_get(d, containers_path, default=[])
+        ]
+        init_containers_path = ("spec", "template", "spec", "initContainers")
+        self.init_containers = [
+            InitContainer(c)
+            for d in deployments for c in chain_get(d, init_containers_path, default=[])
+        ]
+
+        # RELATED_IMAGE_* env vars, including unsupported "valueFrom" references
+        self.related_image_envs = [
+            e for c in self.containers + self.init_containers
+            for e in c.data.get("env", []) if e["name"].startswith("RELATED_IMAGE_")
+        ]
+
+    def _walk(self, obj, key, find_annotations):
+        if is_dict(obj):
+            if find_annotations:
+                metadata = obj.get("metadata")
+                if is_dict(metadata) and is_dict(metadata.get("annotations")):
+                    self._add_annotations(metadata["annotations"])
+            for k, v in obj.items():
+                # Strings in metadata.annotations objects are only handled as annotations
+                if (key, k) == ("metadata", "annotations"):
+                    continue
+                if is_str(v):
+                    self.strings.append((obj, k))
+                else:
+                    # Do not search for metadata.*.metadata.annotations
+                    self._walk(v, k, find_annotations and k != "metadata")
+        elif is_list(obj):
+            for i, item in enumerate(obj):
+                if is_str(item):
+                    self.strings.append((obj, i))
+                else:
+                    self._walk(item, i, find_annotations)
+
+    def _add_annotations(self, obj):
+        for key in self._known_annotation_keys:
+            if key in obj:
+                self.annotations.append(Annotation(obj).in_key(key))
+        for k, v in obj.items():
+            # Do not look in keys that are known pullspec sources
+            if is_str(v) and k not in self._known_annotation_keys:
+                guessed = [
+                    Annotation(obj).in_key(k, i, j) for i, j in self._pullspec_heuristic(v)
+                ]
+                for annotation in guessed:
+                    annotation._siblings = guessed
+                self.guessed_annotations.extend(guessed)
+
+
 class OperatorCSV(object):
     """
     A single ClusterServiceVersion file in an operator manifest.
@@ -588,6 +761,7 @@ class OperatorCSV(object):
         self.data = data
         self._pullspec_heuristic = pullspec_heuristic
         self.repo_dir = kwargs.get('repo_dir', None)
+        self._index = None
 
     @property
     def checksum(self):
@@ -609,13 +783,16 @@ class OperatorCSV(object):
     def dump(self, build_dir: BuildDir = None):
         """
         Write data to file (preserves comments)
+
+        :return: Path of the written file
         """
         if build_dir:
             path = Path(str(self.path).replace(str(self.repo_dir), str(build_dir.path)))
         else:
-            path = self.path
+            path = Path(self.path)
         with open(path, "w") as f:
             yaml.dump(self.data, f)
+        return path
 
     def has_related_images(self):
         """
@@ -657,9 +834,12 @@ class OperatorCSV(object):
 
         :param replacement_pullspecs: mapping of pullspec -> replacment
         """
-        for k in self.data:
-            self._replace_pullspecs_not_in_annotations(self.data, k, replacement_pullspecs)
-        for annotation in self._annotation_pullspecs() + self._guess_annotation_pullspecs():
+        index = self._pullspec_index()
+        for obj, k_or_i in index.strings:
+            # Doesn't matter if string was not a pullspec, it will simply not match anything
+            # in replacement_pullspecs and no replacement will be done
+            self._replace_unnamed_pullspec(obj, k_or_i, replacement_pullspecs)
+        for annotation in index.annotations + index.guessed_annotations:
             self._replace_named_pullspec(annotation, replacement_pullspecs)
 
     def set_related_images(self):
@@ -705,6 +885,21 @@ class OperatorCSV(object):
             log.debug("%s - Set relatedImage %s (from %s): %s",
                       self.path, p.name, p.description, p.image)
             related_images.append(p.as_yaml_object())
+        self._invalidate_pullspec_index()
+
+    def _pullspec_index(self):
+        """Get the index of pullspec locations, build it if necessary
+
+        :rtype: PullspecIndex
+        """
+        if self._index is None:
+            self._index = PullspecIndex(self.data, self._known_annotation_keys,
+                                        self._pullspec_heuristic)
+        return self._index
+
+    def _invalidate_pullspec_index(self):
+        """Drop the index of pullspec locations after the structure of data has changed"""
+        self._index = None
 
     def _named_pullspecs(self):
         pullspecs = []
@@ -723,11 +918,7 @@ class OperatorCSV(object):
         :return: a list of pullspecs. It could be an empty if no spec.RelatedImage section.
         :rtype: list[RelatedImage]
         """
-        related_images_path = ("spec", "relatedImages")
-        return [
-            RelatedImage(r)
-            for r in chain_get(self.data, related_images_path, default=[])
-        ]
+        return list(self._pullspec_index().related_images)
 
     def get_related_image_pullspecs(self):
         """Get the related image pullspecs
@@ -739,34 +930,15 @@ class OperatorCSV(object):
         return [ImageName.parse(related_image.image)
                 for related_image in self._related_image_pullspecs()]
 
-    def _deployments(self):
-        deployments_path = ("spec", "install", "spec", "deployments")
-        return chain_get(self.data, deployments_path, default=[])
-
     def _container_pullspecs(self):
-        deployments = self._deployments()
-        containers_path = ("spec", "template", "spec", "containers")
-        return [
-            Container(c)
-            for d in deployments for c in chain_get(d, containers_path, default=[])
-        ]
+        return list(self._pullspec_index().containers)
 
     def _annotation_pullspecs(self):
         # Known sources of pullspecs in annotations
-        pullspecs = []
-        annotation_objects = self._find_all_annotations(self.data)
-        for obj in annotation_objects:
-            for key in self._known_annotation_keys:
-                if key in obj:
-                    pullspecs.append(Annotation(obj).in_key(key))
-        return pullspecs
+        return list(self._pullspec_index().annotations)
 
     def _related_image_env_pullspecs(self):
-        containers = self._container_pullspecs() + self._init_container_pullspecs()
-        envs = [
-            e for c in containers
-            for e in c.data.get("env", []) if e["name"].startswith("RELATED_IMAGE_")
-        ]
+        envs = self._pullspec_index().related_image_envs
         for env in envs:
             if "valueFrom" in env:
                 msg = '{}: "valueFrom" references are not supported'.format(env["name"])
@@ -776,41 +948,11 @@ class OperatorCSV(object):
         ]
 
     def _init_container_pullspecs(self):
-        deployments = self._deployments()
-        init_containers_path = ("spec", "template", "spec", "initContainers")
-        return [
-            InitContainer(c)
-            for d in deployments for c in chain_get(d, init_containers_path, default=[])
-        ]
+        return list(self._pullspec_index().init_containers)
 
     def _guess_annotation_pullspecs(self):
-        # Other sources of pullspecs in annotations
-        maybe_pullspecs = []
-        annotation_objects = self._find_all_annotations(self.data)
-        for obj in annotation_objects:
-            for k, v in obj.items():
-                # Do not look in keys that are known pullspec sources
-                if is_str(v) and k not in self._known_annotation_keys:
-                    for i, j in self._pullspec_heuristic(v):
-                        maybe_pullspecs.append(Annotation(obj).in_key(k, i, j))
-        # Pullspecs are found left-to-right, they *must* be replaced right-to-left
-        maybe_pullspecs.reverse()
-        return maybe_pullspecs
-
-    def _find_all_annotations(self, obj):
-        if is_dict(obj):
-            metadata = obj.get("metadata")
-            if metadata is not None and "annotations" in metadata:
-                yield metadata["annotations"]
-            for k, v in obj.items():
-                # Do not search for metadata.*.metadata.annotations
-                if k != "metadata":
-                    for annotation in self._find_all_annotations(v):
-                        yield annotation
-        elif is_list(obj):
-            for item in obj:
-                for annotation in self._find_all_annotations(item):
-                    yield annotation
+        # Other sources of pullspecs in annotations, in right-to-left order
+        return list(self._pullspec_index().guessed_annotations)
 
     def _replace_named_pullspec(self, pullspec, replacement_pullspecs):
         old = ImageName.parse(pullspec.image)
@@ -827,21 +969,6 @@ class OperatorCSV(object):
             log.debug("%s - Replaced pullspec: %s -> %s", self.path, old, new)
             obj[key] = new.to_str()  # `new` is an ImageName
 
-    def _replace_pullspecs_not_in_annotations(self, obj, k_or_i, replacements):
-        item = obj[k_or_i]
-        if is_dict(item):
-            for k in item:
-                # Do not descend into metadata.annotations objects
-                if (k_or_i, k) != ("metadata", "annotations"):
-                    self._replace_pullspecs_not_in_annotations(item, k, replacements)
-        elif is_list(item):
-            for i in range(len(item)):
-                self._replace_pullspecs_not_in_annotations(item, i, replacements)
-        elif is_str(item):
-            # Doesn't matter if string was not a pullspec, it will simply not match anything
-            # in replacement_pullspecs and no replacement will be done
-            self._replace_unnamed_pullspec(obj, k_or_i, replacements)
-
     def modifications_append(self, append_mods):
         """Append to a list entry in `self.data` (or add a list, if one does not exist)
 
@@ -852,6 +979,7 @@ class OperatorCSV(object):
         :return: None; this modifies 'self.data' in-place
         """
         modify_dict_recursively(self.data, append_mods, append=True)
+        self._invalidate_pullspec_index()
         check_csv(self.data, _mini_csv_schema)
 
     def modifications_update(self, update_mods):
@@ -864,6 +992,7 @@ class OperatorCSV(object):
         :return: None; this modifies 'self.data' in-place
         """
         modify_dict_recursively(self.data, update_mods)
+        self._invalidate_pullspec_index()
         check_csv(self.data, _mini_csv_schema)
 
 
@@ -926,6 +1055,11 @@ class OperatorManifest(object):
     @classmethod
     def _get_csvs(cls, yaml_files, **kwargs):
         for f in yaml_files:
+            # Skip the full parse for files that are certainly not a CSV
+            kind = scan_kind(f)
+            if kind is not UNKNOWN_KIND and kind != OPERATOR_CSV_KIND:
+                log.debug("%s - Not a ClusterServiceVersion (kind: %s), skipping", f, kind)
+                continue
             try:
                 yield OperatorCSV.from_file(f, **kwargs)
             except NotOperatorCSV:
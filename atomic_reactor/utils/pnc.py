@@ -8,9 +8,16 @@ of the BSD license. See the LICENSE file for details.
 import hashlib
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 from atomic_reactor.util import get_retrying_requests_session
 
+# max number of artifact ids queried in one search request
+PNC_ARTIFACTS_BATCH_SIZE = 100
+MAX_PNC_REQUEST_WORKERS = 4
+# fields of artifact records used by atomic-reactor
+PNC_ARTIFACT_FIELDS = ('id', 'publicUrl', 'purl', *sorted(hashlib.algorithms_guaranteed))
+
 
 class PNCUtil(object):
 
@@ -23,6 +30,7 @@ class PNCUtil(object):
         self.pnc_map = pnc_map
         self.base_api_url = self.pnc_map['base_api_url']
         self._artifact_request_url = None
+        self._artifacts_search_url = None
         self._scm_archive_request_url = None
 
     @property
@@ -32,6 +40,14 @@ class PNCUtil(object):
             self._artifact_request_url = self.base_api_url + '/' + self.pnc_map['get_artifact_path']
         return self._artifact_request_url
 
+    @property
+    def artifacts_search_url(self):
+        if not self._artifacts_search_url and self.pnc_map.get('get_artifacts_path'):
+            # using urljoin here causes the API path in the base_api_url to be removed
+            self._artifacts_search_url = (self.base_api_url + '/'
+                                          + self.pnc_map['get_artifacts_path'])
+        return self._artifacts_search_url
+
     @property
     def scm_archive_request_url(self):
         if not self._scm_archive_request_url:
@@ -47,32 +63,90 @@ class PNCUtil(object):
         :return str, dict; URL of the artifacts and it's checksums to verify download
         :rtype str, dict; URL and checksums
         """
-        response = self.session.get(self.artifact_request_url.format(artifact_id))
-        response.raise_for_status()
+        return self.artifact_url_and_checksums(self._fetch_artifact(artifact_id))
 
-        artifact = response.json()
+    @staticmethod
+    def artifact_url_and_checksums(artifact):
+        """
+        Return URL and checksums from a PNC artifact record
+        :param artifact: dict, PNC artifact record
+        :return str, dict; URL of the artifact and it's checksums to verify download
+        """
         url = artifact['publicUrl']
         checksums = {algo: artifact[algo] for algo in hashlib.algorithms_guaranteed
                      if algo in artifact}
 
         return url, checksums
 
-    def get_artifact_purl_specs(self, artifact_ids):
+    @staticmethod
+    def _artifact_record(artifact):
+        return {key: value for key, value in artifact.items() if key in PNC_ARTIFACT_FIELDS}
+
+    def _fetch_artifact(self, artifact_id):
+        response = self.session.get(self.artifact_request_url.format(artifact_id))
+        response.raise_for_status()
+        return self._artifact_record(response.json())
+
+    def _search_artifacts(self, artifact_ids):
+        artifacts = {}
+        # ids are numeric, no quoting is needed in the RSQL query
+        query = 'id=in=({})'.format(','.join(str(artifact_id) for artifact_id in artifact_ids))
+        params = {'q': query, 'pageSize': len(artifact_ids), 'pageIndex': 0}
+        while True:
+            response = self.session.get(self.artifacts_search_url, params=params)
+            response.raise_for_status()
+            page = response.json()
+            for artifact in page['content']:
+                artifacts[str(artifact['id'])] = self._artifact_record(artifact)
+            params['pageIndex'] += 1
+            if params['pageIndex'] >= page.get('totalPages', 1):
+                break
+        return artifacts
+
+    def get_artifacts(self, artifact_ids, known_artifacts=None):
+        """
+        Return PNC artifact records for all artifact ids
+
+        Records are reduced to PNC_ARTIFACT_FIELDS. Artifacts found in
+        known_artifacts are not requested again. When get_artifacts_path is
+        configured, the other artifacts are queried in batches of
+        PNC_ARTIFACTS_BATCH_SIZE ids. Artifacts which are not found by the
+        search, or all of them without get_artifacts_path, are requested one by
+        one, concurrently.
+        :param artifact_ids: list[str]; PNC artifact ids
+        :param known_artifacts: dict; artifact records fetched before, by artifact id (as str)
+        :return dict; PNC artifact records by artifact id (as str)
+        """
+        known_artifacts = known_artifacts or {}
+        unique_ids = list(dict.fromkeys(str(artifact_id) for artifact_id in artifact_ids))
+        artifacts = {artifact_id: known_artifacts[artifact_id] for artifact_id in unique_ids
+                     if artifact_id in known_artifacts}
+        to_search = [artifact_id for artifact_id in unique_ids if artifact_id not in artifacts]
+
+        if self.artifacts_search_url:
+            for start in range(0, len(to_search), PNC_ARTIFACTS_BATCH_SIZE):
+                batch = to_search[start:start + PNC_ARTIFACTS_BATCH_SIZE]
+                artifacts.update(self._search_artifacts(batch))
+
+        missing = [artifact_id for artifact_id in unique_ids if artifact_id not in artifacts]
+        if missing:
+            with ThreadPoolExecutor(max_workers=MAX_PNC_REQUEST_WORKERS) as executor:
+                for artifact_id, artifact in zip(missing,
+                                                 executor.map(self._fetch_artifact, missing)):
+                    artifacts[artifact_id] = artifact
+
+        return artifacts
+
+    def get_artifact_purl_specs(self, artifact_ids, known_artifacts=None):
         """
         Return a Package URLs for all artifact ids
         :param artifact_ids: list[str]; PNC artifact ids
+        :param known_artifacts: dict; artifact records fetched before, by artifact id (as str)
         :return list[str]; Package URLs of the artifacts corresponding to artifact ids
         :rtype list[str]; Package URLs
         """
-        purl_specs = []
-        for artifact_id in artifact_ids:
-            response = self.session.get(self.artifact_request_url.format(artifact_id))
-            response.raise_for_status()
-
-            artifact = response.json()
-            purl_specs.append(artifact['purl'])
-
-        return purl_specs
+        artifacts = self.get_artifacts(artifact_ids, known_artifacts)
+        return [artifacts[str(artifact_id)]['purl'] for artifact_id in artifact_ids]
 
     def get_scm_archive_from_build_id(self, build_id: str):
         """
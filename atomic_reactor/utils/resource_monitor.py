@@ -0,0 +1,281 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Low overhead sampling of the resources used by the build: disk usage of the
+filesystems it writes to, memory, CPU time and block I/O of its process tree.
+Everything is read from statvfs and /proc, no process is spawned.
+"""
+
+import logging
+import os
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MB = 1000 ** 2  # sadly storage is generally expressed in decimal units
+
+MIN_SAMPLE_INTERVAL = 1.0
+MAX_SAMPLE_INTERVAL = 8.0
+# the series is halved when it grows over this number of samples
+MAX_SAMPLES = 512
+# relative change of a sampled value which resets the interval to MIN_SAMPLE_INTERVAL
+CHANGE_THRESHOLD = 0.05
+
+# where skopeo, buildah and podman keep images, rootful and rootless
+CONTAINER_STORAGE_PATHS = ('/var/lib/containers/storage', '~/.local/share/containers/storage')
+# memory pressure of the cgroup of the build (cgroup v2) or of the whole system
+MEMORY_PRESSURE_FILES = ('/sys/fs/cgroup/memory.pressure', '/proc/pressure/memory')
+
+SAMPLE_FIELDS = ('seconds', 'plugin', 'rss_mb', 'cpu_percent', 'read_mb', 'write_mb',
+                 'memory_pressure', 'disk_used_mb')
+
+
+def disk_usage(path: str) -> Dict[str, int]:
+    """Return the space and inodes used and free in the filesystem of path"""
+    st = os.statvfs(path)
+    return dict(
+        mb_free=st.f_bfree * st.f_frsize // MB,
+        mb_total=st.f_blocks * st.f_frsize // MB,
+        mb_used=(st.f_blocks - st.f_bfree) * st.f_frsize // MB,
+        inodes_free=st.f_ffree,
+        inodes_total=st.f_files,
+        inodes_used=st.f_files - st.f_ffree,
+    )
+
+
+def default_paths(build_dir: Optional[str] = None) -> List[str]:
+    """Return the paths of the filesystems the build is expected to write to"""
+    paths = ['/']
+    if build_dir:
+        paths.append(str(build_dir))
+    paths.append(tempfile.gettempdir())
+    paths.extend(os.path.expanduser(path) for path in CONTAINER_STORAGE_PATHS)
+    return paths
+
+
+def unique_mounts(paths: Iterable[str]) -> List[str]:
+    """Return the existing paths, only the first one of those on the same filesystem"""
+    mounts = []
+    devices = set()
+    for path in paths:
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            continue
+        if device not in devices:
+            devices.add(device)
+            mounts.append(path)
+    return mounts
+
+
+def memory_pressure() -> Optional[float]:
+    """Return the share (%) of the last 10s some tasks stalled on memory, None if unknown"""
+    for path in MEMORY_PRESSURE_FILES:
+        try:
+            with open(path) as f:
+                # some avg10=0.00 avg60=0.00 avg300=0.00 total=0
+                line = f.readline()
+        except OSError:
+            continue
+        return float(line.split()[1].split('=')[1])
+    return None
+
+
+@dataclass
+class ProcessUsage:
+    """Resources used by a process tree"""
+    processes: int = 0
+    rss_bytes: int = 0
+    # includes the descendants which exited and were waited for
+    cpu_seconds: float = 0.0
+    read_bytes: int = 0
+    write_bytes: int = 0
+
+
+def _read_stat(pid: str) -> Optional[Tuple[int, int, int]]:
+    """Return the parent pid, CPU ticks (with waited-for children) and RSS pages of pid"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # the command in parentheses may contain spaces, the fields follow the last ')'
+    fields = stat[stat.rindex(b')') + 2:].split()
+    # utime, stime, cutime and cstime
+    ticks = sum(int(value) for value in fields[11:15])
+    return int(fields[1]), ticks, int(fields[21])
+
+
+def _read_io(pid: int) -> Tuple[int, int]:
+    """Return the bytes pid (with waited-for children) read from and wrote to block devices"""
+    counters = {}
+    try:
+        with open(f'/proc/{pid}/io') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                counters[name] = int(value)
+    except OSError:
+        # not readable for processes of other users
+        return 0, 0
+    return counters.get('read_bytes', 0), counters.get('write_bytes', 0)
+
+
+def process_tree_usage(root_pid: int) -> ProcessUsage:
+    """Return the resources used by root_pid and all its descendants"""
+    stats = {}
+    children = defaultdict(list)
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return ProcessUsage()
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        stat = _read_stat(entry)
+        if stat:
+            stats[int(entry)] = stat
+            children[stat[0]].append(int(entry))
+
+    usage = ProcessUsage()
+    ticks = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        if pid not in stats:
+            continue
+        _, pid_ticks, rss_pages = stats[pid]
+        read_bytes, write_bytes = _read_io(pid)
+        usage.processes += 1
+        ticks += pid_ticks
+        usage.rss_bytes += rss_pages * os.sysconf('SC_PAGE_SIZE')
+        usage.read_bytes += read_bytes
+        usage.write_bytes += write_bytes
+        pending.extend(children[pid])
+    usage.cpu_seconds = ticks / os.sysconf('SC_CLK_TCK')
+    return usage
+
+
+def _changed(old: List[float], new: List[float]) -> bool:
+    return any(abs(b - a) > CHANGE_THRESHOLD * max(abs(a), 1)
+               for a, b in zip(old, new) if a is not None and b is not None)
+
+
+class ResourceMonitor:
+    """Compact time series and peaks of the resources used by a process tree
+
+    Each sample records, for the plugin running at the time, the RSS and CPU
+    usage of the process tree, the bytes it read and wrote since the monitor
+    started, the memory pressure and the space used in each of the mounts.
+
+    The caller takes the samples at the interval returned by sample(): the
+    interval is reset to MIN_SAMPLE_INTERVAL whenever the usage or the plugin
+    changes and doubles up to MAX_SAMPLE_INTERVAL while the usage is steady.
+    When the series grows over MAX_SAMPLES, every other sample is dropped;
+    peaks are tracked from all the samples.
+    """
+
+    def __init__(self, paths: Iterable[str] = ('/',), pid: Optional[int] = None):
+        """
+        :param paths: paths in the filesystems to track the usage of, one per filesystem
+        :param pid: the root of the process tree, this process by default
+        """
+        self.pid = pid or os.getpid()
+        self.mounts = unique_mounts(paths)
+        self.started = datetime.now().isoformat()
+        self.samples: List[List[Any]] = []
+        self.peaks: Dict[str, Any] = {}
+        self.sample_count = 0
+        self.interval = MIN_SAMPLE_INTERVAL
+        # CPU time spent taking the samples
+        self.overhead = 0.0
+
+        self._start = time.monotonic()
+        self._baseline = process_tree_usage(self.pid)
+        self._last_time = self._start
+        self._last_usage = self._baseline
+        self._last_values: Optional[List[float]] = None
+        self._last_plugin: Optional[str] = None
+
+    def _disk_used(self) -> List[Optional[int]]:
+        used = []
+        for path in self.mounts:
+            try:
+                used.append(disk_usage(path)['mb_used'])
+            except OSError:
+                used.append(None)
+        return used
+
+    def _update_peak(self, name: str, value, plugin: Optional[str], peaks=None) -> None:
+        peaks = self.peaks if peaks is None else peaks
+        if value is not None and (name not in peaks or value > peaks[name][0]):
+            peaks[name] = [value, plugin]
+
+    def sample(self, plugin: Optional[str] = None) -> float:
+        """Take a sample, tagged with plugin
+
+        :param plugin: name of the plugin running at the moment
+        :return: float, seconds to wait before taking the next sample
+        """
+        cpu_start = time.thread_time()
+
+        now = time.monotonic()
+        usage = process_tree_usage(self.pid)
+        elapsed = max(now - self._last_time, 1e-3)
+        cpu_percent = round(100 * (usage.cpu_seconds - self._last_usage.cpu_seconds) / elapsed, 1)
+        read_rate = (usage.read_bytes - self._last_usage.read_bytes) / MB / elapsed
+        write_rate = (usage.write_bytes - self._last_usage.write_bytes) / MB / elapsed
+        rss_mb = usage.rss_bytes // MB
+        pressure = memory_pressure()
+        disk_used = self._disk_used()
+
+        self.samples.append([
+            round(now - self._start, 1), plugin, rss_mb, max(cpu_percent, 0.0),
+            max(usage.read_bytes - self._baseline.read_bytes, 0) // MB,
+            max(usage.write_bytes - self._baseline.write_bytes, 0) // MB,
+            pressure, disk_used,
+        ])
+        self.sample_count += 1
+        if len(self.samples) > MAX_SAMPLES:
+            self.samples = self.samples[:-1:2] + self.samples[-1:]
+
+        self._update_peak('rss_mb', rss_mb, plugin)
+        self._update_peak('cpu_percent', cpu_percent, plugin)
+        self._update_peak('memory_pressure', pressure, plugin)
+        disk_peaks = self.peaks.setdefault('disk_used_mb', {})
+        for mount, used in zip(self.mounts, disk_used):
+            self._update_peak(mount, used, plugin, peaks=disk_peaks)
+
+        values = [rss_mb, cpu_percent, read_rate, write_rate, *disk_used]
+        if (self._last_values is None or plugin != self._last_plugin or
+                _changed(self._last_values, values)):
+            self.interval = MIN_SAMPLE_INTERVAL
+        else:
+            self.interval = min(self.interval * 2, MAX_SAMPLE_INTERVAL)
+        self._last_time = now
+        self._last_usage = usage
+        self._last_values = values
+        self._last_plugin = plugin
+
+        self.overhead += time.thread_time() - cpu_start
+        return self.interval
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'started': self.started,
+            'mounts': list(self.mounts),
+            'fields': list(SAMPLE_FIELDS),
+            'samples': [list(sample) for sample in self.samples],
+            'peaks': {name: (dict(peak) if isinstance(peak, dict) else list(peak))
+                      for name, peak in self.peaks.items()},
+            'sample_count': self.sample_count,
+            'overhead_cpu_seconds': round(self.overhead, 3),
+        }
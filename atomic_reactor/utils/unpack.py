@@ -0,0 +1,311 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Unpacking of large tarballs, e.g. remote sources with many small files.
+"""
+
+import bz2
+import errno
+import gzip
+import io
+import logging
+import lzma
+import os
+import queue
+import tarfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+# size of the chunks passed from the decompressing thread
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+# max number of decompressed chunks waiting to be unpacked
+DECOMPRESS_QUEUE_SIZE = 16
+
+COMPRESSION_OPENERS: Dict[bytes, Callable[[str], BinaryIO]] = {
+    b'\x1f\x8b': gzip.open,
+    b'BZh': bz2.open,
+    b'\xfd7zXZ\x00': lzma.open,
+}
+
+
+@dataclass
+class UnpackStats:
+    """Statistics of an unpacked tarball"""
+    members: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def members_per_second(self) -> float:
+        return self.members / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+
+def _open_decompressed(path: str) -> BinaryIO:
+    with open(path, 'rb') as f:
+        magic = f.read(6)
+    for prefix, opener in COMPRESSION_OPENERS.items():
+        if magic.startswith(prefix):
+            return opener(path)
+    return open(path, 'rb')
+
+
+class DecompressingReader(io.RawIOBase):
+    """Decompressed content of a tarball, inflated by a background thread
+
+    gzip, bz2 and lzma release the GIL while decompressing, so the tarball
+    is inflated while the main thread writes the unpacked files.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        super().__init__()
+        self._queue: queue.Queue = queue.Queue(maxsize=DECOMPRESS_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._chunk = memoryview(b'')
+        self._eof = False
+        self._thread = threading.Thread(target=self._decompress, args=(str(path),),
+                                        name='decompress', daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decompress(self, path: str) -> None:
+        try:
+            with _open_decompressed(path) as f:
+                while True:
+                    chunk = f.read(DECOMPRESS_CHUNK_SIZE)
+                    if not self._put(chunk) or not chunk:
+                        return
+        except Exception as exc:  # pylint: disable=broad-except
+            # re-raised by the reading thread
+            self._put(exc)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._chunk and not self._eof:
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                raise item
+            self._eof = not item
+            self._chunk = memoryview(item)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        super().close()
+
+
+def _create_file(path: str, chunks: Iterable[bytes], mode: int, mtime: float) -> None:
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # a file unpacked before, never follow a symlink
+        os.unlink(path)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        for chunk in chunks:
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(fd, view):]
+        os.fchmod(fd, mode & 0o7777)
+        os.utime(fd, (mtime, mtime))
+    finally:
+        os.close(fd)
+
+
+def _is_within(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory + os.sep)
+
+
+def _member_path(dest_dir: str, name: str) -> str:
+    path = os.path.normpath(os.path.join(dest_dir, name))
+    if not _is_within(path, dest_dir):
+        raise tarfile.ExtractError('Attempted path traversal in tar file')
+    return path
+
+
+@dataclass
+class _IndexEntry:
+    """A member of a tarball, read ahead of unpacking"""
+    name: str
+    path: str
+    # path of the target of a hard link
+    link_path: Optional[str] = None
+
+
+def _index_members(tarball_path: Union[str, Path], dest_dir: str) -> List[_IndexEntry]:
+    """Read the headers of all members of a tarball and check their paths
+
+    Like in safe_extractall, nothing is unpacked unless all the member paths
+    and hard link targets are within dest_dir.
+    """
+    index = []
+    reader = io.BufferedReader(DecompressingReader(tarball_path),
+                               buffer_size=DECOMPRESS_CHUNK_SIZE)
+    with reader, tarfile.open(fileobj=reader, mode='r|') as tar:
+        for member in tar:
+            entry = _IndexEntry(member.name, _member_path(dest_dir, member.name))
+            if member.islnk():
+                entry.link_path = _member_path(dest_dir, member.linkname)
+            index.append(entry)
+    return index
+
+
+class _Unpacker:
+    """Unpack members of a tarball, streamed in order, into a directory
+
+    Symlinks are created as they are, like by extractall, wherever they
+    point. Every member is written through the real path of its parent
+    directory, which must be within the directory, so no member is written
+    through a symlink pointing outside of it. The index of real directories,
+    with no symlink between them and the destination, lets most of the
+    members skip resolving that path on disk: a parent missing from the
+    index is resolved with realpath.
+    """
+
+    def __init__(self, tar: tarfile.TarFile, dest_dir: str):
+        self.tar = tar
+        self.dest_dir = dest_dir
+        self.dirs: Set[str] = {dest_dir}
+        self.dir_members: Dict[str, tarfile.TarInfo] = {}
+
+    def _resolve(self, path: str) -> str:
+        real_path = os.path.realpath(path)
+        if not _is_within(real_path, self.dest_dir):
+            raise tarfile.ExtractError('Attempted path traversal in tar file')
+        if os.path.islink(real_path):
+            # realpath gives up on symlink loops
+            raise OSError(errno.ELOOP, os.strerror(errno.ELOOP), path)
+        return real_path
+
+    def _makedirs(self, path: str) -> str:
+        """Create the directory path if missing, return its real path"""
+        if path in self.dirs:
+            return path
+        directory = os.path.join(self._makedirs(os.path.dirname(path)), os.path.basename(path))
+        try:
+            os.mkdir(directory)
+        except FileExistsError:
+            if os.path.islink(directory):
+                return self._makedirs(self._resolve(directory))
+            if not os.path.isdir(directory):
+                raise
+        self.dirs.add(directory)
+        return directory
+
+    def _real_parent(self, path: str) -> str:
+        parent = os.path.dirname(path)
+        return parent if parent in self.dirs else self._resolve(parent)
+
+    def _remove_existing(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except (FileNotFoundError, IsADirectoryError, PermissionError):
+            pass
+
+    def unpack(self, member: tarfile.TarInfo, entry: _IndexEntry) -> int:
+        """Unpack one member, return the number of bytes of file content written"""
+        if member.name != entry.name:
+            raise tarfile.ReadError('Tar file changed while being unpacked')
+        if entry.path == self.dest_dir:
+            return 0
+        parent = self._makedirs(os.path.dirname(entry.path))
+        path = os.path.join(parent, os.path.basename(entry.path))
+
+        if member.isreg():
+            source = self.tar.extractfile(member)
+            _create_file(path, iter(lambda: source.read(DECOMPRESS_CHUNK_SIZE), b''),
+                         member.mode, member.mtime)
+            return member.size
+
+        if member.isdir():
+            # like extractall, set the attributes of directories when they are complete
+            self.dir_members[self._makedirs(path)] = member
+        elif member.issym():
+            self._remove_existing(path)
+            os.symlink(member.linkname, path)
+        elif member.islnk():
+            target = os.path.join(self._real_parent(entry.link_path),
+                                  os.path.basename(entry.link_path))
+            self._remove_existing(path)
+            os.link(target, path, follow_symlinks=False)
+        else:
+            # special files are rare, leave them to tarfile
+            self.tar.extract(member, self.dest_dir)
+        return 0
+
+    def finish(self) -> None:
+        for path in sorted(self.dir_members, reverse=True):
+            member = self.dir_members[path]
+            os.chmod(path, member.mode & 0o7777)
+            os.utime(path, (member.mtime, member.mtime))
+
+
+def unpack_tarball(tarball_path: Union[str, Path], dest_dir: Union[str, Path],
+                   log: Optional[logging.Logger] = None) -> UnpackStats:
+    """Unpack a (compressed) tarball into dest_dir, safely
+
+    The tarball is decompressed in a separate thread and unpacked as a
+    stream. It is read twice: the headers of all members are indexed and
+    their paths checked for path traversal, as by safe_extractall, before
+    anything is written. Symlinks are unpacked wherever they point, but no
+    member is written through a symlink to outside of dest_dir. File
+    ownership is not restored.
+
+    :param tarball_path: path of the tarball, uncompressed or gzip, bz2 or xz compressed
+    :param dest_dir: existing directory to unpack the tarball into
+    :param log: logger to report the unpacking speed to
+    :raise ExtractError: if a member would be written outside of dest_dir
+    :return: UnpackStats
+    """
+    stats = UnpackStats()
+    start = time.monotonic()
+
+    real_dest_dir = os.path.realpath(dest_dir)
+    index = _index_members(tarball_path, real_dest_dir)
+
+    reader = io.BufferedReader(DecompressingReader(tarball_path),
+                               buffer_size=DECOMPRESS_CHUNK_SIZE)
+    with reader, tarfile.open(fileobj=reader, mode='r|') as tar:
+        unpacker = _Unpacker(tar, real_dest_dir)
+        for member in tar:
+            if stats.members == len(index):
+                raise tarfile.ReadError('Tar file changed while being unpacked')
+            stats.bytes += unpacker.unpack(member, index[stats.members])
+            stats.members += 1
+        if stats.members != len(index):
+            raise tarfile.ReadError('Tar file changed while being unpacked')
+        unpacker.finish()
+
+    stats.seconds = time.monotonic() - start
+    (log or logger).info(
+        'Unpacked %s: %d members, %d bytes in %.2fs (%.0f members/s, %.1f MB/s)',
+        os.path.basename(tarball_path), stats.members, stats.bytes, stats.seconds,
+        stats.members_per_second, stats.mb_per_second,
+    )
+    return stats
@@ -0,0 +1,71 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Run the benchmarks: python -m tests.benchmarks --help
+"""
+import argparse
+import json
+import logging
+import sys
+from dataclasses import fields
+
+from tests.benchmarks.scenarios import SCENARIOS, BenchmarkParams, run_benchmarks
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m tests.benchmarks',
+        description='Run atomic-reactor plugin chains against a fake registry and Koji hub',
+    )
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help='scenarios to run, all by default: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed runs of each scenario (default: %(default)s)')
+    parser.add_argument('--output', '-o', help='write JSON results to this file, '
+                                               'instead of the standard output')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='show atomic-reactor logs')
+
+    defaults = BenchmarkParams()
+    for field in fields(BenchmarkParams):
+        default = getattr(defaults, field.name)
+        option = '--' + field.name.replace('_', '-')
+        if isinstance(default, tuple):
+            parser.add_argument(option, nargs='+', default=default,
+                                help='(default: %(default)s)')
+        else:
+            parser.add_argument(option, type=type(default), default=default,
+                                help='(default: %(default)s)')
+
+    parsed = parser.parse_args(args)
+    unknown = set(parsed.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error('unknown scenarios: ' + ', '.join(sorted(unknown)))
+    return parsed
+
+
+def main(args=None) -> int:
+    args = parse_args(args)
+    logging.getLogger('atomic_reactor').setLevel(logging.DEBUG if args.verbose
+                                                 else logging.WARNING)
+
+    params = BenchmarkParams(**{field.name: getattr(args, field.name)
+                                for field in fields(BenchmarkParams)})
+    params.platforms = tuple(params.platforms)
+    results = run_benchmarks(args.scenarios or SCENARIOS, params, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
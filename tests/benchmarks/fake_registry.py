@@ -0,0 +1,365 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+In-process stand-in for an OCI distribution (docker registry v2) server.
+"""
+import hashlib
+import json
+import os
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from atomic_reactor.constants import (MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST,
+                                      MEDIA_TYPE_DOCKER_V2_SCHEMA2)
+
+MEDIA_TYPE_CONFIG = 'application/vnd.docker.container.image.v1+json'
+MEDIA_TYPE_LAYER = 'application/vnd.docker.image.rootfs.diff.tar.gzip'
+
+MANIFEST_RE = re.compile(r'^/v2/(?P<repo>.+)/manifests/(?P<ref>[^/]+)$')
+UPLOAD_RE = re.compile(r'^/v2/(?P<repo>.+)/blobs/uploads/(?P<upload>[^/]*)$')
+BLOB_RE = re.compile(r'^/v2/(?P<repo>.+)/blobs/(?P<digest>[^/]+)$')
+TAGS_RE = re.compile(r'^/v2/(?P<repo>.+)/tags/list$')
+
+
+def sha256_digest(data: bytes) -> str:
+    return 'sha256:' + hashlib.sha256(data).hexdigest()
+
+
+class FakeRegistry:
+    """Registry keeping all blobs and manifests in memory
+
+    Every request is delayed by latency seconds and counted in requests, by
+    method and endpoint (e.g. "GET manifests"). Manifests are only served
+    when their media type is accepted by the client, otherwise 404 is returned.
+
+    With tls, the registry is served over HTTPS with a self-signed certificate,
+    as clients of insecure registries given as host:port try HTTPS first.
+    """
+
+    def __init__(self, latency: float = 0.0, tls: bool = True):
+        self.latency = latency
+        self.tls = tls
+        self.requests: Counter = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        self._blobs: Dict[str, bytes] = {}
+        self._repo_blobs: Dict[str, Set[str]] = {}
+        # repo -> digest -> (media type, content)
+        self._manifests: Dict[str, Dict[str, Tuple[str, bytes]]] = {}
+        # repo -> tag -> digest
+        self._tags: Dict[str, Dict[str, str]] = {}
+        self._uploads: Dict[str, bytearray] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def registry(self) -> str:
+        """host:port of the running registry"""
+        assert self._server, 'registry is not running'
+        host, port = self._server.server_address[:2]
+        return f'{host}:{port}'
+
+    @property
+    def url(self) -> str:
+        scheme = 'https' if self.tls else 'http'
+        return f'{scheme}://{self.registry}'
+
+    def start(self) -> 'FakeRegistry':
+        server_class = _TLSServer if self.tls else ThreadingHTTPServer
+        self._server = server_class(('127.0.0.1', 0), _RegistryHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self  # type: ignore[attr-defined]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FakeRegistry':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.bytes_sent = 0
+            self.bytes_received = 0
+
+    # Content management, used both by the request handler and to seed the registry
+
+    def add_blob(self, repo: str, data: bytes) -> str:
+        digest = sha256_digest(data)
+        with self._lock:
+            self._blobs[digest] = data
+            self._repo_blobs.setdefault(repo, set()).add(digest)
+        return digest
+
+    def get_blob(self, repo: str, digest: str) -> Optional[bytes]:
+        with self._lock:
+            if digest not in self._repo_blobs.get(repo, ()):
+                return None
+            return self._blobs[digest]
+
+    def mount_blob(self, repo: str, digest: str, from_repo: str) -> bool:
+        with self._lock:
+            if digest not in self._repo_blobs.get(from_repo, ()):
+                return False
+            self._repo_blobs.setdefault(repo, set()).add(digest)
+            return True
+
+    def put_manifest(self, repo: str, ref: Optional[str], media_type: str,
+                     content: bytes) -> str:
+        """Store a manifest, tag it unless ref is None or a digest"""
+        digest = sha256_digest(content)
+        with self._lock:
+            self._manifests.setdefault(repo, {})[digest] = (media_type, content)
+            if ref and not ref.startswith('sha256:'):
+                self._tags.setdefault(repo, {})[ref] = digest
+        return digest
+
+    def get_manifest(self, repo: str, ref: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            digest = self._tags.get(repo, {}).get(ref, ref)
+            return self._manifests.get(repo, {}).get(digest)
+
+    def list_tags(self, repo: str) -> List[str]:
+        with self._lock:
+            return sorted(self._tags.get(repo, {}))
+
+    def add_manifest(self, repo: str, tag: Optional[str] = None, architecture: str = 'amd64',
+                     labels: Optional[Dict[str, str]] = None, layers: int = 1,
+                     layer_size: int = 1024) -> Tuple[str, bytes]:
+        """Add a v2 schema 2 image manifest, its config and layers of random data
+
+        :return: tuple, digest and content of the manifest
+        """
+        config = json.dumps({
+            'architecture': architecture,
+            'os': 'linux',
+            'config': {'Labels': labels or {}},
+            'rootfs': {'type': 'layers', 'diff_ids': []},
+        }).encode()
+        layer_blobs = [os.urandom(layer_size) for _ in range(layers)]
+        manifest = json.dumps({
+            'schemaVersion': 2,
+            'mediaType': MEDIA_TYPE_DOCKER_V2_SCHEMA2,
+            'config': {'mediaType': MEDIA_TYPE_CONFIG, 'size': len(config),
+                       'digest': self.add_blob(repo, config)},
+            'layers': [{'mediaType': MEDIA_TYPE_LAYER, 'size': len(blob),
+                        'digest': self.add_blob(repo, blob)} for blob in layer_blobs],
+        }, indent=3).encode()
+        return self.put_manifest(repo, tag, MEDIA_TYPE_DOCKER_V2_SCHEMA2, manifest), manifest
+
+    def add_image(self, repo: str, tag: str, architectures: Tuple[str, ...] = ('amd64',),
+                  **manifest_kwargs) -> Dict[str, str]:
+        """Add a multi-arch image, a manifest list of one v2 manifest per architecture
+
+        :param manifest_kwargs: passed to add_manifest for every architecture
+        :return: dict, digests of the manifest list ('v2_list') and of the manifests (by arch)
+        """
+        digests = {}
+        manifests = []
+        for arch in architectures:
+            digest, manifest = self.add_manifest(repo, None, arch, **manifest_kwargs)
+            digests[arch] = digest
+            manifests.append({'mediaType': MEDIA_TYPE_DOCKER_V2_SCHEMA2, 'size': len(manifest),
+                              'digest': digest, 'platform': {'architecture': arch,
+                                                             'os': 'linux'}})
+
+        manifest_list = json.dumps({
+            'schemaVersion': 2,
+            'mediaType': MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST,
+            'manifests': manifests,
+        }, indent=3).encode()
+        digests['v2_list'] = self.put_manifest(repo, tag, MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST,
+                                               manifest_list)
+        return digests
+
+
+class _TLSServer(ThreadingHTTPServer):
+    """HTTPS server, the TLS handshake is done in the thread handling the request"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cert = os.path.join(tmpdir, 'cert.pem')
+            key = os.path.join(tmpdir, 'key.pem')
+            subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                            '-days', '1', '-subj', '/CN=127.0.0.1',
+                            '-keyout', key, '-out', cert],
+                           check=True, capture_output=True)
+            self.ssl_context.load_cert_chain(cert, key)
+
+    def get_request(self):
+        sock, address = super().get_request()
+        return self.ssl_context.wrap_socket(sock, server_side=True,
+                                            do_handshake_on_connect=False), address
+
+
+class _RegistryHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeRegistry/1.0'
+
+    @property
+    def fake(self) -> FakeRegistry:
+        return self.server.fake  # type: ignore[attr-defined]
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        with self.fake._lock:
+            self.fake.bytes_received += len(body)
+        return body
+
+    def _send(self, status: int, body: bytes = b'', headers: Optional[Dict[str, str]] = None,
+              content_type: str = 'application/json') -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Docker-Distribution-API-Version', 'registry/2.0')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD' and body:
+            self.wfile.write(body)
+            with self.fake._lock:
+                self.fake.bytes_sent += len(body)
+
+    def _error(self, status: int, code: str) -> None:
+        self._send(status, json.dumps({'errors': [{'code': code, 'message': code}]}).encode())
+
+    def _handle(self) -> None:
+        time.sleep(self.fake.latency)
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path in ('/v2', '/v2/'):
+            self._count('base')
+            self._send(200, b'{}')
+            return
+
+        for endpoint, regex in (('tags', TAGS_RE), ('uploads', UPLOAD_RE),
+                                ('manifests', MANIFEST_RE), ('blobs', BLOB_RE)):
+            match = regex.match(url.path)
+            if match:
+                self._count(endpoint)
+                getattr(self, f'_handle_{endpoint}')(query=query, **match.groupdict())
+                return
+
+        self._count('unknown')
+        self._error(404, 'NOT_FOUND')
+
+    def _count(self, endpoint: str) -> None:
+        with self.fake._lock:
+            self.fake.requests[f'{self.command} {endpoint}'] += 1
+
+    def _handle_tags(self, repo: str, query: Dict[str, str]) -> None:
+        if self.command != 'GET':
+            self._error(405, 'UNSUPPORTED')
+            return
+        body = json.dumps({'name': repo, 'tags': self.fake.list_tags(repo)}).encode()
+        self._send(200, body)
+
+    def _handle_manifests(self, repo: str, ref: str, query: Dict[str, str]) -> None:
+        if self.command == 'PUT':
+            media_type = self.headers.get('Content-Type', MEDIA_TYPE_DOCKER_V2_SCHEMA2)
+            digest = self.fake.put_manifest(repo, ref, media_type, self._read_body())
+            self._send(201, headers={'Docker-Content-Digest': digest,
+                                     'Location': f'/v2/{repo}/manifests/{digest}'})
+            return
+        if self.command not in ('GET', 'HEAD'):
+            self._error(405, 'UNSUPPORTED')
+            return
+
+        manifest = self.fake.get_manifest(repo, ref)
+        accepted = {media_type.split(';')[0].strip()
+                    for media_type in self.headers.get('Accept', '').split(',')}
+        if not manifest or manifest[0] not in accepted:
+            self._error(404, 'MANIFEST_UNKNOWN')
+            return
+        media_type, content = manifest
+        self._send(200, content, headers={'Docker-Content-Digest': sha256_digest(content)},
+                   content_type=media_type)
+
+    def _handle_blobs(self, repo: str, digest: str, query: Dict[str, str]) -> None:
+        if self.command not in ('GET', 'HEAD'):
+            self._error(405, 'UNSUPPORTED')
+            return
+        blob = self.fake.get_blob(repo, digest)
+        if blob is None:
+            self._error(404, 'BLOB_UNKNOWN')
+            return
+        self._send(200, blob, headers={'Docker-Content-Digest': digest},
+                   content_type='application/octet-stream')
+
+    def _handle_uploads(self, repo: str, upload: str, query: Dict[str, str]) -> None:
+        body = self._read_body()
+
+        if self.command == 'POST':
+            if 'mount' in query and self.fake.mount_blob(repo, query['mount'],
+                                                         query.get('from', '')):
+                self._blob_created(repo, query['mount'])
+                return
+            if 'digest' in query:
+                self._finish_upload(repo, body, query['digest'])
+                return
+            upload = str(uuid.uuid4())
+            with self.fake._lock:
+                self.fake._uploads[upload] = bytearray(body)
+            self._send(202, headers={'Location': f'/v2/{repo}/blobs/uploads/{upload}',
+                                     'Docker-Upload-UUID': upload, 'Range': '0-0'})
+            return
+
+        with self.fake._lock:
+            data = self.fake._uploads.get(upload)
+            if data is not None:
+                data.extend(body)
+        if data is None:
+            self._error(404, 'BLOB_UPLOAD_UNKNOWN')
+        elif self.command == 'PATCH':
+            self._send(202, headers={'Location': f'/v2/{repo}/blobs/uploads/{upload}',
+                                     'Docker-Upload-UUID': upload,
+                                     'Range': f'0-{max(len(data) - 1, 0)}'})
+        elif self.command == 'PUT':
+            with self.fake._lock:
+                del self.fake._uploads[upload]
+            self._finish_upload(repo, bytes(data), query.get('digest', ''))
+        else:
+            self._error(405, 'UNSUPPORTED')
+
+    def _finish_upload(self, repo: str, data: bytes, expected_digest: str) -> None:
+        if sha256_digest(data) != expected_digest:
+            self._error(400, 'DIGEST_INVALID')
+            return
+        self._blob_created(repo, self.fake.add_blob(repo, data))
+
+    def _blob_created(self, repo: str, digest: str) -> None:
+        self._send(201, headers={'Location': f'/v2/{repo}/blobs/{digest}',
+                                 'Docker-Content-Digest': digest})
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_PATCH = do_DELETE = _handle
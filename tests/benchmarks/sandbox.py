@@ -0,0 +1,133 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Benchmark of hermeto.enforce_sandbox on a synthetic repository, like
+a monorepo with vendored dependencies: many small files, a few symlinks.
+
+Run it: python -m tests.benchmarks.sandbox --help
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from atomic_reactor.utils import hermeto
+
+FILES_PER_DIR = 100
+SUBDIRS_PER_DIR = 10
+
+
+def make_tree(root: Path, files: int, symlink_every: int = 1000) -> Dict[str, int]:
+    """Create a tree of empty files under root
+
+    Directories hold FILES_PER_DIR files and SUBDIRS_PER_DIR subdirectories.
+    Every symlink_every-th file is a symlink instead, pointing to a file in the
+    repository, every 10th symlink points outside of it.
+
+    :return: dict, the number of files, directories, symlinks and unsafe symlinks
+    """
+    stats = {'files': 0, 'dirs': 0, 'symlinks': 0, 'unsafe_symlinks': 0}
+    pending = [root]
+    while stats['files'] < files:
+        directory = pending.pop(0)
+        directory.mkdir(exist_ok=True)
+        stats['dirs'] += 1
+        for i in range(min(FILES_PER_DIR, files - stats['files'])):
+            path = directory / f'file{i}'
+            stats['files'] += 1
+            if stats['files'] % symlink_every:
+                path.touch()
+                continue
+            stats['symlinks'] += 1
+            if stats['symlinks'] % 10:
+                path.symlink_to('file0')
+            else:
+                stats['unsafe_symlinks'] += 1
+                path.symlink_to(os.path.relpath('/etc/passwd', directory))
+        pending.extend(directory / f'dir{i}' for i in range(SUBDIRS_PER_DIR))
+    return stats
+
+
+def resolve_all(repo_root: Path) -> List[str]:
+    """Find unsafe symlinks the way enforce_sandbox used to: resolve every path"""
+    unsafe = []
+    for path_to_dir, subdirs, files in os.walk(repo_root):
+        for entry in subdirs + files:
+            full_path = Path(path_to_dir) / entry
+            try:
+                full_path.resolve().relative_to(repo_root)
+            except RuntimeError:
+                continue
+            except ValueError:
+                unsafe.append(str(full_path.relative_to(repo_root)))
+    return unsafe
+
+
+def _timed(func, repeat: int) -> Dict[str, Any]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return {'runs': runs, 'min': min(runs), 'median': statistics.median(runs),
+            'result': result}
+
+
+def run_sandbox_benchmark(files: int = 500_000, repeat: int = 3) -> Dict[str, Any]:
+    """Time the scan of a synthetic tree of files, against resolving every path
+
+    Both scans run on a warm dentry cache, the tree is created right before.
+    """
+    with tempfile.TemporaryDirectory(prefix='atomic-reactor-benchmark-') as tmpdir:
+        root = Path(tmpdir).resolve() / 'repo'
+        start = time.perf_counter()
+        tree = make_tree(root, files)
+        setup_time = time.perf_counter() - start
+
+        def scan():
+            return sorted(os.path.relpath(path, root)
+                          for path in hermeto._find_unsafe_symlinks(str(root)))
+
+        scandir_scan = _timed(scan, repeat)
+        resolve_scan = _timed(lambda: sorted(resolve_all(root)), repeat)
+
+    unsafe = scandir_scan.pop('result')
+    assert unsafe == resolve_scan.pop('result'), 'the scans found different symlinks'
+    assert len(unsafe) == tree['unsafe_symlinks']
+    return {
+        'tree': tree,
+        'setup_time': setup_time,
+        'repeat': repeat,
+        'scandir_symlinks_only': scandir_scan,
+        'resolve_every_path': resolve_scan,
+        'speedup': resolve_scan['min'] / scandir_scan['min'],
+    }
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m tests.benchmarks.sandbox',
+        description='Time hermeto.enforce_sandbox on a synthetic repository',
+    )
+    parser.add_argument('--files', type=int, default=500_000,
+                        help='number of files in the repository (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed runs of each scan (default: %(default)s)')
+    parsed = parser.parse_args(args)
+
+    json.dump(run_sandbox_benchmark(parsed.files, parsed.repeat), sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Benchmark scenarios, running plugin chains of the real tasks against
+the fake registry and the fake Koji hub.
+"""
+import logging
+import os
+import platform as python_platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from unittest import mock
+
+import urllib3
+import yaml
+
+from atomic_reactor import __version__, util
+from atomic_reactor.constants import (MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST,
+                                      PLUGIN_CHECK_AND_SET_PLATFORMS_KEY)
+from atomic_reactor.dirs import ContextDir, RootBuildDir
+from atomic_reactor.inner import DockerBuildWorkflow
+from atomic_reactor.source import DummySource, PathSource
+from atomic_reactor.tasks.binary import (BinaryInitTask, BinaryPostBuildTask,
+                                         BinaryPreBuildTask)
+from atomic_reactor.tasks.sources import SourceBuildTask
+from tests.fake_koji import FakeKojiHub
+from tests.benchmarks.fake_registry import FakeRegistry
+
+logger = logging.getLogger(__name__)
+
+GOARCH = {
+    'x86_64': 'amd64',
+    'aarch64': 'arm64',
+    'ppc64le': 'ppc64le',
+    's390x': 's390x',
+}
+
+# only the plugins talking to a registry or to Koji are run
+REGISTRY_KOJI_PLUGINS = {
+    'check_base_image', 'koji_parent', 'bump_release', 'group_manifests',
+    'push_floating_tags', 'fetch_sources',
+}
+
+COMPONENT = 'app'
+VERSION = '1.0'
+
+
+@dataclass
+class BenchmarkParams:
+    """Size of the data served by the fakes and their latency"""
+
+    platforms: Tuple[str, ...] = ('x86_64', 'aarch64', 'ppc64le', 's390x')
+    # parent images of the multi-stage Dockerfile, including the base image
+    parents: int = 3
+    layers: int = 5
+    layer_size: int = 256 * 1024
+    # RPM builds installed in the image, one RPM per platform and one SRPM each
+    rpms: int = 20
+    srpm_size: int = 256 * 1024
+    floating_tags: int = 3
+    # seconds added to every request
+    registry_latency: float = 0.0
+    koji_latency: float = 0.0
+
+
+class BenchmarkEnv:
+    """Fake registry and Koji hub, with a working directory for one workflow"""
+
+    def __init__(self, params: BenchmarkParams):
+        self.params = params
+        self.registry = FakeRegistry(latency=params.registry_latency)
+        self.koji = FakeKojiHub(latency=params.koji_latency)
+        self._tmpdir = tempfile.TemporaryDirectory(prefix='atomic-reactor-benchmark-')
+        self.path = Path(self._tmpdir.name)
+        # the fake hub does not authenticate, logging in would require HTTPS and
+        # Kerberos or SSL certificates
+        self._koji_login = mock.patch('atomic_reactor.utils.koji.koji_login',
+                                      return_value=True)
+
+    def __enter__(self) -> 'BenchmarkEnv':
+        self.registry.start()
+        self.koji.start()
+        self._koji_login.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._koji_login.stop()
+        self.koji.stop()
+        self.registry.stop()
+        self._tmpdir.cleanup()
+
+    def reset_counters(self) -> None:
+        self.registry.reset_counters()
+        self.koji.reset_counters()
+
+    def reactor_config(self) -> Dict[str, Any]:
+        return {
+            'version': 1,
+            'koji': {
+                'hub_url': self.koji.hub_url,
+                'root_url': self.koji.root_url,
+                'auth': {},
+            },
+            'openshift': {'url': 'https://openshift.invalid'},
+            'source_registry': {'url': self.registry.url, 'insecure': True},
+            'registry': {'url': f'{self.registry.url}/v2', 'insecure': True},
+            'platform_descriptors': [
+                {'platform': platform, 'architecture': GOARCH[platform]}
+                for platform in self.params.platforms
+            ],
+        }
+
+    def image(self, repo: str, tag: str) -> str:
+        return f'{self.registry.registry}/{repo}:{tag}'
+
+    def make_workflow(self, plugins_conf: List[Dict[str, Any]], platforms: Iterable[str],
+                      source=None, user_params: Optional[Dict[str, Any]] = None
+                      ) -> DockerBuildWorkflow:
+        config_path = self.path / 'reactor-config.yaml'
+        config_path.write_text(yaml.safe_dump(self.reactor_config()))
+
+        workflow = DockerBuildWorkflow(
+            ContextDir(self.path / 'context'),
+            RootBuildDir(self.path / 'build'),
+            namespace='benchmark',
+            pipeline_run_name='benchmark-run',
+            source=source or DummySource(None, None, workdir=str(self.path)),
+            user_params={'image_tag': self.image(f'ns/{COMPONENT}', 'unique'),
+                         **(user_params or {})},
+            reactor_config_path=str(config_path),
+            plugins_conf=plugins_conf,
+        )
+        workflow.data.plugins_results[PLUGIN_CHECK_AND_SET_PLATFORMS_KEY] = list(platforms)
+        workflow.build_dir.init_build_dirs(list(platforms), workflow.source)
+        return workflow
+
+
+def _task_plugins(task_class) -> List[Dict[str, Any]]:
+    """Plugins of the task talking to a registry or to Koji, in the order of the task"""
+    return [dict(conf) for conf in task_class.plugins_conf
+            if conf['name'] in REGISTRY_KOJI_PLUGINS]
+
+
+def _parent_labels(name: str) -> Dict[str, str]:
+    return {'com.redhat.component': name, 'name': f'ns/{name}',
+            'version': VERSION, 'release': '1'}
+
+
+def _layered_image_source(env: BenchmarkEnv) -> PathSource:
+    """Multi-stage Dockerfile, each parent image has its build in Koji"""
+    params = env.params
+    arches = tuple(GOARCH[platform] for platform in params.platforms)
+    stages = []
+    for i in range(params.parents):
+        name = 'base' if i == params.parents - 1 else f'parent{i}'
+        digests = env.registry.add_image(f'ns/{name}', VERSION, architectures=arches,
+                                         labels=_parent_labels(name), layers=params.layers,
+                                         layer_size=params.layer_size)
+        env.koji.add_build(name, VERSION, '1', extra={'image': {'index': {'digests': {
+            MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST: digests['v2_list'],
+        }}}})
+        stage = f'FROM {env.image(f"ns/{name}", VERSION)}'
+        stages.append(stage if name == 'base' else f'{stage} AS {name}')
+
+    source_dir = env.path / 'source'
+    source_dir.mkdir()
+    (source_dir / 'Dockerfile').write_text('\n'.join(stages + [
+        f'LABEL com.redhat.component={COMPONENT} name=ns/{COMPONENT} version={VERSION}',
+        '',
+    ]))
+    return PathSource('path', str(source_dir), workdir=str(env.path / 'source-workdir'))
+
+
+def setup_init(env: BenchmarkEnv) -> DockerBuildWorkflow:
+    """Check and pin parent images, wait for their Koji builds"""
+    return env.make_workflow(_task_plugins(BinaryInitTask), env.params.platforms,
+                             source=_layered_image_source(env))
+
+
+def setup_prebuild(env: BenchmarkEnv) -> DockerBuildWorkflow:
+    """Bump the release, previous releases of the component are in Koji"""
+    source = _layered_image_source(env)
+    for release in range(1, 6):
+        env.koji.add_build(COMPONENT, VERSION, str(release))
+    return env.make_workflow(_task_plugins(BinaryPreBuildTask), env.params.platforms,
+                             source=source)
+
+
+def setup_postbuild(env: BenchmarkEnv) -> DockerBuildWorkflow:
+    """Group the pushed per-platform images into a manifest list and tag it"""
+    params = env.params
+    repo = f'ns/{COMPONENT}'
+    for platform in params.platforms:
+        env.registry.add_manifest(repo, f'unique-{platform}', GOARCH[platform],
+                                  labels=_parent_labels(COMPONENT), layers=params.layers,
+                                  layer_size=params.layer_size)
+
+    workflow = env.make_workflow(_task_plugins(BinaryPostBuildTask), params.platforms)
+    tag_conf = workflow.data.tag_conf
+    tag_conf.add_unique_image(env.image(repo, 'unique'))
+    tag_conf.add_primary_image(env.image(repo, f'{VERSION}-1'))
+    for i in range(params.floating_tags):
+        tag_conf.add_floating_image(env.image(repo, f'floating{i}'))
+    return workflow
+
+
+def _git_repo(path: Path) -> Tuple[str, str]:
+    """Create a git repository without lookaside cache sources, return its URL and HEAD"""
+    path.mkdir()
+    (path / 'Dockerfile').write_text('FROM scratch\n')
+    for cmd in (['init', '-q'], ['add', 'Dockerfile'],
+                ['-c', 'user.name=benchmark', '-c', 'user.email=benchmark@localhost',
+                 'commit', '-q', '-m', 'initial commit']):
+        subprocess.run(['git', '-C', str(path), *cmd], check=True)
+    commit = subprocess.run(['git', '-C', str(path), 'rev-parse', 'HEAD'], check=True,
+                            capture_output=True, text=True).stdout.strip()
+    return f'file://{path}', commit
+
+
+def setup_source_container(env: BenchmarkEnv) -> DockerBuildWorkflow:
+    """Fetch the SRPMs of all RPMs installed in the image and bump the source release"""
+    params = env.params
+    git_url, commit = _git_repo(env.path / 'dist-git')
+
+    rpms_by_arch: Dict[str, List[Dict[str, Any]]] = {platform: [] for platform in
+                                                     params.platforms}
+    for i in range(params.rpms):
+        rpm_build = env.koji.add_build(f'package{i}', VERSION, '1')
+        srpm = os.urandom(params.srpm_size)
+        for platform in params.platforms:
+            rpms_by_arch[platform].append(env.koji.add_rpm(rpm_build, platform, srpm))
+
+    image_build = env.koji.add_build(COMPONENT, VERSION, '1', extra={'image': {}},
+                                     source=f'{git_url}#{commit}')
+    for platform in params.platforms:
+        env.koji.add_archive(image_build, f'docker-image-{platform}.tar.gz',
+                             rpms=tuple(rpms_by_arch[platform]))
+
+    return env.make_workflow(_task_plugins(SourceBuildTask), ['noarch'],
+                             user_params={'sources_for_koji_build_nvr': image_build['nvr']})
+
+
+SCENARIOS: Dict[str, Callable[[BenchmarkEnv], DockerBuildWorkflow]] = {
+    'init': setup_init,
+    'prebuild': setup_prebuild,
+    'postbuild': setup_postbuild,
+    'source_container': setup_source_container,
+}
+
+
+def _run_once(name: str, params: BenchmarkParams, trace_memory: bool) -> Dict[str, Any]:
+    with BenchmarkEnv(params) as env:
+        workflow = SCENARIOS[name](env)
+        env.reset_counters()
+        util.digest_cache.clear()
+
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            workflow.build_container_image()
+        finally:
+            wall_time = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            tracemalloc.stop()
+
+        return {
+            'wall_time': wall_time,
+            'peak_memory': peak_memory,
+            'plugins': [conf['name'] for conf in workflow.plugins_conf],
+            'plugins_durations': dict(workflow.data.plugins_durations),
+            'registry': {
+                'requests': dict(env.registry.requests),
+                'total_requests': sum(env.registry.requests.values()),
+                'bytes_sent': env.registry.bytes_sent,
+                'bytes_received': env.registry.bytes_received,
+            },
+            'koji': {
+                'requests': dict(env.koji.requests),
+                'total_requests': sum(env.koji.requests.values()),
+                'calls': dict(env.koji.calls),
+                'bytes_sent': env.koji.bytes_sent,
+            },
+        }
+
+
+def run_scenario(name: str, params: BenchmarkParams, repeat: int = 3) -> Dict[str, Any]:
+    """Run the scenario repeat times, each time against freshly started fakes
+
+    Wall times are measured without tracing memory allocations, which slows
+    Python down. The peak of traced memory comes from one more run.
+    """
+    runs = [_run_once(name, params, trace_memory=False) for _ in range(repeat)]
+    traced = _run_once(name, params, trace_memory=True)
+    wall_times = [run['wall_time'] for run in runs]
+
+    result = runs[-1]
+    del result['wall_time'], result['peak_memory']
+    return {
+        'wall_time': {
+            'runs': wall_times,
+            'min': min(wall_times),
+            'median': statistics.median(wall_times),
+        },
+        'peak_traced_memory': traced['peak_memory'],
+        **result,
+    }
+
+
+def run_benchmarks(names: Iterable[str], params: BenchmarkParams,
+                   repeat: int = 3) -> Dict[str, Any]:
+    """Run the scenarios, return the results as a JSON-serializable dict"""
+    # the fake registry uses a self-signed certificate
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    scenarios = {}
+    for name in names:
+        logger.info('Running benchmark scenario %s', name)
+        scenarios[name] = run_scenario(name, params, repeat)
+
+    return {
+        'atomic_reactor_version': __version__,
+        'python_version': python_platform.python_version(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'params': asdict(params),
+        'repeat': repeat,
+        'scenarios': scenarios,
+        # kilobytes on Linux, includes the memory of the fakes running in this process
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
@@ -0,0 +1,118 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Smoke tests of the benchmark harness, with small payloads and no latency.
+They need openssl and git and are skipped unless pytest is run with --benchmarks.
+"""
+import json
+
+import koji
+import pytest
+import requests
+
+from tests.benchmarks import __main__ as benchmarks_main
+from tests.fake_koji import FakeKojiHub
+from tests.benchmarks.fake_registry import FakeRegistry
+from tests.benchmarks.sandbox import run_sandbox_benchmark
+from tests.benchmarks.scenarios import BenchmarkParams, run_benchmarks
+
+pytestmark = pytest.mark.benchmark
+
+SMALL_PARAMS = dict(platforms=('x86_64', 'aarch64'), parents=2, layers=1, layer_size=16,
+                    rpms=2, srpm_size=16, floating_tags=1)
+
+
+def test_fake_registry():
+    with FakeRegistry(tls=False) as registry:
+        digests = registry.add_image('ns/base', 'latest', architectures=('amd64', 'arm64'))
+
+        response = requests.get(
+            f'{registry.url}/v2/ns/base/manifests/latest',
+            headers={'Accept': 'application/vnd.docker.distribution.manifest.list.v2+json'}
+        )
+        assert response.status_code == 200
+        assert response.headers['Docker-Content-Digest'] == digests['v2_list']
+
+        # media type not accepted
+        response = requests.get(
+            f'{registry.url}/v2/ns/base/manifests/latest',
+            headers={'Accept': 'application/vnd.docker.distribution.manifest.v2+json'}
+        )
+        assert response.status_code == 404
+
+        assert registry.requests == {'GET manifests': 2}
+
+
+def test_fake_koji_hub():
+    with FakeKojiHub() as hub:
+        build = hub.add_build('app', '1.0', '1')
+        session = koji.ClientSession(hub.hub_url)
+
+        assert session.getBuild('app-1.0-1')['id'] == build['id']
+        assert session.getBuild({'name': 'app', 'version': '1.0', 'release': '2'}) is None
+        with pytest.raises(koji.GenericError):
+            session.getBuild('app-1.0-2', strict=True)
+        assert session.getNextRelease({'name': 'app', 'version': '1.0'}) == '2'
+
+        assert hub.calls == {'getBuild': 3, 'getNextRelease': 1}
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(['init', 'prebuild', 'postbuild', 'source_container'],
+                             BenchmarkParams(**SMALL_PARAMS), repeat=1)
+    # results are machine-readable
+    json.dumps(results)
+    scenarios = results['scenarios']
+
+    init = scenarios['init']
+    assert init['plugins'] == ['check_base_image', 'koji_parent']
+    assert len(init['wall_time']['runs']) == 1
+    assert init['peak_traced_memory'] > 0
+    assert init['registry']['total_requests'] > 0
+    # all parent builds are looked up at once
+    assert init['koji']['calls']['multiCall'] == 1
+
+    prebuild = scenarios['prebuild']
+    assert prebuild['plugins'] == ['bump_release']
+    assert prebuild['koji']['calls']['getNextRelease'] == 1
+
+    postbuild = scenarios['postbuild']
+    assert postbuild['plugins'] == ['group_manifests', 'push_floating_tags']
+    # per-platform manifests and the manifest list for the primary and unique
+    # images, the manifest list for the floating image
+    assert postbuild['registry']['requests']['PUT manifests'] == 2 * 3 + 1
+    assert postbuild['koji']['total_requests'] == 0
+
+    source_container = scenarios['source_container']
+    assert source_container['plugins'] == ['fetch_sources', 'bump_release']
+    assert source_container['koji']['requests']['GET files'] == 2
+
+
+def test_main(tmp_path):
+    output = tmp_path / 'results.json'
+    options = ['--platforms', 'x86_64', '--parents', '1', '--layer-size', '16',
+               '--rpms', '1', '--srpm-size', '16', '--repeat', '1']
+
+    assert benchmarks_main.main(['postbuild', *options, '--output', str(output)]) == 0
+
+    results = json.loads(output.read_text())
+    assert list(results['scenarios']) == ['postbuild']
+    assert results['params']['platforms'] == ['x86_64']
+
+
+def test_main_unknown_scenario():
+    with pytest.raises(SystemExit):
+        benchmarks_main.main(['unknown'])
+
+
+def test_sandbox_benchmark():
+    results = run_sandbox_benchmark(files=10000, repeat=1)
+    json.dumps(results)
+
+    assert results['tree'] == {'files': 10000, 'dirs': 100, 'symlinks': 10, 'unsafe_symlinks': 1}
+    assert len(results['scandir_symlinks_only']['runs']) == 1
+    assert results['speedup'] > 0
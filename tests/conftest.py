@@ -12,9 +12,11 @@ from pathlib import Path
 import pytest
 import requests
 import requests.exceptions
+from atomic_reactor.auth import token_store
 from atomic_reactor.constants import DOCKERFILE_FILENAME
 from atomic_reactor.dirs import ContextDir, RootBuildDir
 from atomic_reactor.source import DummySource
+from atomic_reactor.util import digest_cache
 from tests.constants import LOCALHOST_REGISTRY_HTTP, DOCKER0_REGISTRY_HTTP, TEST_IMAGE
 from tests.util import uuid_value
 
@@ -22,6 +24,38 @@ from osbs.utils import ImageName
 from atomic_reactor.inner import DockerBuildWorkflow
 
 
+def pytest_addoption(parser):
+    parser.addoption('--benchmarks', action='store_true', default=False,
+                     help='run the smoke tests of the benchmark harness')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: smoke test of the benchmark harness')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmarks'):
+        return
+    skip_benchmark = pytest.mark.skip(reason='benchmark smoke test, run with --benchmarks')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+@pytest.fixture(autouse=True)
+def clear_digest_cache():
+    """Do not let checksums cached by one test leak into other tests"""
+    yield
+    digest_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_token_store():
+    """Do not let registry tokens fetched by one test leak into other tests"""
+    yield
+    token_store.clear()
+
+
 @pytest.fixture()
 def temp_image_name():
     return ImageName(repo=("atomic-reactor-tests-%s" % uuid_value()))
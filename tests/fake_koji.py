@@ -0,0 +1,297 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+In-process stand-in for a Koji hub (XML-RPC API) and its file server (topurl).
+"""
+import itertools
+import threading
+import time
+import uuid
+import xmlrpc.client
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import koji
+
+HUB_PATH = '/kojihub'
+FILES_PATH = '/kojifiles'
+
+
+class FakeKojiHub:
+    """Koji hub serving builds, archives and RPMs from memory
+
+    Every HTTP request is delayed by latency seconds. HTTP round trips are
+    counted in requests (by endpoint), API calls in calls (by method), calls
+    made in a multicall are counted individually as well. The hub does not
+    authenticate, calls of unknown methods fail with koji.GenericError.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests: Counter = Counter()
+        self.calls: Counter = Counter()
+        self.bytes_sent = 0
+
+        self.builds: Dict[int, Dict[str, Any]] = {}
+        self.archives: Dict[int, Dict[str, Any]] = {}
+        self.rpms: Dict[int, Dict[str, Any]] = {}
+        # archive id -> ids of the RPMs installed in the image
+        self.image_rpms: Dict[int, List[int]] = {}
+        self.files: Dict[str, bytes] = {}
+        self.tasks: Dict[int, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server, 'hub is not running'
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def hub_url(self) -> str:
+        return self.url + HUB_PATH
+
+    @property
+    def root_url(self) -> str:
+        return self.url + FILES_PATH
+
+    @property
+    def pathinfo(self) -> koji.PathInfo:
+        return koji.PathInfo(topdir=self.root_url)
+
+    def start(self) -> 'FakeKojiHub':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _KojiHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self  # type: ignore[attr-defined]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FakeKojiHub':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.calls.clear()
+            self.bytes_sent = 0
+
+    # Content management
+
+    def add_build(self, name: str, version: str, release: str, state: str = 'COMPLETE',
+                  extra: Optional[Dict[str, Any]] = None, source: Optional[str] = None,
+                  owner_name: str = 'osbs') -> Dict[str, Any]:
+        build_id = next(self._ids)
+        build = {
+            'id': build_id,
+            'build_id': build_id,
+            'name': name,
+            'package_name': name,
+            'version': version,
+            'release': release,
+            'epoch': None,
+            'nvr': f'{name}-{version}-{release}',
+            'state': koji.BUILD_STATES[state],
+            'extra': extra or {},
+            'source': source,
+            'owner_name': owner_name,
+            'volume_name': 'DEFAULT',
+        }
+        self.builds[build_id] = build
+        return build
+
+    def add_archive(self, build: Dict[str, Any], filename: str, btype: str = 'image',
+                    type_name: str = 'tar', extra: Optional[Dict[str, Any]] = None,
+                    rpms: Tuple[Dict[str, Any], ...] = ()) -> Dict[str, Any]:
+        archive_id = next(self._ids)
+        archive = {
+            'id': archive_id,
+            'build_id': build['build_id'],
+            'filename': filename,
+            'btype': btype,
+            'type_name': type_name,
+            'checksum': '',
+            'checksum_type': 0,
+            'extra': extra or {},
+        }
+        self.archives[archive_id] = archive
+        self.image_rpms[archive_id] = [rpm['id'] for rpm in rpms]
+        return archive
+
+    def add_rpm(self, build: Dict[str, Any], arch: str,
+                srpm_data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Add an RPM of the build, with the SRPM of the build available for download"""
+        rpm_id = next(self._ids)
+        rpm = {
+            'id': rpm_id,
+            'build_id': build['build_id'],
+            'name': build['name'],
+            'version': build['version'],
+            'release': build['release'],
+            'nvr': build['nvr'],
+            'arch': arch,
+            'external_repo_name': 'INTERNAL',
+            'buildroot_id': None,
+        }
+        self.rpms[rpm_id] = rpm
+        if srpm_data is not None:
+            srpm_path = self.pathinfo.rpm({**rpm, 'arch': 'src'})
+            self.add_file(f'{self.pathinfo.build(build)}/{srpm_path}', srpm_data)
+        return rpm
+
+    def add_file(self, url: str, data: bytes) -> None:
+        """Make data available at url, which must be under root_url"""
+        assert url.startswith(self.root_url), f'{url} is not served by the hub'
+        self.files[url[len(self.url):]] = data
+
+    # API methods, called with the arguments decoded from the XML-RPC request
+
+    def _find_build(self, build_info: Any) -> Optional[Dict[str, Any]]:
+        if isinstance(build_info, int):
+            return self.builds.get(build_info)
+        if isinstance(build_info, str):
+            build_info = koji.parse_NVR(build_info)
+        for build in self.builds.values():
+            if all(build[key] == build_info[key] for key in ('name', 'version', 'release')):
+                return build
+        return None
+
+    def api_getBuild(self, buildInfo, strict=False):
+        build = self._find_build(buildInfo)
+        if build is None and strict:
+            raise koji.GenericError(f'No such build: {buildInfo}')
+        return build
+
+    def api_getNextRelease(self, buildInfo):
+        releases = [int(build['release']) for build in self.builds.values()
+                    if build['name'] == buildInfo['name'] and
+                    build['version'] == buildInfo['version'] and build['release'].isdigit()]
+        return str(max(releases, default=0) + 1)
+
+    def api_CGInitBuild(self, cg, data):
+        build = self.add_build(data['name'], data['version'], data['release'], state='BUILDING')
+        return {'build_id': build['build_id'], 'token': uuid.uuid4().hex}
+
+    def api_listArchives(self, buildID=None, buildrootID=None, componentBuildrootID=None,
+                         hostID=None, type=None, filename=None, size=None, checksum=None,
+                         typeInfo=None, queryOpts=None, imageID=None, archiveID=None,
+                         strict=False):  # pylint: disable=redefined-builtin
+        if imageID is not None:
+            # no archives (e.g. maven files) are installed in the images
+            return []
+        return [archive for archive in self.archives.values()
+                if (buildID is None or archive['build_id'] == buildID) and
+                (type is None or archive['btype'] == type)]
+
+    def api_listRPMs(self, buildID=None, buildrootID=None, imageID=None,
+                     componentBuildrootID=None, hostID=None, arches=None, queryOpts=None,
+                     draft=None):
+        if imageID is not None:
+            return [self.rpms[rpm_id] for rpm_id in self.image_rpms.get(imageID, [])]
+        if componentBuildrootID is not None:
+            return []
+        return [rpm for rpm in self.rpms.values()
+                if buildID is None or rpm['build_id'] == buildID]
+
+    def api_getRPMHeaders(self, rpmID=None, taskID=None, filepath=None, headers=None,
+                          strict=False):
+        rpm = self.rpms[rpmID]
+        return {'SOURCERPM': f"{rpm['nvr']}.src.rpm"}
+
+    def api_getTaskInfo(self, task_id, request=False, strict=False):
+        return self.tasks.get(task_id)
+
+    def api_search(self, terms, type, matchType, queryOpts=None):  # pylint: disable=W0622
+        return []
+
+    def api_getKojiVersion(self):
+        return koji.__version__ if hasattr(koji, '__version__') else '1.36.0'
+
+    def api_getLoggedInUser(self):
+        return {'id': 1, 'name': 'osbs'}
+
+    def api_multiCall(self, calls, strict=False):
+        results: List[Any] = []
+        for call in calls:
+            try:
+                results.append([self.call(call['methodName'], call['params'])])
+            except koji.GenericError as exc:
+                results.append({'faultCode': exc.faultCode, 'faultString': str(exc)})
+        return results
+
+    def call(self, method: str, params: List[Any]) -> Any:
+        with self._lock:
+            self.calls[method] += 1
+        kwargs = {}
+        if params and isinstance(params[-1], dict) and params[-1].get('__starstar'):
+            kwargs = {key: value for key, value in params[-1].items() if key != '__starstar'}
+            params = params[:-1]
+        api = getattr(self, f'api_{method}', None)
+        if api is None:
+            raise koji.GenericError(f'Invalid method: {method}')
+        return api(*params, **kwargs)
+
+
+class _KojiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeKojiHub/1.0'
+
+    @property
+    def fake(self) -> FakeKojiHub:
+        return self.server.fake  # type: ignore[attr-defined]
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+            with self.fake._lock:
+                self.fake.bytes_sent += len(body)
+
+    def _count(self, endpoint: str) -> None:
+        with self.fake._lock:
+            self.fake.requests[f'{self.command} {endpoint}'] += 1
+
+    def do_POST(self):
+        time.sleep(self.fake.latency)
+        self._count('hub')
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        params, method = xmlrpc.client.loads(body, use_builtin_types=True)
+        try:
+            response = xmlrpc.client.dumps((self.fake.call(method, list(params)),),
+                                           methodresponse=True, allow_none=True)
+        except koji.GenericError as exc:
+            response = xmlrpc.client.dumps(xmlrpc.client.Fault(exc.faultCode, str(exc)),
+                                           methodresponse=True, allow_none=True)
+        self._send(200, response.encode(), 'text/xml')
+
+    def do_GET(self):
+        time.sleep(self.fake.latency)
+        self._count('files')
+        data = self.fake.files.get(self.path)
+        if data is None:
+            self._send(404, b'Not Found', 'text/plain')
+        else:
+            self._send(200, data, 'application/octet-stream')
+
+    do_HEAD = do_GET
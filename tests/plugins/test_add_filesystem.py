@@ -90,7 +90,6 @@ def mock_koji_session(scratch=False, image_task_fail=False,
 
     session.should_receive('buildImageOz').replace_with(_mockBuildImageOz)
 
-    session.should_receive('taskFinished').and_return(True)
     if image_task_fail:
         session.should_receive('getTaskInfo').and_return({
             'state': koji_util.koji.TASK_STATES['FAILED']
@@ -104,13 +103,18 @@ def mock_koji_session(scratch=False, image_task_fail=False,
         (session.should_receive('getTaskResult')
             .replace_with(get_task_result_mock).once())
 
-    session.should_receive('listTaskOutput').and_return([
-        'fedora-23-1.0.x86_64.tar.gz',
-    ])
+    contents = [b'tarball', b'content']
+
+    def _mock_list_task_output(task_id, stat=False):
+        outputs = ['fedora-23-1.0.x86_64.tar.gz']
+        if stat:
+            return {name: {'st_size': str(len(b''.join(contents)))} for name in outputs}
+        return outputs
+
+    session.should_receive('listTaskOutput').replace_with(_mock_list_task_output)
     session.should_receive('getTaskChildren').and_return([
         {'id': 1234568},
     ])
-    contents = [b'tarball', b'content']
     expectation = session.should_receive('downloadTaskOutput')
     for chunk in contents:
         expectation = expectation.and_return(chunk)
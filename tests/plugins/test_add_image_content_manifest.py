@@ -385,6 +385,28 @@ def test_add_image_content_manifest(workflow, requests_mock,
     workflow.build_dir.for_each_platform(check_df)
 
 
+def test_pnc_artifacts_from_workflow_data(workflow, requests_mock):
+    mock_get_icm(requests_mock)
+    mock_content_sets_config(workflow.source.path, empty=True)
+    df_content = dedent("""\
+                            FROM base_image
+                            CMD build /spam/eggs
+                            LABEL com.redhat.component=eggs version=1.0 release=42
+                        """)
+    runner = mock_env(workflow, df_content, remote_sources=REMOTE_SOURCES)
+    # recorded by fetch_maven_artifacts
+    workflow.data.pnc_artifacts[str(PNC_ARTIFACT['id'])] = PNC_ARTIFACT
+
+    runner.run()
+
+    expected_output = deepcopy(ICM_DICT)
+    expected_output['metadata']['image_layer_index'] = 0
+    workflow.build_dir.for_each_platform(
+        check_icm('eggs-1.0-42.json', expected_output, has_content_sets=False)
+    )
+    assert PNC_ARTIFACT_URL not in [request.url for request in requests_mock.request_history]
+
+
 def test_fetch_maven_artifacts_no_pnc_config(workflow, requests_mock, caplog):
     mock_get_icm(requests_mock)
     df_content = dedent("""\
@@ -15,7 +15,8 @@ from atomic_reactor.plugins.bump_release import BumpReleasePlugin
 from atomic_reactor.plugins.fetch_sources import PLUGIN_FETCH_SOURCES_KEY
 from atomic_reactor.plugin import PluginsRunner
 from atomic_reactor.constants import PROG
-from tests.util import add_koji_map_in_workflow
+from tests.fake_koji import FakeKojiHub
+from tests.util import MockKojiMulticall, add_koji_map_in_workflow
 from flexmock import flexmock
 import time
 import pytest
@@ -363,6 +364,9 @@ class TestBumpRelease(object):
             def krb_login(self, *args, **kwargs):
                 return True
 
+            def multicall(self, strict=False, batch=None):
+                return MockKojiMulticall(self)
+
             def CGInitBuild(self, cg_name, nvr_data):
                 assert cg_name == PROG
                 assert nvr_data['name'] == list(component.values())[0]
@@ -470,6 +474,9 @@ class TestBumpRelease(object):
             def krb_login(self, *args, **kwargs):
                 return True
 
+            def multicall(self, strict=False, batch=None):
+                return MockKojiMulticall(self)
+
             def CGInitBuild(self, cg_name, nvr_data):
                 assert cg_name == PROG
                 assert nvr_data['name'] == list(component.values())[0]
@@ -504,6 +511,43 @@ class TestBumpRelease(object):
 
         workflow.build_dir.for_each_platform(check_labels)
 
+    @pytest.mark.parametrize(('append', 'reserve_build', 'expected', 'multicalls'), [
+        # standard releases 1-30 completed, 31 failed
+        (False, False, '32', 4),
+        (False, True, '31', 4),
+        # appended releases 7.1-7.19 completed, 7.20-7.40 failed
+        (True, False, '7.41', 4),
+        (True, True, '7.20', 3),
+    ])
+    def test_deep_release_history(self, workflow, source_dir,
+                                  append, reserve_build, expected, multicalls):
+        labels = {'com.redhat.component': 'component', 'version': '1.0'}
+        if append:
+            labels['release'] = '7'
+
+        with FakeKojiHub() as hub:
+            for release in range(1, 32):
+                hub.add_build('component', '1.0', str(release),
+                              state='FAILED' if release == 31 else 'COMPLETE')
+            for suffix in range(1, 41):
+                hub.add_build('component', '1.0', f'7.{suffix}',
+                              state='FAILED' if suffix >= 20 else 'COMPLETE')
+            # like for an old successful build, every release from 1 has to be checked
+            hub.api_getNextRelease = lambda buildInfo: '1'
+
+            plugin = self.prepare(workflow, source_dir, labels=labels, append=append,
+                                  reserve_build=reserve_build)
+            plugin.xmlrpc = koji.ClientSession(hub.hub_url)
+            plugin.run()
+
+        def check_labels(build_dir):
+            assert build_dir.dockerfile.labels['release'] == expected
+
+        workflow.build_dir.for_each_platform(check_labels)
+        # the candidates are looked up in growing windows, not one by one
+        assert hub.calls['multiCall'] == multicalls
+        assert hub.requests['POST hub'] == multicalls + bool(not append) + reserve_build
+
     @pytest.mark.parametrize('reserve_build, init_fails', [
         (True, RuntimeError),
         (True, koji.GenericError),
@@ -552,6 +596,9 @@ class TestBumpRelease(object):
             def krb_login(self, *args, **kwargs):
                 return True
 
+            def multicall(self, strict=False, batch=None):
+                return MockKojiMulticall(self)
+
             def CGInitBuild(self, cg_name, nvr_data):
                 assert cg_name == PROG
                 assert nvr_data['name'] == "%s-source" % koji_name
@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 from flexmock import flexmock
 
 from atomic_reactor.constants import EXPORTED_SQUASHED_IMAGE_NAME, IMAGE_TYPE_DOCKER_ARCHIVE
@@ -38,3 +40,28 @@ class TestFetchDockerArchive(object):
             assert metadata['type'] == IMAGE_TYPE_DOCKER_ARCHIVE
             assert f'image for platform:{platform} available at ' \
                    f"{image_path / 'image.tar'}" in caplog.text
+
+    @pytest.mark.parametrize('is_flatpak', [True, False])
+    def test_layer_sizes_from_registry(self, workflow, is_flatpak):
+        platforms = ['x86_64', 's390x']
+
+        workflow.build_dir.init_build_dirs(platforms, workflow.source)
+        workflow.data.tag_conf.add_unique_image('registry.com/image:latest')
+        workflow.build_dir.for_each_platform(self.create_image)
+
+        # images are still needed for flatpaks, which are built from them
+        (flexmock(ImageUtil)
+         .should_receive('download_image_archive_tarball')
+         .times(2 if is_flatpak else 0))
+
+        env = (MockEnv(workflow)
+               .for_plugin(FetchDockerArchivePlugin.key)
+               .set_reactor_config({'layer_sizes_from_registry': True}))
+        if is_flatpak:
+            env.set_user_params(flatpak=True)
+        results = env.create_runner().run()
+
+        if is_flatpak:
+            assert set(results[FetchDockerArchivePlugin.key]) == set(platforms)
+        else:
+            assert results[FetchDockerArchivePlugin.key] is None
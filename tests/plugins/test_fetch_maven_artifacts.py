@@ -20,10 +20,12 @@ from atomic_reactor.constants import (REPO_FETCH_ARTIFACTS_KOJI,
                                       REPO_FETCH_ARTIFACTS_URL)
 from atomic_reactor.plugin import PluginFailedException
 from atomic_reactor.plugins.fetch_maven_artifacts import FetchMavenArtifactsPlugin
+from atomic_reactor.utils.artifact_cache import ArtifactCache
 from osbs.utils import ImageName
 from textwrap import dedent
 
 from tests.mock_env import MockEnv
+from tests.util import mock_koji_multicall
 
 KOJI_HUB = 'https://koji-hub.com'
 KOJI_ROOT = 'https://koji-root.com'
@@ -392,6 +394,8 @@ def mock_koji_session(koji_proxyuser=None, koji_ssl_certs_dir=None,
     (session
         .should_receive('krb_login')
         .and_return(True))
+
+    mock_koji_multicall(session)
     return session
 
 
@@ -546,6 +550,14 @@ def test_fetch_maven_artifacts(workflow, source_path):
     assert 'sbom_components' in plugin_result
     assert plugin_result['sbom_components'] == DEFAULT_PNC_SBOM_COMPONENTS
 
+    # artifact records are kept for later plugins, each is requested only once
+    assert sorted(workflow.data.pnc_artifacts) == sorted(
+        str(artifact_id) for artifact_id in DEFAULT_PNC_ARTIFACT_IDS
+    )
+    pnc_api_calls = [call for call in responses.calls
+                     if call.request.url.startswith(PNC_ROOT + '/artifacts/')]
+    assert len(pnc_api_calls) == len(DEFAULT_PNC_ARTIFACT_IDS)
+
 
 @responses.activate  # noqa
 @pytest.mark.parametrize('artifact_type', ['nvr', 'url', 'pnc'])
@@ -663,6 +675,49 @@ def test_fetch_maven_artifacts_nvr_no_match(workflow, source_path,
     assert error_msg in str(e.value)
 
 
+@responses.activate
+def test_fetch_maven_artifacts_nvr_from_cache(workflow, source_path, tmpdir):
+    """Archives in the artifact cache are not downloaded, downloaded archives are cached."""
+    mock_koji_session()
+    mock_fetch_artifacts_by_nvr(source_path)
+    mock_nvr_downloads()
+
+    cache = ArtifactCache(Path(tmpdir, 'cache'))
+    cached_body = ARCHIVE_JAXB_SUN_POM['filename'] + ARCHIVE_JAXB_SUN_POM['group_id']
+    cached_file = Path(tmpdir, 'cached.pom')
+    cached_file.write_text(cached_body)
+    cache.store(cached_file, {'md5': ARCHIVE_JAXB_SUN_POM['checksum']})
+
+    r_c_m = {
+        'version': 1,
+        'koji': {
+            'hub_url': KOJI_HUB,
+            'root_url': KOJI_ROOT,
+            'auth': {}
+        },
+        'artifacts_cache': {'path': str(cache.path)},
+    }
+    results = mock_env(workflow, r_c_m=r_c_m).create_runner().run()
+    plugin_result = results[FetchMavenArtifactsPlugin.key]
+
+    path_info = MockedPathInfo(topdir=KOJI_ROOT)
+    cached_url = (path_info.mavenbuild(DEFAULT_KOJI_BUILD) + '/' +
+                  path_info.mavenfile(ARCHIVE_JAXB_SUN_POM))
+    requested_urls = [call.request.url for call in responses.calls]
+    assert cached_url not in requested_urls
+    assert len(requested_urls) == len(DEFAULT_ARCHIVES) - 1
+
+    workflow.build_dir.for_each_platform(check_downloads_exist(plugin_result))
+    pom_path = workflow.build_dir.any_platform.path.joinpath(
+        FetchMavenArtifactsPlugin.DOWNLOAD_DIR, path_info.mavenfile(ARCHIVE_JAXB_SUN_POM)
+    )
+    assert pom_path.read_text() == cached_body
+
+    for archive in DEFAULT_ARCHIVES:
+        checksum_type = koji.CHECKSUM_TYPES[archive['checksum_type']]
+        assert cache.path.joinpath(checksum_type, archive['checksum']).exists()
+
+
 @responses.activate  # noqa
 def test_fetch_maven_artifacts_nvr_bad_checksum(workflow, source_path):
     """Err when downloaded archive from Koji build has unexpected checksum."""
@@ -18,7 +18,7 @@ import yaml
 from flexmock import flexmock
 import koji
 
-from tests.constants import LOCALHOST_REGISTRY
+from tests.constants import LOCALHOST_REGISTRY, LOCALHOST_REGISTRY_HTTP
 from tests.mock_env import MockEnv
 from tests.utils.test_cachito import CACHITO_URL
 
@@ -37,7 +37,8 @@ from atomic_reactor.constants import (
 )
 from atomic_reactor.plugin import PluginFailedException
 from atomic_reactor.plugins.generate_sbom import GenerateSbomPlugin
-from atomic_reactor.util import base_image_is_custom, base_image_is_scratch
+from atomic_reactor.util import (base_image_is_custom, base_image_is_scratch,
+                                 ManifestDigest, RegistryClient, sha256sum)
 from atomic_reactor.utils import retries
 from osbs.utils import ImageName
 
@@ -1094,6 +1095,9 @@ def mock_env(workflow, df_images, hermeto=False):
         'source_registry': {
             'url': 'registry',
         },
+        'registry': {
+            'url': LOCALHOST_REGISTRY_HTTP,
+        },
         'registries_cfg_path': tmp_dir,
     }
 
@@ -1137,6 +1141,31 @@ def mock_env(workflow, df_images, hermeto=False):
     return env.create_runner()
 
 
+def mock_attached_sboms(attached_platforms=()):
+    """Mock the registry lookups of SBOMs attached to the per-platform images
+
+    The SBOMs of attached_platforms are reported as already attached.
+    """
+    def get_manifest_digests(image, versions):
+        return ManifestDigest(v2=f'sha256:{image.tag.rsplit("-", 1)[-1]}')
+
+    def get_manifest(image, version):
+        platform = image.tag[len('sha256-'):-len('.sbom')]
+        if platform not in attached_platforms:
+            return None, None
+        # cosign is run with DOCKER_CONFIG pointing to the dir with the SBOM files
+        sbom_file = Path(os.environ['DOCKER_CONFIG'], f'icm-{platform}.json')
+        manifest = {'layers': [{'digest': sha256sum(sbom_file.read_text(), prefix=True)}]}
+        return flexmock(json=lambda: manifest), None
+
+    (flexmock(RegistryClient)
+     .should_receive('get_manifest_digests')
+     .replace_with(get_manifest_digests))
+    (flexmock(RegistryClient)
+     .should_receive('get_manifest')
+     .replace_with(get_manifest))
+
+
 def mock_get_sbom_cachito(requests_mock):
     requests_mock.register_uri('GET', CACHITO_SBOM_URL, json=CACHITO_SBOM_JSON)
 
@@ -1366,6 +1395,7 @@ def test_sbom(workflow, requests_mock, koji_session, df_images, use_cache, use_f
      .should_receive('run_cmd')
      .times(len(PLATFORMS))
      .replace_with(check_cosign_run))
+    mock_attached_sboms()
 
     source_path = Path(workflow.source.path)
 
@@ -1396,7 +1426,32 @@ def test_sbom(workflow, requests_mock, koji_session, df_images, use_cache, use_f
     for plat in PLATFORMS:
         expected_result[plat]['components'].extend(deepcopy(expected_components[plat]))
 
-    assert plugin_result == expected_result
+    assert set(plugin_result['push_timings']) == set(PLATFORMS)
+    assert plugin_result['sboms'] == expected_result
+
+
+def test_sbom_already_attached(workflow, requests_mock, koji_session, caplog):
+    mock_get_sbom_cachito(requests_mock)
+    mock_build_icm_urls(requests_mock)
+
+    runner = mock_env(workflow, ['scratch'])
+    workflow.data.tag_conf.add_unique_image(UNIQUE_IMAGE)
+
+    def check_cosign_run(args):
+        assert args[3] == f'{UNIQUE_IMAGE}-{PLATFORMS[1]}'
+        return b''
+
+    (flexmock(retries)
+     .should_receive('run_cmd')
+     .once()
+     .replace_with(check_cosign_run))
+    mock_attached_sboms(attached_platforms=[PLATFORMS[0]])
+
+    plugin_result = runner.run()[GenerateSbomPlugin.key]
+
+    assert set(plugin_result['push_timings']) == set(PLATFORMS)
+    assert (f'for platform {PLATFORMS[0]} is already attached to '
+            f'{UNIQUE_IMAGE}-{PLATFORMS[0]}, skipping') in caplog.text
 
 
 @pytest.mark.parametrize(('df_images, err_msg'), [
@@ -1418,22 +1473,46 @@ def test_sbom_raises(workflow, requests_mock, koji_session, df_images, err_msg):
     assert err_msg in str(exc.value)
 
 
-@pytest.mark.parametrize(('df_images, err_msg'), [
-    (['scratch'], f'SBOM push for platform {PLATFORMS[0]} failed with output:'),
-])
-def test_sbom_raises_cosign(workflow, requests_mock, koji_session, df_images, err_msg, caplog):
+def test_sbom_raises_cosign(workflow, requests_mock, koji_session, caplog):
     mock_get_sbom_cachito(requests_mock)
     mock_build_icm_urls(requests_mock)
 
-    runner = mock_env(workflow, df_images)
+    runner = mock_env(workflow, ['scratch'])
+    workflow.data.tag_conf.add_unique_image(UNIQUE_IMAGE)
+
+    # failure of one platform does not stop pushes for the other platforms
+    (flexmock(retries)
+     .should_receive('run_cmd')
+     .times(len(PLATFORMS))
+     .and_raise(subprocess.CalledProcessError(1, 'cosign', output=b'something went wrong')))
+    mock_attached_sboms()
+
+    with pytest.raises(PluginFailedException) as exc:
+        runner.run()
+
+    assert f"SBOM push failed for platforms: {', '.join(sorted(PLATFORMS))}" in str(exc.value)
+    for platform in PLATFORMS:
+        assert f'SBOM push for platform {platform} failed with output:' in caplog.text
+
+
+def test_sbom_raises_push_errors(workflow, requests_mock, koji_session, caplog):
+    mock_get_sbom_cachito(requests_mock)
+    mock_build_icm_urls(requests_mock)
+
+    runner = mock_env(workflow, ['scratch'])
     workflow.data.tag_conf.add_unique_image(UNIQUE_IMAGE)
 
+    # other errors than a failed cosign run are collected for all the platforms as well
     (flexmock(retries)
      .should_receive('run_cmd')
-     .times(1)
+     .times(len(PLATFORMS))
+     .and_raise(OSError('cosign not found'))
      .and_raise(subprocess.CalledProcessError(1, 'cosign', output=b'something went wrong')))
+    mock_attached_sboms()
 
-    with pytest.raises(PluginFailedException):
+    with pytest.raises(PluginFailedException) as exc:
         runner.run()
 
-    assert err_msg in caplog.text
+    assert f"SBOM push failed for platforms: {', '.join(sorted(PLATFORMS))}" in str(exc.value)
+    assert 'failed: cosign not found' in caplog.text
+    assert 'failed with output:' in caplog.text
@@ -21,6 +21,7 @@ from flexmock import flexmock
 from tests.constants import DOCKER0_REGISTRY
 from tests.mock_env import MockEnv
 
+from atomic_reactor.constants import MEDIA_TYPE_DOCKER_V2_SCHEMA2
 from atomic_reactor.plugin import PluginFailedException
 from atomic_reactor.inner import TagConf
 from atomic_reactor.util import (registry_hostname, ManifestDigest, get_floating_images,
@@ -140,8 +141,8 @@ class MockRegistry(object):
         except ValueError:
             return (400, {}, {'error': 'BAD_MANIFEST'})
 
-        self.add_manifest(name, ref, req.body)
-        return (200, {}, '')
+        digest = self.add_manifest(name, ref, req.body)
+        return (201, {'Docker-Content-Digest': digest}, '')
 
     def _get_blob(self, req, name, digest):
         repo = self.get_repo(name)
@@ -539,6 +540,11 @@ def test_group_manifests(workflow, source_dir, schema_version, test_name, group,
         assert plugin_results["media_type"]
         assert plugin_results["manifest"]
 
+        # the digests of the tagged manifests are recorded for later plugins
+        for image in get_primary_images(workflow):
+            recorded = workflow.data.digest_ledger[image.to_str()]
+            assert recorded == {plugin_results["media_type"]: result_digest.default}
+
     else:
         with pytest.raises(PluginFailedException) as ex:
             runner.run()
@@ -587,6 +593,28 @@ def test_get_built_images(workflow, manifest_version):
     ]
 
 
+@responses.activate
+def test_get_built_images_from_ledger(workflow):
+    MockEnv(workflow).set_check_platforms_result(["x86_64"])
+    workflow.data.tag_conf.add_unique_image(UNIQUE_IMAGE)
+    image = ImageName.parse(f"{UNIQUE_IMAGE}-x86_64")
+    digest = make_digest("foo")
+    # recorded by tag_and_push
+    workflow.data.digest_ledger[image.to_str()] = {MEDIA_TYPE_DOCKER_V2_SCHEMA2: digest}
+
+    flexmock(ManifestUtil).should_receive("__init__")  # and do nothing, this test doesn't use it
+    flexmock(RegistryClient).should_receive("get_manifest_digests").never()
+
+    plugin = GroupManifestsPlugin(workflow)
+    session = RegistrySession(REGISTRY_V2)
+
+    assert plugin.get_built_images(session) == [
+        BuiltImage(pullspec=image, platform="x86_64", manifest_digest=digest,
+                   manifest_version="v2"),
+    ]
+    assert workflow.data.digest_ledger_hits == {GroupManifestsPlugin.key: 1}
+
+
 @responses.activate
 def test_get_built_images_multiple_manifest_types(workflow):
     MockEnv(workflow).set_check_platforms_result(["x86_64"])
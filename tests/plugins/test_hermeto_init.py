@@ -34,6 +34,7 @@ from atomic_reactor.plugins.hermeto_init import (
     HermetoInitPlugin,
 )
 from atomic_reactor.source import SourceConfig
+from atomic_reactor.utils.git_mirror import GitMirrorCache
 from tests.mock_env import MockEnv
 
 from tests.stubs import StubSource
@@ -318,6 +319,24 @@ def test_no_fail_when_missing_cachito_config(workflow, mocked_hermeto_init):
     assert result
 
 
+def test_clone_remote_source_through_mirror(workflow, tmp_path):
+    reactor_config = dedent(f"""\
+        version: 1
+        git_mirror_cache:
+          path: {tmp_path / 'git-cache'}
+        """)
+    mock_reactor_config(workflow, reactor_config)
+
+    target_dir = tmp_path / 'app'
+    (flexmock(GitMirrorCache)
+     .should_receive('clone')
+     .with_args(REMOTE_SOURCE_REPO, target_dir, REMOTE_SOURCE_REF)
+     .once())
+
+    HermetoInitPlugin(workflow).clone_remote_source(REMOTE_SOURCE_REPO, target_dir,
+                                                    REMOTE_SOURCE_REF)
+
+
 def test_ignore_when_missing_remote_source_config(workflow, mocked_hermeto_init):
     """Plugin should just skip when remote source is not configured"""
     remote_source_config = dedent("""---""")
@@ -8,15 +8,19 @@ of the BSD license. See the LICENSE file for details.
 
 from collections import namedtuple
 from enum import Enum
+import hashlib
 import json
 from pathlib import Path
 from typing import Any, Dict
+
+import atomic_reactor.util
 from atomic_reactor.plugins.fetch_docker_archive import FetchDockerArchivePlugin
 from atomic_reactor.plugins.add_help import AddHelpPlugin
 from atomic_reactor.plugins.generate_sbom import GenerateSbomPlugin
 
 import koji
 import koji_cli.lib
+from koji.util import adler32_constructor
 import os
 
 import requests
@@ -134,6 +138,18 @@ class MockedClientSession(object):
         with open(localfile, 'rb') as fp:
             self.uploaded_files[name] = fp.read()
 
+    def subsession(self):
+        return self
+
+    def rawUpload(self, chunk, offset, path, name, overwrite=False):
+        data = self.uploaded_files.get(name, b'')[:offset] + chunk
+        self.uploaded_files[name] = data
+        return {'size': len(chunk), 'hexdigest': adler32_constructor(chunk).hexdigest()}
+
+    def checkUpload(self, path, name, verify=None):
+        data = self.uploaded_files[name]
+        return {'size': len(data), 'hexdigest': adler32_constructor(data).hexdigest()}
+
     def CGImport(self, metadata, server_dir, token=None):
         # metadata cannot be defined in __init__ because tests assume
         # the attribute will not be defined unless this method is called
@@ -337,15 +353,26 @@ def mock_environment(workflow: DockerBuildWorkflow, source_dir: Path,
         "taskRun2": {"containerC": "log message C"},
     }
 
-    (flexmock(OSBS)
-        .should_receive('get_build_logs')
-        .with_args(PIPELINE_RUN_NAME)
-        .and_return(logs))
-    start_time_json = {'status': {'startTime': TIME}}
+    task_runs = []
+    for task_logs in logs.values():
+        task_run = flexmock()
+        task_run.should_receive('get_logs').and_return(task_logs)
+        task_runs.append(task_run)
+    flexmock(atomic_reactor.util.TaskRun).new_instances(*task_runs)
+    pipeline_run_json = {
+        'status': {
+            'startTime': TIME,
+            'childReferences': [
+                {'kind': 'TaskRun', 'name': f'{PIPELINE_RUN_NAME}-{name}',
+                 'pipelineTaskName': name}
+                for name in logs
+            ],
+        },
+    }
     (flexmock(OSBS)
         .should_receive('get_build')
         .with_args(PIPELINE_RUN_NAME)
-        .and_return(start_time_json))
+        .and_return(pipeline_run_json))
     setattr(workflow, 'source', source)
     flexmock(workflow.source).should_receive('commit_id').and_return('123456')
 
@@ -617,7 +644,10 @@ def mock_environment(workflow: DockerBuildWorkflow, source_dir: Path,
         workflow.data.plugins_results[PLUGIN_PUSH_OPERATOR_MANIFESTS_KEY] = \
             PUSH_OPERATOR_MANIFESTS_RESULTS
 
-    sbom_results = {plat: GenerateSbomPlugin.minimal_sbom for plat in PLATFORMS}
+    sbom_results = {
+        'sboms': {plat: GenerateSbomPlugin.minimal_sbom for plat in PLATFORMS},
+        'push_timings': {},
+    }
     workflow.data.plugins_results[PLUGIN_GENERATE_SBOM] = sbom_results
 
 
@@ -879,14 +909,11 @@ class TestKojiImport(object):
         with pytest.raises(PluginFailedException):
             runner.run()
 
-    @pytest.mark.parametrize('fail_method', [
-        'get_build_logs',
-    ])
-    def test_koji_import_osbs_fail(self, workflow, source_dir, fail_method):
+    def test_koji_import_osbs_fail(self, workflow, source_dir):
         mock_environment(workflow, source_dir, name='name', version='1.0', release='1')
-        (flexmock(OSBS)
-            .should_receive(fail_method)
-            .and_raise(OsbsException))
+        task_run = flexmock()
+        task_run.should_receive('get_logs').and_raise(OsbsException)
+        flexmock(atomic_reactor.util.TaskRun).new_instances(task_run)
 
         runner = create_runner(workflow)
         runner.run()
@@ -2070,6 +2097,32 @@ class TestKojiImport(object):
             assert REMOTE_SOURCE_TARBALL_FILENAME not in session.uploaded_files.keys()
             assert REMOTE_SOURCE_JSON_FILENAME not in session.uploaded_files.keys()
 
+        # checksums computed while uploading match the uploaded content
+        for output in data['output']:
+            if output['filename'] in session.uploaded_files:
+                content = session.uploaded_files[output['filename']]
+                assert output['checksum'] == hashlib.md5(content).hexdigest()
+                assert output['checksum_type'] == 'md5'
+
+    def test_upload_without_fast_upload(self, workflow, source_dir):
+        session = MockedClientSession('')
+        mock_environment(workflow, source_dir,
+                         name='ns/name', version='1.0', release='1',
+                         session=session, has_remote_source=RemoteSourceKind.CACHITO)
+        mock_reactor_config(workflow)
+        flexmock(session).should_receive('subsession').never()
+        flexmock(session).should_receive('rawUpload').never()
+
+        runner = create_runner(workflow)
+        workflow.conf.conf['koji']['use_fast_upload'] = False
+        runner.run()
+
+        assert REMOTE_SOURCE_TARBALL_FILENAME in session.uploaded_files
+        for output in session.metadata['output']:
+            if output['filename'] in session.uploaded_files:
+                content = session.uploaded_files[output['filename']]
+                assert output['checksum'] == hashlib.md5(content).hexdigest()
+
     @pytest.mark.parametrize('has_remote_source_file', [True, False])
     def test_remote_source_files(self, workflow, source_dir, has_remote_source_file):
         session = MockedClientSession('')
@@ -22,7 +22,7 @@ from osbs.utils import ImageName
 from flexmock import flexmock
 
 from tests.mock_env import MockEnv
-from tests.util import add_koji_map_in_workflow
+from tests.util import add_koji_map_in_workflow, mock_koji_multicall, MockKojiMulticall
 from copy import deepcopy
 
 import pytest
@@ -92,6 +92,7 @@ def koji_session():
     session = flexmock()
     flexmock(session).should_receive('getBuild').with_args(KOJI_BUILD_NVR).and_return(KOJI_BUILD)
     flexmock(session).should_receive('krb_login').and_return(True)
+    mock_koji_multicall(session)
     flexmock(koji).should_receive('ClientSession').and_return(session)
     return session
 
@@ -173,6 +174,47 @@ class TestKojiParent(object):
         assert 'KojiParentBuildMissing' in str(exc_info.value)
         assert 'state is DELETED, not COMPLETE' in str(exc_info.value)
 
+    def test_parent_builds_polled_together(self, workflow, koji_session):  # noqa
+        builder_nvr = 'builder-1.0-1'
+        builder_build = {'nvr': builder_nvr, 'id': 42, 'state': KOJI_STATE_COMPLETE,
+                         'extra': KOJI_EXTRA}
+        builder_inspect = {INSPECT_CONFIG: {'Labels': {'com.redhat.component': 'builder',
+                                                       'version': '1.0',
+                                                       'release': '1'}}}
+        builder_local = ImageName.parse('builder:stubDigest')
+        (flexmock(workflow.imageutil)
+         .should_receive('get_inspect_for_image')
+         .with_args(builder_local)
+         .and_return(builder_inspect))
+        workflow.data.parent_images_digests['builder:stubDigest'] = {V2_LIST: 'stubDigest'}
+        workflow.data.dockerfile_images = DockerfileImages(['builder:latest', 'base:latest'])
+        workflow.data.dockerfile_images['builder:latest'] = builder_local
+        workflow.data.dockerfile_images['base:latest'] = ImageName.parse('base:stubDigest')
+
+        # base build is complete right away, builder build needs 3 polls
+        (koji_session.should_receive('getBuild')
+            .with_args(KOJI_BUILD_NVR)
+            .and_return(KOJI_BUILD)
+            .once())
+        (koji_session.should_receive('getBuild')
+            .with_args(builder_nvr)
+            .and_return(None)
+            .and_return(KOJI_BUILD_BUILDING)
+            .and_return(builder_build)
+            .times(3))
+        (koji_session.should_receive('multicall')
+            .replace_with(lambda **kwargs: MockKojiMulticall(koji_session))
+            .times(3))
+
+        expected = {
+            BASE_IMAGE_KOJI_BUILD: KOJI_BUILD,
+            PARENT_IMAGES_KOJI_BUILDS: {
+                ImageName.parse('builder:latest').to_str(): builder_build,
+                ImageName.parse('base:latest').to_str(): KOJI_BUILD,
+            },
+        }
+        self.run_plugin_with_args(workflow, expect_result=expected)
+
     def test_base_image_not_inspected(self, workflow, koji_session):  # noqa
         flexmock(workflow.imageutil).should_receive('base_image_inspect').and_return({})
         with pytest.raises(PluginFailedException) as exc_info:
@@ -29,6 +29,7 @@ from atomic_reactor.plugins.pin_operator_digest import (
     PinOperatorDigestsPlugin,
     PullspecReplacer,
 )
+from atomic_reactor.utils.operator import OperatorCSV
 
 from tests.util import OPERATOR_MANIFESTS_DIR
 
@@ -568,6 +569,8 @@ class TestPinOperatorDigest(object):
         runner = mock_env(workflow, repo_dir, site_config=site_config,
                           add_to_config=pull_registries, user_config=user_config,
                           replacement_pullspecs=replacement_pullspecs)
+        # the updated CSV is serialized only once for all platforms
+        flexmock(OperatorCSV).should_call('dump').once()
         result = runner.run()
 
         post_content = f.read_text("utf-8")
@@ -668,6 +671,13 @@ class TestPinOperatorDigest(object):
             expected_content = reference.read_text("utf-8")
             assert content == expected_content
 
+        # the CSV file is the same in all platform-specific build dirs
+        build_dir = runner.workflow.build_dir
+        relpath = pathlib.Path(replaced_csv).relative_to(build_dir.any_platform.path)
+        for platform in PLATFORMS:
+            platform_csv = build_dir.path / platform / relpath
+            assert platform_csv.read_text("utf-8") == expected_content
+
         caplog_text = "\n".join(rec.message for rec in caplog.records)
 
         assert f'Found operator CSV file: {replaced_csv}' in caplog_text
@@ -744,6 +754,34 @@ class TestPinOperatorDigest(object):
         # plugin must always retun pullspecs
         assert result['pin_operator_digest']['related_images']['pullspecs']
 
+    def test_symlinked_csv(self, workflow, repo_dir):
+        original = '{}/ns/foo:1'.format(SOURCE_REGISTRY_URI)
+        manifests_dir = repo_dir.joinpath(OPERATOR_MANIFESTS_DIR)
+        manifests_dir.mkdir()
+        csvs_dir = repo_dir.joinpath('csvs')
+        csvs_dir.mkdir()
+        mock_operator_csv(csvs_dir, 'csv.yaml', [original])
+        manifests_dir.joinpath('csv.yaml').symlink_to('../csvs/csv.yaml')
+
+        user_config = get_user_config(manifests_dir=OPERATOR_MANIFESTS_DIR,
+                                      enable_digest_pinning=False,
+                                      enable_repo_replacements=False)
+        site_config = get_site_config(registry_post_replace={SOURCE_REGISTRY_URI: 'new-registry'})
+
+        runner = mock_env(workflow, repo_dir, user_config=user_config,
+                          site_config=site_config)
+        runner.run()
+
+        # the target of the symlink is updated in all platform-specific build dirs
+        build_dir = runner.workflow.build_dir
+        for platform in PLATFORMS:
+            platform_dir = build_dir.path / platform
+            csv_link = platform_dir / OPERATOR_MANIFESTS_DIR / 'csv.yaml'
+            assert os.readlink(csv_link) == '../csvs/csv.yaml'
+            content = platform_dir.joinpath('csvs', 'csv.yaml').read_text('utf-8')
+            assert 'new-registry/ns/foo:1' in content
+            assert original not in content
+
     def test_exclude_csvs(self, workflow, repo_dir, caplog):
         manifests_dir = repo_dir.joinpath(OPERATOR_MANIFESTS_DIR)
         manifests_dir.mkdir()
@@ -86,8 +86,8 @@ class MockRegistry(object):
         except ValueError:
             return (400, {}, {'error': 'BAD_MANIFEST'})
 
-        self.add_manifest(name, ref, req.body)
-        return (200, {}, '')
+        digest = self.add_manifest(name, ref, req.body)
+        return (201, {'Docker-Content-Digest': digest}, '')
 
 
 def mock_registries(registries, config, primary_images=None, manifest_results=None,
@@ -416,6 +416,13 @@ def test_floating_tags_push(workflow, tmpdir, test_name, manifest_results,
                 assert tag in target_registry.get_repo(name)['tags']
                 assert target_registry.get_manifest(name, tag) == primary_manifest_list
 
+        # the digests of the floating tags are recorded for later plugins
+        ledger = env.workflow.data.digest_ledger
+        for image in env.workflow.data.tag_conf.floating_images:
+            name = image.to_str(registry=False, tag=False)
+            registry_digest = target_registry.get_repo(name)['tags'][image.tag]
+            assert ledger[image.to_str()] == {manifest_results['media_type']: registry_digest}
+
         # Check that plugin returns ManifestDigest object
         assert isinstance(plugin_result, dict)
         # Check that plugin returns correct list of repos
@@ -6,15 +6,18 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
+import json
 import logging
 import os
 import re
 import sys
+import time
 from collections import defaultdict
 from copy import deepcopy
 from datetime import datetime, timedelta
 from pathlib import Path
 from textwrap import dedent
+from urllib.parse import parse_qs, urlparse
 
 import koji
 import pytest
@@ -33,7 +36,7 @@ from atomic_reactor.plugins.resolve_composes import (
     UNPUBLISHED_REPOS,
 )
 from atomic_reactor.source import SourceConfig
-from atomic_reactor.utils.odcs import ODCSClient, construct_compose_url, WaitComposeToFinishTimeout
+from atomic_reactor.utils.odcs import ODCSClient
 from tests.mock_env import MockEnv
 from tests.util import add_koji_map_in_workflow
 
@@ -78,8 +81,59 @@ SIGNING_INTENTS = {
 DEFAULT_SIGNING_INTENT = 'release'
 
 
+class MockODCS(object):
+    """
+    Mock of the ODCS API polled by ODCSClient.wait_for_composes
+
+    Serves the composes added by add_compose, both to the query of composes
+    filtered by IDs and to the query of a single compose. Like ODCS, the query
+    of several composes returns the newest ones first.
+    """
+
+    def __init__(self, rsps):
+        self.composes = {}
+        # compose IDs requested by each query
+        self.queries = []
+        self.canceled = []
+
+        composes_url = '{}/composes/'.format(ODCS_URL)
+        compose_url = re.compile(re.escape(composes_url) + r'\d+$')
+        rsps.add_callback(responses.GET, composes_url, callback=self._get_composes)
+        rsps.add_callback(responses.GET, compose_url, callback=self._get_compose)
+        rsps.add_callback(responses.DELETE, compose_url, callback=self._cancel_compose)
+
+    def add_compose(self, compose):
+        self.composes[compose['id']] = compose
+
+    def _get_composes(self, request):
+        query = parse_qs(urlparse(request.url).query)
+        compose_ids = [int(compose_id) for compose_id in query['id']]
+        assert query['per_page'] == [str(len(compose_ids))]
+        self.queries.append(compose_ids)
+        items = [self.composes[compose_id] for compose_id in sorted(compose_ids, reverse=True)
+                 if compose_id in self.composes]
+        return 200, {}, json.dumps({'items': items})
+
+    def _get_compose(self, request):
+        compose_id = int(request.url.rsplit('/', 1)[-1])
+        self.queries.append([compose_id])
+        if compose_id not in self.composes:
+            return 404, {}, json.dumps({'status': 404, 'error': 'Not Found'})
+        return 200, {}, json.dumps(self.composes[compose_id])
+
+    def _cancel_compose(self, request):
+        self.canceled.append(int(request.url.rsplit('/', 1)[-1]))
+        return 202, {}, ''
+
+
 @pytest.fixture
-def mocked_env(workflow, source_dir):
+def odcs():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        yield MockODCS(rsps)
+
+
+@pytest.fixture
+def mocked_env(workflow, source_dir, odcs):
     env = (
         MockEnv(workflow)
         .for_plugin(ResolveComposesPlugin.key)
@@ -94,6 +148,7 @@ def mocked_env(workflow, source_dir):
     # These are used for further mocking and are not normally part of MockEnv
     env._tmpdir = source_dir
     env._koji_session = mock_koji_session()
+    env._odcs = odcs
     return env
 
 
@@ -169,7 +224,7 @@ def mock_content_sets_config(source_dir: Path, data=None):
 def mock_odcs_client_start_compose():
     """
     Common mock for tests requiring basic compose operation. Typically, this
-    should be used with mock_odcs_client_wait_for_compose. However, if the
+    should be used with mock_odcs_compose_status. However, if the
     fake data set in this mock cannot fulfill the requirement of a test, please
     write a custom one specifically.
     """
@@ -184,12 +239,9 @@ def mock_odcs_client_start_compose():
         .and_return(ODCS_COMPOSE))
 
 
-def mock_odcs_client_wait_for_compose():
+def mock_odcs_compose_status(mocked_env):
     """Refer to the doc of mock_odcs_client_start_compose"""
-    (flexmock(ODCSClient)
-        .should_receive('wait_for_compose')
-        .with_args(ODCS_COMPOSE_ID)
-        .and_return(ODCS_COMPOSE))
+    mocked_env._odcs.add_compose(ODCS_COMPOSE)
 
 
 def mock_koji_session():
@@ -242,7 +294,7 @@ class TestResolveComposes(object):
 
     def test_request_compose(self, mocked_env):
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
         self.run_plugin_with_args(mocked_env)
 
     @pytest.mark.parametrize('arches', (
@@ -260,7 +312,7 @@ class TestResolveComposes(object):
                 arches=arches)
             .once()
             .and_return(ODCS_COMPOSE))
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
         mocked_env.set_check_platforms_result(arches)
         self.run_plugin_with_args(mocked_env)
 
@@ -353,10 +405,7 @@ class TestResolveComposes(object):
                 .once()
                 .and_return(odcs_with_arches))
 
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(ODCS_COMPOSE_ID)
-                .and_return(odcs_with_arches))
+            mocked_env._odcs.add_compose(odcs_with_arches)
 
         compose_ids = []
         current_repourls = ["http://example.com/current.repo"]
@@ -371,11 +420,7 @@ class TestResolveComposes(object):
                 compose['id'] = compose_id
                 compose['result_repofile'] = ODCS_COMPOSE_REPO + '/odcs-{}.repo'.format(compose_id)
 
-                (flexmock(ODCSClient)
-                    .should_receive('wait_for_compose')
-                    .once()
-                    .with_args(compose_id)
-                    .and_return(compose))
+                mocked_env._odcs.add_compose(compose)
 
                 compose_ids.append(compose_id)
                 for arch in arches:
@@ -387,11 +432,7 @@ class TestResolveComposes(object):
                 compose['id'] = compose_id
                 compose['result_repofile'] = ODCS_COMPOSE_REPO + '/odcs-{}.repo'.format(compose_id)
 
-                (flexmock(ODCSClient)
-                 .should_receive('wait_for_compose')
-                 .once()
-                 .with_args(compose_id)
-                 .and_return(compose))
+                mocked_env._odcs.add_compose(compose)
                 for arch in arches:
                     expected_yum_repourls[arch].append(compose['result_repofile'])
 
@@ -456,7 +497,7 @@ class TestResolveComposes(object):
             .once()
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         mocked_env.set_check_platforms_result(arches)
         self.run_plugin_with_args(mocked_env)
@@ -497,7 +538,7 @@ class TestResolveComposes(object):
             .once()
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         mocked_env.set_check_platforms_result(arches)
         self.run_plugin_with_args(mocked_env)
@@ -561,7 +602,7 @@ class TestResolveComposes(object):
                        arches=['x86_64'])
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         self.run_plugin_with_args(mocked_env)
 
@@ -593,7 +634,7 @@ class TestResolveComposes(object):
                        arches=['x86_64'])
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         self.run_plugin_with_args(mocked_env)
 
@@ -651,7 +692,7 @@ class TestResolveComposes(object):
                        arches=['x86_64'])
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         self.run_plugin_with_args(mocked_env)
 
@@ -797,10 +838,7 @@ class TestResolveComposes(object):
                 .with_args(source_type='pulp', source=source, arches=[arch], sigkeys=[],
                            flags=expected_flags)
                 .and_return(pulp_composes[arch]).once())
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(pulp_id)
-                .and_return(pulp_composes[arch]).once())
+            mocked_env._odcs.add_compose(pulp_composes[arch])
 
         mock_content_sets_config(mocked_env._tmpdir, content_set)
 
@@ -836,10 +874,7 @@ class TestResolveComposes(object):
                            packages=['spam', 'bacon', 'eggs'], sigkeys=sig_keys)
                 .and_return(tag_compose).once())
 
-        (flexmock(ODCSClient)
-            .should_receive('wait_for_compose')
-            .with_args(ODCS_COMPOSE_ID)
-            .and_return(tag_compose).once())
+        mocked_env._odcs.add_compose(tag_compose)
 
         plugin_result = self.run_plugin_with_args(mocked_env, platforms=arches, is_pulp=pulp_arches)
 
@@ -878,7 +913,7 @@ class TestResolveComposes(object):
         mock_repo_config(mocked_env._tmpdir, repo_config)
 
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         self.run_plugin_with_args(mocked_env)
 
@@ -933,11 +968,12 @@ class TestResolveComposes(object):
             )
 
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         (flexmock(ODCSClient)
-            .should_receive('__init__')
-            .with_args(ODCS_URL, **exp_kwargs))
+            .should_call('__init__')
+            .with_args(ODCS_URL, **exp_kwargs)
+            .once())
 
         self.run_plugin_with_args(mocked_env, plug_args)
 
@@ -967,7 +1003,7 @@ class TestResolveComposes(object):
             .and_return(KOJI_TARGET))
 
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         self.run_plugin_with_args(mocked_env, plugin_args)
 
@@ -1039,11 +1075,7 @@ class TestResolveComposes(object):
                 sigkeys=sigkeys)
             .and_return(odcs_compose))
 
-        (flexmock(ODCSClient)
-            .should_receive('wait_for_compose')
-            .once()
-            .with_args(odcs_compose['id'])
-            .and_return(odcs_compose))
+        mocked_env._odcs.add_compose(odcs_compose)
 
         parent_build_info = {
             'id': 1234,
@@ -1089,11 +1121,7 @@ class TestResolveComposes(object):
             compose['id'] = compose_id
             compose['sigkeys'] = ' '.join(SIGNING_INTENTS[signing_intent])
 
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .once()
-                .with_args(compose_id)
-                .and_return(compose))
+            mocked_env._odcs.add_compose(compose)
 
             composes.append(compose)
 
@@ -1149,7 +1177,7 @@ class TestResolveComposes(object):
                 arches=['x86_64'])
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
 
         self.run_plugin_with_args(mocked_env)
 
@@ -1198,7 +1226,7 @@ class TestResolveComposes(object):
                     arches=['x86_64'])
                 .once()
                 .and_return(ODCS_COMPOSE))
-            mock_odcs_client_wait_for_compose()
+            mock_odcs_compose_status(mocked_env)
             self.run_plugin_with_args(mocked_env)
         else:
             (flexmock(ODCSClient)
@@ -1244,11 +1272,7 @@ class TestResolveComposes(object):
             .should_receive('start_compose')
             .never())
 
-        (flexmock(ODCSClient)
-            .should_receive('wait_for_compose')
-            .once()
-            .with_args(old_odcs_compose['id'])
-            .and_return(old_odcs_compose))
+        mocked_env._odcs.add_compose(old_odcs_compose)
 
         (flexmock(ODCSClient)
             .should_receive('renew_compose')
@@ -1256,11 +1280,7 @@ class TestResolveComposes(object):
             .with_args(old_odcs_compose['id'], sigkeys.split())
             .and_return(new_odcs_compose))
 
-        (flexmock(ODCSClient)
-            .should_receive('wait_for_compose')
-            .times(1 if expect_renew else 0)
-            .with_args(new_odcs_compose['id'])
-            .and_return(new_odcs_compose))
+        mocked_env._odcs.add_compose(new_odcs_compose)
 
         plugin_args = {
             'compose_ids': [old_odcs_compose['id']],
@@ -1289,6 +1309,11 @@ class TestResolveComposes(object):
 
         plugin_result = self.run_plugin_with_args(mocked_env, plugin_args)
 
+        expected_queries = [[old_odcs_compose['id']]]
+        if expect_renew:
+            expected_queries.append([new_odcs_compose['id']])
+        assert mocked_env._odcs.queries == expected_queries
+
         if expect_renew:
             assert plugin_result['composes'] == [new_odcs_compose]
             if depkeys:
@@ -1301,7 +1326,7 @@ class TestResolveComposes(object):
 
     def test_inject_yum_repos_from_new_compose(self, mocked_env):
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
         results = self.run_plugin_with_args(mocked_env)
         yum_repourls = results.get('yum_repourls') or {}
         expected_yum_repourls = defaultdict(list)
@@ -1317,11 +1342,7 @@ class TestResolveComposes(object):
             compose['id'] = compose_id
             compose['result_repofile'] = ODCS_COMPOSE_REPO + '/odcs-{}.repo'.format(compose_id)
 
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .once()
-                .with_args(compose_id)
-                .and_return(compose))
+            mocked_env._odcs.add_compose(compose)
 
             compose_ids.append(compose_id)
             expected_yum_repourls[ODCS_COMPOSE_DEFAULT_ARCH].append(compose['result_repofile'])
@@ -1335,6 +1356,9 @@ class TestResolveComposes(object):
         yum_repourls = results.get('yum_repourls') or {}
 
         assert yum_repourls == expected_yum_repourls
+        # all composes are polled with a single query, in the order they were given
+        assert mocked_env._odcs.queries == [compose_ids]
+        assert [compose['id'] for compose in results['composes']] == compose_ids
 
     def test_abort_when_odcs_config_missing(self, caplog, mocked_env):
         # Clear out default reactor config
@@ -1431,7 +1455,7 @@ class TestResolveComposes(object):
     def test_content_sets_validation(self, mocked_env,
                                      content_sets_content, expect_error):
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_compose_status(mocked_env)
         mock_content_sets_config(mocked_env._tmpdir, content_sets_content)
         self.run_plugin_with_args(mocked_env, expect_error=expect_error)
 
@@ -1505,20 +1529,11 @@ class TestResolveComposes(object):
             start_chain.and_return(custom_pulp_compose)
 
         if modules:
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(compose_module_id)
-                .and_return(custom_module_compose))
+            mocked_env._odcs.add_compose(custom_module_compose)
         if packages:
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(compose_package_id)
-                .and_return(custom_package_compose))
+            mocked_env._odcs.add_compose(custom_package_compose)
         if content_sets:
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(compose_pulp_id)
-                .and_return(custom_pulp_compose))
+            mocked_env._odcs.add_compose(custom_pulp_compose)
 
         results = self.run_plugin_with_args(mocked_env)
 
@@ -1544,9 +1559,8 @@ class TestResolveComposes(object):
                 'Signing intent will not be adjusted for it.' in caplog.text)
 
     @pytest.mark.parametrize('cancel_compose', (True, False))
-    @responses.activate
     def test_canceling_compose_when_timeout_of_waiting_for_the_compose(
-        self, mocked_env, tmpdir, cancel_compose, caplog
+        self, mocked_env, cancel_compose, caplog
     ):
         repo_config = dedent("""\
                         compose:
@@ -1563,79 +1577,50 @@ class TestResolveComposes(object):
             compose['id'] = parent_compose_id
             compose['result_repofile'] = ODCS_COMPOSE_REPO + '/odcs-{}.repo'.format(
                 parent_compose_id)
-
-            (flexmock(ODCSClient)
-             .should_receive('wait_for_compose')
-             .once()
-             .with_args(parent_compose_id)
-             .and_return(compose))
-            # Ensure ODCS responses the compose is still waiting for process before
-            # checking the timeout.
-            parent_url = construct_compose_url(ODCS_URL, parent_compose_id)
             if cancel_compose:
+                # The parent composes are renewed, the renewed compose 15 is still
+                # waiting for process when the timeout is reached.
                 renew_compose = compose.copy()
-                compose['state_name'] = 'removed'
                 renew_compose['id'] += 5
-                renew_parent_url = construct_compose_url(ODCS_URL, renew_compose['id'])
+                renew_compose['state_name'] = 'wait' if renew_compose['id'] == 15 else 'done'
+                compose['state_name'] = 'removed'
                 (flexmock(ODCSClient)
                  .should_receive('renew_compose')
                  .once()
                  .with_args(compose['id'], [])
                  .and_return(renew_compose))
-                (flexmock(ODCSClient)
-                 .should_receive('wait_for_compose')
-                 .once()
-                 .with_args(renew_compose['id'])
-                 .and_return(renew_compose))
-                if renew_compose['id'] == 15:
-                    responses.add(responses.GET, url=renew_parent_url, json={
-                        'id': renew_compose['id'],
-                        'state_name': 'wait'
-                    })
-                else:
-                    responses.add(responses.GET, url=renew_parent_url, json={
-                        'id': renew_compose['id'],
-                        'state_name': 'done'
-                    })
-                responses.add(responses.DELETE, url=renew_parent_url)
-            else:
-                responses.add(responses.GET, url=parent_url, json={
-                    'id': parent_compose_id,
-                    'state_name': 'done'
-                })
-            # Ensure to cancel the compose
-            responses.add(responses.DELETE, url=parent_url)
+                mocked_env._odcs.add_compose(renew_compose)
+            mocked_env._odcs.add_compose(compose)
+
         # Fake data for an existing compose requested from ODCS.
         # No need to start a new one.
         plugin_args = {'compose_ids': [ODCS_COMPOSE_ID]}
+        compose = ODCS_COMPOSE.copy()
+        if not cancel_compose:
+            # Ensure ODCS responses the compose is still waiting for process
+            compose['state_name'] = 'wait'
+        mocked_env._odcs.add_compose(compose)
 
-        # Ensure ODCSClient.wait_for_compose raises timeout error
-        (flexmock(ODCSClient)
-         .should_receive('wait_for_compose')
-         .with_args(ODCS_COMPOSE_ID)
-         .once()
-         .and_raise(WaitComposeToFinishTimeout(ODCS_COMPOSE_ID, ODCSClient.DEFAULT_WAIT_TIMEOUT)))
-
-        # Ensure ODCS responses the compose is still waiting for process before
-        # checking the timeout.
-        compose_url = construct_compose_url(ODCS_URL, ODCS_COMPOSE_ID)
-        responses.add(responses.GET, url=compose_url, json={
-            'id': ODCS_COMPOSE_ID,
-            'state_name': 'wait'
-        })
-        # Ensure to cancel the compose
-        responses.add(responses.DELETE, url=compose_url)
+        # Time out after the first query
+        flexmock(ODCSClient, DEFAULT_WAIT_TIMEOUT=0)
+        flexmock(time).should_receive('sleep')
 
         with pytest.raises(PluginFailedException) as exc:
             self.run_plugin_with_args(mocked_env, plugin_args=plugin_args)
 
-        msg = 'Timeout of waiting for compose {}'.format(ODCS_COMPOSE_ID)
-        assert msg in str(exc.value)
+        # All composes are polled together
+        assert mocked_env._odcs.queries[0] == parent_compose_ids + [ODCS_COMPOSE_ID]
         if cancel_compose:
+            assert 'Timeout of waiting for compose 15' in str(exc.value)
             msg = 'Canceling the compose 15'
             assert msg in caplog.text
             msg = 'The compose 16 is not in progress, skip canceling'
             assert msg in caplog.text
+            assert mocked_env._odcs.canceled == [15]
+        else:
+            msg = 'Timeout of waiting for compose {}'.format(ODCS_COMPOSE_ID)
+            assert msg in str(exc.value)
+            assert mocked_env._odcs.canceled == []
 
     def test_plugin_aborted_no_yumrepourls_include_koji_repo_true(self, mocked_env, caplog):
         """
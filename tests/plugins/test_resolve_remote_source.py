@@ -363,14 +363,12 @@ def mock_cachito_api_multiple_remote_sources(workflow, user=KOJI_TASK_OWNER):
         .should_receive("wait_for_request")
         .with_args({"id": CACHITO_REQUEST_ID})
         .and_return(CACHITO_SOURCE_REQUEST)
-        .ordered()
     )
     (
         flexmock(CachitoAPI)
         .should_receive("wait_for_request")
         .with_args({"id": SECOND_CACHITO_REQUEST_ID})
         .and_return(SECOND_CACHITO_SOURCE_REQUEST)
-        .ordered()
     )
 
     (
@@ -382,7 +380,6 @@ def mock_cachito_api_multiple_remote_sources(workflow, user=KOJI_TASK_OWNER):
             dest_filename="remote-source-gomod.tar.gz",
         )
         .and_return(mock_cachito_tarball(expected_dowload_path(workflow, "gomod")))
-        .ordered()
     )
 
     (
@@ -390,7 +387,6 @@ def mock_cachito_api_multiple_remote_sources(workflow, user=KOJI_TASK_OWNER):
         .should_receive("get_request_env_vars")
         .with_args(CACHITO_SOURCE_REQUEST["id"])
         .and_return(CACHITO_ENV_VARS_JSON)
-        .ordered()
     )
 
     (
@@ -398,7 +394,6 @@ def mock_cachito_api_multiple_remote_sources(workflow, user=KOJI_TASK_OWNER):
         .should_receive("get_request_config_files")
         .with_args(CACHITO_SOURCE_REQUEST["id"])
         .and_return(CACHITO_CONFIG_FILES)
-        .ordered()
     )
 
     (
@@ -410,7 +405,6 @@ def mock_cachito_api_multiple_remote_sources(workflow, user=KOJI_TASK_OWNER):
             dest_filename="remote-source-pip.tar.gz",
         )
         .and_return(mock_cachito_tarball(expected_dowload_path(workflow, "pip")))
-        .ordered()
     )
 
     (
@@ -418,7 +412,6 @@ def mock_cachito_api_multiple_remote_sources(workflow, user=KOJI_TASK_OWNER):
         .should_receive("get_request_env_vars")
         .with_args(SECOND_CACHITO_SOURCE_REQUEST["id"])
         .and_return(SECOND_CACHITO_ENV_VARS_JSON)
-        .ordered()
     )
 
     (
@@ -426,7 +419,6 @@ def mock_cachito_api_multiple_remote_sources(workflow, user=KOJI_TASK_OWNER):
         .should_receive("get_request_config_files")
         .with_args(SECOND_CACHITO_SOURCE_REQUEST["id"])
         .and_return(SECOND_CACHITO_CONFIG_FILES)
-        .ordered()
     )
 
     (
@@ -965,6 +957,9 @@ def run_plugin_with_args(workflow, dependency_replacements=None, expect_error=No
     results = runner.run()[ResolveRemoteSourcePlugin.key]
 
     if expect_result:
+        for result in results:
+            timings = result.pop("timings")
+            assert set(timings) == {"wait", "download"}
         assert results == expected_plugin_results
 
     return results
@@ -25,7 +25,7 @@ from atomic_reactor.plugins.check_and_set_platforms import CheckAndSetPlatformsP
 from atomic_reactor.plugins.flatpak_create_oci import FlatpakCreateOciPlugin
 from atomic_reactor.plugins.tag_and_push import TagAndPushPlugin
 from atomic_reactor.plugins.fetch_sources import FetchSourcesPlugin
-from atomic_reactor.utils import retries
+from atomic_reactor.utils import digest_ledger, retries
 from tests.constants import (LOCALHOST_REGISTRY, TEST_IMAGE, TEST_IMAGE_NAME, MOCK,
                              DOCKER0_REGISTRY)
 from tests.mock_env import MockEnv
@@ -225,7 +225,8 @@ def test_tag_and_push_plugin(
             # we only test this when mocking docker because we don't expect
             # running actual docker against v2 registry
             if missing_v2:
-                assert "Retrying push because V2 schema 2" in caplog.text
+                assert "V2 schema 2 manifest latest of" in caplog.text
+                assert "not found in the registry" in caplog.text
 
 
 @pytest.mark.parametrize(("is_source_build", "v2s2", "unsupported_image_type"), [
@@ -324,10 +325,8 @@ def test_tag_and_push_plugin_oci(workflow, monkeypatch, is_source_build, v2s2,
     flexmock(random).should_receive('randrange').and_return(sources_random_number)
     flexmock(osbs.utils).should_receive('utcnow').and_return(sources_timestamp)
 
-    if is_source_build:
-        media_type = 'application/vnd.docker.distribution.manifest.v2+json'
-    else:
-        media_type = 'application/vnd.oci.image.manifest.v1+json'
+    # flatpaks are pushed with --format=v2s2
+    media_type = 'application/vnd.docker.distribution.manifest.v2+json'
     ref_name = "app/org.gnome.eog/x86_64/master"
 
     if not is_source_build:
@@ -416,6 +415,7 @@ def test_tag_and_push_plugin_oci(workflow, monkeypatch, is_source_build, v2s2,
     (flexmock(requests.Session)
         .should_receive('request')
         .replace_with(custom_get))
+    flexmock(time).should_receive('sleep')
 
     if fail_push or unsupported_image_type or (is_source_build and not v2s2):
         with pytest.raises(PluginFailedException):
@@ -435,6 +435,93 @@ def test_tag_and_push_plugin_oci(workflow, monkeypatch, is_source_build, v2s2,
         assert wf_data.annotations['repositories'] == repos_annotations
 
 
+def flatpak_workflow(workflow, platforms):
+    workflow.user_params['flatpak'] = True
+    workflow.data.tag_conf.add_unique_image(f'{LOCALHOST_REGISTRY}/{TEST_IMAGE}')
+    workflow.build_dir.init_build_dirs(platforms, workflow.source)
+
+    flatpak_create_oci_result: Dict[str, Any] = {}
+    for current_platform in platforms:
+        metadata = deepcopy(IMAGE_METADATA_OCI)
+        metadata['ref_name'] = f'app/org.gnome.eog/{current_platform}/master'
+        flatpak_create_oci_result[current_platform] = metadata
+
+    return (MockEnv(workflow)
+            .for_plugin(TagAndPushPlugin.key)
+            .set_reactor_config({'registry': {'url': LOCALHOST_REGISTRY, 'insecure': True}})
+            .set_plugin_result(CheckAndSetPlatformsPlugin.key, platforms)
+            .set_plugin_result(FlatpakCreateOciPlugin.key, flatpak_create_oci_result))
+
+
+def test_tag_and_push_plugin_digestfile(workflow, caplog):
+    platforms = ['x86_64', 'ppc64le']
+    env = flatpak_workflow(workflow, platforms)
+    pushed = []
+
+    def run_skopeo(args):
+        digest_file = next(arg.split('=', 1)[1] for arg in args
+                           if arg.startswith('--digestfile='))
+        with open(digest_file, 'w') as f:
+            f.write(DIGEST_V2 + '\n')
+        pushed.append(args[-1])
+        return ''
+
+    flexmock(retries).should_receive('run_cmd').replace_with(run_skopeo)
+    # the digest written by skopeo is used, the registry is not queried
+    flexmock(requests.Session).should_receive('request').never()
+
+    results = env.create_runner().run()
+
+    pushed_images = results[TagAndPushPlugin.key]['pushed_images']
+    assert sorted(pushed) == sorted(f'docker://{image.to_str()}' for image in pushed_images)
+    assert workflow.data.digest_ledger == {
+        image.to_str(): {'application/vnd.docker.distribution.manifest.v2+json': DIGEST_V2}
+        for image in pushed_images
+    }
+    assert 'not found in the registry' not in caplog.text
+
+
+def test_tag_and_push_plugin_no_digestfile(workflow, caplog):
+    platforms = ['x86_64', 'ppc64le']
+    env = flatpak_workflow(workflow, platforms)
+    flexmock(retries).should_receive('run_cmd').and_return('')
+
+    manifest_url = f'https://{LOCALHOST_REGISTRY}/v2/{TEST_IMAGE}/manifests/latest'
+    manifest_response = requests.Response()
+    (flexmock(manifest_response,
+              status_code=200,
+              headers={
+                'Content-Type': 'application/vnd.docker.distribution.manifest.v2+json',
+                'Docker-Content-Digest': DIGEST_V2
+              }))
+    manifest_unknown_response = requests.Response()
+    flexmock(manifest_unknown_response, status_code=404)
+    lookups = []
+
+    def custom_get(method, url, headers, **kwargs):
+        # without a digest, the manifest is looked up by tag, it is found on the second lookup
+        assert url.startswith(manifest_url)
+        lookups.append(url)
+        if len(lookups) <= len(platforms):
+            return manifest_unknown_response
+        return manifest_response
+
+    mock_get_retry_session()
+    flexmock(requests.Session).should_receive('request').replace_with(custom_get)
+    sleeps = []
+    flexmock(time).should_receive('sleep').replace_with(sleeps.append)
+
+    results = env.create_runner().run()
+
+    # each image is pushed once, the missing manifest is looked up again
+    assert len(lookups) == 2 * len(platforms)
+    assert len(sleeps) == len(platforms)
+    assert all(0.5 <= sleep_time <= 1 for sleep_time in sleeps)
+    assert 'not found in the registry' not in caplog.text
+    for image in results[TagAndPushPlugin.key]['pushed_images']:
+        assert digest_ledger.get_recorded_digests(workflow.data, image) == {'v2': DIGEST_V2}
+
+
 def test_skip_plugin(workflow, caplog):
     reactor_config = {
         'registry': {
@@ -11,8 +11,10 @@ from atomic_reactor.source import GitSource
 from flexmock import flexmock
 
 from atomic_reactor import source
+from atomic_reactor.config import Configuration
 from atomic_reactor.tasks import common
 from atomic_reactor.tasks import clone
+from atomic_reactor.utils.git_mirror import GitMirrorCache
 from tests.constants import DOCKERFILE_GIT
 
 
@@ -44,3 +46,32 @@ class TestCloneTask:
 
         clone_task = clone.CloneTask(params)
         clone_task.execute()
+
+    def test_clone_execute_with_mirror_cache(self, tmpdir):
+        params = common.TaskParams(
+            build_dir=str(tmpdir),
+            context_dir="/context",
+            config_file="config.yaml",
+            namespace="test-namespace",
+            pipeline_run_name='test-pipeline-run',
+            user_params={'user': 'foo', 'git_uri': DOCKERFILE_GIT},
+            task_result=None,
+        )
+        cache_path = os.path.join(str(tmpdir), 'git-cache')
+        config = Configuration(raw_config={
+            'version': 1,
+            'git_mirror_cache': {'path': cache_path},
+        })
+        flexmock(clone.CloneTask).should_receive('load_config').and_return(config)
+
+        def check_clone(uri, target_dir, commit, branch, depth):
+            assert uri == DOCKERFILE_GIT
+            assert target_dir == os.path.join(str(tmpdir), 'docker-hello-world')
+            os.mkdir(target_dir)
+
+        (flexmock(GitMirrorCache)
+            .should_receive('clone')
+            .replace_with(check_clone)
+            .once())
+
+        clone.CloneTask(params).execute()
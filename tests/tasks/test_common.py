@@ -216,6 +216,19 @@ class TestTask:
 
         task.run()
 
+    def test_run_shares_digest_cache(self, params, tmp_path):
+        cached_file = tmp_path / 'file'
+        cached_file.write_bytes(b'abc')
+
+        class SomeTask(common.Task):
+            def execute(self):
+                util.digest_cache.update_file(cached_file, {'md5sum': 'checksum'})
+
+        SomeTask(params).run()
+
+        cache = util.DigestCache(dirs.ContextDir(tmp_path).digest_cache)
+        assert cache.get(cached_file.stat()) == {'md5sum': 'checksum'}
+
     @pytest.mark.parametrize("autosave", [True, False])
     def test_autosave_context_data(self, autosave, params):
 
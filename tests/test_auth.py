@@ -5,13 +5,16 @@ All rights reserved.
 This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
-from atomic_reactor.auth import HTTPBearerAuth, HTTPRegistryAuth, HTTPBasicAuthWithB64
+from atomic_reactor.auth import (HTTPBearerAuth, HTTPRegistryAuth, HTTPBasicAuthWithB64,
+                                 token_store)
+from flexmock import flexmock
 from requests.auth import HTTPBasicAuth
 import base64
 import json
 import pytest
 import requests
 import responses
+import time
 
 
 BEARER_TOKEN = 'the-token'
@@ -110,7 +113,6 @@ class TestHTTPBearerAuth(object):
         responses.add(responses.GET, fedora_url, status=200, json='fedora-success-also')
 
         centos_url = 'https://registry.example.com/v2/centos/tags/list'
-        responses.add_callback(responses.GET, centos_url, callback=bearer_unauthorized_callback)
         responses.add(responses.GET, centos_url, status=200, json='centos-success')
         responses.add(responses.GET, centos_url, status=200, json='centos-success-also')
 
@@ -119,10 +121,81 @@ class TestHTTPBearerAuth(object):
         assert requests.get(fedora_url, auth=auth).json() == 'fedora-success'
         assert requests.get(fedora_url, auth=auth).json() == 'fedora-success-also'
 
+        # the challenge of the registry is known, the token is fetched before the request
         assert requests.get(centos_url, auth=auth).json() == 'centos-success'
         assert requests.get(centos_url, auth=auth).json() == 'centos-success-also'
 
-        assert len(responses.calls) == 8
+        assert len(responses.calls) == 7
+        assert token_store.round_trips_avoided == 1
+        assert token_store.fetches_avoided == 0
+
+    @responses.activate
+    @pytest.mark.parametrize(('credentials', 'shared'), (
+        ({}, True),
+        ({'username': 'spam', 'password': 'bacon'}, False),
+        ({'auth_b64': b64encode('spam', 'eggs')}, False),
+    ))
+    def test_token_shared_between_instances(self, credentials, shared):
+        responses.add(responses.GET, BEARER_REALM_URL + '?scope=repository:fedora:pull',
+                      json={'token': BEARER_TOKEN}, match_querystring=True)
+
+        url = 'https://registry.example.com/v2/fedora/tags/list'
+        responses.add_callback(responses.GET, url, callback=bearer_unauthorized_callback)
+        responses.add_callback(responses.GET, url, callback=bearer_success_callback)
+
+        assert requests.get(url, auth=HTTPBearerAuth()).json() == 'success'
+        assert len(responses.calls) == 3
+
+        assert requests.get(url, auth=HTTPBearerAuth(**credentials)).json() == 'success'
+        # no 401 round trip, the token is only fetched for other credentials
+        assert len(responses.calls) == (4 if shared else 5)
+        assert token_store.round_trips_avoided == 1
+        assert token_store.fetches_avoided == (1 if shared else 0)
+
+    @responses.activate
+    def test_token_expiry(self):
+        realm_url = BEARER_REALM_URL + '?scope=repository:fedora:pull'
+        responses.add(responses.GET, realm_url, json={'token': 'old', 'expires_in': 300},
+                      match_querystring=True)
+        responses.add(responses.GET, realm_url, json={'token': BEARER_TOKEN, 'expires_in': 300},
+                      match_querystring=True)
+
+        url = 'https://registry.example.com/v2/fedora/tags/list'
+        responses.add_callback(responses.GET, url, callback=bearer_unauthorized_callback)
+        responses.add(responses.GET, url, status=200, json='success')
+        responses.add_callback(responses.GET, url, callback=bearer_success_callback)
+
+        now = time.monotonic()
+        auth = HTTPBearerAuth()
+        assert requests.get(url, auth=auth).json() == 'success'
+
+        # the token expires in 300 seconds, it is refreshed 10 seconds earlier
+        flexmock(time).should_receive('monotonic').and_return(now + 291)
+        assert requests.get(url, auth=auth).json() == 'success'
+        assert [call.request.url.split('?')[0] for call in responses.calls] == [
+            url, BEARER_REALM_URL, url, BEARER_REALM_URL, url,
+        ]
+
+    @responses.activate
+    def test_rejected_token_refreshed(self):
+        realm_url = BEARER_REALM_URL + '?scope=repository:fedora:pull'
+        responses.add(responses.GET, realm_url, json={'token': 'revoked'},
+                      match_querystring=True)
+        responses.add(responses.GET, realm_url, json={'token': BEARER_TOKEN},
+                      match_querystring=True)
+
+        url = 'https://registry.example.com/v2/fedora/tags/list'
+        responses.add_callback(responses.GET, url, callback=bearer_unauthorized_callback)
+        responses.add(responses.GET, url, status=200, json='success')
+        responses.add_callback(responses.GET, url, callback=bearer_unauthorized_callback)
+        responses.add_callback(responses.GET, url, callback=bearer_success_callback)
+
+        auth = HTTPBearerAuth()
+        assert requests.get(url, auth=auth).json() == 'success'
+        assert requests.get(url, auth=auth).json() == 'success'
+        assert [call.request.url.split('?')[0] for call in responses.calls] == [
+            url, BEARER_REALM_URL, url, url, BEARER_REALM_URL, url,
+        ]
 
     @responses.activate
     @pytest.mark.parametrize(('partial_url', 'repo'), (
@@ -1482,6 +1482,37 @@ operator_manifests:
 
         assert conf.remote_sources_default_version == expected
 
+    @pytest.mark.parametrize('param', [
+        ("", None),  # default
+        ("git_mirror_cache: {path: /var/cache/git}", {'path': '/var/cache/git', 'max_size': 0}),
+        ("git_mirror_cache: {path: /var/cache/git, max_size: 1024}",
+         {'path': '/var/cache/git', 'max_size': 1024}),
+    ])
+    def test_git_mirror_cache(self, param):
+        config, expected = param
+        config += "\n" + REQUIRED_CONFIG
+
+        config_json = read_yaml(config, 'schemas/config.json')
+        conf = Configuration(raw_config=config_json)
+
+        assert conf.git_mirror_cache == expected
+
+    @pytest.mark.parametrize('param', [
+        ("", None),  # default
+        ("artifacts_cache: {path: /var/cache/artifacts}",
+         {'path': '/var/cache/artifacts', 'max_size': 0}),
+        ("artifacts_cache: {path: /var/cache/artifacts, max_size: 1024}",
+         {'path': '/var/cache/artifacts', 'max_size': 1024}),
+    ])
+    def test_artifacts_cache(self, param):
+        config, expected = param
+        config += "\n" + REQUIRED_CONFIG
+
+        config_json = read_yaml(config, 'schemas/config.json')
+        conf = Configuration(raw_config=config_json)
+
+        assert conf.artifacts_cache == expected
+
 
 def test_ensure_odcsconfig_does_not_modify_original_signing_intents():
     signing_intents = [{'name': 'release', 'keys': ['R123', 'R234']}]
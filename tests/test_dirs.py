@@ -20,6 +20,7 @@ from atomic_reactor.dirs import (
     BuildDir,
     BuildDirIsNotInitialized,
     ContextDir,
+    DockerfileCacheStats,
     DockerfileNotExist,
     FileCreationFunc,
     ImageInspectionData,
@@ -100,6 +101,77 @@ def test_builddir_get_parsed_dockerfile_with_parent_env(
     assert expected_envs == parsed_df.envs
 
 
+def test_builddir_dockerfile_is_cached(tmpdir):
+    dir_path = Path(tmpdir)
+    dir_path.joinpath(DOCKERFILE_FILENAME).write_text("FROM fedora:35\nLABEL a=1\n", "utf-8")
+    build_dir = BuildDir(dir_path, "x86_64")
+
+    dockerfile = build_dir.dockerfile
+    assert dockerfile is build_dir.dockerfile
+    assert dockerfile.baseimage == "fedora:35"
+    assert dockerfile.labels == {"a": "1"}
+    assert build_dir.dockerfile_stats == DockerfileCacheStats(parses=1, hits=1)
+
+
+def test_builddir_dockerfile_cache_invalidated_by_external_change(tmpdir):
+    dir_path = Path(tmpdir)
+    dockerfile_path = dir_path.joinpath(DOCKERFILE_FILENAME)
+    dockerfile_path.write_text("FROM fedora:35\n", "utf-8")
+    build_dir = BuildDir(dir_path, "x86_64")
+    assert build_dir.dockerfile.baseimage == "fedora:35"
+
+    # same size, written right after the content was read
+    dockerfile_path.write_text("FROM fedora:36\n", "utf-8")
+    assert build_dir.dockerfile.baseimage == "fedora:36"
+
+    dockerfile_path.write_text("FROM fedora:36\nLABEL a=1\n", "utf-8")
+    assert build_dir.dockerfile.labels == {"a": "1"}
+    assert build_dir.dockerfile_stats == DockerfileCacheStats(parses=3, hits=0)
+
+
+def test_builddir_dockerfile_cache_consistent_with_writes(tmpdir):
+    dir_path = Path(tmpdir)
+    dockerfile_path = dir_path.joinpath(DOCKERFILE_FILENAME)
+    dockerfile_path.write_text("FROM fedora:35\n", "utf-8")
+    build_dir = BuildDir(dir_path, "x86_64")
+
+    build_dir.dockerfile.labels["a"] = "1"
+    assert dockerfile_path.read_text("utf-8") == "FROM fedora:35\nLABEL a=1\n"
+    assert build_dir.dockerfile.labels == {"a": "1"}
+
+    build_dir.dockerfile.lines = ["FROM fedora:36\n"]
+    assert build_dir.dockerfile.baseimage == "fedora:36"
+
+    # parsers with the parent environment see the changes as well
+    parent_inspect = {"Config": {"Env": ["HOME=/home"]}}
+    dockerfile = build_dir.dockerfile_with_parent_env(parent_inspect)
+    assert dockerfile is build_dir.dockerfile_with_parent_env(parent_inspect)
+    assert dockerfile is not build_dir.dockerfile
+    build_dir.dockerfile.content = "FROM fedora:37\nENV PATH=$HOME\n"
+    assert dockerfile.envs == {"PATH": "/home"}
+
+
+def test_builddir_dockerfile_created_later(tmpdir):
+    dir_path = Path(tmpdir)
+    build_dir = BuildDir(dir_path, "x86_64")
+    dockerfile = build_dir.dockerfile
+    with pytest.raises(IOError):
+        print(dockerfile.content)
+
+    dockerfile.content = "FROM fedora:35\n"
+    assert dir_path.joinpath(DOCKERFILE_FILENAME).read_text("utf-8") == "FROM fedora:35\n"
+    assert build_dir.dockerfile.baseimage == "fedora:35"
+
+
+def test_builddir_dockerfile_structure_is_a_copy(tmpdir):
+    dir_path = Path(tmpdir)
+    dir_path.joinpath(DOCKERFILE_FILENAME).write_text("FROM fedora:35\n", "utf-8")
+    build_dir = BuildDir(dir_path, "x86_64")
+
+    build_dir.dockerfile.structure[0]["value"] = "changed"
+    assert build_dir.dockerfile.structure[0]["value"] == "fedora:35"
+
+
 def test_rootbuilddir_copy_sources(build_dir, mock_source):
     root_path = build_dir / "root_builddir"
     root_path.mkdir()
@@ -176,6 +248,22 @@ def test_rootbuilddir_get_any_platform(build_dir, mock_source):
     assert build_dir_1.platform == build_dir_2.platform
 
 
+def test_rootbuilddir_platform_dir_is_reused(build_dir, mock_source):
+    root = RootBuildDir(build_dir)
+    root.init_build_dirs(["x86_64", "s390x"], mock_source)
+    assert root.platform_dir("x86_64") is root.platform_dir("x86_64")
+    assert root.platform_dir("s390x") is not root.platform_dir("x86_64")
+    assert root.any_platform.dockerfile_stats is root.dockerfile_stats
+
+    def parse(build_dir: BuildDir):
+        build_dir.dockerfile_path.write_text("FROM fedora:35\n", "utf-8")
+        return build_dir.dockerfile.baseimage
+
+    root.for_each_platform(parse)
+    root.for_each_platform(lambda build_dir: build_dir.dockerfile.baseimage)
+    assert root.dockerfile_stats == DockerfileCacheStats(parses=2, hits=2)
+
+
 def test_rootbuilddir_get_any_platform_fails_if_build_dirs_not_inited(build_dir):
     with pytest.raises(BuildDirIsNotInitialized, match="not initialized yet"):
         print(RootBuildDir(build_dir).any_platform)
@@ -16,7 +16,7 @@ import time
 import pytest
 from flexmock import flexmock
 
-from atomic_reactor.util import get_retrying_requests_session
+from atomic_reactor.util import digest_cache, get_retrying_requests_session
 from atomic_reactor.download import download_url
 from atomic_reactor.constants import CACHITO_ALG_STR
 
@@ -35,6 +35,16 @@ class TestDownloadUrl(object):
         with open(result, 'rb') as f:
             assert f.read() == content
 
+    @responses.activate
+    def test_checksums_cached(self):
+        url = 'https://example.com/path/file'
+        dest_dir = tempfile.mkdtemp()
+        md5sum = '900150983cd24fb0d6963f7d28e17f72'
+        responses.add(responses.GET, url, body=b'abc')
+        result = download_url(url, dest_dir, expected_checksums={'md5': md5sum})
+
+        assert digest_cache.get(os.stat(result)) == {'md5sum': md5sum}
+
     @responses.activate
     def test_cachito_download_digest_matches(self):
         url = 'https://example.com/path/file'
@@ -431,15 +431,34 @@ def test_fs_watcher_update(monkeypatch):
     assert data["mb_free"] == 99
 
 
-def test_fs_watcher(monkeypatch):
-    w = FSWatcher()
+def test_fs_watcher(monkeypatch, tmp_path):
+    w = FSWatcher(paths=["/", str(tmp_path)])
     monkeypatch.setattr(time, "sleep", lambda x: x)  # don't waste a second of test time
+    assert w.get_resource_data() is None
+    w.set_plugin("plugin_a")
     w.start()
     w.finish()
-    w.join(0.1)  # timeout if thread still running
+    w.join(5)  # timeout if thread still running
     assert not w.is_alive()
     assert "mb_used" in w.get_usage_data()
 
+    usage = w.get_resource_data()
+    assert usage["mounts"][0] == "/"
+    assert usage["sample_count"] >= 1
+    assert all(sample[1] == "plugin_a" for sample in usage["samples"])
+    assert usage["peaks"]["rss_mb"][1] == "plugin_a"
+
+
+def test_workflow_saves_resource_usage(workflow: DockerBuildWorkflow):
+    workflow.build_container_image()
+
+    [usage] = workflow.data.resource_usage
+    assert usage["sample_count"] >= 1
+    # the workflow data stays valid
+    workflow.data.save(workflow.context_dir)
+    loaded = ImageBuildWorkflowData.load_from_dir(workflow.context_dir)
+    assert loaded.resource_usage == [usage]
+
 
 class TestTagConf:
     """Test class TagConf"""
@@ -626,6 +645,12 @@ class TestWorkflowData:
                 {
                     "local_filename": "/path/to/dir1/remote-source.tar.gz",
                     "dest_filename": "remote-source.tar.gz",
+                    "metadata": {
+                        "filename": "remote-source.tar.gz",
+                        "filesize": 1024,
+                        "checksum": "00000000000000000000000000000000",
+                        "checksum_type": "md5",
+                    },
                 },
             ]
         )
@@ -648,3 +673,4 @@ class TestWorkflowData:
         assert wf_data.dockerfile_images == loaded_wf_data.dockerfile_images
         assert wf_data.tag_conf == loaded_wf_data.tag_conf
         assert wf_data.plugins_results == loaded_wf_data.plugins_results
+        assert wf_data.koji_upload_files == loaded_wf_data.koji_upload_files
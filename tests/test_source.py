@@ -11,6 +11,7 @@ from atomic_reactor.source import (
     PathSource,
     DummySource,
 )
+from atomic_reactor.utils.git_mirror import GitMirrorCache
 from osbs.exceptions import OsbsValidationException
 
 
@@ -35,6 +36,15 @@ class TestGitSource(object):
 
         assert len(gs.commit_id) == 40  # current git hashes are this long
 
+    def test_checks_out_repo_through_mirror(self, local_fake_repo, tmp_path):
+        gs = GitSource('git', local_fake_repo, provider_params={'git_commit_depth': 1})
+        gs.mirror_cache = GitMirrorCache(tmp_path / 'cache')
+        gs.get()
+
+        assert os.path.exists(os.path.join(gs.path, '.git'))
+        assert len(list((tmp_path / 'cache').glob('*.git'))) == 1
+        assert gs.get_vcs_info().vcs_url == local_fake_repo
+
     @pytest.mark.parametrize(
         'method_name', ['config', 'get_build_file_path', 'commit_id', 'get_vcs_info']
     )
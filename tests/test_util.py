@@ -6,6 +6,7 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
+import hashlib
 import io
 import json
 import logging
@@ -37,7 +38,8 @@ from atomic_reactor.constants import (IMAGE_TYPE_DOCKER_ARCHIVE, IMAGE_TYPE_OCI,
                                       )
 from atomic_reactor.util import (figure_out_build_file,
                                  render_yum_repo, process_substitutions,
-                                 get_checksums, print_version_of_tools,
+                                 get_checksums, DigestCache, digest_cache,
+                                 print_version_of_tools,
                                  get_version_of_tools,
                                  human_size, CommandResult,
                                  registry_hostname, Dockercfg, RegistrySession,
@@ -70,7 +72,7 @@ from atomic_reactor.util import (figure_out_build_file,
 from tests.constants import MOCK, REACTOR_CONFIG_MAP
 import atomic_reactor.util
 from osbs.utils import ImageName
-from osbs.exceptions import OsbsValidationException
+from osbs.exceptions import OsbsException, OsbsValidationException
 
 if MOCK:
     from tests.retry_mock import mock_get_retry_session
@@ -210,6 +212,60 @@ def test_get_hexdigests(tmpdir, content, algorithms, expected, write_to_file, sh
         assert checksums == expected
 
 
+def test_get_checksums_cached(tmp_path):
+    path = tmp_path / 'file'
+    path.write_bytes(b'abc')
+    md5sum = '900150983cd24fb0d6963f7d28e17f72'
+    sha256sum = 'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad'
+
+    assert get_checksums(str(path), ['md5']) == {'md5sum': md5sum}
+    assert digest_cache.get(path.stat()) == {'md5sum': md5sum}
+
+    computed = []
+    compute_checksums = atomic_reactor.util._compute_checksums
+
+    def check_compute_checksums(fd, hash_objs):
+        computed.extend(hash_obj.name for hash_obj in hash_objs)
+        compute_checksums(fd, hash_objs)
+
+    (flexmock(atomic_reactor.util)
+     .should_receive('_compute_checksums')
+     .replace_with(check_compute_checksums))
+
+    # only the missing checksum is computed
+    assert get_checksums(str(path), ['md5', 'sha256']) == {'md5sum': md5sum,
+                                                           'sha256sum': sha256sum}
+    assert computed == ['sha256']
+
+    assert get_checksums(str(path), ['sha256', 'md5']) == {'sha256sum': sha256sum,
+                                                           'md5sum': md5sum}
+    assert computed == ['sha256']
+
+
+def test_get_checksums_modified_file(tmp_path):
+    path = tmp_path / 'file'
+    path.write_bytes(b'abc')
+    get_checksums(str(path), ['md5'])
+
+    path.write_bytes(b'abcd')
+    assert get_checksums(str(path), ['md5']) == {'md5sum': 'e2fc714c4727ee9395f324cd2e7f331f'}
+
+
+def test_digest_cache_persistent(tmp_path):
+    cache_path = tmp_path / 'digest_cache.jsonl'
+    path = tmp_path / 'file'
+    path.write_bytes(b'abc')
+
+    cache = DigestCache(cache_path)
+    cache.update_file(path, {'md5sum': 'md5'})
+    cache.update_file(path, {'sha256sum': 'sha256'})
+    # a line cut off by a killed process is skipped
+    with open(cache_path, 'a') as f:
+        f.write('{"key": ')
+
+    assert DigestCache(cache_path).get(path.stat()) == {'md5sum': 'md5', 'sha256sum': 'sha256'}
+
+
 @pytest.mark.parametrize('image_type, expected', [
     (IMAGE_TYPE_DOCKER_ARCHIVE, 'docker-image-XXX.x86_64.tar.gz'),
     (IMAGE_TYPE_OCI_TAR, 'oci-image-XXX.x86_64.tar.gz'),
@@ -1076,25 +1132,61 @@ def test_validate_with_schema(data, schema, valid):
 LogEntry = namedtuple('LogEntry', ['platform', 'line'])
 
 
+class FakeOSBS(object):
+    """Serve the logs of the task runs of a pipeline run, given by pipeline task name"""
+
+    def __init__(self, logs):
+        self.os = self
+        self.logs = logs
+        self.task_run_logs = {}
+        # names of the task runs, as their logs are fetched
+        self.fetched = []
+
+    def get_build(self, pipeline_run_name):
+        child_references = []
+        for name, containers in self.logs.items():
+            task_run_name = f'{pipeline_run_name}-{name}'
+            self.task_run_logs[task_run_name] = containers
+            child_references.append(
+                {'kind': 'TaskRun', 'name': task_run_name, 'pipelineTaskName': name}
+            )
+        return {'status': {'childReferences': child_references}}
+
+
+class FakeTaskRun(object):
+    def __init__(self, os, task_run_name):
+        self.osbs = os
+        self.task_run_name = task_run_name
+
+    def get_logs(self):
+        self.osbs.fetched.append(self.task_run_name)
+        logs = self.osbs.task_run_logs[self.task_run_name]
+        if isinstance(logs, Exception):
+            raise logs
+        return logs
+
+
+@pytest.fixture
+def fake_task_run(monkeypatch):
+    monkeypatch.setattr(atomic_reactor.util, 'TaskRun', FakeTaskRun)
+
+
 @pytest.mark.parametrize('source_build', [True, False])
-def test_osbs_logs_get_log_files(tmpdir, source_build):
-    class OSBS(object):
-        def get_build_logs(self, pipeline_run_name):
-            if not source_build:
-                logs = {
-                    "taskRun1": {"containerA": "log message A", "containerB": "log message B"},
-                    "taskRun2": {"containerC": "log message C"},
-                    "taskRun3-s390x": {"containerD": "log message D"},
-                    "taskRun4-ppc64le": {"containerE": "log message E"},
-                    "taskRun5-aarch64": {"containerF": "log message F"},
-                    "taskRun6-x86-64": {"containerG": "log message G"},
-                }
-            else:
-                logs = {
-                    "taskRun1": {"containerA": "log message A", "containerB": "log message B"},
-                    "taskRun2": {"containerC": "log message C"},
-                }
-            return logs
+def test_osbs_logs_get_log_files(tmpdir, fake_task_run, source_build):
+    if not source_build:
+        logs = {
+            "taskRun1": {"containerA": "log message A", "containerB": "log message B"},
+            "taskRun2": {"containerC": "log message C"},
+            "taskRun3-s390x": {"containerD": "log message D"},
+            "taskRun4-ppc64le": {"containerE": "log message E"},
+            "taskRun5-aarch64": {"containerF": "log message F"},
+            "taskRun6-x86-64": {"containerG": "log message G"},
+        }
+    else:
+        logs = {
+            "taskRun1": {"containerA": "log message A", "containerB": "log message B"},
+            "taskRun2": {"containerC": "log message C"},
+        }
 
     osbs_logfiles_metadata = [{'checksum': '1b6c0f6e47915b0d0d12cc0fc863750a',
                                'checksum_type': 'md5',
@@ -1139,7 +1231,7 @@ def test_osbs_logs_get_log_files(tmpdir, source_build):
         osbs_logs = OSBSLogs(logger, ['x86_64', 'ppc64le', 'aarch64', 's390x'])
     else:
         osbs_logs = OSBSLogs(logger, [])
-    osbs = OSBS()
+    osbs = FakeOSBS(logs)
     outputs = osbs_logs.get_log_files(osbs, 'test-pipeline-run')
     if not source_build:
         for index, output in enumerate(outputs):
@@ -1150,14 +1242,11 @@ def test_osbs_logs_get_log_files(tmpdir, source_build):
         assert output.metadata == osbs_logfiles_metadata[0]
 
 
-def test_osbs_logs_get_log_files_remote_source():
-    class OSBS(object):
-        def get_build_logs(self, pipeline_run_name):
-            logs = {
-                "taskRun1": {"containerA": "log message A", "containerB": "log message B"},
-                "binary-container-hermeto": {"containerH": "log message H"},
-            }
-            return logs
+def test_osbs_logs_get_log_files_remote_source(fake_task_run):
+    logs = {
+        "taskRun1": {"containerA": "log message A", "containerB": "log message B"},
+        "binary-container-hermeto": {"containerH": "log message H"},
+    }
 
     osbs_logfiles_metadata = [{'checksum': '5e65a3a57cb8240f3c1656bdbd533be4',
                                'checksum_type': 'md5',
@@ -1178,12 +1267,84 @@ def test_osbs_logs_get_log_files_remote_source():
     logger = flexmock()
     flexmock(logger).should_receive('error')
     osbs_logs = OSBSLogs(logger, [])
-    osbs = OSBS()
+    osbs = FakeOSBS(logs)
     outputs = osbs_logs.get_log_files(osbs, 'test-pipeline-run')
     for index, output in enumerate(outputs):
         assert output.metadata == osbs_logfiles_metadata[index]
 
 
+def test_osbs_logs_get_log_files_chunked(monkeypatch, fake_task_run):
+    long_log = 'x' * 25 + 'é' * 10
+    osbs = FakeOSBS({
+        "taskRun1": {"containerA": "log message A",
+                     "containerB": long_log},
+        "taskRun2-x86-64": {"containerC": ""},
+    })
+
+    # small chunks, and the checksums are computed while writing the logs
+    monkeypatch.setattr(OSBSLogs, 'LOG_CHUNK_SIZE', 4)
+    flexmock(atomic_reactor.util).should_receive('get_checksums').never()
+
+    logger = flexmock()
+    osbs_logs = OSBSLogs(logger, ['x86_64'])
+    outputs = osbs_logs.get_log_files(osbs, 'test-pipeline-run')
+
+    expected_contents = [
+        ('osbs-build.log', 'log message A\n{}\n'.format(long_log).encode('utf-8')),
+        ('x86_64.log', b'\n'),
+    ]
+    assert len(outputs) == len(expected_contents)
+    for output, (filename, content) in zip(outputs, expected_contents):
+        with open(output.filename, 'rb') as f:
+            assert f.read() == content
+        assert output.metadata == {'checksum': hashlib.md5(content).hexdigest(),
+                                   'checksum_type': 'md5',
+                                   'filename': filename,
+                                   'filesize': len(content),
+                                   'type': 'log',
+                                   'arch': 'noarch'}
+
+
+def test_osbs_logs_get_log_files_per_task_run(fake_task_run):
+    osbs = FakeOSBS({
+        "taskRun1": {"containerA": "log message A"},
+        "taskRun2": OsbsException('pod not found'),
+        "taskRun3-x86-64": {"containerB": "log message B"},
+    })
+    written = []
+
+    def write_log(log_files, log):
+        # the logs of a task run are fetched only once the previous ones are written
+        written.append((log, list(osbs.fetched)))
+
+    logger = flexmock()
+    (flexmock(logger)
+     .should_receive('error')
+     .with_args('unable to get logs of task run %s: %s',
+                'test-pipeline-run-taskRun2', OsbsException)
+     .once())
+    osbs_logs = OSBSLogs(logger, ['x86_64'])
+    flexmock(osbs_logs).should_receive('_write_log').replace_with(write_log)
+
+    outputs = osbs_logs.get_log_files(osbs, 'test-pipeline-run')
+
+    assert written == [
+        ('log message A', ['test-pipeline-run-taskRun1']),
+        ('log message B', ['test-pipeline-run-taskRun1', 'test-pipeline-run-taskRun2',
+                           'test-pipeline-run-taskRun3-x86-64']),
+    ]
+    assert [output.metadata['filename'] for output in outputs] == ['osbs-build.log', 'x86_64.log']
+
+
+def test_osbs_logs_get_log_files_osbs_fail():
+    osbs = flexmock(os=None)
+    osbs.should_receive('get_build').and_raise(OsbsException('not found'))
+    logger = flexmock()
+    logger.should_receive('error').with_args('unable to get build logs: %s', OsbsException).once()
+
+    assert OSBSLogs(logger, []).get_log_files(osbs, 'test-pipeline-run') == []
+
+
 @pytest.mark.parametrize('raise_error', [
     HTTPError,
     RetryError,
@@ -10,6 +10,8 @@ of the BSD license. See the LICENSE file for details.
 import requests
 import uuid
 
+from flexmock import flexmock
+
 
 def add_koji_map_in_workflow(workflow, hub_url, root_url=None, reserve_build=None,
                              delegate_task=None, delegated_priority=None,
@@ -49,6 +51,34 @@ def add_koji_map_in_workflow(workflow, hub_url, root_url=None, reserve_build=Non
         koji_map['auth']['krb_keytab_path'] = str(krb_keytab)
 
 
+class MockKojiMulticall(object):
+    """Stand-in for koji.MultiCallSession, forwarding calls to the mocked session"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __getattr__(self, name):
+        method = getattr(self.session, name)
+
+        def call(*args, **kwargs):
+            return flexmock(result=method(*args, **kwargs))
+
+        return call
+
+
+def mock_koji_multicall(session):
+    """Make session.multicall() forward the calls to the (mocked) session methods"""
+    (flexmock(session)
+     .should_receive('multicall')
+     .replace_with(lambda **kwargs: MockKojiMulticall(session)))
+
+
 def uuid_value():
     return uuid.uuid4().hex
 
@@ -0,0 +1,105 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+
+import hashlib
+import os
+
+from atomic_reactor.config import Configuration
+from atomic_reactor.util import digest_cache
+from atomic_reactor.utils.artifact_cache import ArtifactCache
+
+
+def checksums_of(data, *algorithms):
+    return {algorithm: hashlib.new(algorithm, data).hexdigest() for algorithm in algorithms}
+
+
+def test_from_config(tmp_path):
+    conf = Configuration(raw_config={'version': 1})
+    assert ArtifactCache.from_config(conf) is None
+
+    conf = Configuration(raw_config={
+        'version': 1,
+        'artifacts_cache': {'path': str(tmp_path / 'cache'), 'max_size': 1024},
+    })
+    cache = ArtifactCache.from_config(conf)
+    assert cache.path == tmp_path / 'cache'
+    assert cache.path.is_dir()
+    assert cache.max_size == 1024
+
+
+def test_store_and_fetch(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache')
+    artifact = tmp_path / 'artifact.jar'
+    artifact.write_bytes(b'jar')
+    checksums = checksums_of(b'jar', 'md5', 'sha256')
+
+    cache.store(artifact, checksums)
+
+    md5_entry = cache.path / 'md5' / checksums['md5']
+    sha256_entry = cache.path / 'sha256' / checksums['sha256']
+    assert md5_entry.read_bytes() == b'jar'
+    assert os.path.samefile(md5_entry, sha256_entry)
+    # no temporary files are left behind
+    assert sorted(path.name for path in cache.path.iterdir()) == ['md5', 'sha256']
+
+    dest = tmp_path / 'dest.jar'
+    assert cache.fetch(checksums, dest)
+    assert dest.read_bytes() == b'jar'
+    assert not os.path.samefile(dest, md5_entry)
+    assert digest_cache.get(dest.stat())['sha256sum'] == checksums['sha256']
+
+    assert cache.fetch({'md5': checksums['md5']}, tmp_path / 'dest-md5.jar')
+
+
+def test_fetch_miss(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache')
+    dest = tmp_path / 'dest.jar'
+
+    assert not cache.fetch({}, dest)
+    assert not cache.fetch(checksums_of(b'jar', 'md5'), dest)
+
+    artifact = tmp_path / 'artifact.jar'
+    artifact.write_bytes(b'jar')
+    cache.store(artifact, checksums_of(b'jar', 'md5'))
+    other = tmp_path / 'other.jar'
+    other.write_bytes(b'other')
+    cache.store(other, checksums_of(b'other', 'sha256'))
+
+    # the artifact was not verified with sha256
+    assert not cache.fetch(checksums_of(b'jar', 'md5', 'sha256'), dest)
+    # the checksums refer to different artifacts
+    mixed = {**checksums_of(b'jar', 'md5'), **checksums_of(b'other', 'sha256')}
+    assert not cache.fetch(mixed, dest)
+    assert not dest.exists()
+
+
+def test_evict(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache', max_size=250)
+
+    entries = []
+    for i, data in enumerate([b'a' * 100, b'b' * 100, b'c' * 100]):
+        artifact = tmp_path / 'artifact'
+        artifact.write_bytes(data)
+        checksums = checksums_of(data, 'md5', 'sha1')
+        cache.store(artifact, checksums)
+        entry = cache.path / 'md5' / checksums['md5']
+        os.utime(entry, (i, i))
+        entries.append((entry, cache.path / 'sha1' / checksums['sha1']))
+
+    # the cache fits three artifacts only when the newest is stored
+    (oldest_md5, oldest_sha1), (older_md5, older_sha1), (newest_md5, _) = entries
+    assert not oldest_md5.exists()
+    assert not oldest_sha1.exists()
+    assert older_md5.exists()
+    assert older_sha1.exists()
+    assert newest_md5.exists()
+
+    cache.max_size = 150
+    cache.evict()
+    assert not older_md5.exists()
+    assert newest_md5.exists()
@@ -0,0 +1,105 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+
+import pytest
+import requests
+from flexmock import flexmock
+from osbs.utils import ImageName
+
+from atomic_reactor.constants import (MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST,
+                                      MEDIA_TYPE_DOCKER_V2_SCHEMA2)
+from atomic_reactor.inner import ImageBuildWorkflowData
+from atomic_reactor.util import ManifestDigest, RegistryClient
+from atomic_reactor.utils import digest_ledger
+
+REGISTRY = 'registry.example.com'
+IMAGE = ImageName.parse(f'{REGISTRY}/ns/app:1.0')
+OTHER_IMAGE = ImageName.parse(f'{REGISTRY}/ns/app:latest')
+
+
+def test_record_digests():
+    wf_data = ImageBuildWorkflowData()
+
+    digest_ledger.record_digest(wf_data, IMAGE, MEDIA_TYPE_DOCKER_V2_SCHEMA2, 'sha256:v2')
+    digest_ledger.record_digest(wf_data, IMAGE, MEDIA_TYPE_DOCKER_V2_SCHEMA2, None)
+    # the registry did not send the digest of v2_list
+    digest_ledger.record_digests(wf_data, OTHER_IMAGE,
+                                 ManifestDigest(v2='sha256:other', v2_list=True))
+
+    assert wf_data.digest_ledger == {
+        IMAGE.to_str(): {MEDIA_TYPE_DOCKER_V2_SCHEMA2: 'sha256:v2'},
+        OTHER_IMAGE.to_str(): {MEDIA_TYPE_DOCKER_V2_SCHEMA2: 'sha256:other'},
+    }
+    assert digest_ledger.get_recorded_digests(wf_data, IMAGE) == {'v2': 'sha256:v2'}
+    assert digest_ledger.get_recorded_digests(wf_data, IMAGE, versions=('oci',)) == {}
+
+
+def test_lookup_digests():
+    wf_data = ImageBuildWorkflowData()
+    wf_data.digest_ledger = {
+        IMAGE.to_str(): {
+            MEDIA_TYPE_DOCKER_V2_SCHEMA2: 'sha256:v2',
+            MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST: 'sha256:list',
+        },
+    }
+
+    # only the versions which are not recorded are queried
+    (flexmock(RegistryClient)
+     .should_receive('get_manifest_digests')
+     .with_args(image=IMAGE, versions=('v1', 'oci', 'oci_index'), require_digest=False)
+     .and_return(ManifestDigest(v1='sha256:v1'))
+     .once())
+    # nothing is known about OTHER_IMAGE, it is looked up as without the ledger
+    (flexmock(RegistryClient)
+     .should_receive('get_manifest_digests')
+     .with_args(image=OTHER_IMAGE, versions=digest_ledger.ALL_VERSIONS, require_digest=True)
+     .and_return(ManifestDigest(v2='sha256:other'))
+     .once())
+
+    digests = digest_ledger.lookup_digests(wf_data, [IMAGE, OTHER_IMAGE], REGISTRY,
+                                           consumer='store_metadata')
+
+    assert digests == {
+        IMAGE.to_str(): {'v1': 'sha256:v1', 'v2': 'sha256:v2', 'v2_list': 'sha256:list'},
+        OTHER_IMAGE.to_str(): {'v2': 'sha256:other'},
+    }
+    assert list(digests[IMAGE.to_str()]) == ['v1', 'v2', 'v2_list']
+    assert wf_data.digest_ledger_hits == {'store_metadata': 2}
+    # the looked up digests are recorded
+    assert digest_ledger.get_recorded_digests(wf_data, OTHER_IMAGE) == {'v2': 'sha256:other'}
+
+
+def test_lookup_digests_recorded():
+    wf_data = ImageBuildWorkflowData()
+    digest_ledger.record_digest(wf_data, IMAGE, MEDIA_TYPE_DOCKER_V2_SCHEMA2, 'sha256:v2')
+    flexmock(RegistryClient).should_receive('get_manifest_digests').never()
+
+    for _ in range(2):
+        digests = digest_ledger.lookup_digests(wf_data, [IMAGE], REGISTRY, versions=('v2',),
+                                               consumer='verify_media')
+        assert digests == {IMAGE.to_str(): {'v2': 'sha256:v2'}}
+
+    assert wf_data.digest_ledger_hits == {'verify_media': 2}
+
+
+@pytest.mark.parametrize('status_code', [404, 500])
+def test_lookup_digests_missing_not_found(status_code):
+    wf_data = ImageBuildWorkflowData()
+    digest_ledger.record_digest(wf_data, IMAGE, MEDIA_TYPE_DOCKER_V2_SCHEMA2, 'sha256:v2')
+
+    response = flexmock(status_code=status_code)
+    (flexmock(RegistryClient)
+     .should_receive('get_manifest_digests')
+     .and_raise(requests.exceptions.HTTPError(response=response)))
+
+    if status_code == 404:
+        digests = digest_ledger.lookup_digests(wf_data, [IMAGE], REGISTRY)
+        assert digests == {IMAGE.to_str(): {'v2': 'sha256:v2'}}
+    else:
+        with pytest.raises(requests.exceptions.HTTPError):
+            digest_ledger.lookup_digests(wf_data, [IMAGE], REGISTRY)
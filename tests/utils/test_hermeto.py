@@ -738,6 +738,7 @@ def write_file_tree(tree_def: dict, rooted_at: Union[str, Path], *, exist_dirs_o
             None,
             id="subdir-symlink-ok",
         ),
+        pytest.param({"dangling": Symlink("missing/file")}, None, id="dangling-symlink-ok"),
         # bad
         pytest.param(
             {"symlink_to_parent": Symlink("..")}, "symlink_to_parent", id="parent-symlink-bad"
@@ -753,6 +754,14 @@ def write_file_tree(tree_def: dict, rooted_at: Union[str, Path], *, exist_dirs_o
             "subdir/symlink_to_root",
             id="subdir-root-symlink-bad",
         ),
+        pytest.param(
+            {"dangling": Symlink("../missing")}, "dangling", id="dangling-symlink-bad"
+        ),
+        pytest.param(
+            {"a": {"b": {"c": {"link": Symlink("../../../..")}}}},
+            "a/b/c/link",
+            id="nested-symlink-bad",
+        ),
     ],
 )
 def test_enforce_sandbox(file_tree, bad_symlink, tmp_path):
@@ -761,14 +770,28 @@ def test_enforce_sandbox(file_tree, bad_symlink, tmp_path):
         error = f"The destination of {bad_symlink!r} is outside of cloned repository"
         with pytest.raises(SymlinkSandboxError, match=error):
             enforce_sandbox(tmp_path, remove_unsafe_symlinks=False)
-        assert Path(tmp_path / bad_symlink).exists()
+        assert os.path.lexists(tmp_path / bad_symlink)
         enforce_sandbox(tmp_path, remove_unsafe_symlinks=True)
-        assert not Path(tmp_path / bad_symlink).exists()
+        assert not os.path.lexists(tmp_path / bad_symlink)
     else:
         enforce_sandbox(tmp_path, remove_unsafe_symlinks=False)
         enforce_sandbox(tmp_path, remove_unsafe_symlinks=True)
 
 
+def test_enforce_sandbox_resolves_only_symlinks(tmp_path):
+    file_tree = {
+        "dir": {"file": "foo", "subdir": {"file": "bar", "link": Symlink("../file")}},
+        "link_to_dir": Symlink("dir"),
+    }
+    write_file_tree(file_tree, tmp_path)
+
+    with mock.patch("os.path.realpath", wraps=os.path.realpath) as realpath:
+        enforce_sandbox(tmp_path, remove_unsafe_symlinks=False)
+
+    resolved = [Path(call.args[0]) for call in realpath.call_args_list]
+    assert resolved == [tmp_path, tmp_path / "link_to_dir", tmp_path / "dir/subdir/link"]
+
+
 def test_enforce_sandbox_symlink_loop(tmp_path, caplog):
     file_tree = {"foo_b": Symlink("foo_a"), "foo_a": Symlink("foo_b")}
     write_file_tree(file_tree, tmp_path)
@@ -776,19 +799,20 @@ def test_enforce_sandbox_symlink_loop(tmp_path, caplog):
     assert "Symlink loop from " in caplog.text
 
 
-@mock.patch("pathlib.Path.resolve")
-def test_enforce_sandbox_runtime_error(mock_resolve, tmp_path):
+def test_enforce_sandbox_runtime_error(tmp_path):
     error = "RuntimeError is triggered"
+    realpath = os.path.realpath
 
-    def side_effect():
-        raise RuntimeError(error)
-
-    mock_resolve.side_effect = side_effect
+    def side_effect(path):
+        if os.path.islink(path):
+            raise RuntimeError(error)
+        return realpath(path)
 
     file_tree = {"foo_b": Symlink("foo_a"), "foo_a": Symlink("foo_b")}
     write_file_tree(file_tree, tmp_path)
-    with pytest.raises(RuntimeError, match=error):
-        enforce_sandbox(tmp_path, remove_unsafe_symlinks=True)
+    with mock.patch("os.path.realpath", side_effect=side_effect):
+        with pytest.raises(RuntimeError, match=error):
+            enforce_sandbox(tmp_path, remove_unsafe_symlinks=True)
 
 
 def test_get_submodules_sbom_components(mocked_repo_submodules):
@@ -5,9 +5,13 @@ All rights reserved.
 This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
+import gzip
+import hashlib
+import json
 import subprocess
 
 import pytest
+import responses
 import tarfile
 import io
 import os
@@ -367,6 +371,118 @@ class TestImageUtil:
         ):
             image_util.get_uncompressed_image_layer_sizes(path=path)
 
+    def mock_registry_image(self, layers, media_type, diff_ids=None):
+        """Mock an image in the output registry, layers given as (blob, uncompressed content)"""
+        registry_url = 'https://registry.example.com'
+        config_blob = json.dumps({
+            'rootfs': {
+                'type': 'layers',
+                'diff_ids': diff_ids or [
+                    f'sha256:{hashlib.sha256(content).hexdigest()}' for _, content in layers
+                ],
+            },
+        }).encode()
+        blobs = [config_blob] + [blob for blob, _ in layers]
+        digests = [f'sha256:{hashlib.sha256(blob).hexdigest()}' for blob in blobs]
+
+        manifest = {
+            'schemaVersion': 2,
+            'mediaType': 'application/vnd.docker.distribution.manifest.v2+json',
+            'config': {'digest': digests[0]},
+            'layers': [{'digest': digest, 'mediaType': media_type} for digest in digests[1:]],
+        }
+        responses.add(responses.GET, f'{registry_url}/v2/ns/image/manifests/1-x86_64',
+                      json=manifest,
+                      headers={'Content-Type': manifest['mediaType']})
+        for digest, blob in set(zip(digests, blobs)):
+            responses.add(responses.GET, f'{registry_url}/v2/ns/image/blobs/{digest}', body=blob)
+
+        return config.Configuration(raw_config={
+            'version': 1,
+            'registry': {'url': registry_url, 'insecure': False},
+        })
+
+    @pytest.mark.parametrize('media_type', [
+        'application/vnd.docker.image.rootfs.diff.tar.gzip',
+        'application/vnd.oci.image.layer.v1.tar+gzip',
+        'application/vnd.oci.image.layer.v1.tar',
+    ])
+    @responses.activate
+    def test_get_uncompressed_image_layer_sizes_from_registry(self, media_type, monkeypatch):
+        monkeypatch.setattr(imageutil, 'LAYER_CHUNK_SIZE', 64)
+        contents = [os.urandom(1000), b'base layer' * 100, b'']
+        if media_type.endswith('gzip'):
+            # the 2nd layer consists of multiple gzip members
+            blobs = [
+                gzip.compress(contents[0]),
+                gzip.compress(contents[1][:500]) + gzip.compress(contents[1][500:]),
+                gzip.compress(contents[2]),
+            ]
+        else:
+            blobs = contents
+        conf = self.mock_registry_image(list(zip(blobs, contents)), media_type)
+
+        image_util = imageutil.ImageUtil(util.DockerfileImages([]), conf)
+        expected_data = [
+            {'diff_id': f'sha256:{hashlib.sha256(content).hexdigest()}', 'size': len(content)}
+            for content in contents
+        ]
+        image = 'registry.example.com/ns/image:1-x86_64'
+        assert image_util.get_uncompressed_image_layer_sizes_from_registry(image) == expected_data
+        blob_calls = [call for call in responses.calls if '/blobs/' in call.request.url]
+        assert len(blob_calls) == 4
+
+        # layer sizes are cached by digest, only the config is fetched again
+        assert image_util.get_uncompressed_image_layer_sizes_from_registry(image) == expected_data
+        blob_calls = [call for call in responses.calls if '/blobs/' in call.request.url]
+        assert len(blob_calls) == 5
+
+    @responses.activate
+    def test_get_uncompressed_image_layer_sizes_from_registry_diff_id_mismatch(self):
+        content = b'layer content'
+        conf = self.mock_registry_image(
+            [(gzip.compress(content), content)],
+            'application/vnd.docker.image.rootfs.diff.tar.gzip',
+            diff_ids=['sha256:' + 'a' * 64],
+        )
+        image_util = imageutil.ImageUtil(util.DockerfileImages([]), conf)
+        with pytest.raises(ValueError, match='does not match sha256:a{64} from config'):
+            image_util.get_uncompressed_image_layer_sizes_from_registry(
+                'registry.example.com/ns/image:1-x86_64'
+            )
+
+    @responses.activate
+    def test_get_uncompressed_image_layer_sizes_from_registry_unsupported(self):
+        content = b'layer content'
+        conf = self.mock_registry_image(
+            [(content, content)], 'application/vnd.oci.image.layer.v1.tar+zstd',
+        )
+        image_util = imageutil.ImageUtil(util.DockerfileImages([]), conf)
+        with pytest.raises(imageutil.UnsupportedLayerError,
+                           match=r'unsupported layer media types .*\+zstd'):
+            image_util.get_uncompressed_image_layer_sizes_from_registry(
+                'registry.example.com/ns/image:1-x86_64'
+            )
+        # no layer is downloaded, only the config
+        blob_calls = [call for call in responses.calls if '/blobs/' in call.request.url]
+        assert len(blob_calls) == 1
+
+    @pytest.mark.parametrize('chunk_size', [1, 64, 4096])
+    def test_decompress_layer(self, chunk_size, monkeypatch):
+        monkeypatch.setattr(imageutil, 'LAYER_CHUNK_SIZE', 64)
+        content = bytes(10000) + os.urandom(100)
+        blob = gzip.compress(content) + gzip.compress(bytes(128)) + gzip.compress(b'')
+        chunks = [blob[i:i + chunk_size] for i in range(0, len(blob), chunk_size)]
+
+        blob_checksum = hashlib.sha256()
+        pieces = list(imageutil._decompress_layer(
+            'application/vnd.oci.image.layer.v1.tar+gzip', chunks, blob_checksum
+        ))
+        # highly compressed chunks are not inflated at once
+        assert max(len(piece) for piece in pieces) == 64
+        assert b''.join(pieces) == content + bytes(128)
+        assert blob_checksum.digest() == hashlib.sha256(blob).digest()
+
     def test_extract_filesystem_layer(self, tmpdir):
         image_util = imageutil.ImageUtil(util.DockerfileImages([]), self.config)
         src_path = Path(tmpdir) / 'tarball.tar'
@@ -7,9 +7,13 @@ of the BSD license. See the LICENSE file for details.
 """
 
 import re
+import time
 from typing import Any, Dict
 
+import hashlib
+
 import koji
+from koji.util import adler32_constructor
 from atomic_reactor.inner import DockerBuildWorkflow
 from atomic_reactor.plugins.fetch_docker_archive import FetchDockerArchivePlugin
 from atomic_reactor.util import DockerfileImages, ManifestDigest, RegistryClient
@@ -20,7 +24,8 @@ from osbs.utils import ImageName
 from atomic_reactor.utils.koji import (koji_login, create_koji_session,
                                        TaskWatcher, tag_koji_build,
                                        get_koji_module_build, KojiUploadLogger,
-                                       get_output)
+                                       get_output, upload_file_with_checksums,
+                                       watch_tasks)
 from atomic_reactor.plugin import TaskCanceledException
 from atomic_reactor.constants import (KOJI_MAX_RETRIES,
                                       KOJI_OFFLINE_RETRY_INTERVAL,
@@ -28,8 +33,12 @@ from atomic_reactor.constants import (KOJI_MAX_RETRIES,
                                       IMAGE_TYPE_DOCKER_ARCHIVE)
 from flexmock import flexmock
 import pytest
+import requests
+import responses
 
+from atomic_reactor.utils.imageutil import UnsupportedLayerError
 from atomic_reactor.utils.rpm import parse_rpm_output
+from tests.util import MockKojiMulticall
 
 KOJI_RETRY_OPTS = {'anon_retry': True, 'max_retries': KOJI_MAX_RETRIES,
                    'retry_interval': KOJI_RETRY_INTERVAL, 'offline_retry': True,
@@ -168,43 +177,230 @@ class TestStreamTaskOutput(object):
         assert ''.join(list(streamer)) == contents
 
 
+class TestDownloadTaskOutput(object):
+    ROOT_URL = 'https://koji.example.com/kojifiles'
+    URL = f'{ROOT_URL}/work/tasks/4567/1234567/image.tar.gz'
+    CONTENT = b'0123456789abcdefghij'
+
+    def mock_session(self, size=len(CONTENT)):
+        session = flexmock()
+        (session
+            .should_receive('listTaskOutput')
+            .with_args(1234567, stat=True)
+            .and_return({'image.tar.gz': {'st_size': str(size)}}))
+        return session
+
+    def mock_http(self, ranged=True, fail_ranges=None, short=False):
+        """Serve CONTENT, return the list of requested ranges
+
+        :param fail_ranges: ranges (None without a range) failing with a connection error once
+        :param short: whether the responses lack their last byte
+        """
+        fail_ranges = set(fail_ranges or ())
+        cut = 1 if short else 0
+        requested = []
+        headers = {'Content-Length': str(len(self.CONTENT))}
+        if ranged:
+            headers['Accept-Ranges'] = 'bytes'
+        # unlike urllib3, responses reads the body of a HEAD response
+        responses.add(responses.HEAD, self.URL, headers=headers, body=self.CONTENT)
+
+        def get_callback(request):
+            requested_range = request.headers.get('Range')
+            requested.append(requested_range)
+            if requested_range in fail_ranges:
+                fail_ranges.remove(requested_range)
+                raise requests.exceptions.ConnectionError('connection reset')
+            if requested_range is None:
+                return 200, {}, self.CONTENT[:len(self.CONTENT) - cut]
+            start, end = map(int, requested_range[len('bytes='):].split('-'))
+            return 206, {}, self.CONTENT[start:end + 1 - cut]
+
+        responses.add_callback(responses.GET, self.URL, callback=get_callback)
+        return requested
+
+    @responses.activate
+    @pytest.mark.parametrize(('ranged', 'exp_ranges'), [
+        (True, ['bytes=0-7', 'bytes=8-15', 'bytes=16-19']),
+        (False, [None]),
+    ])
+    def test_download_http(self, tmp_path, monkeypatch, ranged, exp_ranges):
+        monkeypatch.setattr(koji_util, 'TASK_OUTPUT_RANGE_SIZE', 8)
+        requested = self.mock_http(ranged=ranged)
+        session = self.mock_session()
+        session.should_receive('downloadTaskOutput').never()
+        dest = tmp_path / 'image.tar.gz'
+
+        size = koji_util.download_task_output(session, 1234567, 'image.tar.gz', dest,
+                                              pathinfo=koji.PathInfo(self.ROOT_URL))
+
+        assert size == len(self.CONTENT)
+        assert dest.read_bytes() == self.CONTENT
+        assert sorted(requested, key=str) == sorted(exp_ranges, key=str)
+
+    @responses.activate
+    def test_download_http_resume(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(koji_util, 'TASK_OUTPUT_RANGE_SIZE', 8)
+        flexmock(time).should_receive('sleep')
+        # the first request of the range fails
+        requested = self.mock_http(fail_ranges={'bytes=8-15'})
+        session = self.mock_session()
+        session.should_receive('downloadTaskOutput').never()
+        dest = tmp_path / 'image.tar.gz'
+
+        koji_util.download_task_output(session, 1234567, 'image.tar.gz', dest,
+                                       pathinfo=koji.PathInfo(self.ROOT_URL))
+
+        assert dest.read_bytes() == self.CONTENT
+        assert requested.count('bytes=8-15') == 2
+
+    @responses.activate
+    @pytest.mark.parametrize(('ranged', 'fail_ranges', 'short', 'exp_requests'), [
+        # a short range is resumed, until the resumes run out
+        (True, (), True, koji_util.TASK_OUTPUT_MAX_RESUMES + 1),
+        # a download without ranges is not resumed
+        (False, (), True, 1),
+        (False, (None,), False, 1),
+    ])
+    def test_download_http_incomplete(self, tmp_path, caplog, ranged, fail_ranges, short,
+                                      exp_requests):
+        flexmock(time).should_receive('sleep')
+        requested = self.mock_http(ranged=ranged, fail_ranges=fail_ranges, short=short)
+        session = self.mock_session()
+        (session
+            .should_receive('downloadTaskOutput')
+            .and_return(self.CONTENT)
+            .and_return(b''))
+        dest = tmp_path / 'image.tar.gz'
+
+        koji_util.download_task_output(session, 1234567, 'image.tar.gz', dest,
+                                       pathinfo=koji.PathInfo(self.ROOT_URL))
+
+        assert len(requested) == exp_requests
+        assert dest.read_bytes() == self.CONTENT
+        assert f'Failed to download {self.URL}, streaming it from the hub' in caplog.text
+
+    @responses.activate
+    @pytest.mark.parametrize('http_status', [404, 200])
+    def test_download_hub_fallback(self, tmp_path, caplog, http_status):
+        if http_status == 404:
+            responses.add(responses.HEAD, self.URL, status=404)
+        else:
+            # size of the file on the web server does not match the task output
+            responses.add(responses.HEAD, self.URL, headers={'Content-Length': '3'},
+                          body=self.CONTENT[:3])
+        session = self.mock_session()
+        (session
+            .should_receive('downloadTaskOutput')
+            .and_return(self.CONTENT)
+            .and_return(b''))
+        dest = tmp_path / 'image.tar.gz'
+
+        koji_util.download_task_output(session, 1234567, 'image.tar.gz', dest,
+                                       pathinfo=koji.PathInfo(self.ROOT_URL))
+
+        assert dest.read_bytes() == self.CONTENT
+        assert f'Failed to download {self.URL}, streaming it from the hub' in caplog.text
+
+    def test_download_size_mismatch(self, tmp_path):
+        session = self.mock_session(size=len(self.CONTENT) + 1)
+        (session
+            .should_receive('downloadTaskOutput')
+            .and_return(self.CONTENT)
+            .and_return(b''))
+
+        with pytest.raises(RuntimeError, match='has 20 bytes, expected 21 bytes'):
+            koji_util.download_task_output(session, 1234567, 'image.tar.gz',
+                                           tmp_path / 'image.tar.gz')
+
+    def test_download_not_found(self, tmp_path):
+        session = flexmock()
+        session.should_receive('listTaskOutput').and_return({})
+
+        with pytest.raises(RuntimeError, match='image.tar.gz not found in the output of task'):
+            koji_util.download_task_output(session, 1234567, 'image.tar.gz',
+                                           tmp_path / 'image.tar.gz')
+
+
+class FakeUploadSession(object):
+    """Koji session implementing the fast upload calls"""
+
+    def __init__(self, corrupt_chunk=False):
+        self.uploaded: Dict[str, bytes] = {}
+        self.chunks = 0
+        self.corrupt_chunk = corrupt_chunk
+
+    def rawUpload(self, chunk, offset, path, name, overwrite=False):
+        self.chunks += 1
+        data = self.uploaded.get(name, b'')[:offset] + chunk
+        self.uploaded[name] = data
+        if self.corrupt_chunk:
+            chunk = chunk[:-1] + b'X'
+        return {'size': len(chunk), 'hexdigest': adler32_constructor(chunk).hexdigest()}
+
+    def checkUpload(self, path, name, verify=None):
+        data = self.uploaded[name]
+        return {'size': len(data), 'hexdigest': adler32_constructor(data).hexdigest()}
+
+
+class TestUploadFileWithChecksums(object):
+    @pytest.mark.parametrize(('content', 'blocksize', 'expected_chunks'), [
+        (b'', 4, 1),
+        (b'spam', 4, 1),
+        (b'spam and eggs', 4, 4),
+    ])
+    def test_upload(self, tmpdir, content, blocksize, expected_chunks):
+        local_file = tmpdir.join('output.tar.gz')
+        local_file.write_binary(content)
+        session = FakeUploadSession()
+
+        result = upload_file_with_checksums(session, str(local_file), 'koji-upload/dir',
+                                            'output.tar.gz', algorithms=['md5', 'sha256'],
+                                            blocksize=blocksize)
+
+        assert session.uploaded == {'output.tar.gz': content}
+        assert session.chunks == expected_chunks
+        assert result['checksums'] == {'md5sum': hashlib.md5(content).hexdigest(),
+                                       'sha256sum': hashlib.sha256(content).hexdigest()}
+        assert result['size'] == len(content)
+        assert result['seconds'] >= 0
+
+    def test_corrupted_chunk(self, tmpdir):
+        local_file = tmpdir.join('output.tar.gz')
+        local_file.write_binary(b'spam')
+        session = FakeUploadSession(corrupt_chunk=True)
+
+        with pytest.raises(koji.GenericError, match='upload checksum failed'):
+            upload_file_with_checksums(session, str(local_file), 'koji-upload/dir',
+                                       'output.tar.gz')
+
+
 class TestTaskWatcher(object):
-    @pytest.mark.parametrize(('finished', 'info', 'exp_state', 'exp_failed'), [
-        ([False, False, True],
-         {'state': koji.TASK_STATES['CANCELED']},
-         'CANCELED', True),
-
-        ([False, True],
-         {'state': koji.TASK_STATES['FAILED']},
-         'FAILED', True),
-
-        ([True],
-         {'state': koji.TASK_STATES['CLOSED']},
-         'CLOSED', False),
+    @pytest.mark.parametrize(('states', 'exp_state', 'exp_failed'), [
+        (['FREE', 'OPEN', 'CANCELED'], 'CANCELED', True),
+        (['OPEN', 'FAILED'], 'FAILED', True),
+        (['CLOSED'], 'CLOSED', False),
     ])
-    def test_wait(self, finished, info, exp_state, exp_failed):
+    def test_wait(self, states, exp_state, exp_failed):
         session = flexmock()
         task_id = 1234
-        task_finished = (session.should_receive('taskFinished')
-                         .with_args(task_id))
-        for finished_value in finished:
-            task_finished = task_finished.and_return(finished_value)
-
-        (session.should_receive('getTaskInfo')
-            .with_args(task_id, request=True)
-            .once()
-            .and_return(info))
+        get_task_info = (session.should_receive('getTaskInfo')
+                         .with_args(task_id, request=True)
+                         .times(len(states)))
+        for state in states:
+            get_task_info = get_task_info.and_return({'state': koji.TASK_STATES[state]})
 
         task = TaskWatcher(session, task_id, poll_interval=0)
         assert task.wait() == exp_state
         assert task.failed() == exp_failed
+        assert task.task_info == {'state': koji.TASK_STATES[exp_state]}
 
     def test_cancel(self):
         session = flexmock()
         task_id = 1234
         (session
-         .should_receive('taskFinished')
-         .with_args(task_id)
+         .should_receive('getTaskInfo')
+         .with_args(task_id, request=True)
          .and_raise(TaskCanceledException))
 
         task = TaskWatcher(session, task_id, poll_interval=0)
@@ -213,6 +409,63 @@ class TestTaskWatcher(object):
 
         assert task.failed()
 
+    def test_task_not_found(self):
+        session = flexmock()
+        session.should_receive('getTaskInfo').and_return(None)
+
+        task = TaskWatcher(session, 1234, poll_interval=0)
+        with pytest.raises(RuntimeError, match='Koji task 1234 not found'):
+            task.wait()
+
+    @pytest.mark.parametrize(('method', 'exp_intervals'), [
+        ('tagBuild', [1, 1.5, 2.25, 3.375, 5, 5]),
+        ('image', [15, 22.5, 33.75, 50.625, 60]),
+        ('buildContainer', [2, 3, 4.5, 6.75]),
+    ])
+    def test_next_interval(self, method, exp_intervals):
+        task = TaskWatcher(flexmock(), 1234)
+        task.update({'state': koji.TASK_STATES['OPEN'], 'method': method})
+        assert [task.next_interval() for _ in exp_intervals] == exp_intervals
+
+        task = TaskWatcher(flexmock(), 1234, poll_interval=7)
+        task.update({'state': koji.TASK_STATES['OPEN'], 'method': method})
+        assert [task.next_interval() for _ in exp_intervals] == [7] * len(exp_intervals)
+
+    def test_detect_delay(self):
+        flexmock(time).should_receive('time').and_return(1000.5)
+        task = TaskWatcher(flexmock(), 1234)
+
+        assert not task.update({'state': koji.TASK_STATES['OPEN'], 'completion_ts': None})
+        assert task.detect_delay is None
+        assert task.update({'state': koji.TASK_STATES['CLOSED'], 'completion_ts': 998.0})
+        assert task.state == 'CLOSED'
+        assert task.detect_delay == 2.5
+
+    def test_watch_tasks(self):
+        session = flexmock()
+        states = {
+            1: ['OPEN', 'CLOSED'],
+            2: ['OPEN', 'OPEN', 'FAILED'],
+            3: ['CLOSED'],
+        }
+
+        def get_task_info(task_id, request=False):
+            assert request
+            return {'state': koji.TASK_STATES[states[task_id].pop(0)]}
+
+        session.should_receive('getTaskInfo').replace_with(get_task_info)
+        # all the due tasks are polled in one multicall, the last one alone
+        (session
+            .should_receive('multicall')
+            .replace_with(lambda **kwargs: MockKojiMulticall(session))
+            .times(2))
+
+        watchers = [TaskWatcher(session, task_id, poll_interval=0) for task_id in states]
+        watch_tasks(session, watchers)
+
+        assert [watcher.state for watcher in watchers] == ['CLOSED', 'FAILED', 'CLOSED']
+        assert states == {1: [], 2: [], 3: []}
+
 
 class TestTagKojiBuild(object):
     @pytest.mark.parametrize(('task_state', 'failure'), (
@@ -237,10 +490,6 @@ class TestTagKojiBuild(object):
             .should_receive('tagBuild')
             .with_args(tag_name, build_id)
             .and_return(task_id))
-        (session
-            .should_receive('taskFinished')
-            .with_args(task_id)
-            .and_return(True))
         (session
             .should_receive('getTaskInfo')
             .with_args(task_id, request=True)
@@ -433,9 +682,16 @@ class TestKojiUploadLogger(object):
 @pytest.mark.parametrize('from_scratch', [True, False])
 @pytest.mark.parametrize('no_v2_digest', [True, False])
 @pytest.mark.parametrize('is_flatpak', [True, False])
+@pytest.mark.parametrize(('layer_sizes_from_registry', 'unsupported_layers'), [
+    (True, False),
+    (True, True),
+    (False, False),
+])
 def test_binary_build_get_output(no_v2_digest: bool,
                                  from_scratch: bool,
                                  is_flatpak: bool,
+                                 layer_sizes_from_registry: bool,
+                                 unsupported_layers: bool,
                                  workflow: DockerBuildWorkflow,
                                  tmpdir):
     platform = "x86_64"
@@ -482,13 +738,34 @@ def test_binary_build_get_output(no_v2_digest: bool,
     ]
     workflow.build_dir.init_build_dirs([platform], workflow.source)
     platform_dir = workflow.build_dir.platform_dir(platform)
-    (flexmock(workflow.imageutil)
-     .should_receive('get_uncompressed_image_layer_sizes')
-     .with_args(str(platform_dir.exported_squashed_image))
-     .and_return(layer_sizes))
+    # flatpaks are always built from the image archives
+    if layer_sizes_from_registry and not is_flatpak and not unsupported_layers:
+        (flexmock(workflow.imageutil)
+         .should_receive('get_uncompressed_image_layer_sizes_from_registry')
+         .with_args(image_pullspec)
+         .and_return(layer_sizes))
+    else:
+        if layer_sizes_from_registry and not is_flatpak:
+            # the image archive is fetched for layers which cannot be streamed
+            (flexmock(workflow.imageutil)
+             .should_receive('get_uncompressed_image_layer_sizes_from_registry')
+             .with_args(image_pullspec)
+             .and_raise(UnsupportedLayerError('unsupported layer media types'))
+             .once())
+            (flexmock(workflow.imageutil)
+             .should_receive('download_image_archive_tarball')
+             .with_args(image_pullspec, str(platform_dir.exported_squashed_image))
+             .once())
+        else:
+            flexmock(workflow.imageutil).should_receive('download_image_archive_tarball').never()
+        (flexmock(workflow.imageutil)
+         .should_receive('get_uncompressed_image_layer_sizes')
+         .with_args(str(platform_dir.exported_squashed_image))
+         .and_return(layer_sizes))
 
     workflow.conf.conf = {
         'registry': {'url': 'https://registry.host/', 'insecure': False},
+        'layer_sizes_from_registry': layer_sizes_from_registry,
     }
 
     # Mock get_inspect_for_image
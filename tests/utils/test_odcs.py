@@ -187,6 +187,51 @@ def test_wait_for_compose(odcs_client, final_state_id, final_state_name, expect_
         odcs_client.wait_for_compose(COMPOSE_ID)
 
 
+@responses.activate
+def test_wait_for_composes(odcs_client):
+    other_compose_id = COMPOSE_ID + 1
+    missing_compose_id = COMPOSE_ID + 2
+
+    def handle_composes_list(request):
+        assert_request_token(request, odcs_client.session)
+        items = [json.loads(compose_json(1, 'generating')),
+                 json.loads(compose_json(2, 'done', compose_id=other_compose_id))]
+        return (200, {}, json.dumps({'items': items, 'meta': {}}))
+
+    responses.add_callback(responses.GET, '{}composes/'.format(ODCS_URL),
+                           content_type='application/json',
+                           callback=handle_composes_list)
+    # composes missing in the list response are queried on their own
+    responses.add(responses.GET, '{}composes/{}'.format(ODCS_URL, missing_compose_id),
+                  body=compose_json(2, 'done', compose_id=missing_compose_id))
+    # the only compose still in progress is then polled on its own
+    responses.add(responses.GET, '{}composes/{}'.format(ODCS_URL, COMPOSE_ID),
+                  body=compose_json(2, 'done'))
+
+    (flexmock(time)
+        .should_receive('sleep')
+        .and_return(None))
+
+    composes = odcs_client.wait_for_composes([COMPOSE_ID, other_compose_id,
+                                              missing_compose_id])
+    assert sorted(composes) == [COMPOSE_ID, other_compose_id, missing_compose_id]
+    assert all(compose['state_name'] == 'done' for compose in composes.values())
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_wait_for_composes_failed(odcs_client):
+    other_compose_id = COMPOSE_ID + 1
+    items = [json.loads(compose_json(2, 'done')),
+             json.loads(compose_json(4, 'failed', compose_id=other_compose_id))]
+    responses.add(responses.GET, '{}composes/'.format(ODCS_URL),
+                  json={'items': items, 'meta': {}})
+
+    with pytest.raises(RuntimeError,
+                       match='Failed request for compose_id={}'.format(other_compose_id)):
+        odcs_client.wait_for_composes([COMPOSE_ID, other_compose_id])
+
+
 @responses.activate
 def test_renew_compose(odcs_client):
     new_compose_id = COMPOSE_ID + 1
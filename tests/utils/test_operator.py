@@ -7,6 +7,7 @@ of the BSD license. See the LICENSE file for details.
 """
 
 import copy
+import json
 
 from collections import Counter
 from io import StringIO
@@ -24,8 +25,10 @@ from atomic_reactor.utils.operator import (
     OperatorCSV,
     OperatorManifest,
     NotOperatorCSV,
+    UNKNOWN_KIND,
     default_pullspec_heuristic,
     get_yaml_parser,
+    scan_kind,
 )
 from osbs.utils import ImageName
 
@@ -1133,6 +1136,113 @@ class TestOperatorCSV(object):
         assert csv.data["spec"]["metadata"]["annotations"]["containerImage"] == 'd.e/f:1'
         assert csv.data["spec"]["metadata"]["annotations"]["notContainerImage"] == 'd.e/f:1'
 
+    def test_get_pullspecs_after_replacements(self):
+        data = {
+            'kind': 'ClusterServiceVersion',
+            'metadata': {
+                'annotations': {
+                    'containerImage': 'a.b/c:1',
+                    'foo': 'a.b/c:1, x a.b/d:1, x a.b/c:1',
+                }
+            },
+        }
+        replacements = {
+            ImageName.parse(old): ImageName.parse(new) for old, new in [
+                ('a.b/c:1', 'registry.example.com/c@sha256:' + SHA),
+                ('a.b/d:1', 'e.f/d:1'),
+            ]
+        }
+        self._mock_check_csv()
+        csv = OperatorCSV("original.yaml", data)
+        assert csv.get_pullspecs() == {ImageName.parse('a.b/c:1'), ImageName.parse('a.b/d:1')}
+
+        csv.replace_pullspecs(replacements)
+
+        # indices of pullspecs found in annotations are updated on replacement
+        assert csv.get_pullspecs() == set(replacements.values())
+        replaced = 'registry.example.com/c@sha256:' + SHA
+        assert csv.data['metadata']['annotations'] == {
+            'containerImage': replaced,
+            'foo': '{0}, x e.f/d:1, x {0}'.format(replaced),
+        }
+
+    def test_pullspec_index_rebuilt_on_changes(self):
+        csv = OperatorCSV("original.yaml", ORIGINAL.data)
+        index = csv._pullspec_index()
+
+        csv.get_pullspecs()
+        csv.replace_pullspecs_everywhere(self._replacement_pullspecs)
+        assert csv._pullspec_index() is index
+
+        csv.set_related_images()
+        assert csv._pullspec_index() is not index
+        index = csv._pullspec_index()
+
+        csv.modifications_update({'metadata': {'annotations': {'foo': 'a.b/c:1'}}})
+        assert csv._pullspec_index() is not index
+        assert ImageName.parse('a.b/c:1') in csv.get_pullspecs()
+
+    def test_pullspec_index_large_csv(self):
+        """
+        Benchmark-like test on a synthetic ~5 MB CSV: the data is walked and
+        the annotations are searched for pullspecs only once for all the
+        operations done by the pin_operator_digest plugin.
+        """
+        n_deployments = 100
+        n_containers = 10
+        n_envs = 20
+
+        def pullspec(i, j, k=0):
+            return 'registry.example.com/ns/image-{}-{}-{}:v1'.format(i, j, k)
+
+        deployments = []
+        for i in range(n_deployments):
+            containers = []
+            for j in range(n_containers):
+                env = [{'name': 'RELATED_IMAGE_{}_{}_{}'.format(i, j, k),
+                        'value': pullspec(i, j, k)} for k in range(n_envs)]
+                env += [{'name': 'OTHER_{}'.format(k), 'value': 'x' * 150}
+                        for k in range(n_envs)]
+                containers.append({'name': 'c-{}-{}'.format(i, j),
+                                   'image': pullspec(i, j, n_envs),
+                                   'env': env})
+            deployments.append({
+                'name': 'd-{}'.format(i),
+                'spec': {'template': {'metadata': {'annotations': {'foo': 'bar'}},
+                                      'spec': {'containers': containers}}},
+            })
+        alm_examples = ' '.join(
+            '{{"image": "{}", "description": "{}"}}'.format(pullspec(i % n_deployments, 0),
+                                                            'lorem ipsum ' * 20)
+            for i in range(n_deployments * 10)
+        )
+        data = {
+            'kind': 'ClusterServiceVersion',
+            'metadata': {'annotations': {'alm-examples': alm_examples,
+                                         'containerImage': pullspec(0, 0)}},
+            'spec': {'install': {'spec': {'deployments': deployments}}},
+        }
+        assert len(json.dumps(data)) > 5 * 1024 * 1024
+
+        searched = []
+
+        def heuristic(text):
+            searched.append(text)
+            return default_pullspec_heuristic(text)
+
+        csv = OperatorCSV("large.yaml", data, pullspec_heuristic=heuristic)
+        replacements = {p: ImageName.parse(p.to_str() + '-pinned') for p in csv.get_pullspecs()}
+        assert len(replacements) == n_deployments * n_containers * (n_envs + 1)
+
+        assert not csv.has_related_images()
+        csv.replace_pullspecs_everywhere(replacements)
+        csv.set_related_images()
+        # alm-examples and 'foo' annotations of all the deployments
+        assert len(searched) == n_deployments + 1
+
+        assert csv.get_pullspecs() == set(replacements.values())
+        assert len(searched) == 2 * (n_deployments + 1)
+
     def test_ignored_annotations(self):
         data = {
             'kind': 'ClusterServiceVersion',
@@ -1360,6 +1470,31 @@ class TestOperatorManifest(object):
         manifest = OperatorManifest.from_directory(str(tmpdir))
         assert manifest.csv
 
+    def test_from_directory_skips_other_kinds(self, tmpdir):
+        original = tmpdir.join("original.yaml")
+        original.write(ORIGINAL.content)
+        crd = tmpdir.join("crd.yaml")
+        crd.write("apiVersion: v1\nkind: CustomResourceDefinition\nspec: {}\n")
+        unknown = tmpdir.join("unknown.yml")
+        unknown.write("secret: &kind Secret\nkind: *kind\n")
+
+        # Only the CSV and the file which could not be scanned are fully parsed
+        (flexmock(OperatorCSV)
+            .should_call('from_file')
+            .with_args(str(original))
+            .once())
+        (flexmock(OperatorCSV)
+            .should_call('from_file')
+            .with_args(str(unknown))
+            .once())
+        (flexmock(OperatorCSV)
+            .should_call('from_file')
+            .with_args(str(crd))
+            .never())
+
+        manifest = OperatorManifest.from_directory(str(tmpdir))
+        assert manifest.csv.path == str(original)
+
     def test_directory_does_not_exist(self, tmpdir):
         nonexistent = tmpdir.join("nonexistent")
 
@@ -1379,6 +1514,28 @@ class TestOperatorManifest(object):
         assert str(exc_info.value) == msg
 
 
+@pytest.mark.parametrize('content, expected', [
+    (ORIGINAL_CONTENT, 'ClusterServiceVersion'),
+    (YAML_LIST_CONTENT, None),
+    ('', None),
+    ('just a string', None),
+    ('spec:\n  kind: Foo\n  list: [{kind: Bar}]\nkind: "Baz"\n', 'Baz'),
+    ('{apiVersion: v1, kind: Foo}', 'Foo'),
+    ('? [complex, key]\n: value\nkind: Foo\n', 'Foo'),
+    ('kind: [Foo]\n', None),
+    ('apiVersion: v1\n', None),
+    ('foo: &foo Foo\nkind: *foo\n', UNKNOWN_KIND),
+    ('kind: [Foo\n', UNKNOWN_KIND),
+])
+def test_scan_kind(tmpdir, content, expected):
+    path = tmpdir.join("file.yaml")
+    path.write(content)
+    if expected is UNKNOWN_KIND:
+        assert scan_kind(str(path)) is UNKNOWN_KIND
+    else:
+        assert scan_kind(str(path)) == expected
+
+
 def test_annotations_with_preserved_quotes():
     """Test special configuration of ruamel yaml
       * don't do line breaks after 80 characters
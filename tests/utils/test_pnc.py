@@ -7,6 +7,7 @@ of the BSD license. See the LICENSE file for details.
 """
 import json
 from io import BufferedReader, BytesIO
+from urllib.parse import parse_qs, urlparse
 
 import pytest
 import requests
@@ -82,6 +83,69 @@ class TestPNCUtil(object):
 
         assert pnc_artifact_purl_specs == [purl_spec]
 
+    @responses.activate
+    def test_get_artifacts_search(self):
+        artifacts = [{'id': str(artifact_id), 'md5': 'abcd',
+                      'publicUrl': f'https://code.example.com/{artifact_id}'}
+                     for artifact_id in range(1, 6)]
+        pnc_map = mock_pnc_map()
+        pnc_map['get_artifacts_path'] = 'artifacts'
+        pnc_util = PNCUtil(pnc_map)
+
+        pages = []
+
+        def search_callback(request):
+            query = parse_qs(urlparse(request.url).query)
+            pages.append(query)
+            assert query['q'] == ['id=in=(1,2,3,4)']
+            assert query['pageSize'] == ['4']
+            content = artifacts[:2] if query['pageIndex'] == ['0'] else artifacts[2:3]
+            return 200, {}, json.dumps({'totalPages': 2, 'content': content})
+
+        responses.add_callback(responses.GET, PNC_BASE_API_URL + '/artifacts',
+                               callback=search_callback)
+        # not found by the search
+        responses.add(responses.GET, PNC_BASE_API_URL + '/artifacts/4', status=200,
+                      body=json.dumps(artifacts[3]))
+
+        result = pnc_util.get_artifacts([1, 2, 3, 4, 2])
+
+        assert result == {artifact['id']: artifact for artifact in artifacts[:4]}
+        assert [query['pageIndex'] for query in pages] == [['0'], ['1']]
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_get_artifacts_without_search(self):
+        pnc_util = PNCUtil(mock_pnc_map())
+        artifacts = {}
+        for artifact_id in ('1', '2', '3'):
+            artifacts[artifact_id] = {'id': artifact_id, 'publicUrl': 'https://code.example.com',
+                                      'sha256': artifact_id}
+            responses.add(responses.GET, PNC_BASE_API_URL + f'/artifacts/{artifact_id}',
+                          status=200, body=json.dumps(artifacts[artifact_id]))
+
+        assert pnc_util.get_artifacts(['1', '2', '3']) == artifacts
+        assert pnc_util.artifact_url_and_checksums(artifacts['2']) == (
+            'https://code.example.com', {'sha256': '2'}
+        )
+
+    @responses.activate
+    def test_get_artifacts_known(self):
+        pnc_util = PNCUtil(mock_pnc_map())
+        known = {'1': {'id': '1', 'purl': 'pkg:maven/org.example/known@1'}}
+        responses.add(responses.GET, PNC_BASE_API_URL + '/artifacts/2', status=200,
+                      body=json.dumps({'id': '2', 'purl': 'pkg:maven/org.example/fetched@1',
+                                       'sha256': 'abcd', 'build': {'id': 'unused'}}))
+
+        assert pnc_util.get_artifact_purl_specs([2, 1], known) == [
+            'pkg:maven/org.example/fetched@1', 'pkg:maven/org.example/known@1',
+        ]
+        # only the missing artifact is requested, without fields which are not used
+        assert len(responses.calls) == 1
+        assert pnc_util.get_artifacts(['2']) == {
+            '2': {'id': '2', 'purl': 'pkg:maven/org.example/fetched@1', 'sha256': 'abcd'},
+        }
+
     @responses.activate
     def test_get_scm_archive_filename_in_header(self):
         build_id = '1234'
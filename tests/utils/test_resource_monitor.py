@@ -0,0 +1,111 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+
+import os
+import subprocess
+
+import pytest
+
+from atomic_reactor.utils import resource_monitor
+from atomic_reactor.utils.resource_monitor import (MAX_SAMPLE_INTERVAL, MIN_SAMPLE_INTERVAL,
+                                                   MB, ProcessUsage, ResourceMonitor)
+
+
+def test_unique_mounts(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    paths = [str(tmp_path), str(tmp_path / 'sub'), str(tmp_path / 'missing'), '/proc']
+    assert resource_monitor.unique_mounts(paths) == [str(tmp_path), '/proc']
+
+
+@pytest.mark.parametrize('files, expected', [
+    ([], None),
+    (['some avg10=12.50 avg60=3.00 avg300=1.00 total=1234\n'], 12.5),
+    ([None, 'some avg10=0.00 avg60=0.00 avg300=0.00 total=0\n'], 0.0),
+])
+def test_memory_pressure(tmp_path, monkeypatch, files, expected):
+    paths = []
+    for i, content in enumerate(files):
+        path = tmp_path / f'pressure{i}'
+        if content is not None:
+            path.write_text(content)
+        paths.append(str(path))
+    monkeypatch.setattr(resource_monitor, 'MEMORY_PRESSURE_FILES', paths)
+
+    assert resource_monitor.memory_pressure() == expected
+
+
+def test_process_tree_usage():
+    # the (sleep) child is a part of the tree, other processes are not
+    with subprocess.Popen(['sleep', '10']) as child:
+        try:
+            tree = resource_monitor.process_tree_usage(os.getpid())
+            child_only = resource_monitor.process_tree_usage(child.pid)
+        finally:
+            child.kill()
+
+    assert tree.processes >= 2
+    assert tree.rss_bytes > child_only.rss_bytes > 0
+    assert tree.cpu_seconds > 0
+    assert child_only.processes == 1
+
+    assert resource_monitor.process_tree_usage(2 ** 30) == ProcessUsage()
+
+
+def test_resource_monitor(monkeypatch, tmp_path):
+    usages = iter([
+        ProcessUsage(1, 100 * MB, 1.0, 0, 0),  # baseline
+        ProcessUsage(1, 100 * MB, 1.0, 0, 0),
+        ProcessUsage(1, 100 * MB, 1.0, 0, 0),
+        ProcessUsage(1, 100 * MB, 1.0, 0, 0),
+        ProcessUsage(2, 300 * MB, 1.0, 50 * MB, 10 * MB),
+        ProcessUsage(2, 300 * MB, 1.0, 50 * MB, 10 * MB),
+        ProcessUsage(2, 300 * MB, 1.0, 50 * MB, 10 * MB),
+    ])
+    monkeypatch.setattr(resource_monitor, 'process_tree_usage', lambda pid: next(usages))
+    monkeypatch.setattr(resource_monitor, 'memory_pressure', lambda: 1.5)
+    monkeypatch.setattr(resource_monitor, 'disk_usage', lambda path: {'mb_used': 42})
+
+    monitor = ResourceMonitor(paths=[str(tmp_path)])
+    intervals = [monitor.sample('plugin_a'), monitor.sample('plugin_a'),
+                 monitor.sample('plugin_b'), monitor.sample('plugin_b'),
+                 monitor.sample('plugin_b'), monitor.sample('plugin_b')]
+
+    # steady usage backs off, a new plugin or a change in usage (the memory grew, then
+    # the I/O stopped) resets the interval
+    assert intervals == [MIN_SAMPLE_INTERVAL, 2 * MIN_SAMPLE_INTERVAL, MIN_SAMPLE_INTERVAL,
+                         MIN_SAMPLE_INTERVAL, MIN_SAMPLE_INTERVAL, 2 * MIN_SAMPLE_INTERVAL]
+
+    data = monitor.as_dict()
+    assert data['mounts'] == [str(tmp_path)]
+    assert data['sample_count'] == 6
+    assert [sample[1] for sample in data['samples']] == ['plugin_a'] * 2 + ['plugin_b'] * 4
+    assert [sample[2] for sample in data['samples']] == [100, 100, 100, 300, 300, 300]
+    assert data['samples'][-1][4:] == [50, 10, 1.5, [42]]
+    assert data['peaks'] == {
+        'rss_mb': [300, 'plugin_b'],
+        'cpu_percent': [0.0, 'plugin_a'],
+        'memory_pressure': [1.5, 'plugin_a'],
+        'disk_used_mb': {str(tmp_path): [42, 'plugin_a']},
+    }
+    assert data['overhead_cpu_seconds'] >= 0
+
+
+def test_resource_monitor_limits(monkeypatch):
+    monkeypatch.setattr(resource_monitor, 'MAX_SAMPLES', 4)
+    monkeypatch.setattr(resource_monitor, 'process_tree_usage', lambda pid: ProcessUsage())
+
+    monitor = ResourceMonitor(paths=[])
+    intervals = [monitor.sample() for _ in range(10)]
+
+    assert intervals[-1] == MAX_SAMPLE_INTERVAL
+
+    monitor.sample('last')
+    assert monitor.sample_count == 11
+    assert len(monitor.samples) <= 4
+    # the last sample is always kept
+    assert monitor.samples[-1][1] == 'last'
@@ -0,0 +1,212 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+
+import io
+import os
+import tarfile
+
+import pytest
+
+from atomic_reactor.utils import unpack
+from atomic_reactor.utils.unpack import DecompressingReader, unpack_tarball
+
+
+def add_file(tar, name, data=b'', mode=0o644):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = mode
+    info.mtime = 1000
+    tar.addfile(info, io.BytesIO(data))
+
+
+def add_member(tar, name, member_type, linkname='', mode=0o755):
+    info = tarfile.TarInfo(name)
+    info.type = member_type
+    info.linkname = linkname
+    info.mode = mode
+    info.mtime = 1000
+    tar.addfile(info)
+
+
+@pytest.mark.parametrize('compression', ['', 'gz', 'bz2', 'xz'])
+def test_unpack_tarball(tmp_path, compression):
+    tarball = tmp_path / 'source.tar'
+    with tarfile.open(tarball, f'w:{compression}') as tar:
+        add_member(tar, 'app', tarfile.DIRTYPE, mode=0o700)
+        add_file(tar, 'app/README', b'readme')
+        add_file(tar, 'app/bin/run', b'#!/bin/sh', mode=0o755)
+        add_member(tar, 'app/docs', tarfile.SYMTYPE, linkname='README')
+        add_member(tar, 'app/README.link', tarfile.LNKTYPE, linkname='app/README')
+        add_member(tar, 'deps/bin', tarfile.SYMTYPE, linkname='../app/bin')
+        add_file(tar, 'deps/bin/tool', b'tool')
+        # replaced by later members
+        add_member(tar, 'app/replaced', tarfile.SYMTYPE, linkname='README')
+        add_file(tar, 'app/replaced', b'new')
+        add_file(tar, 'app/replaced', b'newer')
+
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    stats = unpack_tarball(tarball, dest)
+
+    assert (dest / 'app/README').read_bytes() == b'readme'
+    assert os.access(dest / 'app/bin/run', os.X_OK)
+    assert (dest / 'app/README').stat().st_mtime == 1000
+    assert (dest / 'app').stat().st_mode & 0o777 == 0o700
+    assert os.readlink(dest / 'app/docs') == 'README'
+    assert os.path.samefile(dest / 'app/README.link', dest / 'app/README')
+    assert (dest / 'app/bin/tool').read_bytes() == b'tool'
+    assert not (dest / 'app/replaced').is_symlink()
+    assert (dest / 'app/replaced').read_bytes() == b'newer'
+
+    assert stats.members == 10
+    assert stats.bytes == len(b'readme#!/bin/shtoolnewnewer')
+    assert stats.members_per_second > 0
+
+
+@pytest.mark.parametrize('members', [
+    [('../evil', tarfile.REGTYPE, '')],
+    [('/etc/evil', tarfile.REGTYPE, '')],
+    [('app/../../evil', tarfile.REGTYPE, '')],
+    [('link', tarfile.SYMTYPE, '..'), ('link/evil', tarfile.REGTYPE, '')],
+    [('hardlink', tarfile.LNKTYPE, '../outside')],
+    # a symlink to a directory checked before is replaced
+    [('link', tarfile.SYMTYPE, 'sub'), ('link/dir', tarfile.DIRTYPE, ''),
+     ('link', tarfile.SYMTYPE, '..'), ('link/evil', tarfile.REGTYPE, '')],
+    # the symlink x/y is created as y
+    [('x', tarfile.SYMTYPE, '.'), ('x/y', tarfile.SYMTYPE, '..'), ('y/evil', tarfile.REGTYPE, '')],
+    [('x', tarfile.SYMTYPE, '.'), ('x/y', tarfile.DIRTYPE, ''), ('x/y/z', tarfile.SYMTYPE, '../..'),
+     ('y/z/evil', tarfile.REGTYPE, '')],
+    # a symlink within the directory is redirected by replacing the symlink it points through
+    [('a', tarfile.SYMTYPE, 'sub'), ('b', tarfile.SYMTYPE, 'a/..'), ('a', tarfile.SYMTYPE, '.'),
+     ('b/evil', tarfile.REGTYPE, '')],
+])
+def test_unpack_tarball_path_traversal(tmp_path, members):
+    (tmp_path / 'outside').write_text('outside')
+    tarball = tmp_path / 'evil.tar.gz'
+    with tarfile.open(tarball, 'w:gz') as tar:
+        for name, member_type, linkname in members:
+            if member_type == tarfile.REGTYPE:
+                add_file(tar, name, b'evil')
+            else:
+                add_member(tar, name, member_type, linkname=linkname)
+
+    dest = tmp_path / 'dest'
+    (dest / 'sub').mkdir(parents=True)
+
+    with pytest.raises(tarfile.ExtractError, match='Attempted path traversal'):
+        unpack_tarball(tarball, dest)
+    assert not (tmp_path / 'evil').exists()
+
+
+def test_unpack_tarball_checked_ahead(tmp_path):
+    tarball = tmp_path / 'evil.tar'
+    with tarfile.open(tarball, 'w') as tar:
+        add_file(tar, 'app/README', b'readme')
+        add_file(tar, '../evil', b'evil')
+
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+
+    with pytest.raises(tarfile.ExtractError, match='Attempted path traversal'):
+        unpack_tarball(tarball, dest)
+    # nothing is written when any of the members is unsafe
+    assert not list(dest.iterdir())
+
+
+def test_unpack_tarball_symlinked_dirs(tmp_path):
+    tarball = tmp_path / 'source.tar'
+    with tarfile.open(tarball, 'w') as tar:
+        add_member(tar, 'x', tarfile.SYMTYPE, linkname='.')
+        add_file(tar, 'x/x/a/file', b'a')
+        add_member(tar, 'a/b', tarfile.SYMTYPE, linkname='../c')
+        add_file(tar, 'x/a/b/file', b'c')
+        add_member(tar, 'loop', tarfile.SYMTYPE, linkname='loop')
+
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    unpack_tarball(tarball, dest)
+
+    assert (dest / 'a/file').read_bytes() == b'a'
+    assert (dest / 'c/file').read_bytes() == b'c'
+    assert sorted(os.listdir(dest)) == ['a', 'c', 'loop', 'x']
+
+    with tarfile.open(tarball, 'w') as tar:
+        add_file(tar, 'loop/file')
+    with pytest.raises(OSError, match='Too many levels of symbolic links'):
+        unpack_tarball(tarball, dest)
+
+
+def test_unpack_tarball_outside_symlinks(tmp_path):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    tarball = tmp_path / 'source.tar'
+    with tarfile.open(tarball, 'w') as tar:
+        add_member(tar, 'py', tarfile.SYMTYPE, linkname='/usr/bin/python3')
+        add_member(tar, 'abs', tarfile.SYMTYPE, linkname=str(outside))
+        add_member(tar, 'up', tarfile.SYMTYPE, linkname='../outside')
+
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    # symlinks are unpacked wherever they point, like by extractall
+    unpack_tarball(tarball, dest)
+
+    assert os.readlink(dest / 'py') == '/usr/bin/python3'
+    assert os.readlink(dest / 'abs') == str(outside)
+    assert os.readlink(dest / 'up') == '../outside'
+
+    # but nothing is written through them
+    for name in ('abs/evil', 'up/evil', 'up/sub/evil'):
+        with tarfile.open(tarball, 'w') as tar:
+            add_file(tar, name, b'evil')
+        with pytest.raises(tarfile.ExtractError, match='Attempted path traversal'):
+            unpack_tarball(tarball, dest)
+    assert not list(outside.iterdir())
+
+
+# the tarball has fewer or more members on the second pass
+@pytest.mark.parametrize('index_longer', [True, False])
+def test_unpack_tarball_changed(tmp_path, monkeypatch, index_longer):
+    tarball = tmp_path / 'source.tar'
+    with tarfile.open(tarball, 'w') as tar:
+        add_file(tar, 'a')
+        add_file(tar, 'b')
+
+    index_members = unpack._index_members
+
+    def changed_index(*args):
+        index = index_members(*args)
+        if index_longer:
+            return index + [unpack._IndexEntry('c', str(tmp_path / 'dest/c'))]
+        return index[:-1]
+
+    monkeypatch.setattr(unpack, '_index_members', changed_index)
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+
+    with pytest.raises(tarfile.ReadError, match='changed while being unpacked'):
+        unpack_tarball(tarball, dest)
+
+
+def test_decompressing_reader(tmp_path, monkeypatch):
+    monkeypatch.setattr(unpack, 'DECOMPRESS_CHUNK_SIZE', 4)
+    monkeypatch.setattr(unpack, 'DECOMPRESS_QUEUE_SIZE', 1)
+    path = tmp_path / 'data'
+    path.write_bytes(b'0123456789')
+
+    with DecompressingReader(path) as reader:
+        assert reader.read() == b'0123456789'
+
+    # the decompressing thread stops when the reader is closed early
+    reader = DecompressingReader(path)
+    assert reader.read(2) == b'01'
+    reader.close()
+
+    path.write_bytes(b'\x1f\x8bcorrupted')
+    with DecompressingReader(path) as reader:
+        with pytest.raises(OSError):
+            reader.read()